@@ -5,17 +5,36 @@ Erweitert um Sequential Training Endpoints
 
 import os
 import json
+import time
+import base64
+import asyncio
 import redis
 import requests
 import psycopg2
 from contextlib import contextmanager
 from typing import Dict, List, Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from datetime import datetime
 
 # Import Bot Router
 from bot_router import router as bot_router
+from command_bus import enqueue_command
+from event_stream import EVENT_TOPICS, EventBroadcaster
+from response_cache import ResponseCache, SCOPE_MARKET, SCOPE_PORTFOLIO, is_not_modified
+from task_queues import QUEUE_METRICS_KEY
+from pipeline import pipeline_status
+import model_registry
+import training_scheduler
+from response_formats import (
+    FORMAT_JSON,
+    MEDIA_TYPES,
+    UnsupportedFormat,
+    build_candle_payload,
+    negotiate_format,
+    serializer_for,
+)
 
 # Redis Connection
 redis_host = os.getenv("REDIS_HOST", "redis")
@@ -35,6 +54,29 @@ except Exception as redis_error:
     print(f"❌ Redis connection failed: {redis_error}")
     r = None
 
+# Response Cache (Schlüssel: endpoint + params + data-version aus Redis)
+response_cache = ResponseCache(
+    r,
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 512)),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", 900)),
+)
+# Continuous Aggregates refreshen per Policy unabhängig von den Ingest-Writes (data_version):
+# ihr letzter erfolgreicher Refresh geht mit in den Cache-Key, sonst bleibt ein ETag zu lange gültig
+AGGREGATE_TIMEFRAMES = {
+    "15min": "market_data_15min",
+    "1hour": "market_data_1hour",
+    "1day": "market_data_1day",
+}
+AGGREGATE_WATERMARK_TTL = float(os.getenv("AGGREGATE_WATERMARK_TTL", 30))
+_aggregate_watermarks: Dict[str, object] = {"expires": 0.0, "values": {}}
+
+# Live Event Stream (eine Redis Pub/Sub Subscription pro Prozess, Fan-out an SSE-Clients)
+event_broadcaster = EventBroadcaster(
+    {"host": redis_host, "port": redis_port, "password": redis_password},
+    queue_size=int(os.getenv("SSE_CLIENT_QUEUE_SIZE", 256)),
+)
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", 15))
+
 # Alpaca API Configuration
 ALPACA_API_KEY = os.getenv("ALPACA_API_KEY")
 ALPACA_SECRET = os.getenv("ALPACA_SECRET")
@@ -104,22 +146,22 @@ def ensure_limit(value: int, default: int = 100, maximum: int = 1000) -> int:
     return min(value, maximum)
 
 
-def fetch_timescale_candles(
+def fetch_timescale_rows(
     symbol: str,
     timeframe: str,
     limit_val: int,
     start_dt: Optional[datetime] = None,
     end_dt: Optional[datetime] = None,
-) -> List[Dict[str, object]]:
-    """Liest OHLCV-Daten aus TimescaleDB für ein beliebiges Zeitfenster."""
+) -> List[tuple]:
+    """Liest OHLCV-Daten aus TimescaleDB für ein beliebiges Zeitfenster.
+
+    Liefert chronologisch sortierte Cursor-Zeilen (time, timestamp, open, high, low, close, volume);
+    Typ-Konvertierung (float8/bigint/Epoch) passiert bereits in SQL.
+    """
 
     timeframe = timeframe.lower()
 
-    aggregate_map = {
-        "15min": "market_data_15min",
-        "1hour": "market_data_1hour",
-        "1day": "market_data_1day",
-    }
+    aggregate_map = AGGREGATE_TIMEFRAMES
 
     timeframe_map = {
         "1min": "1 minute",
@@ -158,7 +200,6 @@ def fetch_timescale_candles(
                     query = f"""
                         SELECT
                             bucket,
-                            ticker,
                             open,
                             high,
                             low,
@@ -190,7 +231,6 @@ def fetch_timescale_candles(
                     query = f"""
                         SELECT
                             {bucket_expr} AS bucket,
-                            ticker,
                             (array_agg(open ORDER BY time))[1] AS open,
                             MAX(high) AS high,
                             MIN(low) AS low,
@@ -206,33 +246,99 @@ def fetch_timescale_candles(
                     allowed = sorted(list(aggregate_map.keys()) + list(timeframe_map.keys()))
                     raise HTTPException(status_code=400, detail=f"Invalid timeframe. Allowed: {allowed}")
 
+                query = f"""
+                    SELECT
+                        bucket,
+                        EXTRACT(EPOCH FROM bucket)::bigint,
+                        open::float8,
+                        high::float8,
+                        low::float8,
+                        close::float8,
+                        COALESCE(volume, 0)::bigint
+                    FROM ({query}) AS recent
+                    WHERE bucket IS NOT NULL
+                    ORDER BY bucket ASC
+                """
                 execute_params = [*params, limit_val]
                 cur.execute(query, execute_params)
-                rows = cur.fetchall()
+                return cur.fetchall()
 
     except HTTPException:
         raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    candles: List[Dict[str, object]] = []
-    for row in reversed(rows):  # Chronologisch sortieren
-        bucket_time, ticker, open_p, high_p, low_p, close_p, vol = row
-        if bucket_time is None:
-            continue
-        candles.append(
-            {
-                "time": bucket_time.isoformat(),
-                "timestamp": int(bucket_time.timestamp()),
-                "open": float(open_p) if open_p is not None else None,
-                "high": float(high_p) if high_p is not None else None,
-                "low": float(low_p) if low_p is not None else None,
-                "close": float(close_p) if close_p is not None else None,
-                "volume": int(vol) if vol is not None else 0,
-            }
-        )
+def aggregate_watermarks() -> Dict[str, str]:
+    """Letzter erfolgreicher Policy-Refresh pro Continuous Aggregate (view -> ISO), AGGREGATE_WATERMARK_TTL gecacht."""
+    now = time.monotonic()
+    if now < _aggregate_watermarks["expires"]:
+        return _aggregate_watermarks["values"]
+    values: Dict[str, str] = {}
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT ca.view_name, MAX(js.last_successful_finish)
+                    FROM timescaledb_information.continuous_aggregates ca
+                    JOIN timescaledb_information.jobs j
+                      ON j.hypertable_schema = ca.materialization_hypertable_schema
+                     AND j.hypertable_name = ca.materialization_hypertable_name
+                    JOIN timescaledb_information.job_stats js ON js.job_id = j.job_id
+                    GROUP BY ca.view_name
+                    """
+                )
+                values = {view: finished.isoformat() for view, finished in cur.fetchall() if finished}
+    except Exception as exc:
+        print(f"⚠️ Aggregate watermark lookup failed: {exc}")
+    _aggregate_watermarks.update(expires=now + AGGREGATE_WATERMARK_TTL, values=values)
+    return values
+
+
+def aggregate_watermark(timeframes: List[str]) -> Optional[str]:
+    """Cache-Key Anteil für aggregat-basierte Timeframes; None wenn keiner aus einem Aggregat kommt."""
+    views = sorted({AGGREGATE_TIMEFRAMES[tf.lower()] for tf in timeframes if tf.lower() in AGGREGATE_TIMEFRAMES})
+    if not views:
+        return None
+    watermarks = aggregate_watermarks()
+    return ",".join(f"{view}@{watermarks.get(view)}" for view in views)
+
+
+def cached_response(
+    request: Request,
+    endpoint: str,
+    params: Dict[str, object],
+    scope: str,
+    builder,
+    fmt: str = FORMAT_JSON,
+    frames_key: str = "data",
+) -> Response:
+    """Liefert einen gecachten Body (JSON/columnar/msgpack/arrow) mit ETag/Last-Modified bzw. 304."""
+    serializer = serializer_for(fmt, frames_key)
+    media_type = MEDIA_TYPES[fmt]
+    entry = response_cache.lookup_or_build(endpoint, params, scope, builder, serializer, media_type)
+    if entry is None:
+        return Response(content=serializer(builder()), media_type=media_type, headers={"Vary": "Accept"})
+
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": entry.last_modified,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept",
+    }
+    if is_not_modified(entry, request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        response_cache.record("not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+def resolve_response_format(request: Request, format_param: Optional[str]) -> str:
+    """Content Negotiation für OHLCV-Endpoints (?format=... oder Accept-Header)."""
+    try:
+        return negotiate_format(format_param, request.headers.get("accept"))
+    except UnsupportedFormat as exc:
+        raise HTTPException(status_code=406, detail=str(exc)) from exc
 
-    return candles
 
 def get_alpaca_headers():
     return {
@@ -358,62 +464,167 @@ async def get_positions():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+CLOSED_ORDER_STATUSES = ["filled", "canceled", "expired", "rejected", "replaced", "done_for_day"]
+
+
+def encode_trades_cursor(created_at: datetime, order_id: str) -> str:
+    """Opaker Keyset-Cursor (created_at, id) für /trades."""
+    raw = json.dumps([created_at.isoformat(), order_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_trades_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(order_id)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def format_trade(order_id, symbol, side, filled_qty, filled_avg_price, filled_at, status, order_type) -> Dict[str, object]:
+    quantity = float(filled_qty or 0)
+    return {
+        "id": order_id,
+        "ticker": symbol,
+        "side": side,  # buy/sell
+        "quantity": int(quantity) if quantity.is_integer() else quantity,  # Bruchteile bei fractional Orders
+        "price": float(filled_avg_price or 0),
+        "timestamp": filled_at.isoformat() if isinstance(filled_at, datetime) else filled_at,
+        "status": status,
+        "order_type": order_type
+    }
+
+
+def _fetch_trades_from_alpaca(limit: int, symbols: Optional[List[str]], side: Optional[str],
+                              start_dt: Optional[datetime], end_dt: Optional[datetime]) -> List[Dict[str, object]]:
+    """Fallback solange alpaca_orders noch nicht synchronisiert ist – Filter serverseitig bei Alpaca."""
+    params = {"status": "closed", "limit": limit, "direction": "desc"}
+    if symbols:
+        params["symbols"] = ",".join(symbols)
+    if side:
+        params["side"] = side
+    if start_dt:
+        params["after"] = start_dt.isoformat()
+    if end_dt:
+        params["until"] = end_dt.isoformat()
+
+    response = requests.get(
+        f"{ALPACA_BASE_URL}/v2/orders",
+        headers=get_alpaca_headers(),
+        params=params,
+        timeout=10
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Alpaca API error")
+
+    return [
+        format_trade(
+            order.get("id"),
+            order.get("symbol"),
+            order.get("side"),
+            order.get("filled_qty"),
+            order.get("filled_avg_price"),
+            order.get("filled_at"),
+            order.get("status"),
+            order.get("type"),
+        )
+        for order in response.json()
+    ]
+
+
 @app.get("/trades")
-async def get_trades(limit: int = 50, ticker: str = None):
+async def get_trades(
+    limit: int = 50,
+    ticker: str = None,
+    cursor: str = None,
+    side: str = None,
+    start: str = None,
+    end: str = None,
+):
     """
     Trading History (API.md Endpoint #7)
-    Zeigt abgeschlossene Trades
+    Zeigt abgeschlossene Trades aus der lokal synchronisierten Tabelle alpaca_orders
+    (Worker-Task sync_alpaca_orders), neueste zuerst, mit Keyset-Pagination.
     
     Query Parameters:
     - limit: Anzahl Trades (default: 50, max: 500)
-    - ticker: Filter nach Symbol (optional)
+    - ticker: Filter nach Symbol, kommagetrennt für mehrere (optional)
+    - side: buy | sell (optional)
+    - start / end: Zeitraum (ISO format, optional)
+    - cursor: next_cursor der vorherigen Seite (optional)
     """
+    limit = ensure_limit(limit, default=50, maximum=500)
+    symbols = sorted({t.strip().upper() for t in ticker.split(",") if t.strip()}) if ticker else None
+    side = side.lower() if side else None
+    if side and side not in {"buy", "sell"}:
+        raise HTTPException(status_code=400, detail="Parameter 'side' muss buy oder sell sein")
+    start_dt = parse_iso_datetime(start)
+    end_dt = parse_iso_datetime(end)
+    filters = {"ticker": ticker, "side": side, "start": start, "end": end}
+    active_filter = {k: v for k, v in filters.items() if v} or None
+
     try:
-        limit = min(limit, 500)  # Max 500
-        
-        # Alpaca Orders (closed/filled)
-        response = requests.get(
-            f"{ALPACA_BASE_URL}/v2/orders",
-            headers=get_alpaca_headers(),
-            params={
-                "status": "closed",
-                "limit": limit,
-                "direction": "desc"
-            },
-            timeout=10
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Alpaca API error")
-        
-        orders = response.json()
-        
-        # Filter by ticker if specified
-        if ticker:
-            orders = [o for o in orders if o.get("symbol") == ticker.upper()]
-        
-        # Format trades
-        formatted_trades = []
-        for order in orders:
-            filled_at = order.get("filled_at")
-            
-            formatted_trades.append({
-                "id": order.get("id"),
-                "ticker": order.get("symbol"),
-                "side": order.get("side"),  # buy/sell
-                "quantity": int(order.get("filled_qty", 0)),
-                "price": float(order.get("filled_avg_price", 0)),
-                "timestamp": filled_at,
-                "status": order.get("status"),
-                "order_type": order.get("type")
-            })
-        
+        synced = bool(r and r.exists("alpaca_orders_sync"))
+        if not synced:
+            if cursor:
+                raise HTTPException(status_code=400, detail="Cursor pagination requires synced order history")
+            trades = _fetch_trades_from_alpaca(limit, symbols, side, start_dt, end_dt)
+            return {
+                "trades": trades,
+                "count": len(trades),
+                "filter": active_filter,
+                "next_cursor": None,
+                "source": "alpaca"
+            }
+
+        clauses = ["status = ANY(%s)"]
+        params: List[object] = [CLOSED_ORDER_STATUSES]
+        if symbols:
+            clauses.append("symbol = ANY(%s)")
+            params.append(symbols)
+        if side:
+            clauses.append("side = %s")
+            params.append(side)
+        if start_dt:
+            clauses.append("created_at >= %s")
+            params.append(start_dt)
+        if end_dt:
+            clauses.append("created_at <= %s")
+            params.append(end_dt)
+        if cursor:
+            cursor_time, cursor_id = decode_trades_cursor(cursor)
+            clauses.append("(created_at, id) < (%s, %s)")
+            params.extend([cursor_time, cursor_id])
+        params.append(limit + 1)
+
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT id, symbol, side, filled_qty, filled_avg_price, filled_at, status, order_type, created_at
+                    FROM alpaca_orders
+                    WHERE {" AND ".join(clauses)}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, params)
+                rows = cur.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_trades_cursor(rows[-1][8], rows[-1][0])
+
+        trades = [format_trade(*row[:8]) for row in rows]
         return {
-            "trades": formatted_trades,
-            "count": len(formatted_trades),
-            "filter": {"ticker": ticker} if ticker else None
+            "trades": trades,
+            "count": len(trades),
+            "filter": active_filter,
+            "next_cursor": next_cursor,
+            "source": "timescaledb"
         }
         
+    except HTTPException:
+        raise
     except requests.exceptions.RequestException as e:
         raise HTTPException(status_code=503, detail=f"Alpaca API unavailable: {str(e)}")
     except Exception as e:
@@ -494,10 +705,11 @@ async def get_training_status():
 
 
 @app.post("/training/start")
-async def start_training():
+async def start_training(force: bool = False):
     """
     Startet sequenzielles Training manuell
     Trainiert alle Portfolio + Grok Tickers
+    force=true übergeht den Trainingsdaten-Fingerprint (kein Skip/Incremental)
     """
     try:
         if not r:
@@ -515,17 +727,21 @@ async def start_training():
                     "current_ticker": status.get("current_ticker")
                 }
         
-        # Training-Command setzen (Worker wird es aufnehmen)
-        r.set("training:command", "start")
-        r.expire("training:command", 300)  # 5 Minuten TTL
+        # Training-Command auf den Command Bus (Listener startet sofort)
+        command_id = enqueue_command(r, "training_start", {"force": force}, source="api")
+        if not command_id:
+            raise HTTPException(status_code=503, detail="Command bus unavailable")
         
         return {
             "success": True,
             "message": "Training command sent to worker",
+            "command_id": command_id,
             "monitor_endpoint": "/training/status",
             "note": "Training wird vom Worker verarbeitet"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -624,15 +840,166 @@ async def get_training_history():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/training/evaluations")
+async def get_training_evaluations(
+    model_version: str = None,
+    horizon: int = None,
+    ticker: str = "ALL",
+    limit: int = 20
+):
+    """
+    Out-of-Sample Metriken der Walk-Forward Evaluation (Tabelle model_evaluations)
+
+    - ohne model_version: die letzten `limit` Versionen (Vergleich über Modellversionen)
+    - ticker: 'ALL' (Default, alle Ticker zusammen) oder ein Symbol; '*' = alle Zeilen
+    """
+    try:
+        limit_val = ensure_limit(limit, default=20, maximum=200)
+        filters = []
+        if model_version:
+            filters.append(("model_version", model_version))
+        if horizon:
+            filters.append(("horizon_minutes", horizon))
+        if ticker and ticker != "*":
+            filters.append(("ticker", ticker.upper()))
+        params = [value for _, value in filters]
+        where = " AND ".join(f"{column} = %s" for column, _ in filters) or "TRUE"
+        where_e = " AND ".join(f"e.{column} = %s" for column, _ in filters) or "TRUE"
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    WITH versions AS (
+                        SELECT model_version, MAX(time) AS evaluated_at
+                        FROM model_evaluations
+                        WHERE {where}
+                        GROUP BY model_version
+                        ORDER BY evaluated_at DESC
+                        LIMIT %s
+                    )
+                    SELECT e.model_version, e.source, v.evaluated_at, e.horizon_minutes, e.ticker, e.folds, e.rows,
+                           e.mae, e.mape, e.rmse, e.r2, e.direction_accuracy
+                    FROM model_evaluations e
+                    JOIN versions v ON v.model_version = e.model_version
+                    WHERE {where_e}
+                    ORDER BY v.evaluated_at DESC, e.horizon_minutes, e.ticker
+                """, params + [limit_val] + params)
+                rows = cur.fetchall()
+        evaluations = []
+        for row in rows:
+            if not evaluations or evaluations[-1]["model_version"] != row[0]:
+                evaluations.append({
+                    "model_version": row[0],
+                    "source": row[1],
+                    "evaluated_at": row[2].isoformat() if row[2] else None,
+                    "metrics": []
+                })
+            evaluations[-1]["metrics"].append({
+                "horizon": row[3], "ticker": row[4], "folds": row[5], "rows": row[6],
+                "mae": row[7], "mape": row[8], "rmse": row[9], "r2": row[10], "direction_accuracy": row[11]
+            })
+        return {"evaluations": evaluations, "count": len(evaluations)}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/training/registry")
+async def get_model_registry(scope: str = None, horizon: int = None):
+    """
+    Model Registry: aktuelle Version (current Pointer), Rollback-History und Manifeste
+    (Features, Metriken, Trainingsfenster, Latenz) pro scope ('global' oder Ticker) und Horizon
+    """
+    try:
+        if not r:
+            raise HTTPException(status_code=503, detail="Redis not connected")
+        pointers = model_registry.current_map(r)
+        slots = []
+        for slot_scope, slot_horizon in model_registry.list_slots():
+            if scope and slot_scope != scope.upper() and slot_scope != scope:
+                continue
+            if horizon and slot_horizon != str(horizon):
+                continue
+            versions = model_registry.list_versions(slot_scope, slot_horizon)
+            current = pointers.get(model_registry.slot(slot_scope, slot_horizon))
+            manifest = model_registry.read_manifest(slot_scope, slot_horizon, current) if current else None
+            slots.append({
+                "scope": slot_scope,
+                "horizon": slot_horizon,
+                "current": current,
+                "history": model_registry.history(r, slot_scope, slot_horizon),
+                "versions": versions[::-1],
+                "manifest": {k: v for k, v in (manifest or {}).items() if k != "features"},
+                "feature_count": len((manifest or {}).get("features", []))
+            })
+        return {"slots": slots, "count": len(slots), "registry_dir": model_registry.REGISTRY_DIR}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/training/schedule")
+async def get_training_schedule():
+    """
+    Letzter Plan des Training Schedulers (Budget, eingeplante Jobs mit Score/Zeitlimit,
+    zurückgestellte und preempted Jobs) und der Backlog für das nächste Fenster
+    """
+    try:
+        if not r:
+            raise HTTPException(status_code=503, detail="Redis not connected")
+        plan_data = r.get(training_scheduler.PLAN_KEY)
+        backlog = training_scheduler.load_backlog(r)
+        return {
+            "plan": json.loads(plan_data) if plan_data else None,
+            "backlog": sorted(backlog.values(), key=lambda entry: entry.get("score", 0), reverse=True),
+            "backlog_size": len(backlog),
+            "next_budget_seconds": training_scheduler.window_budget()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/training/registry/rollback")
+async def rollback_model(horizon: int, scope: str = model_registry.GLOBAL_SCOPE, version: str = None):
+    """
+    Setzt den current Pointer auf `version` bzw. die zuvor promotete Version zurück.
+    Wirkt sofort: Inferenz-Worker laden beim nächsten Lauf die Version des Pointers.
+    """
+    try:
+        if not r:
+            raise HTTPException(status_code=503, detail="Redis not connected")
+        if scope != model_registry.GLOBAL_SCOPE:
+            scope = scope.upper()
+        previous = model_registry.current(r, scope, horizon)
+        try:
+            target = model_registry.rollback(r, scope, horizon, version)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        if not target:
+            raise HTTPException(status_code=409, detail="No previous version to roll back to")
+        return {"success": True, "scope": scope, "horizon": str(horizon), "previous": previous, "current": target}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ===== MARKET DATA ENDPOINTS =====
 
 @app.get("/market/data/{symbol}")
 async def get_market_data(
+    request: Request,
     symbol: str,
     timeframe: str = "15min",  # 1min, 5min, 15min, 1hour, 1day
     limit: int = 100,           # Anzahl Candles
     start: str = None,          # Optional: Start-Datum (ISO format)
-    end: str = None             # Optional: End-Datum (ISO format)
+    end: str = None,            # Optional: End-Datum (ISO format)
+    format: str = None          # Optional: json | columnar | msgpack | arrow
 ):
     """
     Historische OHLCV-Daten für Charts
@@ -643,25 +1010,39 @@ async def get_market_data(
     - limit: Anzahl Candles (max 1000, default 100)
     - start: Start-Datum (ISO format: 2025-10-01T00:00:00)
     - end: End-Datum (ISO format: 2025-10-02T23:59:59)
+    - format: json (Default), columnar, msgpack, arrow – alternativ per Accept-Header
     
     Returns:
-    - OHLCV-Daten als Array für Chart-Bibliotheken
+    - OHLCV-Daten als Array (json) bzw. parallele Arrays (columnar/msgpack/arrow)
+    - Gecacht pro Data-Version (ETag/Last-Modified, 304 bei unveränderten Daten)
     """
     try:
+        fmt = resolve_response_format(request, format)
         start_dt = parse_iso_datetime(start)
         end_dt = parse_iso_datetime(end)
         if start_dt and end_dt and end_dt < start_dt:
             raise HTTPException(status_code=400, detail="Parameter 'end' muss nach 'start' liegen")
 
         limit_val = ensure_limit(limit)
-        candles = fetch_timescale_candles(symbol, timeframe, limit_val, start_dt, end_dt)
 
-        return {
+        def build():
+            rows = fetch_timescale_rows(symbol, timeframe, limit_val, start_dt, end_dt)
+            return {
+                "symbol": symbol.upper(),
+                "timeframe": timeframe,
+                "count": len(rows),
+                "data": build_candle_payload(fmt, rows),
+            }
+
+        params = {
             "symbol": symbol.upper(),
-            "timeframe": timeframe,
-            "count": len(candles),
-            "data": candles,
+            "timeframe": timeframe.lower(),
+            "limit": limit_val,
+            "start": start_dt.isoformat() if start_dt else None,
+            "end": end_dt.isoformat() if end_dt else None,
+            "aggregate": aggregate_watermark([timeframe]),
         }
+        return cached_response(request, "market_data", params, SCOPE_MARKET, build, fmt)
 
     except HTTPException:
         raise
@@ -671,30 +1052,42 @@ async def get_market_data(
 
 @app.get("/market/ohlcv/{symbol}/multi")
 async def get_multi_timeframe_ohlcv(
+    request: Request,
     symbol: str,
     timeframes: str = "15min,1hour,1day",
     limit: int = 100,
+    format: str = None,
 ):
-    """Liefert mehrere TimescaleDB-Aggregate gleichzeitig."""
+    """Liefert mehrere TimescaleDB-Aggregate gleichzeitig (gecacht pro Data-Version, Formate wie /market/data)."""
 
     frames = [frame.strip() for frame in timeframes.split(",") if frame.strip()]
     if not frames:
         raise HTTPException(status_code=400, detail="Parameter 'timeframes' darf nicht leer sein")
 
+    fmt = resolve_response_format(request, format)
     limit_val = ensure_limit(limit)
-    result: Dict[str, List[Dict[str, object]]] = {}
 
-    try:
+    def build():
+        result: Dict[str, object] = {}
         for frame in frames:
-            candles = fetch_timescale_candles(symbol, frame, limit_val)
-            result[frame] = candles
-
+            result[frame] = build_candle_payload(fmt, fetch_timescale_rows(symbol, frame, limit_val))
         return {
             "symbol": symbol.upper(),
             "timeframes": result,
             "requested": frames,
         }
 
+    try:
+        params = {
+            "symbol": symbol.upper(),
+            "timeframes": ",".join(frames),
+            "limit": limit_val,
+            "aggregate": aggregate_watermark(frames),
+        }
+        return cached_response(
+            request, "market_ohlcv_multi", params, SCOPE_MARKET, build, fmt, frames_key="timeframes"
+        )
+
     except HTTPException:
         raise
     except Exception as exc:
@@ -770,97 +1163,162 @@ async def get_latest_price(symbol: str):
 # 🕐 TIMESCALEDB PERFORMANCE ENDPOINTS
 # ============================================
 
+MOVERS_CACHE_SECONDS = int(os.getenv("MOVERS_CACHE_SECONDS", 60))
+
+
+def _resolve_universe(universe: Optional[str]) -> Optional[List[str]]:
+    """Löst den universe-Parameter in eine Tickerliste auf (None = alle Ticker)."""
+    if not universe or universe.strip().lower() == "all":
+        return None
+
+    key = universe.strip().lower()
+    if key in {"dynamic", "portfolio"}:
+        if not r:
+            raise HTTPException(status_code=503, detail="Redis not available")
+        if key == "dynamic":
+            tickers = json.loads(r.get("dynamic_tickers") or "[]")
+        else:
+            positions = json.loads(r.get("portfolio_positions") or "[]")
+            tickers = [p.get("ticker") or p.get("symbol") for p in positions if isinstance(p, dict)]
+    else:
+        tickers = universe.split(",")
+
+    return sorted({t.strip().upper() for t in tickers if t and t.strip()})
+
+
+def _format_mover(ticker: str, open_p, close_p, change_pct, high_p, low_p) -> Dict[str, object]:
+    return {
+        "ticker": ticker,
+        "open": float(open_p),
+        "close": float(close_p),
+        "change_percent": round(float(change_pct), 2),
+        "high": float(high_p),
+        "low": float(low_p)
+    }
+
+
+def _top_movers_from_redis(limit: int, tickers: Optional[List[str]]) -> Optional[Dict[str, List]]:
+    """Liest Gainer/Loser aus der vom Worker gepflegten Intraday-Zusammenfassung."""
+    if not r:
+        return None
+
+    day = datetime.utcnow().date().isoformat()
+    summary_key = f"intraday:summary:{day}"
+    movers_key = f"intraday:movers:{day}"
+
+    if tickers is None:
+        pipe = r.pipeline(transaction=False)
+        pipe.zrevrange(movers_key, 0, limit - 1)
+        pipe.zrange(movers_key, 0, limit - 1)
+        gainer_tickers, loser_tickers = pipe.execute()
+        needed = list(dict.fromkeys(gainer_tickers + loser_tickers))
+    else:
+        needed = tickers
+    if not needed:
+        return None
+
+    summaries = {}
+    for ticker, raw in zip(needed, r.hmget(summary_key, needed)):
+        if raw:
+            summaries[ticker] = json.loads(raw)
+    if not summaries:
+        return None
+
+    if tickers is not None:
+        ranked = sorted(summaries, key=lambda t: summaries[t]["change_percent"], reverse=True)
+        gainer_tickers = ranked[:limit]
+        loser_tickers = ranked[::-1][:limit]
+
+    def build(selection: List[str]) -> List[Dict[str, object]]:
+        rows = []
+        for ticker in selection:
+            s = summaries.get(ticker)
+            if s and s.get("open"):
+                rows.append(_format_mover(ticker, s["open"], s["last"], s["change_percent"], s["high"], s["low"]))
+        return rows
+
+    return {"gainers": build(gainer_tickers), "losers": build(loser_tickers)}
+
+
+def _top_movers_from_db(limit: int, tickers: Optional[List[str]]) -> Dict[str, List]:
+    """Fallback: Gainer und Loser in einem einzigen Scan über die heutigen market_data Zeilen."""
+    universe_filter = ""
+    params: List[object] = []
+    if tickers is not None:
+        universe_filter = " AND ticker = ANY(%s)"
+        params.append(tickers)
+    params.extend([limit, limit])
+
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                WITH today_prices AS (
+                    SELECT
+                        ticker,
+                        FIRST(close, time) AS open_price,
+                        LAST(close, time) AS close_price,
+                        MAX(high) AS high_price,
+                        MIN(low) AS low_price
+                    FROM market_data
+                    WHERE time > date_trunc('day', NOW()){universe_filter}
+                    GROUP BY ticker
+                ), ranked AS (
+                    SELECT
+                        ticker,
+                        open_price,
+                        close_price,
+                        ((close_price - open_price) / open_price * 100) AS change_percent,
+                        high_price,
+                        low_price
+                    FROM today_prices
+                    WHERE open_price > 0
+                )
+                (SELECT 'gainer' AS side, * FROM ranked ORDER BY change_percent DESC LIMIT %s)
+                UNION ALL
+                (SELECT 'loser' AS side, * FROM ranked ORDER BY change_percent ASC LIMIT %s)
+            """, params)
+            rows = cur.fetchall()
+
+    movers: Dict[str, List] = {"gainers": [], "losers": []}
+    for side, *values in rows:
+        movers["gainers" if side == "gainer" else "losers"].append(_format_mover(*values))
+    return movers
+
+
 @app.get("/market/top-movers")
-async def get_top_movers(limit: int = 10):
+async def get_top_movers(response: Response, limit: int = 10, universe: Optional[str] = None):
     """
     Top Gainer und Loser des aktuellen Tages
-    Verwendet TimescaleDB Performance View
-    """
-    try:
-        with db_connection() as conn:
-            with conn.cursor() as cur:
-                # Top Gainer
-                cur.execute("""
-            WITH today_prices AS (
-                SELECT
-                    ticker,
-                    FIRST(close, time) AS open_price,
-                    LAST(close, time) AS close_price,
-                    MAX(high) AS high_price,
-                    MIN(low) AS low_price
-                FROM market_data
-                WHERE time > date_trunc('day', NOW())
-                GROUP BY ticker
-            )
-            SELECT
-                ticker,
-                open_price,
-                close_price,
-                ((close_price - open_price) / open_price * 100) AS change_percent,
-                high_price,
-                low_price
-            FROM today_prices
-            WHERE open_price > 0
-            ORDER BY change_percent DESC
-            LIMIT %s
-        """, (limit,))
-
-                gainers = []
-                for row in cur.fetchall():
-                    ticker, open_p, close_p, change_pct, high_p, low_p = row
-                    gainers.append({
-                        "ticker": ticker,
-                        "open": float(open_p),
-                        "close": float(close_p),
-                        "change_percent": round(float(change_pct), 2),
-                        "high": float(high_p),
-                        "low": float(low_p)
-                    })
 
-                # Top Loser
-                cur.execute("""
-            WITH today_prices AS (
-                SELECT
-                    ticker,
-                    FIRST(close, time) AS open_price,
-                    LAST(close, time) AS close_price,
-                    MAX(high) AS high_price,
-                    MIN(low) AS low_price
-                FROM market_data
-                WHERE time > date_trunc('day', NOW())
-                GROUP BY ticker
-            )
-            SELECT
-                ticker,
-                open_price,
-                close_price,
-                ((close_price - open_price) / open_price * 100) AS change_percent,
-                high_price,
-                low_price
-            FROM today_prices
-            WHERE open_price > 0
-            ORDER BY change_percent ASC
-            LIMIT %s
-        """, (limit,))
+    Liest die vom Worker (fetch_data) inkrementell gepflegte Intraday-Zusammenfassung aus Redis
+    (intraday:movers:{tag} / intraday:summary:{tag}); TimescaleDB nur als Fallback.
+    universe: all (Default) | dynamic | portfolio | kommagetrennte Ticker
+    """
+    limit = ensure_limit(limit, default=10, maximum=100)
+    tickers = _resolve_universe(universe)
 
-                losers = []
-                for row in cur.fetchall():
-                    ticker, open_p, close_p, change_pct, high_p, low_p = row
-                    losers.append({
-                        "ticker": ticker,
-                        "open": float(open_p),
-                        "close": float(close_p),
-                        "change_percent": round(float(change_pct), 2),
-                        "high": float(high_p),
-                        "low": float(low_p)
-                    })
-        
+    try:
+        movers = None
+        source = "intraday_summary"
+        try:
+            movers = _top_movers_from_redis(limit, tickers)
+        except redis.RedisError as redis_error:
+            print(f"⚠️ Intraday summary unavailable: {redis_error}")
+        if movers is None:
+            source = "timescaledb"
+            movers = _top_movers_from_db(limit, tickers)
+
+        response.headers["Cache-Control"] = f"public, max-age={MOVERS_CACHE_SECONDS}"
         return {
-            "gainers": gainers,
-            "losers": losers,
+            "gainers": movers["gainers"],
+            "losers": movers["losers"],
+            "universe": universe or "all",
+            "source": source,
             "timestamp": datetime.now().isoformat()
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -930,12 +1388,12 @@ async def get_portfolio_performance(days: int = 30):
 
 
 @app.get("/portfolio/performance/summary")
-async def get_portfolio_performance_summary(limit: int = 168):
-    """Kompakte Übersicht auf Basis des Continuous Aggregates portfolio_performance_30d."""
+async def get_portfolio_performance_summary(request: Request, limit: int = 168):
+    """Kompakte Übersicht auf Basis des Continuous Aggregates portfolio_performance_30d (gecacht pro Data-Version)."""
 
     limit_val = ensure_limit(limit, default=168, maximum=720)
 
-    try:
+    def build():
         with db_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
@@ -1004,6 +1462,16 @@ async def get_portfolio_performance_summary(limit: int = 168):
             "generated_at": datetime.now().isoformat(),
         }
 
+    try:
+        # portfolio_performance_30d ist eine View über ein gleitendes NOW()-Fenster: ändert sich stündlich
+        # auch ohne neuen Equity-Write -> aktuelle Stunde gehört zum Key
+        window = datetime.utcnow().strftime("%Y-%m-%dT%H")
+        return cached_response(
+            request, "portfolio_performance_summary", {"limit": limit_val, "window": window}, SCOPE_PORTFOLIO, build
+        )
+
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
@@ -1210,6 +1678,107 @@ async def get_database_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/stream")
+async def stream_events(request: Request, topics: str = ",".join(EVENT_TOPICS)):
+    """
+    Server-Sent Events: Live-Deltas statt Polling
+
+    topics: kommagetrennt aus market, predictions, trading, training (Default: alle)
+    Jedes Event: `event: <topic>` + `data: {"type", "time", "data"}`
+    """
+    selected = [t.strip().lower() for t in topics.split(",") if t.strip()]
+    invalid = [t for t in selected if t not in EVENT_TOPICS]
+    if not selected or invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid topics {invalid}. Allowed: {list(EVENT_TOPICS)}")
+
+    await event_broadcaster.start()
+    subscriber = event_broadcaster.subscribe(selected)
+
+    async def event_source():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield frame
+        finally:
+            event_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/stream/stats")
+async def get_stream_stats():
+    """Verbundene SSE-Clients, verteilte und verworfene Events (pro API-Prozess)."""
+    return {"stream": event_broadcaster.stats(), "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/system/cache-stats")
+async def get_cache_stats():
+    """Hit-Rate und Größe des Response Caches (pro API-Prozess) plus aktuelle Data-Versionen."""
+    versions = {}
+    for scope in (SCOPE_MARKET, SCOPE_PORTFOLIO):
+        version, updated = response_cache.data_version(scope)
+        versions[scope] = {
+            "version": version,
+            "updated": datetime.fromtimestamp(updated).isoformat() if updated else None,
+        }
+    return {
+        "cache": response_cache.stats(),
+        "data_versions": versions,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+
+@app.get("/system/queue-stats")
+async def get_queue_stats():
+    """Queue-Tiefe und Wait/Run-Zeiten der Celery Queues (Snapshot von collect_queue_metrics)."""
+    if not r:
+        raise HTTPException(status_code=503, detail="Redis not available")
+    try:
+        raw = r.get(QUEUE_METRICS_KEY)
+        if not raw:
+            raise HTTPException(status_code=404, detail="Queue metrics not collected yet")
+        return json.loads(raw)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Queue stats error: {str(e)}")
+
+
+@app.get("/system/pipeline-status")
+async def get_pipeline_status(runs: int = 10):
+    """Freshness und Dauer der Pipeline-Stufen ingest -> predict -> enhance -> trade."""
+    if not r:
+        raise HTTPException(status_code=503, detail="Redis not available")
+    try:
+        return pipeline_status(r, runs=ensure_limit(runs, 10, 100))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Pipeline status error: {str(e)}")
+
+@app.get("/system/provider-health")
+async def get_provider_health():
+    """Passive Provider Health (Erfolgsquote, Latenz) aus den echten API-Calls des Workers."""
+    if not r:
+        raise HTTPException(status_code=503, detail="Redis not available")
+    try:
+        raw = r.get("provider_health")
+        if not raw:
+            raise HTTPException(status_code=404, detail="Provider health not collected yet")
+        return json.loads(raw)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Provider health error: {str(e)}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,371 @@
+"""
+Vektorisierter Backtester für die trade_bot Schwellwert-Strategie
+
+Spielt 15-Minuten Bars (market_data_15min) und gespeicherte Predictions (Tabelle predictions)
+pro Ticker nach und wendet dieselben Regeln wie trade_bot an:
+
+- Signal: (predicted - price) / price >= buy_threshold_pct -> buy, <= -sell_threshold_pct -> sell
+  (ein Horizon, Default 60m; Menge max_position_per_trade; Fill zum Close des Bars)
+- Risk: emergency_stop_active, max_trades_per_run (pro Bar über alle Ticker), cooldown_minutes,
+  max_position_per_ticker (Trades pro Ticker und UTC-Tag), daily_notional_cap; Cooldowns und
+  Notional werden wie in trade_bot beim Tageswechsel zurückgesetzt
+
+Daten liegen als Matrizen (Bars × Ticker) vor. Signale, Positionen, Equity und Kennzahlen sind
+reine NumPy-Operationen; nur die pfadabhängigen Risk-Regeln laufen als Schleife über die
+Signal-Kandidaten (entfällt ganz, wenn keine dieser Regeln aktiv ist).
+
+Kennzahlen: P&L, Rendite, Sharpe (annualisiert aus Tagesrenditen), Max Drawdown, Turnover.
+Parameter-Sweeps verteilen die Kombinationen per ProcessPoolExecutor auf alle Kerne; die Daten
+werden pro Prozess nur einmal übertragen (Pool-Initializer).
+
+CLI:
+    python backtest.py --tickers AAPL,MSFT --days 365
+    python backtest.py --synthetic 100 --days 365 --sweep buy_threshold_pct=0.005,0.01,0.02 sell_threshold_pct=0.005,0.01
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+BAR_SECONDS = 15 * 60
+TRADING_DAYS = 252
+
+DEFAULT_PARAMS = {
+    # trading_settings
+    'buy_threshold_pct': 0.05,
+    'sell_threshold_pct': 0.05,
+    'max_position_per_trade': 1,
+    # risk_settings
+    'max_trades_per_run': 0,
+    'cooldown_minutes': 0,
+    'max_position_per_ticker': 0,
+    'daily_notional_cap': 0.0,
+    'emergency_stop_active': False,
+    # nur Backtest
+    'initial_capital': 100000.0,
+    'fee_bps': 0.0,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def params_from_settings(trading_settings: Optional[dict], risk_settings: Optional[dict]) -> Dict[str, object]:
+    """Backtest-Parameter aus den Redis Keys trading_settings / risk_settings (wie trade_bot sie liest)."""
+    params = dict(DEFAULT_PARAMS)
+    for source in (trading_settings or {}, risk_settings or {}):
+        for key in DEFAULT_PARAMS:
+            if source.get(key) is not None:
+                params[key] = source[key]
+    return params
+
+
+# ---------------------------------------------------------------------------
+# Daten
+# ---------------------------------------------------------------------------
+
+def build_dataset(tickers: List[str], bars: Iterable[tuple], predictions: Iterable[tuple],
+                  max_prediction_age_minutes: int = 30) -> Dict[str, object]:
+    """Matrizen aus Cursor-Zeilen.
+
+    bars:        (bucket, ticker, close)
+    predictions: (time, ticker, predicted_price), chronologisch
+    Entscheidungszeitpunkt eines Bars ist sein Ende (bucket + 15min); verwendet wird die letzte
+    Prediction davor, sofern sie nicht älter als max_prediction_age_minutes ist.
+    """
+    col = {ticker: idx for idx, ticker in enumerate(tickers)}
+    bars = [(int(b[0].timestamp()) + BAR_SECONDS, col[b[1]], b[2]) for b in bars if b[1] in col]
+    times = np.unique(np.array([b[0] for b in bars], dtype=np.int64))
+    close = np.full((len(times), len(tickers)), np.nan)
+    if bars:
+        rows = np.searchsorted(times, [b[0] for b in bars])
+        close[rows, [b[1] for b in bars]] = np.array([b[2] for b in bars], dtype=float)
+
+    per_ticker = {idx: ([], []) for idx in range(len(tickers))}
+    for ts, ticker, price in predictions:
+        if ticker in col and price is not None:
+            per_ticker[col[ticker]][0].append(int(ts.timestamp()))
+            per_ticker[col[ticker]][1].append(float(price))
+    predicted = np.full_like(close, np.nan)
+    max_age = max_prediction_age_minutes * 60
+    for idx, (pred_times, pred_values) in per_ticker.items():
+        if not pred_times:
+            continue
+        pred_times = np.array(pred_times, dtype=np.int64)
+        pred_values = np.array(pred_values)
+        pos = np.searchsorted(pred_times, times, side='right') - 1
+        valid = (pos >= 0) & (times - pred_times[np.maximum(pos, 0)] <= max_age)
+        predicted[:, idx] = np.where(valid, pred_values[np.maximum(pos, 0)], np.nan)
+    return {'tickers': list(tickers), 'times': times, 'close': close, 'predicted': predicted}
+
+
+def load_history(tickers: List[str], start: datetime, end: datetime, horizon: int = 60,
+                 max_prediction_age_minutes: int = 30) -> Dict[str, object]:
+    """Bars aus market_data_15min + Predictions (ein Horizon) aus TimescaleDB."""
+    from db_pool import db_cursor
+
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT bucket, ticker, close::float8
+            FROM market_data_15min
+            WHERE ticker = ANY(%s) AND bucket >= %s AND bucket < %s
+            ORDER BY bucket
+        """, (tickers, start, end))
+        bars = cur.fetchall()
+        cur.execute("""
+            SELECT time, ticker, predicted_price::float8
+            FROM predictions
+            WHERE ticker = ANY(%s) AND horizon_minutes = %s AND time >= %s AND time < %s
+            ORDER BY time
+        """, (tickers, horizon, start - timedelta(minutes=max_prediction_age_minutes), end))
+        predictions = cur.fetchall()
+    logger.info(f"Backtest data: {len(bars)} bars, {len(predictions)} predictions for {len(tickers)} tickers")
+    return build_dataset(tickers, bars, predictions, max_prediction_age_minutes)
+
+
+def synthetic_dataset(n_tickers: int = 100, days: int = 252, seed: int = 7, skill: float = 0.3) -> Dict[str, object]:
+    """Random-Walk Kurse + verrauschte 60m-Prognosen (skill = Anteil echter Zukunftsbewegung)."""
+    rng = np.random.default_rng(seed)
+    bars_per_day = 26  # 9:30-16:00 ET
+    day_starts = np.arange(days, dtype=np.int64) * 86400 + 1704205800  # 2024-01-02 14:30 UTC
+    times = (day_starts[:, None] + (np.arange(bars_per_day) + 1) * BAR_SECONDS).ravel()
+    returns = rng.normal(0, 0.004, (len(times), n_tickers))
+    close = 100 * np.exp(np.cumsum(returns, axis=0))
+    future = np.vstack([close[4:], np.repeat(close[-1:], 4, axis=0)])  # 4 Bars = 60 Minuten
+    noise = rng.normal(0, 0.008, close.shape)
+    predicted = close * (1 + skill * (future / close - 1) + noise)
+    predicted[rng.random(close.shape) < 0.05] = np.nan  # fehlende Predictions
+    return {'tickers': [f'T{i:03d}' for i in range(n_tickers)], 'times': times,
+            'close': close, 'predicted': predicted}
+
+
+# ---------------------------------------------------------------------------
+# Simulation
+# ---------------------------------------------------------------------------
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """Forward-Fill entlang der Zeitachse; führende NaN bleiben NaN."""
+    idx = np.where(np.isfinite(values), np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return values[idx, np.arange(values.shape[1])]
+
+
+def _apply_risk_rules(side: np.ndarray, close: np.ndarray, times: np.ndarray, p: dict) -> np.ndarray:
+    """Pfadabhängige Regeln aus trade_bot/check_risk_limits; Schleife nur über Signal-Kandidaten."""
+    qty = int(p['max_position_per_trade'])
+    max_run = int(p['max_trades_per_run'] or 0)
+    cooldown = int(p['cooldown_minutes'] or 0) * 60
+    max_ticker = int(p['max_position_per_ticker'] or 0)
+    cap = float(p['daily_notional_cap'] or 0)
+
+    trades = np.zeros(side.shape)
+    rows, cols = np.nonzero(side)
+    sides = side[rows, cols].tolist()
+    prices = close[rows, cols].tolist()
+    row_times = times[rows].tolist()
+    row_days = (times[rows] // 86400).tolist()
+
+    cooldown_until = [0] * side.shape[1]
+    trades_day = [0] * side.shape[1]
+    current_day, notional_today = None, 0.0
+    run_row, run_trades, run_blocked = -1, 0, False
+    filled_rows, filled_cols, filled_sides = [], [], []
+    for row, col, sig, price, ts, day in zip(rows.tolist(), cols.tolist(), sides, prices, row_times, row_days):
+        if day != current_day:
+            # trade_bot: risk_status Reset bei Datumswechsel (Notional + Cooldowns)
+            current_day, notional_today = day, 0.0
+            cooldown_until = [0] * side.shape[1]
+            trades_day = [0] * side.shape[1]
+        if row != run_row:
+            # check_risk_limits: Tagesvolumen >= Cap blockiert den ganzen Lauf
+            run_row, run_trades = row, 0
+            run_blocked = bool(cap) and notional_today >= cap
+        if run_blocked or (max_run and run_trades >= max_run):
+            continue
+        if cooldown and ts < cooldown_until[col]:
+            continue
+        if max_ticker and trades_day[col] >= max_ticker:
+            continue
+        notional = price * qty
+        if cap and notional_today + notional > cap:
+            continue
+        filled_rows.append(row)
+        filled_cols.append(col)
+        filled_sides.append(sig)
+        run_trades += 1
+        notional_today += notional
+        trades_day[col] += 1
+        if cooldown:
+            cooldown_until[col] = ts + cooldown
+    trades[filled_rows, filled_cols] = np.array(filled_sides, dtype=float) * qty
+    return trades
+
+
+def simulate(data: Dict[str, object], params: Optional[dict] = None) -> Dict[str, object]:
+    """Ein Backtest-Lauf; Rückgabe Kennzahlen + P&L pro Ticker."""
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    times, close, predicted = data['times'], data['close'], data['predicted']
+    capital = float(p['initial_capital'])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = (predicted - close) / close
+        side = np.where(change >= p['buy_threshold_pct'], 1, np.where(change <= -p['sell_threshold_pct'], -1, 0)).astype(np.int8)
+    side[~np.isfinite(change)] = 0
+
+    path_rules = any(p[key] for key in ('max_trades_per_run', 'cooldown_minutes', 'max_position_per_ticker', 'daily_notional_cap'))
+    if p['emergency_stop_active'] or not len(times):
+        trades = np.zeros(close.shape)
+    elif path_rules:
+        trades = _apply_risk_rules(side, close, times, p)
+    else:
+        trades = side * float(int(p['max_position_per_trade']))
+
+    price = np.nan_to_num(_ffill(close))
+    flows = trades * price
+    notional = np.abs(flows)
+    fees = notional * (float(p['fee_bps']) / 10000)
+    position = np.cumsum(trades, axis=0)
+    cash = -np.cumsum((flows + fees).sum(axis=1))
+    equity = capital + cash + (position * price).sum(axis=1)
+
+    result = {
+        'params': p,
+        'bars': int(len(times)),
+        'tickers': len(data['tickers']),
+        'trades': int(np.count_nonzero(trades)),
+        'buys': int((trades > 0).sum()),
+        'sells': int((trades < 0).sum()),
+        'notional': round(float(notional.sum()), 2),
+        'fees': round(float(fees.sum()), 2),
+        'pnl': 0.0, 'return_pct': 0.0, 'sharpe': None, 'max_drawdown': 0.0,
+        'turnover': 0.0, 'days': 0, 'pnl_by_ticker': {},
+    }
+    if not len(times):
+        return result
+
+    # Tagesrenditen aus der Equity am letzten Bar jedes UTC-Tages
+    days = times // 86400
+    day_end = np.nonzero(np.diff(days, append=days[-1] + 1))[0]
+    daily_equity = np.concatenate([[capital], equity[day_end]])
+    daily_returns = np.diff(daily_equity) / daily_equity[:-1]
+    std = daily_returns.std(ddof=1) if len(daily_returns) > 1 else 0.0
+    peak = np.maximum.accumulate(np.concatenate([[capital], equity]))
+    drawdown = (np.concatenate([[capital], equity]) - peak) / peak
+    pnl_by_ticker = -(flows + fees).sum(axis=0) + position[-1] * price[-1]
+
+    result.update({
+        'pnl': round(float(equity[-1] - capital), 2),
+        'return_pct': round(float(equity[-1] / capital - 1) * 100, 4),
+        'sharpe': round(float(daily_returns.mean() / std * np.sqrt(TRADING_DAYS)), 4) if std > 0 else None,
+        'max_drawdown': round(float(drawdown.min()), 6),
+        'turnover': round(float(notional.sum() / capital), 4),  # gehandeltes Notional / Startkapital
+        'days': int(len(day_end)),
+        'pnl_by_ticker': {t: round(float(v), 2) for t, v in zip(data['tickers'], pnl_by_ticker) if v},
+    })
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Parameter-Sweeps
+# ---------------------------------------------------------------------------
+
+_sweep_data: Optional[Dict[str, object]] = None
+
+
+def _init_sweep(data):
+    global _sweep_data
+    _sweep_data = data
+
+
+def _run_sweep(params):
+    result = simulate(_sweep_data, params)
+    result.pop('pnl_by_ticker', None)
+    return result
+
+
+def sweep(data: Dict[str, object], grid: Dict[str, list], base_params: Optional[dict] = None,
+          processes: Optional[int] = None) -> List[Dict[str, object]]:
+    """Alle Kombinationen aus grid (kartesisches Produkt), sortiert nach Sharpe (None zuletzt)."""
+    keys = list(grid)
+    combos = [dict(base_params or {}, **dict(zip(keys, values))) for values in itertools.product(*(grid[k] for k in keys))]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(combos) == 1:
+        _init_sweep(data)
+        results = [_run_sweep(c) for c in combos]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(combos)), initializer=_init_sweep, initargs=(data,)) as pool:
+            results = list(pool.map(_run_sweep, combos, chunksize=max(1, len(combos) // (processes * 4))))
+    return sorted(results, key=lambda r: r['sharpe'] if r['sharpe'] is not None else float('-inf'), reverse=True)
+
+
+def _parse_grid(specs: List[str]) -> Dict[str, list]:
+    grid = {}
+    for spec in specs:
+        key, _, values = spec.partition('=')
+        if key not in DEFAULT_PARAMS:
+            raise SystemExit(f"Unknown parameter '{key}'. Allowed: {sorted(DEFAULT_PARAMS)}")
+        grid[key] = [type(DEFAULT_PARAMS[key])(float(v)) if not isinstance(DEFAULT_PARAMS[key], bool) else v.lower() in ('1', 'true')
+                     for v in values.split(',')]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest der trade_bot Schwellwert-Strategie")
+    parser.add_argument("--tickers", help="Komma-getrennt (Default: dynamic_tickers aus Redis)")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--horizon", type=int, default=60)
+    parser.add_argument("--synthetic", type=int, metavar="N", help="N synthetische Ticker statt DB")
+    parser.add_argument("--settings", action="store_true", help="Parameter aus Redis trading_settings/risk_settings")
+    parser.add_argument("--set", nargs="*", default=[], metavar="KEY=VALUE", help="einzelne Parameter überschreiben")
+    parser.add_argument("--sweep", nargs="*", default=[], metavar="KEY=V1,V2", help="Parameter-Grid")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='[backtest] %(asctime)s %(levelname)s %(message)s')
+
+    params = dict(DEFAULT_PARAMS)
+    tickers = [t.strip().upper() for t in args.tickers.split(',')] if args.tickers else None
+    if args.settings or (not tickers and not args.synthetic):
+        import redis
+        import redis_codec
+        client = redis.from_url(os.getenv('REDIS_URL', 'redis://:pass123@redis:6379/0'))
+        if args.settings:
+            params = params_from_settings(redis_codec.loads(client.get('trading_settings'), {}),
+                                          redis_codec.loads(client.get('risk_settings'), {}))
+        if not tickers and not args.synthetic:
+            tickers = redis_codec.loads(client.get('dynamic_tickers'), []) or []
+    params.update({k: v[0] for k, v in _parse_grid(args.set).items()})
+
+    started = time.perf_counter()
+    if args.synthetic:
+        data = synthetic_dataset(args.synthetic, days=args.days)
+    else:
+        end = datetime.utcnow()
+        data = load_history(tickers, end - timedelta(days=args.days), end, horizon=args.horizon)
+    loaded = time.perf_counter()
+    print(f"📊 {data['close'].shape[0]} bars × {data['close'].shape[1]} tickers loaded in {loaded - started:.2f}s")
+
+    if args.sweep:
+        results = sweep(data, _parse_grid(args.sweep), base_params=params, processes=args.processes)
+        grid_keys = list(_parse_grid(args.sweep))
+        print(f"sweep: {len(results)} combinations in {time.perf_counter() - loaded:.2f}s")
+        for res in results[:args.top]:
+            combo = {k: res['params'][k] for k in grid_keys}
+            print(f"  {combo} pnl={res['pnl']:.2f} sharpe={res['sharpe']} max_dd={res['max_drawdown']:.4f} "
+                  f"turnover={res['turnover']:.2f} trades={res['trades']}")
+    else:
+        result = simulate(data, params)
+        print(f"simulated in {time.perf_counter() - loaded:.2f}s")
+        result.pop('pnl_by_ticker')
+        print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Command Bus auf Redis Streams (ersetzt die hochfrequenten Polling-Beat-Tasks)
+
+- Producer (API, Frontend-Bridge) hängen Commands an den Stream commands:stream an
+- Ein langlebiger Listener (docker-compose Service command-listener) liest per
+  XREADGROUP BLOCK aus der Consumer Group command-workers und führt die Handler
+  aus worker.COMMAND_HANDLERS sofort aus
+- Handler werfen bei Fehlern eine Exception; XACK nur nach Erfolg. Fehlgeschlagene Commands
+  bleiben pending, der Sweep (alle COMMAND_SWEEP_SECONDS) übernimmt sie nach
+  COMMAND_RETRY_IDLE_MS per XAUTOCLAIM und stellt sie erneut zu, nach COMMAND_MAX_RETRIES
+  landen sie in commands:dead. Der Sweep führt selbst keine Handler ohne Command aus.
+- Legacy-Bridge: das QML-Frontend schreibt weiterhin Keys (frontend:emergency_actions,
+  frontend:manual_orders, training:command, ...). Keyspace Notifications auf diese Keys
+  werden in Commands übersetzt; nach jedem (Re-)Subscribe werden Keys, die sich seit dem
+  letzten gesehenen Wert geändert haben, nachgeholt. Ohne konfigurierbare Notifications
+  prüft die Bridge die Keys alle COMMAND_SWEEP_SECONDS auf Änderungen.
+
+Start: python command_bus.py
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import redis
+
+COMMAND_STREAM = "commands:stream"
+COMMAND_DEAD_LETTER = "commands:dead"
+COMMAND_GROUP = "command-workers"
+COMMAND_STATS_KEY = "commands:stats"
+COMMAND_STREAM_MAXLEN = 10000
+
+COMMAND_BLOCK_MS = int(os.getenv("COMMAND_BLOCK_MS", 5000))
+COMMAND_RETRY_IDLE_MS = int(os.getenv("COMMAND_RETRY_IDLE_MS", 15000))
+COMMAND_MAX_RETRIES = int(os.getenv("COMMAND_MAX_RETRIES", 5))
+COMMAND_SWEEP_SECONDS = int(os.getenv("COMMAND_SWEEP_SECONDS", 15))
+
+# Legacy Frontend-Keys -> Command-Typ
+LEGACY_KEY_COMMANDS = {
+    "frontend:emergency_actions": "emergency",
+    "frontend:manual_orders": "manual_orders",
+    "training:command": "training_start",
+    "frontend:trading_config": "settings",
+    "frontend:bot_strategy": "settings",
+    "frontend:portfolio_settings": "settings",
+    "autotrading:enabled": "autotrading",
+    "autotrading:status": "autotrading",
+}
+# Zustands-Keys bleiben nach dem Handler gesetzt -> beim Nachholen nur bei geändertem Wert übersetzen
+# (die übrigen Keys leert der Handler bzw. sein Lauf ist ohne offene Einträge ein No-op)
+LEGACY_STATE_KEYS = {"frontend:trading_config", "frontend:bot_strategy", "frontend:portfolio_settings",
+                     "autotrading:enabled", "autotrading:status"}
+_EMPTY_VALUES = {None, "", "null", "[]", "{}"}
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_command(redis_client, command_type: str, payload: Optional[dict] = None, source: str = "api") -> Optional[str]:
+    """Hängt einen Command an den Stream an; liefert die Stream-ID (oder None bei Fehler)."""
+    fields = {
+        "type": command_type,
+        "payload": json.dumps(payload or {}, default=str),
+        "source": source,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    try:
+        message_id = redis_client.xadd(COMMAND_STREAM, fields, maxlen=COMMAND_STREAM_MAXLEN, approximate=True)
+        return message_id.decode() if isinstance(message_id, bytes) else message_id
+    except Exception as e:
+        logger.error(f"Enqueue command {command_type} failed: {e}")
+        return None
+
+
+class CommandBus:
+    """Langlebiger Consumer einer Redis-Stream Consumer Group."""
+
+    def __init__(self, redis_client, handlers: Dict[str, Callable[[dict], object]],
+                 consumer: Optional[str] = None, after_command: Optional[Callable[[], object]] = None):
+        self.redis = redis_client
+        self.handlers = handlers
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.after_command = after_command
+        self._stop = threading.Event()
+        self._last_sweep = 0.0
+
+    # ----- Setup -----
+    def ensure_group(self) -> None:
+        try:
+            self.redis.xgroup_create(COMMAND_STREAM, COMMAND_GROUP, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    # ----- Verarbeitung -----
+    def _handle(self, message_id: str, fields: Dict[str, str]) -> None:
+        command_type = fields.get("type")
+        handler = self.handlers.get(command_type)
+        started = time.perf_counter()
+        if handler is None:
+            logger.warning(f"Unknown command type '{command_type}' ({message_id}) -> dead letter")
+            self._dead_letter(message_id, fields, "unknown_command")
+            return
+        try:
+            payload = json.loads(fields.get("payload") or "{}")
+            result = handler(payload)
+        except Exception as e:
+            logger.error(f"Command {command_type} ({message_id}) failed: {e}")
+            self.redis.hincrby(COMMAND_STATS_KEY, f"{command_type}:failed", 1)
+            return  # nicht ACKen -> Retry über XAUTOCLAIM
+
+        self.redis.xack(COMMAND_STREAM, COMMAND_GROUP, message_id)
+        latency_ms = (time.perf_counter() - started) * 1000
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hincrby(COMMAND_STATS_KEY, f"{command_type}:ok", 1)
+        pipe.hset(COMMAND_STATS_KEY, f"{command_type}:last_ms", f"{latency_ms:.1f}")
+        pipe.hset(COMMAND_STATS_KEY, f"{command_type}:last_at", datetime.utcnow().isoformat())
+        pipe.execute()
+        logger.info(f"✅ Command {command_type} ({message_id}) handled in {latency_ms:.0f}ms: {str(result)[:120]}")
+        if self.after_command:
+            try:
+                self.after_command()
+            except Exception as e:
+                logger.warning(f"after_command hook failed: {e}")
+
+    def _dead_letter(self, message_id: str, fields: Dict[str, str], reason: str) -> None:
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(COMMAND_DEAD_LETTER, {**fields, "original_id": message_id, "reason": reason},
+                  maxlen=1000, approximate=True)
+        pipe.xack(COMMAND_STREAM, COMMAND_GROUP, message_id)
+        pipe.hincrby(COMMAND_STATS_KEY, "dead_lettered", 1)
+        pipe.execute()
+
+    def _retry_pending(self) -> int:
+        """Übernimmt lange unbestätigte Commands (Crash oder Handler-Fehler) und stellt sie neu zu."""
+        start_id, retried = "0-0", 0
+        while True:
+            next_id, claimed, *_ = self.redis.xautoclaim(
+                COMMAND_STREAM, COMMAND_GROUP, self.consumer, COMMAND_RETRY_IDLE_MS, start_id=start_id, count=20
+            )
+            for message_id, fields in claimed:
+                if not fields:  # bereits getrimmt
+                    self.redis.xack(COMMAND_STREAM, COMMAND_GROUP, message_id)
+                    continue
+                pending = self.redis.xpending_range(COMMAND_STREAM, COMMAND_GROUP, message_id, message_id, 1)
+                deliveries = pending[0]["times_delivered"] if pending else 1
+                if deliveries > COMMAND_MAX_RETRIES:
+                    logger.error(f"Command {fields.get('type')} ({message_id}) exceeded {COMMAND_MAX_RETRIES} retries")
+                    self._dead_letter(message_id, fields, "max_retries")
+                    continue
+                self._handle(message_id, fields)
+                retried += 1
+            next_id = next_id.decode() if isinstance(next_id, bytes) else next_id
+            if next_id in ("0-0", "0"):
+                return retried
+            start_id = next_id
+
+    def _maybe_sweep(self) -> None:
+        """Sweep: nur pending Commands per XAUTOCLAIM zurückholen, keine Handler ohne Command."""
+        now = time.monotonic()
+        if now - self._last_sweep < COMMAND_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+        try:
+            self._retry_pending()
+        except redis.ResponseError as e:
+            logger.warning(f"Command sweep failed: {e}")
+
+    def run_forever(self) -> None:
+        self.ensure_group()
+        logger.info(f"📬 Command bus listening on {COMMAND_STREAM} as {self.consumer}")
+        # Eigene, vor einem Neustart unbestätigte Commands zuerst abarbeiten
+        for _, messages in self.redis.xreadgroup(COMMAND_GROUP, self.consumer, {COMMAND_STREAM: "0"}, count=100) or []:
+            for message_id, fields in messages:
+                if fields:
+                    self._handle(message_id, fields)
+        while not self._stop.is_set():
+            try:
+                response = self.redis.xreadgroup(
+                    COMMAND_GROUP, self.consumer, {COMMAND_STREAM: ">"}, count=10, block=COMMAND_BLOCK_MS
+                )
+                for _, messages in response or []:
+                    for message_id, fields in messages:
+                        self._handle(message_id, fields)
+                self._maybe_sweep()
+            except redis.ConnectionError as e:
+                logger.warning(f"Command bus Redis connection lost: {e} – retry in 2s")
+                time.sleep(2)
+            except redis.ResponseError as e:
+                if "NOGROUP" in str(e):
+                    self.ensure_group()
+                else:
+                    raise
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class LegacyKeyBridge(threading.Thread):
+    """Übersetzt Keyspace Notifications auf Legacy-Frontend-Keys in Commands."""
+
+    def __init__(self, redis_client, db: int = 0):
+        super().__init__(daemon=True, name="legacy-key-bridge")
+        self.redis = redis_client
+        self.db = db
+        self._seen: Dict[str, Optional[str]] = {}  # key -> zuletzt übersetzter Wert
+
+    def _translate(self, key: str, value: Optional[str], catch_up: bool = False) -> bool:
+        """Enqueued den Command für key (leere Werte nie, Zustands-Keys beim Nachholen nur bei Änderung)."""
+        if value in _EMPTY_VALUES:
+            self._seen.pop(key, None)
+            return False
+        if catch_up and key in LEGACY_STATE_KEYS and self._seen.get(key) == value:
+            return False
+        self._seen[key] = value
+        return enqueue_command(self.redis, LEGACY_KEY_COMMANDS[key], {"key": key}, source="legacy_key") is not None
+
+    def catch_up(self) -> int:
+        """Holt Änderungen nach, deren Notification verloren ging (Disconnect, Start)."""
+        keys = list(LEGACY_KEY_COMMANDS)
+        return sum(self._translate(key, value, catch_up=True) for key, value in zip(keys, self.redis.mget(keys)))
+
+    def enable_notifications(self) -> bool:
+        try:
+            flags = self.redis.config_get("notify-keyspace-events").get("notify-keyspace-events", "")
+            wanted = set(flags) | set("K$")
+            if not set("K$") <= set(flags) and "A" not in flags:
+                self.redis.config_set("notify-keyspace-events", "".join(sorted(wanted)))
+            return True
+        except redis.ResponseError as e:
+            logger.warning(f"Keyspace notifications not configurable ({e}) – checking keys for changes")
+            return False
+
+    def run(self) -> None:
+        prefix = f"__keyspace@{self.db}__:"
+        while True:
+            try:
+                if not self.enable_notifications():
+                    self.catch_up()
+                    time.sleep(COMMAND_SWEEP_SECONDS)
+                    continue
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(*[prefix + key for key in LEGACY_KEY_COMMANDS])
+                self.catch_up()  # Änderungen während des Disconnects
+                for message in pubsub.listen():
+                    if message.get("data") != "set":
+                        continue
+                    key = message["channel"][len(prefix):]
+                    self._translate(key, self.redis.get(key))
+            except redis.ConnectionError as e:
+                logger.warning(f"Legacy key bridge disconnected: {e} – retry in 2s")
+                time.sleep(2)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    import worker
+
+    worker.ensure_defaults_once()
+    redis_client = redis.from_url(os.getenv("REDIS_URL"), decode_responses=True)
+    bridge = LegacyKeyBridge(redis_client, db=redis_client.connection_pool.connection_kwargs.get("db", 0))
+    bridge.start()
+    bus = CommandBus(
+        redis_client,
+        worker.COMMAND_HANDLERS,
+        after_command=worker.update_backend_responses,
+    )
+    bus.run_forever()
+
+
+if __name__ == "__main__":
+    main()
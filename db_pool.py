@@ -0,0 +1,203 @@
+"""
+Fork-sicherer PostgreSQL Connection Pool für Celery Worker
+
+- Ein psycopg2 ThreadedConnectionPool pro Prozess, angelegt in worker_process_init
+  (Prefork-Child) bzw. lazy beim ersten Zugriff; ein nach dem Fork geerbter Pool
+  des Parent-Prozesses wird verworfen (PID-Check) und nie benutzt
+- Health Check beim Auschecken: geschlossene Connections werden ersetzt, nach
+  längerer Idle-Zeit prüft ein SELECT 1 die Verbindung
+- Verbindungsfehler (OperationalError/InterfaceError) verwerfen die Connection,
+  der nächste Zugriff baut automatisch neu auf
+- db_cursor():   autocommit, für Reads und einzelne Writes
+- transaction(): explizite Transaktion (COMMIT bei Erfolg, ROLLBACK bei Fehler)
+  für Batch-Writes
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 4))
+DB_HEALTHCHECK_IDLE_SECONDS = float(os.getenv("DB_HEALTHCHECK_IDLE_SECONDS", 30))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_CONNECT_RETRIES = 3
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[pg_pool.ThreadedConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+_slots: Optional[threading.BoundedSemaphore] = None
+_last_used: Dict[int, float] = {}
+_stats = {"checkouts": 0, "waits": 0, "reconnects": 0, "healthcheck_failures": 0, "errors": 0, "pool_inits": 0}
+
+
+def _dsn() -> str:
+    return os.getenv("DATABASE_URL")
+
+
+def init_pool(minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX, dsn: Optional[str] = None) -> pg_pool.ThreadedConnectionPool:
+    """Legt den Pool für den aktuellen Prozess an (idempotent pro PID)."""
+    global _pool, _pool_pid, _slots
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            return _pool
+        # Geerbter Pool aus dem Parent: Sockets gehören dem Parent, nicht schließen
+        _pool = None
+        _last_used.clear()
+        last_error = None
+        for attempt in range(DB_CONNECT_RETRIES):
+            try:
+                _pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, dsn or _dsn())
+                break
+            except psycopg2.Error as e:
+                last_error = e
+                logger.error(f"DB pool init attempt {attempt + 1} failed: {e}")
+                time.sleep(2)
+        if _pool is None:
+            raise RuntimeError(f"Cannot connect to database after retries: {last_error}")
+        _pool_pid = os.getpid()
+        # ThreadedConnectionPool wirft bei Erschöpfung sofort PoolError -> Threads warten auf einen Slot
+        _slots = threading.BoundedSemaphore(maxconn)
+        _stats["pool_inits"] += 1
+        logger.info(f"🗄️ DB pool ready (pid={_pool_pid}, min={minconn}, max={maxconn})")
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _pool_pid = None
+        _last_used.clear()
+
+
+def _get_pool() -> pg_pool.ThreadedConnectionPool:
+    if _pool is None or _pool_pid != os.getpid():
+        return init_pool()
+    return _pool
+
+
+def _is_healthy(connection) -> bool:
+    if connection.closed:
+        return False
+    idle = time.monotonic() - _last_used.get(id(connection), 0.0)
+    if idle < DB_HEALTHCHECK_IDLE_SECONDS:
+        return True
+    try:
+        with connection.cursor() as cur:
+            cur.execute("SELECT 1")
+        if not connection.autocommit:
+            connection.rollback()
+        return True
+    except psycopg2.Error:
+        _stats["healthcheck_failures"] += 1
+        return False
+
+
+def _checkout(autocommit: bool):
+    db = _get_pool()
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        _stats["waits"] += 1
+        if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise pg_pool.PoolError(f"No DB connection free after {DB_POOL_TIMEOUT:.0f}s (max={db.maxconn})")
+    connection = None
+    # Slot bis zur Rückgabe halten; jeder Fehler beim Auschecken (auch der Reconnect) gibt ihn frei
+    try:
+        connection = db.getconn()
+        _stats["checkouts"] += 1
+        if not _is_healthy(connection):
+            db.putconn(connection, close=True)
+            _last_used.pop(id(connection), None)
+            connection = None  # bereits zurückgegeben
+            connection = db.getconn()
+            _stats["reconnects"] += 1
+        if connection.autocommit != autocommit:
+            connection.autocommit = autocommit
+    except BaseException:
+        if connection is not None:
+            _putconn(db, connection, broken=True)
+        slots.release()
+        raise
+    return db, slots, connection
+
+
+def _release(db, slots, connection, broken: bool) -> None:
+    try:
+        _putconn(db, connection, broken)
+    finally:
+        slots.release()
+
+
+def _putconn(db, connection, broken: bool) -> None:
+    if broken or connection.closed:
+        _last_used.pop(id(connection), None)
+        _stats["errors"] += 1
+        try:
+            db.putconn(connection, close=True)
+        except Exception:
+            pass
+        return
+    _last_used[id(connection)] = time.monotonic()
+    db.putconn(connection)
+
+
+@contextmanager
+def db_connection(autocommit: bool = True):
+    """Checkt eine gepoolte Connection aus; bei Verbindungsfehlern wird sie verworfen."""
+    db, slots, connection = _checkout(autocommit)
+    broken = False
+    try:
+        yield connection
+        if not autocommit and not connection.closed:
+            connection.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    except BaseException:
+        if not autocommit and not connection.closed:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                broken = True
+        raise
+    finally:
+        _release(db, slots, connection, broken)
+
+
+@contextmanager
+def db_cursor():
+    """Cursor auf einer autocommit Connection (Reads, einzelne idempotente Writes)."""
+    with db_connection(autocommit=True) as connection:
+        with connection.cursor() as cur:
+            yield cur
+
+
+@contextmanager
+def transaction():
+    """Cursor innerhalb einer expliziten Transaktion: COMMIT am Ende, ROLLBACK bei Exception."""
+    with db_connection(autocommit=False) as connection:
+        with connection.cursor() as cur:
+            yield cur
+
+
+def pool_stats() -> Dict[str, object]:
+    db = _pool if _pool_pid == os.getpid() else None
+    return {
+        **_stats,
+        "pid": os.getpid(),
+        "initialized": db is not None,
+        "in_use": len(db._used) if db is not None else 0,
+        "idle": len(db._pool) if db is not None else 0,
+        "max": db.maxconn if db is not None else DB_POOL_MAX,
+    }
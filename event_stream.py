@@ -0,0 +1,156 @@
+"""
+Event Stream (Redis Pub/Sub -> Server-Sent Events)
+
+Worker-Seite: publish_event() schreibt Deltas auf Kanäle events:{topic}
+  - events:market       fetch_data (geänderte Quotes)
+  - events:predictions  generate_predictions
+  - events:trading      trade_bot / append_trade_log / update_frontend_feedback
+  - events:training     SequentialTrainer.update_training_status
+
+API-Seite: EventBroadcaster hält pro Prozess genau EINE Redis-Subscription und verteilt
+jede Nachricht (einmal als SSE-Frame formatiert) an begrenzte Queues pro Client.
+Langsame Clients verlieren die ältesten Events statt den Broadcaster zu blockieren.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+EVENT_CHANNEL_PREFIX = "events:"
+EVENT_TOPICS = ("market", "predictions", "trading", "training")
+
+logger = logging.getLogger(__name__)
+
+
+def publish_event(redis_client, topic: str, event_type: str, data) -> int:
+    """Publiziert ein Event auf events:{topic}; Fehler werden nur geloggt (Best Effort)."""
+    message = json.dumps({
+        "type": event_type,
+        "time": datetime.utcnow().isoformat(),
+        "data": data,
+    }, default=str)
+    try:
+        return redis_client.publish(f"{EVENT_CHANNEL_PREFIX}{topic}", message)
+    except Exception as e:
+        logger.debug(f"Event publish failed ({topic}/{event_type}): {e}")
+        return 0
+
+
+class Subscriber:
+    """Ein verbundener Client mit eigener, begrenzter Queue."""
+
+    __slots__ = ("topics", "queue", "dropped")
+
+    def __init__(self, topics: Iterable[str], queue_size: int):
+        self.topics: Set[str] = set(topics)
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, frame: str) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Ältestes Event verwerfen – der Client bekommt den neuesten Stand
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.queue.put_nowait(frame)
+            self.dropped += 1
+
+
+class EventBroadcaster:
+    """Fan-out von Redis Pub/Sub auf beliebig viele SSE-Clients eines API-Prozesses."""
+
+    def __init__(self, redis_kwargs: Optional[Dict[str, object]] = None, queue_size: int = 256):
+        self.redis_kwargs = redis_kwargs or {
+            "host": os.getenv("REDIS_HOST", "redis"),
+            "port": int(os.getenv("REDIS_PORT", 6379)),
+            "password": os.getenv("REDIS_PASSWORD", "pass123"),
+        }
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscriber]] = {topic: set() for topic in EVENT_TOPICS}
+        self._task: Optional[asyncio.Task] = None
+        self._seq = 0
+        self._stats = {"received": 0, "delivered": 0, "reconnects": 0}
+
+    # ----- Client Verwaltung -----
+    def subscribe(self, topics: Iterable[str]) -> Subscriber:
+        subscriber = Subscriber(topics, self.queue_size)
+        for topic in subscriber.topics:
+            self._subscribers.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        for topic in subscriber.topics:
+            self._subscribers.get(topic, set()).discard(subscriber)
+
+    # ----- Verteilung -----
+    def dispatch(self, topic: str, data: str) -> int:
+        """Formatiert die Nachricht einmal als SSE-Frame und verteilt sie an alle Abonnenten."""
+        self._seq += 1
+        self._stats["received"] += 1
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return 0
+        frame = f"id: {self._seq}\nevent: {topic}\ndata: {data}\n\n"
+        for subscriber in subscribers:
+            subscriber.offer(frame)
+        self._stats["delivered"] += len(subscribers)
+        return len(subscribers)
+
+    async def start(self) -> None:
+        """Startet den Redis-Listener lazy beim ersten Client (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        import redis.asyncio as aioredis
+
+        backoff = 1
+        while True:
+            client = aioredis.Redis(decode_responses=True, **self.redis_kwargs)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{EVENT_CHANNEL_PREFIX}*")
+                backoff = 1
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    topic = message["channel"][len(EVENT_CHANNEL_PREFIX):]
+                    self.dispatch(topic, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["reconnects"] += 1
+                logger.warning(f"Event stream Redis subscription lost: {e} – retry in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                try:
+                    await pubsub.close()
+                    await client.close()
+                except Exception:
+                    pass
+
+    def stats(self) -> Dict[str, object]:
+        subscribers: Set[Subscriber] = set()
+        for subs in self._subscribers.values():
+            subscribers.update(subs)
+        return {
+            **self._stats,
+            "clients": len(subscribers),
+            "clients_per_topic": {topic: len(subs) for topic, subs in self._subscribers.items()},
+            "dropped": sum(s.dropped for s in subscribers),
+            "listener_running": self._task is not None and not self._task.done(),
+            "queue_size": self.queue_size,
+            "pid": os.getpid(),
+        }
@@ -0,0 +1,178 @@
+"""
+Inference Router: Ticker-Modelle (SequentialTrainer) vor dem globalen Multi-Horizon Modell
+
+generate_predictions hat bisher nur die globalen Modelle aus train_model genutzt, obwohl der
+SequentialTrainer pro Ticker und Horizon eigene Modelle trainiert (Registry scope = Ticker).
+Pro (Ticker, Horizon) gilt:
+
+- existiert eine Ticker-Version im Registry-Pointer, die nicht älter als
+  INFERENCE_TICKER_MODEL_MAX_AGE_HOURS ist -> Route 'ticker'
+- sonst (oder wenn Laden/Predict fehlschlägt) -> Route 'global'
+
+Ticker-Predictoren liegen in einem begrenzten LRU (INFERENCE_MAX_LOADED_MODELS), da 100 Ticker
+x 3 Horizonte nicht gleichzeitig in den RAM passen. Pro Zyklus werden deshalb höchstens so viele
+Ticker-Slots geroutet, wie der Cache hält (neueste Versionen zuerst) - die Auswahl bleibt über die
+Zyklen stabil, statt dass ein voller Scan den LRU jedes Mal komplett austauscht. Slots mit bekanntem
+Ladefehler (PredictorCache.failed) gehen direkt an das globale Modell. Vorhergesagt wird gruppiert pro Modell:
+das globale Modell bekommt alle Ticker eines Horizonts in einem predict()-Aufruf.
+Latenz pro Route landet in inference_route_stats, die Genauigkeit pro Route berechnet
+compute_prediction_quality_metrics aus dem deviation_tracker (Feld 'route').
+"""
+
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+import model_registry
+
+TICKER_MODELS_ENABLED = os.getenv('INFERENCE_TICKER_MODELS', '1') == '1'
+MAX_LOADED_MODELS = int(os.getenv('INFERENCE_MAX_LOADED_MODELS', '48'))
+MAX_MODEL_AGE_HOURS = float(os.getenv('INFERENCE_TICKER_MODEL_MAX_AGE_HOURS', '72'))
+
+ROUTE_TICKER = 'ticker'
+ROUTE_GLOBAL = 'global'
+ROUTE_STATS_KEY = 'inference_route_stats'
+
+logger = logging.getLogger(__name__)
+
+
+def plan_routes(client, tickers: Iterable[str], horizons: Iterable[str], max_age_hours: float = MAX_MODEL_AGE_HOURS,
+                now: Optional[datetime] = None) -> Dict[str, Dict[str, str]]:
+    """ticker -> {horizon: version} für alle frischen Ticker-Modelle (ein HMGET für alle Slots)."""
+    tickers, horizons = list(tickers), [str(hz) for hz in horizons]
+    slots = [(t, hz) for t in tickers for hz in horizons]
+    if not slots:
+        return {}
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=max_age_hours)
+    values = client.hmget(model_registry.CURRENT_KEY, [model_registry.slot(t, hz) for t, hz in slots])
+    routes = {}
+    for (ticker, hz), version in zip(slots, values):
+        version = model_registry._text(version)
+        trained = model_registry.version_time(version)
+        if trained is not None and trained >= cutoff:
+            routes.setdefault(ticker, {})[hz] = version
+    return routes
+
+
+def select_routes(routes: Dict[str, Dict[str, str]], cache: model_registry.PredictorCache,
+                  capacity: Optional[int] = None) -> tuple:
+    """Begrenzt routes auf capacity Slots, neueste Versionen zuerst (Versions-IDs sind sortierbar).
+
+    Rückgabe (routes, {'capacity_limited': n, 'known_failures': n}); alle übrigen Slots nutzen das
+    globale Modell.
+    """
+    slots, skipped = [], {'capacity_limited': 0, 'known_failures': 0}
+    for ticker, per_hz in routes.items():
+        for hz, version in per_hz.items():
+            if cache.failed(ticker, hz, version):
+                skipped['known_failures'] += 1
+            else:
+                slots.append((version, ticker, hz))
+    slots.sort(reverse=True)
+    if capacity and len(slots) > capacity:
+        skipped['capacity_limited'] = len(slots) - capacity
+        slots = slots[:capacity]
+    selected = {}
+    for version, ticker, hz in slots:
+        selected.setdefault(ticker, {})[hz] = version
+    return selected, skipped
+
+
+def _route_stats() -> Dict[str, float]:
+    return {'models': 0, 'predict_calls': 0, 'rows': 0, 'predict_ms': 0.0, 'failures': 0}
+
+
+def _predict(predictor, frame):
+    """Predict auf frame, ausgerichtet auf das Feature-Schema des Predictors (fehlende Spalten = 0)."""
+    import numpy as np
+
+    expected = list(predictor.feature_metadata.get_features())
+    start = time.perf_counter()
+    values = np.asarray(predictor.predict(frame.reindex(columns=expected, fill_value=0)), dtype=float)
+    return values, (time.perf_counter() - start) * 1000
+
+
+class InferenceRouter:
+    """Gruppierte Vorhersage pro Modell mit Ticker-Modell-Routing und LRU für Ticker-Predictoren."""
+
+    def __init__(self, capacity: int = MAX_LOADED_MODELS):
+        self.cache = model_registry.PredictorCache(max_entries=capacity)
+
+    def predict(self, client, features: Dict[str, object], global_predictors: Dict[str, object],
+                horizons: Iterable[str], global_versions: Optional[Dict[str, str]] = None,
+                ticker_models: bool = TICKER_MODELS_ENABLED) -> Dict[str, object]:
+        """features: ticker -> DataFrame mit einer Feature-Zeile.
+
+        Rückgabe {'predictions': {ticker: {hz: {'value', 'route', 'version'}}}, 'stats': {...}}
+        """
+        import pandas as pd
+
+        horizons = [str(hz) for hz in horizons]
+        global_versions = global_versions or {}
+        routes = plan_routes(client, features, horizons) if ticker_models else {}
+        routes, skipped = select_routes(routes, self.cache, self.cache.max_entries)
+        stats = {ROUTE_TICKER: {**_route_stats(), 'fallbacks': 0, **skipped}, ROUTE_GLOBAL: _route_stats()}
+        cache_before = dict(self.cache.stats)
+        predictions = {}
+        global_rows = {hz: [] for hz in horizons}
+
+        # 1) Ticker-Modelle: ein Predictor pro (Ticker, Horizon); Fehler fallen auf das globale Modell zurück
+        for ticker in features:
+            for hz in horizons:
+                version = routes.get(ticker, {}).get(hz)
+                if version is None:
+                    global_rows[hz].append(ticker)
+                    continue
+                entry = self.cache.get(ticker, hz, version)
+                try:
+                    if entry is None:
+                        raise RuntimeError('Predictor nicht ladbar')
+                    values, ms = _predict(entry['predictor'], features[ticker])
+                except Exception as e:
+                    logger.warning(f"Ticker-Modell {ticker}/{hz}@{version} fehlgeschlagen, Fallback global: {e}")
+                    stats[ROUTE_TICKER]['failures'] += 1
+                    stats[ROUTE_TICKER]['fallbacks'] += 1
+                    global_rows[hz].append(ticker)
+                    continue
+                route = stats[ROUTE_TICKER]
+                route['models'] += 1
+                route['predict_calls'] += 1
+                route['rows'] += 1
+                route['predict_ms'] += ms
+                predictions.setdefault(ticker, {})[hz] = {'value': float(values[0]), 'route': ROUTE_TICKER,
+                                                          'version': entry['version']}
+
+        # 2) Globales Modell: alle übrigen Ticker eines Horizonts in einem Batch
+        for hz, tickers in global_rows.items():
+            predictor = global_predictors.get(hz)
+            if predictor is None or not tickers:
+                continue
+            batch = pd.concat([features[t] for t in tickers], ignore_index=True)
+            try:
+                values, ms = _predict(predictor, batch)
+            except Exception as e:
+                logger.exception(f"Globales Modell hz={hz} fehlgeschlagen für {len(tickers)} Ticker: {e}")
+                stats[ROUTE_GLOBAL]['failures'] += 1
+                continue
+            route = stats[ROUTE_GLOBAL]
+            route['models'] += 1
+            route['predict_calls'] += 1
+            route['rows'] += len(tickers)
+            route['predict_ms'] += ms
+            for ticker, value in zip(tickers, values):
+                predictions.setdefault(ticker, {})[hz] = {'value': float(value), 'route': ROUTE_GLOBAL,
+                                                          'version': global_versions.get(hz)}
+
+        for route in stats.values():
+            route['predict_ms'] = round(route['predict_ms'], 3)
+            route['per_row_ms'] = round(route['predict_ms'] / route['rows'], 4) if route['rows'] else None
+        stats[ROUTE_TICKER]['load_ms'] = round(self.cache.stats['load_ms'] - cache_before['load_ms'], 1)
+        stats[ROUTE_TICKER]['loads'] = self.cache.stats['loads'] - cache_before['loads']
+        coverage = {hz: {ROUTE_TICKER: 0, ROUTE_GLOBAL: 0} for hz in horizons}
+        for per_hz in predictions.values():
+            for hz, pred in per_hz.items():
+                coverage[hz][pred['route']] += 1
+        return {'predictions': predictions,
+                'stats': {'routes': stats, 'coverage': coverage, 'cache': self.cache.snapshot()}}
@@ -138,9 +138,32 @@ CREATE TABLE IF NOT EXISTS alpaca_orders (
     id TEXT PRIMARY KEY,
     symbol TEXT NOT NULL,
     side TEXT,
-    qty INT,
-    filled_qty INT,
+    qty DOUBLE PRECISION,           -- Bruchstücke bei fractional/notional Orders
+    filled_qty DOUBLE PRECISION,
+    filled_avg_price DOUBLE PRECISION,
     status TEXT,
-    created_at TIMESTAMPTZ
+    order_type TEXT,
+    created_at TIMESTAMPTZ,
+    submitted_at TIMESTAMPTZ,
+    filled_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ
 );
+-- Bestehende Installationen: Spalten für den inkrementellen Order-Sync (sync_alpaca_orders) nachziehen
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS filled_avg_price DOUBLE PRECISION;
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS order_type TEXT;
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS submitted_at TIMESTAMPTZ;
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS filled_at TIMESTAMPTZ;
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE alpaca_orders ALTER COLUMN qty TYPE DOUBLE PRECISION;
+ALTER TABLE alpaca_orders ALTER COLUMN filled_qty TYPE DOUBLE PRECISION;
 CREATE INDEX IF NOT EXISTS idx_alpaca_orders_symbol_time ON alpaca_orders(symbol, created_at);
+-- Keyset-Pagination für /trades: ORDER BY created_at DESC, id DESC (optional pro Symbol)
+CREATE INDEX IF NOT EXISTS idx_alpaca_orders_time_id
+    ON alpaca_orders (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_alpaca_orders_symbol_time_id
+    ON alpaca_orders (symbol, created_at DESC, id DESC);
+-- Sync-Fenster: älteste noch offene Order
+CREATE INDEX IF NOT EXISTS idx_alpaca_orders_open_submitted
+    ON alpaca_orders (submitted_at)
+    WHERE status IN ('new', 'accepted', 'pending_new', 'partially_filled', 'accepted_for_bidding',
+                     'pending_cancel', 'pending_replace', 'held', 'calculated');
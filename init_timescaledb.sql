@@ -211,6 +211,35 @@ CREATE INDEX IF NOT EXISTS idx_grok_health_log_time
     ON grok_health_log (time DESC);
 
 
+-- ============================================
+-- 🧪 Model Evaluations (Walk-Forward, Out-of-Sample)
+-- ============================================
+
+-- Eine Zeile pro Modellversion × Horizon × Ticker (ticker = 'ALL' für alle Ticker zusammen)
+CREATE TABLE IF NOT EXISTS model_evaluations (
+    time TIMESTAMPTZ NOT NULL,
+    model_version TEXT NOT NULL,
+    source TEXT NOT NULL,              -- train_model | sequential
+    horizon_minutes INT NOT NULL,
+    ticker TEXT NOT NULL,
+    folds INT,
+    rows INT,
+    mae DOUBLE PRECISION,
+    mape DOUBLE PRECISION,
+    rmse DOUBLE PRECISION,
+    r2 DOUBLE PRECISION,
+    direction_accuracy DOUBLE PRECISION
+);
+
+SELECT create_hypertable('model_evaluations', 'time',
+    chunk_time_interval => INTERVAL '30 days',
+    if_not_exists => TRUE
+);
+
+CREATE INDEX IF NOT EXISTS idx_model_evaluations_version 
+    ON model_evaluations (model_version, horizon_minutes, ticker);
+
+
 -- ============================================
 -- 📦 NORMALE TABELLEN (keine Time-Series)
 -- ============================================
@@ -242,13 +271,36 @@ CREATE TABLE IF NOT EXISTS alpaca_orders (
     id TEXT PRIMARY KEY,
     symbol TEXT NOT NULL,
     side TEXT,
-    qty INT,
-    filled_qty INT,
+    qty DOUBLE PRECISION,           -- Bruchstücke bei fractional/notional Orders
+    filled_qty DOUBLE PRECISION,
+    filled_avg_price DOUBLE PRECISION,
     status TEXT,
-    created_at TIMESTAMPTZ
+    order_type TEXT,
+    created_at TIMESTAMPTZ,
+    submitted_at TIMESTAMPTZ,
+    filled_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ
 );
+-- Bestehende Installationen: Spalten für den inkrementellen Order-Sync (sync_alpaca_orders) nachziehen
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS filled_avg_price DOUBLE PRECISION;
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS order_type TEXT;
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS submitted_at TIMESTAMPTZ;
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS filled_at TIMESTAMPTZ;
+ALTER TABLE alpaca_orders ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE alpaca_orders ALTER COLUMN qty TYPE DOUBLE PRECISION;
+ALTER TABLE alpaca_orders ALTER COLUMN filled_qty TYPE DOUBLE PRECISION;
 CREATE INDEX IF NOT EXISTS idx_alpaca_orders_symbol_time 
     ON alpaca_orders (symbol, created_at);
+-- Keyset-Pagination für /trades: ORDER BY created_at DESC, id DESC (optional pro Symbol)
+CREATE INDEX IF NOT EXISTS idx_alpaca_orders_time_id
+    ON alpaca_orders (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_alpaca_orders_symbol_time_id
+    ON alpaca_orders (symbol, created_at DESC, id DESC);
+-- Sync-Fenster: älteste noch offene Order
+CREATE INDEX IF NOT EXISTS idx_alpaca_orders_open_submitted
+    ON alpaca_orders (submitted_at)
+    WHERE status IN ('new', 'accepted', 'pending_new', 'partially_filled', 'accepted_for_bidding',
+                     'pending_cancel', 'pending_replace', 'held', 'calculated');
 
 
 -- Settings
@@ -0,0 +1,173 @@
+"""
+US-Markt Handelszeiten + marktzeitabhängiger Celery Beat Schedule
+
+Phasen (US/Eastern):
+- pre      04:00 - 09:30  (Pre-Market)
+- regular  09:30 - 16:00  (13:00 an Early-Close Tagen)
+- post     16:00 - 20:00  (After-Hours, 17:00 an Early-Close Tagen)
+- closed   sonst, Wochenenden und NYSE-Feiertage
+
+market_schedule(run_every, sessions=...) ist ein celery.schedules.schedule, der
+nur in den angegebenen Phasen fällig wird. Außerhalb schläft Beat bis zum
+nächsten Fenster (max. MAX_SLEEP_SECONDS, danach Neuberechnung).
+"""
+
+from datetime import date, datetime, time as dtime, timedelta
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import holidays
+import pytz
+from celery.schedules import schedstate, schedule
+
+EASTERN = pytz.timezone('US/Eastern')
+
+PHASE_PRE = 'pre'
+PHASE_REGULAR = 'regular'
+PHASE_POST = 'post'
+PHASE_CLOSED = 'closed'
+EXTENDED_SESSIONS = (PHASE_PRE, PHASE_REGULAR, PHASE_POST)
+OFF_HOURS = (PHASE_CLOSED,)
+
+PRE_OPEN = dtime(4, 0)
+REGULAR_OPEN = dtime(9, 30)
+REGULAR_CLOSE = dtime(16, 0)
+EARLY_CLOSE = dtime(13, 0)
+POST_CLOSE = dtime(20, 0)
+EARLY_POST_CLOSE = dtime(17, 0)
+
+MAX_SLEEP_SECONDS = 3600
+
+
+@lru_cache(maxsize=4)
+def us_holidays(year: int):
+    """NYSE-Feiertage pro Jahr (Aufbau ist teuer, wird pro Prozess gecacht).
+
+    holidays.NYSE enthält Good Friday und nicht Columbus/Veterans Day; ältere
+    holidays-Versionen ohne NYSE-Kalender fallen auf die US-Bundesfeiertage zurück.
+    """
+    calendar = getattr(holidays, 'NYSE', None) or holidays.UnitedStates
+    return calendar(years=year)
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in us_holidays(day.year)
+
+
+def is_early_close(day: date) -> bool:
+    """Verkürzte Sitzung: 3. Juli, Tag nach Thanksgiving, Heiligabend (jeweils an Handelstagen)."""
+    if (day.month, day.day) in ((7, 3), (12, 24)):
+        return True
+    thanksgiving = day - timedelta(days=1)
+    return (day.month == 11 and thanksgiving.weekday() == 3 and 22 <= thanksgiving.day <= 28)
+
+
+def session_bounds(day: date) -> Optional[Tuple[datetime, datetime, datetime, datetime]]:
+    """(pre_open, open, close, post_close) als ET-datetimes; None an handelsfreien Tagen."""
+    if not is_trading_day(day):
+        return None
+    early = is_early_close(day)
+    close = REGULAR_CLOSE if not early else EARLY_CLOSE
+    post = POST_CLOSE if not early else EARLY_POST_CLOSE
+    return tuple(EASTERN.localize(datetime.combine(day, t)) for t in (PRE_OPEN, REGULAR_OPEN, close, post))
+
+
+def _to_eastern(now: Optional[datetime]) -> datetime:
+    if now is None:
+        return datetime.now(EASTERN)
+    if now.tzinfo is None:
+        now = pytz.utc.localize(now)
+    return now.astimezone(EASTERN)
+
+
+def market_phase(now: Optional[datetime] = None) -> str:
+    now_et = _to_eastern(now)
+    bounds = session_bounds(now_et.date())
+    if bounds is None:
+        return PHASE_CLOSED
+    pre_open, open_, close, post_close = bounds
+    if open_ <= now_et < close:
+        return PHASE_REGULAR
+    if pre_open <= now_et < open_:
+        return PHASE_PRE
+    if close <= now_et < post_close:
+        return PHASE_POST
+    return PHASE_CLOSED
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    return market_phase(now) == PHASE_REGULAR
+
+
+def _boundaries(start_et: datetime, days: int = 7) -> List[datetime]:
+    """Alle Phasenwechsel (inkl. Mitternacht) ab start_et für die nächsten Tage, sortiert."""
+    points = []
+    for offset in range(days + 1):
+        day = start_et.date() + timedelta(days=offset)
+        points.append(EASTERN.localize(datetime.combine(day, dtime(0, 0))))
+        bounds = session_bounds(day)
+        if bounds:
+            points.extend(bounds)
+    return sorted(p for p in points if p > start_et)
+
+
+def next_session_start(sessions: Iterable[str], now: Optional[datetime] = None) -> Optional[datetime]:
+    """Nächster Zeitpunkt ab dem eine der Phasen gilt (ET); None wenn sie bereits gilt."""
+    sessions = set(sessions)
+    now_et = _to_eastern(now)
+    if market_phase(now_et) in sessions:
+        return None
+    for point in _boundaries(now_et):
+        if market_phase(point) in sessions:
+            return point
+    return now_et + timedelta(seconds=MAX_SLEEP_SECONDS)
+
+
+def next_regular_open(now: Optional[datetime] = None) -> datetime:
+    """Nächste reguläre Markteröffnung (bei offenem Markt: die heutige)."""
+    now_et = _to_eastern(now)
+    bounds = session_bounds(now_et.date())
+    if bounds and now_et < bounds[2]:
+        return bounds[1]
+    day = now_et.date()
+    for _ in range(14):
+        day += timedelta(days=1)
+        bounds = session_bounds(day)
+        if bounds:
+            return bounds[1]
+    return now_et
+
+
+class market_schedule(schedule):
+    """Intervall-Schedule, der nur in bestimmten Marktphasen fällig wird.
+
+    market_schedule(300)                               -> alle 5 Min während der regulären Sitzung
+    market_schedule(300, sessions=EXTENDED_SESSIONS)   -> inkl. Pre-/After-Market
+    market_schedule(1800, sessions=OFF_HOURS)          -> nur außerhalb der Handelszeiten
+    """
+
+    def __init__(self, run_every=None, sessions: Iterable[str] = (PHASE_REGULAR,), relative=False, nowfun=None, app=None):
+        self.sessions = tuple(sessions)
+        super().__init__(run_every=run_every, relative=relative, nowfun=nowfun, app=app)
+
+    def is_due(self, last_run_at):
+        now = self.now()
+        start = next_session_start(self.sessions, now)
+        if start is not None:
+            wait = (start - _to_eastern(now)).total_seconds()
+            return schedstate(False, max(1.0, min(wait, MAX_SLEEP_SECONDS)))
+        return super().is_due(last_run_at)
+
+    def __repr__(self):
+        return f'<market_schedule: every {self.human_seconds} during {"/".join(self.sessions)}>'
+
+    def __reduce__(self):
+        return self.__class__, (self.run_every, self.sessions, self.relative, self.nowfun)
+
+    def __eq__(self, other):
+        if isinstance(other, market_schedule):
+            return self.run_every == other.run_every and self.sessions == other.sessions
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
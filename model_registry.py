@@ -0,0 +1,328 @@
+"""
+Versionierte Model Registry für die AutoGluon Predictoren (train_model, SequentialTrainer)
+
+Bisher hat train_model ./autogluon_model_{15|30|60} direkt überschrieben, während
+generate_predictions dasselbe Verzeichnis laden konnte, und die Modelle des SequentialTrainer
+(/app/models/autogluon_model_{ticker}_{h}) hat keine Inferenz geladen. Die Registry trennt
+Schreiben und Lesen:
+
+- Jede Version ist ein unveränderliches Verzeichnis {MODEL_REGISTRY_DIR}/{scope}/{horizon}/{version}
+  (scope = 'global' für train_model, sonst der Ticker). Trainiert wird in ein Staging-Verzeichnis,
+  das erst mit manifest.json per os.rename veröffentlicht wird
+- manifest.json: Feature-Schema, Metriken, Trainingsfenster, Zeilen, Inferenz-Latenz
+- Redis Hash model_registry:current ({scope}:{horizon} -> version) ist der "current" Pointer;
+  Promotion mehrerer Horizonte läuft in einer MULTI Transaktion
+- model_registry:history:{scope}:{horizon} (neueste zuerst) erlaubt sofortiges Rollback
+- gc() löscht alte Versionen, nie die aktuelle oder die letzten Rollback-Ziele
+- PredictorCache lädt einen Predictor nur neu, wenn sich der Pointer ändert; eine nicht ladbare
+  Version wird erst nach MODEL_REGISTRY_LOAD_RETRY_SECONDS erneut versucht
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import redis
+
+REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', '/app/models/registry')
+KEEP_VERSIONS = int(os.getenv('MODEL_REGISTRY_KEEP', '5'))   # Versionen pro Slot, die gc() behält
+HISTORY_LENGTH = int(os.getenv('MODEL_REGISTRY_HISTORY', '10'))
+STAGING_MAX_AGE = 6 * 3600  # verwaiste Staging-Verzeichnisse (abgebrochenes Training)
+LOAD_RETRY_SECONDS = int(os.getenv('MODEL_REGISTRY_LOAD_RETRY_SECONDS', '900'))  # fehlgeschlagene Version erneut laden
+
+GLOBAL_SCOPE = 'global'
+CURRENT_KEY = 'model_registry:current'
+HISTORY_PREFIX = 'model_registry:history:'
+MANIFEST_FILE = 'manifest.json'
+STAGING_PREFIX = '.staging-'
+VERSION_FORMAT = '%Y%m%dT%H%M%S%fZ'
+
+logger = logging.getLogger(__name__)
+
+
+def _text(value) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+def slot(scope: str, horizon) -> str:
+    return f"{scope}:{horizon}"
+
+
+def history_key(scope: str, horizon) -> str:
+    return f"{HISTORY_PREFIX}{slot(scope, horizon)}"
+
+
+def new_version() -> str:
+    """Sortierbare Versions-ID (UTC, Mikrosekunden)."""
+    return datetime.utcnow().strftime(VERSION_FORMAT)
+
+
+def version_time(version: Optional[str]) -> Optional[datetime]:
+    """Trainingszeitpunkt einer Version (UTC); None für fremde Formate."""
+    try:
+        return datetime.strptime(version, VERSION_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def version_path(scope: str, horizon, version: str) -> str:
+    return os.path.join(REGISTRY_DIR, scope, str(horizon), version)
+
+
+def staging_path(scope: str, horizon, version: str) -> str:
+    """Trainingsziel; wird erst durch publish() zur Version."""
+    return os.path.join(REGISTRY_DIR, scope, str(horizon), f"{STAGING_PREFIX}{version}")
+
+
+def measure_latency(predictor, frame, rows: int = 200, runs: int = 3) -> Dict[str, Optional[float]]:
+    """Inferenz-Latenz auf einer Stichprobe (bester von runs Durchläufen)."""
+    sample = frame.head(rows)
+    if not len(sample):
+        return {'batch_rows': 0, 'batch_ms': None, 'per_row_ms': None, 'single_row_ms': None}
+    best_batch = best_single = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        predictor.predict(sample)
+        batch = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        predictor.predict(sample.head(1))
+        single = (time.perf_counter() - start) * 1000
+        best_batch = batch if best_batch is None else min(best_batch, batch)
+        best_single = single if best_single is None else min(best_single, single)
+    return {'batch_rows': int(len(sample)), 'batch_ms': round(best_batch, 3),
+            'per_row_ms': round(best_batch / len(sample), 4), 'single_row_ms': round(best_single, 3)}
+
+
+def publish(scope: str, horizon, version: str, manifest: Dict[str, object]) -> str:
+    """Schreibt manifest.json ins Staging-Verzeichnis und benennt es atomar in die Version um."""
+    staging = staging_path(scope, horizon, version)
+    target = version_path(scope, horizon, version)
+    manifest = {**manifest, 'scope': scope, 'horizon': str(horizon), 'version': version,
+                'published_at': datetime.utcnow().isoformat()}
+    with open(os.path.join(staging, MANIFEST_FILE), 'w') as fh:
+        json.dump(manifest, fh, default=str)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.rename(staging, target)
+    return target
+
+
+def read_manifest(scope: str, horizon, version: str) -> Optional[Dict[str, object]]:
+    try:
+        with open(os.path.join(version_path(scope, horizon, version), MANIFEST_FILE)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def list_versions(scope: str, horizon) -> List[str]:
+    """Veröffentlichte Versionen eines Slots, älteste zuerst."""
+    base = os.path.join(REGISTRY_DIR, scope, str(horizon))
+    try:
+        entries = os.listdir(base)
+    except OSError:
+        return []
+    return sorted(v for v in entries
+                  if not v.startswith(STAGING_PREFIX) and os.path.isfile(os.path.join(base, v, MANIFEST_FILE)))
+
+
+def list_slots() -> List[tuple]:
+    """Alle (scope, horizon) mit Verzeichnis in der Registry."""
+    slots = []
+    try:
+        scopes = sorted(os.listdir(REGISTRY_DIR))
+    except OSError:
+        return []
+    for scope in scopes:
+        scope_dir = os.path.join(REGISTRY_DIR, scope)
+        if os.path.isdir(scope_dir):
+            slots.extend((scope, hz) for hz in sorted(os.listdir(scope_dir)) if os.path.isdir(os.path.join(scope_dir, hz)))
+    return slots
+
+
+def current(client, scope: str, horizon) -> Optional[str]:
+    return _text(client.hget(CURRENT_KEY, slot(scope, horizon)))
+
+
+def current_versions(client, scope: str, horizons: Iterable) -> Dict[str, Optional[str]]:
+    """Pointer mehrerer Horizonte mit einem HMGET."""
+    horizons = [str(hz) for hz in horizons]
+    if not horizons:
+        return {}
+    values = client.hmget(CURRENT_KEY, [slot(scope, hz) for hz in horizons])
+    return {hz: _text(v) for hz, v in zip(horizons, values)}
+
+
+def current_map(client) -> Dict[str, str]:
+    return {_text(k): _text(v) for k, v in (client.hgetall(CURRENT_KEY) or {}).items()}
+
+
+def history(client, scope: str, horizon) -> List[str]:
+    return [_text(v) for v in client.lrange(history_key(scope, horizon), 0, -1)]
+
+
+def promote(client, scope: str, versions: Dict[str, str]) -> Dict[str, str]:
+    """Setzt den current Pointer für mehrere Horizonte in einer Transaktion (horizon -> version)."""
+    for hz, version in versions.items():
+        if read_manifest(scope, hz, version) is None:
+            raise ValueError(f"Version {version} für {slot(scope, hz)} nicht veröffentlicht")
+    pipe = client.pipeline(transaction=True)
+    pipe.hset(CURRENT_KEY, mapping={slot(scope, hz): version for hz, version in versions.items()})
+    for hz, version in versions.items():
+        key = history_key(scope, hz)
+        pipe.lrem(key, 0, version)
+        pipe.lpush(key, version)
+        pipe.ltrim(key, 0, HISTORY_LENGTH - 1)
+    pipe.execute()
+    logger.info(f"📦 Promoted {scope}: {versions}")
+    return versions
+
+
+def rollback(client, scope: str, horizon, version: Optional[str] = None) -> Optional[str]:
+    """Zurück auf version bzw. die zuvor promotete Version; Rückgabe neue aktuelle Version.
+
+    Die verworfene Version fällt aus der History (bleibt bis gc() auf der Platte).
+    """
+    key = history_key(scope, horizon)
+    with client.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                pipe.watch(CURRENT_KEY, key)
+                active = _text(pipe.hget(CURRENT_KEY, slot(scope, horizon)))
+                entries = [_text(v) for v in pipe.lrange(key, 0, -1)]
+                if version is None:
+                    candidates = [v for v in entries if v != active and read_manifest(scope, horizon, v) is not None]
+                    if not candidates:
+                        return None
+                    target = candidates[0]
+                else:
+                    target = version
+                if read_manifest(scope, horizon, target) is None:
+                    raise ValueError(f"Version {target} für {slot(scope, horizon)} nicht vorhanden")
+                pipe.multi()
+                pipe.hset(CURRENT_KEY, slot(scope, horizon), target)
+                if active and active != target:
+                    pipe.lrem(key, 0, active)
+                pipe.lrem(key, 0, target)
+                pipe.lpush(key, target)
+                pipe.ltrim(key, 0, HISTORY_LENGTH - 1)
+                pipe.execute()
+                logger.warning(f"↩️ Rollback {slot(scope, horizon)}: {active} -> {target}")
+                return target
+            except redis.WatchError:
+                continue
+
+
+def gc(client, keep: int = KEEP_VERSIONS, scopes: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Löscht Versionen jenseits der neuesten keep pro Slot; current und die letzten keep
+    promoteten Versionen (Rollback-Ziele) bleiben immer."""
+    scopes = set(scopes) if scopes is not None else None
+    removed = staging_removed = 0
+    pointers = current_map(client)
+    now = time.time()
+    for scope, hz in list_slots():
+        if scopes is not None and scope not in scopes:
+            continue
+        base = os.path.join(REGISTRY_DIR, scope, hz)
+        protected = set(history(client, scope, hz)[:keep])
+        if pointers.get(slot(scope, hz)):
+            protected.add(pointers[slot(scope, hz)])
+        versions = list_versions(scope, hz)
+        for version in versions[:-keep] if keep > 0 else versions:
+            if version in protected:
+                continue
+            shutil.rmtree(os.path.join(base, version), ignore_errors=True)
+            removed += 1
+        for entry in os.listdir(base):
+            path = os.path.join(base, entry)
+            if entry.startswith(STAGING_PREFIX) and now - os.path.getmtime(path) > STAGING_MAX_AGE:
+                shutil.rmtree(path, ignore_errors=True)
+                staging_removed += 1
+    if removed or staging_removed:
+        logger.info(f"🧹 Model Registry GC: {removed} Versionen, {staging_removed} Staging-Verzeichnisse entfernt")
+    return {'removed': removed, 'staging_removed': staging_removed}
+
+
+class PredictorCache:
+    """Geladene Predictoren pro Slot; neu geladen wird nur bei geändertem current Pointer.
+
+    max_entries begrenzt die Zahl geladener Predictoren (LRU), z.B. für die Ticker-Modelle
+    des SequentialTrainer, die nicht alle gleichzeitig in den RAM passen. Ladefehler werden pro
+    Version gemerkt, damit ein kaputtes Verzeichnis nicht in jedem Zyklus neu geladen wird.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, retry_seconds: float = LOAD_RETRY_SECONDS):
+        self.max_entries = max_entries
+        self.retry_seconds = retry_seconds
+        self._entries = OrderedDict()  # slot -> (version, predictor, manifest)
+        self._failures = {}  # slot -> (version, time.monotonic() des Fehlers)
+        self.stats = {'hits': 0, 'loads': 0, 'load_errors': 0, 'failed_skips': 0, 'evictions': 0, 'load_ms': 0.0}
+
+    def failed(self, scope: str, horizon, version: str) -> bool:
+        """True, wenn version zuletzt nicht ladbar war und die Retry-Frist noch läuft."""
+        failure = self._failures.get(slot(scope, horizon))
+        return failure is not None and failure[0] == version and time.monotonic() - failure[1] < self.retry_seconds
+
+    def resident(self, scope: str, horizon, version: str) -> bool:
+        cached = self._entries.get(slot(scope, horizon))
+        return cached is not None and cached[0] == version
+
+    def get(self, scope: str, horizon, version: str) -> Optional[Dict[str, object]]:
+        """{'version', 'predictor', 'manifest'} für eine Version; bei Ladefehler die zuletzt geladene."""
+        key = slot(scope, horizon)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == version:
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        elif self.failed(scope, horizon, version):
+            self.stats['failed_skips'] += 1
+            if cached is None:
+                return None
+        else:
+            start = time.perf_counter()
+            try:
+                from autogluon.tabular import TabularPredictor
+                predictor = TabularPredictor.load(version_path(scope, horizon, version))
+            except Exception as e:
+                self.stats['load_errors'] += 1
+                self._failures[key] = (version, time.monotonic())
+                logger.error(f"Model Registry: {key}@{version} nicht ladbar: {e}")
+                if cached is None:
+                    return None
+                # Letzte funktionierende Version weiterverwenden
+            else:
+                self._failures.pop(key, None)
+                self.stats['loads'] += 1
+                self.stats['load_ms'] += (time.perf_counter() - start) * 1000
+                cached = (version, predictor, read_manifest(scope, horizon, version) or {})
+                self._entries[key] = cached
+                self._entries.move_to_end(key)
+                logger.info(f"📦 Loaded {key}@{version}")
+                while self.max_entries and len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats['evictions'] += 1
+        return {'version': cached[0], 'predictor': cached[1], 'manifest': cached[2]}
+
+    def load(self, client, scope: str, horizons: Iterable) -> Dict[str, Dict[str, object]]:
+        """horizon -> {'version', 'predictor', 'manifest'} für alle Horizonte mit Pointer."""
+        loaded = {}
+        for hz, version in current_versions(client, scope, horizons).items():
+            if version:
+                entry = self.get(scope, hz, version)
+                if entry is not None:
+                    loaded[hz] = entry
+        return loaded
+
+    def versions(self) -> Dict[str, str]:
+        return {key: entry[0] for key, entry in self._entries.items()}
+
+    def snapshot(self) -> Dict[str, object]:
+        return {**self.stats, 'load_ms': round(self.stats['load_ms'], 1),
+                'size': len(self._entries), 'capacity': self.max_entries}
@@ -0,0 +1,203 @@
+"""
+Markt-Pipeline ingest -> predict -> enhance -> trade
+
+Statt vier unabhängiger Beat-Crons (fetch_data, generate_predictions,
+update_ml_predictions_enhanced, trade_bot) startet Beat eine Celery-Chain; jede
+Stufe startet die nächste sobald sie fertig ist. Jede Stufe protokolliert
+Freshness in Redis Hash pipeline_status (ein Feld pro Stufe, JSON):
+
+- input_age_s   Alter der Ausgabe der Vorstufe beim Start dieser Stufe
+- sla_s/sla_ok  erlaubtes Input-Alter (PIPELINE_SLA_<STUFE>_SECONDS)
+- end_to_end_s  nur trade: Alter der Marktdaten beim Handeln
+- duration_ms, status, started_at, finished_at
+
+Die Aufzeichnung erfolgt per Decorator in den Tasks selbst, gilt also auch für
+manuelle Aufrufe außerhalb der Chain. Eine Stufe ohne verwertbares Ergebnis wirft
+StageError (statt None/Fehler-Dict zurückzugeben), damit die Chain dort abbricht.
+"""
+
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from redis import WatchError
+
+from task_queues import QUEUE_INGEST, QUEUE_ML_INFER, QUEUE_POLICIES, QUEUE_REALTIME
+
+STAGE_INGEST = 'ingest'
+STAGE_PREDICT = 'predict'
+STAGE_ENHANCE = 'enhance'
+STAGE_TRADE = 'trade'
+PIPELINE_STAGES = (STAGE_INGEST, STAGE_PREDICT, STAGE_ENHANCE, STAGE_TRADE)
+UPSTREAM = {STAGE_PREDICT: STAGE_INGEST, STAGE_ENHANCE: STAGE_PREDICT, STAGE_TRADE: STAGE_PREDICT}
+STAGE_QUEUES = {STAGE_INGEST: QUEUE_INGEST, STAGE_PREDICT: QUEUE_ML_INFER, STAGE_ENHANCE: QUEUE_ML_INFER,
+                STAGE_TRADE: QUEUE_REALTIME}
+
+PIPELINE_INTERVAL_SECONDS = int(os.getenv('PIPELINE_INTERVAL_SECONDS', 300))
+PIPELINE_SLA_SECONDS = {
+    STAGE_PREDICT: int(os.getenv('PIPELINE_SLA_PREDICT_SECONDS', 120)),
+    STAGE_ENHANCE: int(os.getenv('PIPELINE_SLA_ENHANCE_SECONDS', 60)),
+    STAGE_TRADE: int(os.getenv('PIPELINE_SLA_TRADE_SECONDS', 60)),
+}
+# Ein Lauf darf den nächsten nicht überholen, eine tote Chain (Worker gekillt, Nachricht verloren) darf
+# die Pipeline aber nicht lange blockieren: der Lock startet kurz (PIPELINE_LOCK_TTL, bis die erste Stufe
+# läuft) und jede Stufe verlängert ihn beim Start auf ihr Hard Time Limit plus Übergabezeit zur nächsten
+PIPELINE_LOCK_KEY = 'pipeline:lock'
+PIPELINE_LOCK_GRACE_SECONDS = int(os.getenv('PIPELINE_LOCK_GRACE_SECONDS', 120))
+PIPELINE_LOCK_TTL = max(PIPELINE_INTERVAL_SECONDS, PIPELINE_LOCK_GRACE_SECONDS)
+PIPELINE_STATUS_KEY = 'pipeline_status'
+PIPELINE_RUNS_KEY = 'pipeline_runs'
+
+logger = logging.getLogger(__name__)
+
+
+class StageError(RuntimeError):
+    """Pipeline-Stufe ohne verwertbares Ergebnis; bricht die Chain ab (on_error -> pipeline_failed)."""
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _stage_state(redis_client, stage: str) -> Dict[str, object]:
+    raw = redis_client.hget(PIPELINE_STATUS_KEY, stage)
+    try:
+        return json.loads(_decode(raw)) if raw else {}
+    except ValueError:
+        return {}
+
+
+def stage_lock_ttl(stage: str) -> int:
+    """Lock-TTL ab Start einer Stufe: ihr Hard Time Limit plus Übergabe an die nächste Stufe."""
+    return QUEUE_POLICIES[STAGE_QUEUES[stage]]['time_limit'] + PIPELINE_LOCK_GRACE_SECONDS
+
+
+def pipeline_stage(redis_client, stage: str):
+    """Decorator: protokolliert Input-Freshness, Dauer und Status einer Pipeline-Stufe.
+
+    Innerhalb der Chain übergibt run_market_pipeline pipeline_run=<run_id>; die Stufe verlängert
+    damit den Pipeline-Lock und bricht ab, wenn inzwischen ein anderer Lauf den Lock hält.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, pipeline_run: Optional[str] = None, **kwargs):
+            started = time.time()
+            entry = {'started_at': datetime.utcfromtimestamp(started).isoformat(), 'status': 'running'}
+            try:
+                upstream = UPSTREAM.get(stage)
+                if upstream:
+                    produced = _stage_state(redis_client, upstream).get('finished_epoch')
+                    if produced:
+                        entry['input_age_s'] = round(started - produced, 1)
+                        entry['sla_s'] = PIPELINE_SLA_SECONDS[stage]
+                        entry['sla_ok'] = entry['input_age_s'] <= entry['sla_s']
+                        if not entry['sla_ok']:
+                            logger.warning(f"⏱️ Pipeline {stage}: input from {upstream} is {entry['input_age_s']}s old (SLA {entry['sla_s']}s)")
+                if stage == STAGE_TRADE:
+                    ingested = _stage_state(redis_client, STAGE_INGEST).get('finished_epoch')
+                    if ingested:
+                        entry['end_to_end_s'] = round(started - ingested, 1)
+            except Exception as e:
+                logger.debug(f"Pipeline freshness lookup failed ({stage}): {e}")
+
+            status = 'ok'
+            try:
+                if pipeline_run and not refresh_pipeline_lock(redis_client, pipeline_run, stage_lock_ttl(stage)):
+                    raise StageError(f"Pipeline-Lauf {pipeline_run}: Lock gehört einem neueren Lauf")
+                return func(*args, **kwargs)
+            except Exception:
+                status = 'error'
+                raise
+            finally:
+                finished = time.time()
+                previous = {}
+                try:
+                    previous = _stage_state(redis_client, stage)
+                except Exception:
+                    pass
+                entry.update({
+                    'status': status,
+                    'finished_at': datetime.utcfromtimestamp(finished).isoformat(),
+                    'duration_ms': round((finished - started) * 1000, 1),
+                    'runs': int(previous.get('runs', 0)) + 1,
+                    'sla_breaches': int(previous.get('sla_breaches', 0)) + (1 if entry.get('sla_ok') is False else 0),
+                })
+                # Nur erfolgreiche Läufe gelten als frische Ausgabe für die Folgestufe
+                entry['finished_epoch'] = finished if status == 'ok' else previous.get('finished_epoch')
+                try:
+                    redis_client.hset(PIPELINE_STATUS_KEY, stage, json.dumps(entry))
+                except Exception as e:
+                    logger.debug(f"Pipeline status write failed ({stage}): {e}")
+        return wrapper
+    return decorator
+
+
+def acquire_pipeline_lock(redis_client) -> Optional[str]:
+    """Reserviert einen Pipeline-Lauf; None wenn noch ein Lauf aktiv ist."""
+    run_id = uuid.uuid4().hex[:12]
+    if redis_client.set(PIPELINE_LOCK_KEY, run_id, nx=True, ex=PIPELINE_LOCK_TTL):
+        return run_id
+    return None
+
+
+def refresh_pipeline_lock(redis_client, run_id: str, ttl: int) -> bool:
+    """Verlängert den Lock von run_id (bzw. übernimmt ihn, falls abgelaufen); False wenn ein anderer Lauf ihn hält."""
+    with redis_client.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                pipe.watch(PIPELINE_LOCK_KEY)
+                owner = _decode(pipe.get(PIPELINE_LOCK_KEY))
+                if owner not in (None, run_id):
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.set(PIPELINE_LOCK_KEY, run_id, ex=ttl)
+                pipe.execute()
+                return True
+            except WatchError:
+                continue
+
+
+def release_pipeline_lock(redis_client, run_id: str) -> None:
+    if _decode(redis_client.get(PIPELINE_LOCK_KEY)) == run_id:
+        redis_client.delete(PIPELINE_LOCK_KEY)
+
+
+def record_run(redis_client, run_id: str, started_epoch: float, status: str) -> Dict[str, object]:
+    """Hängt einen abgeschlossenen Lauf an pipeline_runs an (letzte 100)."""
+    entry = {
+        'run_id': run_id,
+        'status': status,
+        'started_at': datetime.utcfromtimestamp(started_epoch).isoformat(),
+        'duration_s': round(time.time() - started_epoch, 1),
+    }
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.lpush(PIPELINE_RUNS_KEY, json.dumps(entry))
+    pipe.ltrim(PIPELINE_RUNS_KEY, 0, 99)
+    pipe.execute()
+    return entry
+
+
+def pipeline_status(redis_client, runs: int = 10) -> Dict[str, object]:
+    """Aktueller Stand aller Stufen plus die letzten Läufe (für die API)."""
+    raw = redis_client.hgetall(PIPELINE_STATUS_KEY) or {}
+    stages = {}
+    for stage in PIPELINE_STAGES:
+        value = raw.get(stage) or raw.get(stage.encode())
+        if value:
+            state = json.loads(_decode(value))
+            state.pop('finished_epoch', None)
+            stages[stage] = state
+    recent = [json.loads(_decode(item)) for item in redis_client.lrange(PIPELINE_RUNS_KEY, 0, runs - 1)]
+    return {
+        'interval_seconds': PIPELINE_INTERVAL_SECONDS,
+        'sla_seconds': PIPELINE_SLA_SECONDS,
+        'running': redis_client.exists(PIPELINE_LOCK_KEY) == 1,
+        'stages': stages,
+        'recent_runs': recent,
+    }
@@ -0,0 +1,423 @@
+"""
+Passive Provider Health (statt aktiver Probes im Heartbeat)
+
+- Jeder echte Provider-Call aus dem Worker läuft über ProviderHealth.request() und
+  hinterlässt Outcome (ok/Fehler, HTTP-Status, Latenz) in einem rollierenden Fenster
+  pro Provider:
+    provider_health:{provider}:events   Liste "epoch,ok,latency_ms,status" (neueste zuerst, max. window)
+    provider_health:{provider}          Hash last_call/last_success/last_failure/last_error/last_status
+- snapshot() leitet daraus Erfolgsquote, Latenz und active ab
+- Nur wenn ein Provider länger als idle_seconds keine Calls hatte, wird ein billiger
+  Probe ausgeführt (höchstens einmal pro idle_seconds, über SET NX abgesichert)
+
+Circuit Breaker + Quota (prozessübergreifend in Redis):
+    provider_breaker:{provider}         Hash state/failures/open_until/cooldown/reason
+    provider_breaker:{provider}:trial   SET NX Lock für den einen Half-Open Testcall
+    provider_quota:{provider}:{period}  Call-Zähler pro Tag/Monat (PROVIDER_QUOTAS)
+- closed -> open nach breaker_failures Fehlern in Folge oder sofort bei 429 (Retry-After)
+- open: request() wirft ProviderUnavailable ohne HTTP-Call, bis cooldown abgelaufen ist
+- half-open: genau ein Testcall; Erfolg schließt, Fehler öffnet mit doppeltem Cooldown
+- rank() sortiert verfügbare Provider nach Erfolgsquote, Latenz und Rest-Quota
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+
+EVENTS_KEY = 'provider_health:{provider}:events'
+STATE_KEY = 'provider_health:{provider}'
+PROBE_LOCK_KEY = 'provider_health:{provider}:probe'
+SNAPSHOT_KEY = 'provider_health'
+
+BREAKER_KEY = 'provider_breaker:{provider}'
+TRIAL_KEY = 'provider_breaker:{provider}:trial'
+QUOTA_KEY = 'provider_quota:{provider}:{period}'
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+HALF_OPEN_TRIAL_SECONDS = 60
+
+# Andere 4xx (404 unbekannter Ticker, 422 abgelehnte Order) sind Fachfehler, der Provider ist erreichbar
+FAILURE_STATUSES = (401, 403, 429)
+
+PROVIDER_HOSTS = {
+    'finnhub.io': 'finnhub',
+    'api.twelvedata.com': 'twelvedata',
+    'financialmodelingprep.com': 'fmp',
+    'api.marketstack.com': 'marketstack',
+    'www.alphavantage.co': 'alphavantage',
+    'alpaca.markets': 'alpaca',
+    'x.ai': 'grok',
+    'xai-api.com': 'grok',
+}
+
+# Free-Tier Limits (Anzahl, Periode); Override per Env PROVIDER_QUOTA_<NAME>=<anzahl>/<day|month>
+DEFAULT_QUOTAS = {
+    'alphavantage': (25, 'day'),
+    'twelvedata': (800, 'day'),
+    'fmp': (250, 'day'),
+    'marketstack': (100, 'month'),
+}
+
+
+def _load_quotas():
+    quotas = dict(DEFAULT_QUOTAS)
+    for provider in set(PROVIDER_HOSTS.values()) | set(DEFAULT_QUOTAS):
+        raw = os.getenv(f'PROVIDER_QUOTA_{provider.upper()}')
+        if not raw:
+            continue
+        limit, _, period = raw.partition('/')
+        try:
+            limit = int(limit)
+        except ValueError:
+            continue
+        if limit > 0:
+            quotas[provider] = (limit, period if period in ('day', 'month') else 'day')
+        else:
+            quotas.pop(provider, None)  # 0 = unbegrenzt (z.B. bezahlter Plan)
+    return quotas
+
+
+PROVIDER_QUOTAS = _load_quotas()
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(Exception):
+    """Circuit Breaker offen oder Quota erschöpft: Call wurde nicht ausgeführt."""
+
+
+def provider_for_url(url: str) -> Optional[str]:
+    host = (urlparse(url).hostname or '').lower()
+    for suffix, provider in PROVIDER_HOSTS.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return provider
+    return None
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class ProviderHealth:
+    def __init__(self, redis_client, window: int = 200, window_seconds: int = 900, idle_seconds: int = 900,
+                 breaker_failures: int = 5, breaker_cooldown: int = 300, breaker_max_cooldown: int = 3600, quotas=None):
+        self.redis = redis_client
+        self.window = window
+        self.window_seconds = window_seconds
+        self.idle_seconds = idle_seconds
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.breaker_max_cooldown = breaker_max_cooldown
+        self.quotas = PROVIDER_QUOTAS if quotas is None else quotas
+        # Lokaler Cache offener Breaker: spart den Redis-Roundtrip für den Rest des Zyklus
+        self._blocked_until: Dict[str, float] = {}
+
+    # ----- Aufzeichnung -----
+    def record(self, provider: str, ok: bool, latency_ms: float, status: Optional[int] = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        state = {'last_call': f'{now:.3f}', 'last_status': status if status is not None else ''}
+        if ok:
+            state['last_success'] = f'{now:.3f}'
+        else:
+            state['last_failure'] = f'{now:.3f}'
+            state['last_error'] = (error or f'HTTP {status}')[:200]
+        try:
+            events_key = EVENTS_KEY.format(provider=provider)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lpush(events_key, f'{now:.3f},{int(ok)},{latency_ms:.1f},{status or 0}')
+            pipe.ltrim(events_key, 0, self.window - 1)
+            pipe.hset(STATE_KEY.format(provider=provider), mapping=state)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Provider health record failed ({provider}): {e}")
+
+    def request(self, method: str, url: str, provider: Optional[str] = None, **kwargs) -> requests.Response:
+        """requests.request mit Outcome-Aufzeichnung; Exceptions werden aufgezeichnet und weitergereicht."""
+        provider = provider or provider_for_url(url)
+        if provider and not self.allow(provider):
+            raise ProviderUnavailable(f'{provider}: circuit open or quota exhausted')
+        if provider:
+            self._consume_quota(provider)
+        started = time.perf_counter()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except Exception as e:
+            if provider:
+                self.record(provider, False, (time.perf_counter() - started) * 1000, error=f'{type(e).__name__}: {e}')
+                self._breaker_outcome(provider, False)
+            raise
+        if provider:
+            ok = response.status_code < 500 and response.status_code not in FAILURE_STATUSES
+            self.record(provider, ok, (time.perf_counter() - started) * 1000, response.status_code,
+                        None if ok else f'HTTP {response.status_code}: {response.text[:120]}')
+            retry_after = response.headers.get('Retry-After') if response.status_code == 429 else None
+            self._breaker_outcome(provider, ok, response.status_code, retry_after)
+        return response
+
+    # ----- Circuit Breaker -----
+    def _period(self, provider: str) -> Optional[str]:
+        quota = self.quotas.get(provider)
+        if not quota:
+            return None
+        return datetime.utcnow().strftime('%Y%m' if quota[1] == 'month' else '%Y%m%d')
+
+    def _consume_quota(self, provider: str) -> None:
+        period = self._period(provider)
+        if not period:
+            return
+        try:
+            key = QUOTA_KEY.format(provider=provider, period=period)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.incr(key)
+            pipe.expire(key, 32 * 86400 if len(period) == 6 else 2 * 86400)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Provider quota count failed ({provider}): {e}")
+
+    def _load_states(self, providers):
+        pipe = self.redis.pipeline(transaction=False)
+        for provider in providers:
+            pipe.hgetall(BREAKER_KEY.format(provider=provider))
+            period = self._period(provider)
+            if period:
+                pipe.get(QUOTA_KEY.format(provider=provider, period=period))
+        raw = iter(pipe.execute())
+        states = {}
+        for provider in providers:
+            state = {_decode(k): _decode(v) for k, v in (next(raw) or {}).items()}
+            quota = self.quotas.get(provider)
+            used = int(_decode(next(raw)) or 0) if quota else None
+            states[provider] = {
+                'state': state.get('state', STATE_CLOSED),
+                'failures': int(state.get('failures', 0) or 0),
+                'open_until': float(state.get('open_until', 0) or 0),
+                'cooldown': int(float(state.get('cooldown', 0) or 0)) or self.breaker_cooldown,
+                'reason': state.get('reason'),
+                'quota_limit': quota[0] if quota else None,
+                'quota_used': used,
+                'quota_remaining': max(0, quota[0] - used) if quota else None,
+            }
+        return states
+
+    @staticmethod
+    def _is_available(state: Dict[str, object], now: float) -> bool:
+        if state['quota_remaining'] == 0:
+            return False
+        return state['state'] == STATE_CLOSED or now >= state['open_until']
+
+    def _check(self, provider: str) -> Optional[Dict[str, object]]:
+        """Breaker/Quota-Zustand wenn der Provider verfügbar ist, sonst None."""
+        now = time.time()
+        if self._blocked_until.get(provider, 0) > now:
+            return None
+        try:
+            state = self._load_states([provider])[provider]
+        except Exception:
+            return {'state': STATE_CLOSED}
+        if not self._is_available(state, now):
+            self._block(provider, state, now)
+            return None
+        return state
+
+    def _block(self, provider: str, state: Dict[str, object], now: float) -> None:
+        # Erschöpfte Quota: lokal nur kurz cachen, der Zähler kann in der nächsten Periode zurückspringen
+        self._blocked_until[provider] = now + 60 if state['quota_remaining'] == 0 else state['open_until']
+
+    def available(self, provider: str) -> bool:
+        """Lesender Check ohne den Half-Open Testcall zu reservieren."""
+        return self._check(provider) is not None
+
+    def allow(self, provider: str) -> bool:
+        """Darf jetzt ein Call raus? Reserviert nach Ablauf des Cooldowns den einen Half-Open Testcall."""
+        state = self._check(provider)
+        if state is None:
+            return False
+        if state['state'] == STATE_CLOSED:
+            return True
+        try:
+            if not self.redis.set(TRIAL_KEY.format(provider=provider), '1', nx=True, ex=HALF_OPEN_TRIAL_SECONDS):
+                return False
+            self.redis.hset(BREAKER_KEY.format(provider=provider), 'state', STATE_HALF_OPEN)
+            logger.info(f"🔌 Circuit {provider}: half-open (trial call)")
+        except Exception as e:
+            logger.debug(f"Circuit check failed ({provider}): {e}")
+        return True
+
+    def _breaker_outcome(self, provider: str, ok: bool, status: Optional[int] = None, retry_after=None) -> None:
+        key = BREAKER_KEY.format(provider=provider)
+        try:
+            if ok:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hget(key, 'state')
+                pipe.hset(key, mapping={'state': STATE_CLOSED, 'failures': 0, 'cooldown': self.breaker_cooldown})
+                pipe.delete(TRIAL_KEY.format(provider=provider))
+                previous = _decode(pipe.execute()[0])
+                if previous not in (None, STATE_CLOSED):
+                    logger.info(f"🔌 Circuit {provider}: closed")
+                self._blocked_until.pop(provider, None)
+                return
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hincrby(key, 'failures', 1)
+            pipe.hget(key, 'state')
+            failures, state = pipe.execute()
+            state = _decode(state)
+            if status == 429 or state == STATE_HALF_OPEN or failures >= self.breaker_failures:
+                reason = 'rate_limited' if status == 429 else f'{failures} failures' + (f' (HTTP {status})' if status else '')
+                self.trip(provider, reason=reason, retry_after=retry_after, escalate=state == STATE_HALF_OPEN)
+        except Exception as e:
+            logger.debug(f"Circuit update failed ({provider}): {e}")
+
+    def trip(self, provider: str, reason: str = 'rate_limited', retry_after=None, escalate: bool = False) -> None:
+        """Öffnet den Breaker (auch für Soft-Limits in HTTP 200 Antworten, z.B. AlphaVantage 'Note')."""
+        key = BREAKER_KEY.format(provider=provider)
+        try:
+            previous = float(_decode(self.redis.hget(key, 'cooldown')) or self.breaker_cooldown)
+        except Exception:
+            previous = self.breaker_cooldown
+        cooldown = min(self.breaker_max_cooldown, previous * 2) if escalate else self.breaker_cooldown
+        try:
+            cooldown = max(cooldown, min(self.breaker_max_cooldown, float(retry_after)))
+        except (TypeError, ValueError):
+            pass
+        open_until = time.time() + cooldown
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(key, mapping={'state': STATE_OPEN, 'open_until': f'{open_until:.3f}', 'cooldown': int(cooldown), 'reason': reason[:120]})
+            pipe.delete(TRIAL_KEY.format(provider=provider))
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Circuit trip failed ({provider}): {e}")
+        self._blocked_until[provider] = open_until
+        logger.warning(f"🔌 Circuit {provider}: open for {int(cooldown)}s ({reason})")
+
+    def breaker_states(self, providers: Iterable[str]) -> Dict[str, Dict[str, object]]:
+        """Breaker- und Quota-Zustand für market_source_stats / API."""
+        now = time.time()
+        states = self._load_states(list(providers))
+        for state in states.values():
+            open_until = state.pop('open_until')
+            if state['state'] != STATE_CLOSED:
+                state['retry_in_s'] = max(0, round(open_until - now))
+        return states
+
+    def rank(self, providers: Iterable[str]) -> list:
+        """Verfügbare Provider sortiert nach Erfolgsquote, Latenz und Rest-Quota (beste zuerst).
+
+        Offene Breaker und erschöpfte Quotas fallen heraus; Provider mit abgelaufenem
+        Cooldown kommen ans Ende (Half-Open Testcall).
+        """
+        providers = list(providers)
+        if not providers:
+            return []
+        try:
+            now = time.time()
+            states = self._load_states(providers)
+            summaries = self.snapshot(providers)
+        except Exception as e:
+            logger.debug(f"Provider ranking failed: {e}")
+            return providers
+        scored = []
+        for order, provider in enumerate(providers):
+            state = states[provider]
+            if not self._is_available(state, now):
+                self._block(provider, state, now)
+                continue
+            summary = summaries[provider]
+            success = summary['success_rate'] if summary['success_rate'] is not None else 0.75
+            latency = summary['latency_p50_ms'] if summary['latency_p50_ms'] is not None else 1000.0
+            quota_factor = state['quota_remaining'] / state['quota_limit'] if state['quota_limit'] else 1.0
+            score = success * (0.5 + 0.5 * quota_factor) - min(latency, 5000.0) / 10000.0
+            if state['state'] != STATE_CLOSED:
+                score -= 10  # Half-Open Kandidat zuletzt
+            scored.append((-score, order, provider))
+        return [provider for _, _, provider in sorted(scored)]
+
+    # ----- Auswertung -----
+    def summary(self, provider: str, events=None, state=None) -> Dict[str, object]:
+        now = time.time()
+        if events is None or state is None:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lrange(EVENTS_KEY.format(provider=provider), 0, -1)
+            pipe.hgetall(STATE_KEY.format(provider=provider))
+            events, state = pipe.execute()
+        state = {_decode(k): _decode(v) for k, v in (state or {}).items()}
+        recent = []
+        for raw in events or []:
+            try:
+                ts, ok, latency, status = _decode(raw).split(',')
+                ts = float(ts)
+            except ValueError:
+                continue
+            if now - ts > self.window_seconds:
+                break  # Liste ist neueste zuerst
+            recent.append((ok == '1', float(latency), int(status)))
+
+        last_call = float(state['last_call']) if state.get('last_call') else None
+        last_success = float(state['last_success']) if state.get('last_success') else None
+        last_failure = float(state['last_failure']) if state.get('last_failure') else None
+        result = {
+            'calls': len(recent),
+            'success_rate': None,
+            'latency_p50_ms': None,
+            'latency_p95_ms': None,
+            'rate_limited': sum(1 for _, _, status in recent if status == 429),
+            'idle_seconds': round(max(0.0, now - last_call), 1) if last_call else None,
+            'last_error': state.get('last_error'),
+        }
+        if recent:
+            successes = sum(1 for ok, _, _ in recent if ok)
+            latencies = [latency for _, latency, _ in recent]
+            result['success_rate'] = round(successes / len(recent), 3)
+            result['latency_p50_ms'] = round(_percentile(latencies, 0.5), 1)
+            result['latency_p95_ms'] = round(_percentile(latencies, 0.95), 1)
+            result['active'] = result['success_rate'] >= 0.5
+        else:
+            # Kein Traffic im Fenster: letzter bekannter Zustand
+            result['active'] = bool(last_success and (not last_failure or last_success >= last_failure))
+        result['source'] = 'passive' if recent else 'last_known'
+        return result
+
+    def is_idle(self, summary: Dict[str, object]) -> bool:
+        idle = summary.get('idle_seconds')
+        return idle is None or idle > self.idle_seconds
+
+    def snapshot(self, providers: Iterable[str], probes: Optional[Dict[str, Callable[[], object]]] = None) -> Dict[str, Dict[str, object]]:
+        """Health aller Provider; billige Probes nur für idle Provider mit Probe-Funktion."""
+        providers = list(providers)
+        probes = probes or {}
+        pipe = self.redis.pipeline(transaction=False)
+        for provider in providers:
+            pipe.lrange(EVENTS_KEY.format(provider=provider), 0, -1)
+            pipe.hgetall(STATE_KEY.format(provider=provider))
+        raw = pipe.execute()
+        health = {}
+        for idx, provider in enumerate(providers):
+            summary = self.summary(provider, raw[2 * idx], raw[2 * idx + 1])
+            probe = probes.get(provider)
+            if probe and self.is_idle(summary) and self._claim_probe(provider):
+                try:
+                    probe()  # läuft über request() und zeichnet selbst auf
+                except Exception as e:
+                    logger.debug(f"Provider probe failed ({provider}): {e}")
+                summary = self.summary(provider)
+                summary['source'] = 'probe'
+            health[provider] = summary
+        return health
+
+    def _claim_probe(self, provider: str) -> bool:
+        try:
+            return bool(self.redis.set(PROBE_LOCK_KEY.format(provider=provider), '1', nx=True, ex=self.idle_seconds))
+        except Exception:
+            return False
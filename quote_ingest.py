@@ -0,0 +1,144 @@
+"""
+Quote Ingestion Engine (einzige Stelle, die Realtime-Quotes bei den Providern abfragt)
+
+Früher pollten worker.fetch_data (Median -> market_data) und
+multi_api_enhanced_service (Mittelwert -> multi_api_enhanced_data) dieselben Ticker
+bei Finnhub/FMP/Marketstack -> doppelte Quota. Jetzt:
+
+1. collect_readings(): pro Zyklus jedes (Provider, Symbol) höchstens einmal, als
+   Multi-Symbol Batches (quote_providers.py) in der Reihenfolge von provider_health.rank
+2. build_record(): kanonischer Quote-Record pro Ticker (Redis Key market_quotes) mit
+   Median-Preis, OHLC der Primärquelle und Detail pro Quelle
+3. to_market_data() / to_enhanced() / enhanced_stats(): beide Alt-Formate werden nur
+   noch aus dem kanonischen Record abgeleitet (gleiche Aggregationsregel)
+
+Kanonischer Record:
+{
+  "price": 255.4, "open": ..., "high": ..., "low": ..., "change": ..., "change_pct": ..., "volume": ...,
+  "primary_source": "finnhub",
+  "sources": {"finnhub": {"price": 255.46, "open": ..., ..., "fetched_at": "..."}, "fmp": {...}},
+  "time": "2025-10-08T14:15:41"
+}
+"""
+
+import statistics
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+CANONICAL_KEY = 'market_quotes'
+ENHANCED_DATA_KEY = 'multi_api_enhanced_data'
+ENHANCED_STATS_KEY = 'multi_api_enhanced_stats'
+
+# Referenz für open/high/low/change: erste vorhandene Quelle in dieser Reihenfolge
+PRIMARY_PRIORITY = ('finnhub', 'twelvedata', 'fmp', 'marketstack', 'alphavantage', 'yfinance', 'stub')
+DETAIL_FIELDS = ('price', 'open', 'high', 'low', 'change', 'change_pct', 'volume', 'market_cap', 'pe_ratio')
+
+
+def collect_readings(tickers: List[str], providers: Dict[str, object], provider_order: List[str],
+                     readings_by_ticker: Dict[str, List[dict]], target_sources: int,
+                     log: Optional[Callable[..., None]] = None) -> Dict[str, Dict[str, int]]:
+    """Befüllt readings_by_ticker provider-weise; Rückgabe pro Provider: ok/failed/circuit_skipped/calls.
+
+    Fallback-only Provider (EOD/Quota) fragen nur Ticker ohne jede Quelle ab, alle anderen nur
+    Ticker mit weniger als target_sources Quellen.
+    """
+    results = {}
+    for name in provider_order:
+        provider = providers[name]
+        if provider.fallback_only:
+            needed = [t for t in tickers if not readings_by_ticker[t]]
+        else:
+            needed = [t for t in tickers if len(readings_by_ticker[t]) < target_sources]
+        if not needed:
+            continue
+        batch = provider.batch_quotes(needed)
+        counts = {'ok': 0, 'failed': 0, 'circuit_skipped': 0, 'calls': batch['calls']}
+        for ticker in needed:
+            reading = batch['quotes'].get(ticker)
+            if reading:
+                readings_by_ticker[ticker].append(reading)
+                counts['ok'] += 1
+                if log:
+                    log(ticker, name, 'ok')
+                continue
+            status = batch['failures'].get(ticker, 'empty')
+            counts['circuit_skipped' if status == 'circuit_open' else 'failed'] += 1
+            if log:
+                log(ticker, name, status)
+        results[name] = counts
+    return results
+
+
+def build_record(readings: List[dict], now: Optional[datetime] = None) -> Optional[dict]:
+    """Kanonischer Record aus den Readings eines Tickers (None ohne numerischen Preis)."""
+    readings = [r for r in readings if r.get('price') is not None]
+    if not readings:
+        return None
+    fetched_at = (now or datetime.utcnow()).isoformat()
+    price = statistics.median(float(r['price']) for r in readings)
+    primary = next((r for src in PRIMARY_PRIORITY for r in readings if r['source'] == src), readings[0])
+    sources = {}
+    for reading in readings:
+        detail = {field: reading.get(field) for field in DETAIL_FIELDS if reading.get(field) is not None}
+        detail['fetched_at'] = fetched_at
+        sources[reading['source']] = detail
+    return {
+        'price': price,
+        'open': primary.get('open'),
+        'high': primary.get('high'),
+        'low': primary.get('low'),
+        'change': primary.get('change'),
+        'change_pct': primary.get('change_pct'),
+        'volume': primary.get('volume') or 0,
+        'primary_source': primary['source'],
+        'sources': sources,
+        'time': fetched_at,
+    }
+
+
+def to_market_data(record: dict) -> dict:
+    """Format von market_data (Frontend, Trading Bot)."""
+    price = record['price']
+    return {
+        'price': price,
+        'change': record.get('change'),
+        'change_percent': record.get('change_pct'),
+        'time': record['time'],
+        'sources_used': list(record['sources']),
+        'source_deviation': [
+            {'source': src, 'delta_pct': (detail['price'] - price) / price if price else 0}
+            for src, detail in record['sources'].items()
+        ],
+    }
+
+
+def to_enhanced(record: dict) -> dict:
+    """Format von multi_api_enhanced_data (früher multi_api_enhanced_service)."""
+    fundamentals = next((d for d in record['sources'].values() if d.get('market_cap') is not None), {})
+    return {
+        'price': record['price'],
+        'open': record.get('open'),
+        'high': record.get('high'),
+        'low': record.get('low'),
+        'change': record.get('change'),
+        'change_pct': record.get('change_pct'),
+        'volume': record.get('volume', 0),
+        'primary_source': record['primary_source'],
+        'sources_count': len(record['sources']),
+        'sources_used': list(record['sources']),
+        'market_cap': fundamentals.get('market_cap'),
+        'pe_ratio': fundamentals.get('pe_ratio'),
+        'timestamp': record['time'],
+    }
+
+
+def enhanced_stats(records: Dict[str, dict], tickers: List[str], provider_results: Dict[str, Dict[str, int]]) -> dict:
+    """Format von multi_api_enhanced_stats."""
+    stats = {name: {'success': counts['ok'], 'errors': counts['failed']} for name, counts in provider_results.items()}
+    stats.update({
+        'total_tickers': len(tickers),
+        'tickers_with_data': len(records),
+        'coverage_pct': round(len(records) / len(tickers) * 100, 1) if tickers else 0,
+        'timestamp': datetime.utcnow().isoformat(),
+    })
+    return stats
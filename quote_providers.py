@@ -0,0 +1,211 @@
+"""
+Quote Provider Adapter mit Multi-Symbol Batches
+
+Jeder Provider implementiert _fetch_chunk(symbols) für bis zu max_batch Symbole pro
+Request; batch_quotes(symbols) teilt die Ticker-Liste entsprechend auf. Damit sinkt
+die Anzahl Calls pro fetch_data Zyklus von O(tickers) auf O(tickers / max_batch):
+
+    Provider      max_batch  Endpoint
+    fmp           50         /api/v3/quote/AAPL,MSFT,...
+    marketstack   100        /v1/eod/latest?symbols=AAPL,MSFT,...
+    twelvedata    8          /time_series?symbol=AAPL,MSFT,...  (8 Credits/Minute -> Pause zwischen Chunks)
+    finnhub       1          /quote (Free-Tier hat keinen Multi-Symbol Quote Endpoint)
+    alphavantage  1          TIME_SERIES_INTRADAY (Bulk Quotes nur Premium)
+
+Alle Calls laufen über ProviderHealth.request (Health, Circuit Breaker, Quota). Ist der
+Breaker offen, werden die restlichen Chunks nicht mehr angefragt.
+
+Reading-Format (wie in fetch_data):
+    {'source', 'price', 'open', 'high', 'low', 'change', 'change_pct', 'volume'}
+"""
+
+import logging
+import time
+from typing import Dict, List
+
+from provider_health import ProviderUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+def _float(value, default=None):
+    try:
+        return float(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return default
+
+
+class QuoteFetchError(Exception):
+    """Chunk-Fehler mit Status für market_fetch_log (z.B. http_403)."""
+
+    def __init__(self, status: str):
+        super().__init__(status)
+        self.status = status
+
+
+def _check(resp):
+    if resp.status_code != 200:
+        raise QuoteFetchError(f'http_{resp.status_code}')
+    return resp.json()
+
+
+class QuoteProvider:
+    name = ''
+    max_batch = 1
+    chunk_pause = 0.0      # Sekunden zwischen zwei Chunks (Rate Limit pro Minute)
+    fallback_only = False  # nur abfragen wenn für den Ticker noch gar keine Quelle geliefert hat
+
+    def __init__(self, api_key: str, health):
+        self.api_key = api_key
+        self.health = health
+
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _get(self, url: str, timeout: int = 15):
+        return self.health.request('GET', url, provider=self.name, timeout=timeout)
+
+    def _fetch_chunk(self, symbols: List[str]) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    def batch_quotes(self, symbols: List[str]) -> Dict[str, object]:
+        """Quotes für alle Symbole in Chunks von max_batch.
+
+        Rückgabe: {'quotes': {symbol: reading}, 'failures': {symbol: status}, 'calls': angefragte Chunks}
+        """
+        quotes, failures, calls = {}, {}, 0
+        chunks = [symbols[i:i + self.max_batch] for i in range(0, len(symbols), self.max_batch)]
+        for idx, chunk in enumerate(chunks):
+            if idx and self.chunk_pause:
+                time.sleep(self.chunk_pause)
+            try:
+                calls += 1
+                result = self._fetch_chunk(chunk)
+            except ProviderUnavailable:
+                # Breaker offen / Quota leer: Rest des Zyklus kostet keine Zeit mehr
+                for chunk_rest in chunks[idx:]:
+                    failures.update({symbol: 'circuit_open' for symbol in chunk_rest})
+                break
+            except QuoteFetchError as e:
+                failures.update({symbol: e.status for symbol in chunk})
+                continue
+            except Exception as e:
+                logger.warning(f"{self.name} batch {idx + 1}/{len(chunks)} failed: {e}")
+                failures.update({symbol: 'exception' for symbol in chunk})
+                continue
+            quotes.update(result)
+            failures.update({symbol: 'empty' for symbol in chunk if symbol not in result})
+        return {'quotes': quotes, 'failures': failures, 'calls': calls}
+
+
+class FinnhubQuotes(QuoteProvider):
+    name = 'finnhub'
+    max_batch = 1
+
+    def _fetch_chunk(self, symbols):
+        symbol = symbols[0]
+        js = _check(self._get(f'https://finnhub.io/api/v1/quote?symbol={symbol}&token={self.api_key}', timeout=10))
+        if js.get('c') in (None, 0):
+            return {}
+        return {symbol: {'source': 'finnhub', 'price': js.get('c'), 'open': js.get('o'), 'high': js.get('h'), 'low': js.get('l'),
+                         'change': js.get('d'), 'change_pct': js.get('dp'), 'volume': js.get('v') or 0}}
+
+
+class FMPQuotes(QuoteProvider):
+    name = 'fmp'
+    max_batch = 50
+
+    def _fetch_chunk(self, symbols):
+        arr = _check(self._get(f'https://financialmodelingprep.com/api/v3/quote/{",".join(symbols)}?apikey={self.api_key}'))
+        quotes = {}
+        for item in arr if isinstance(arr, list) else []:
+            symbol, price = item.get('symbol'), item.get('price')
+            if symbol in symbols and price not in (None, 0):
+                quotes[symbol] = {'source': 'fmp', 'price': price, 'open': item.get('open', price),
+                                  'high': item.get('dayHigh', price), 'low': item.get('dayLow', price),
+                                  'change': item.get('change'), 'change_pct': item.get('changesPercentage'),
+                                  'volume': item.get('volume') or 0,
+                                  'market_cap': item.get('marketCap'), 'pe_ratio': item.get('pe')}
+        return quotes
+
+
+class MarketstackQuotes(QuoteProvider):
+    name = 'marketstack'
+    max_batch = 100
+    fallback_only = True  # EOD Daten + Monatsquote
+
+    def _fetch_chunk(self, symbols):
+        js = _check(self._get(f'http://api.marketstack.com/v1/eod/latest?access_key={self.api_key}&symbols={",".join(symbols)}'))
+        quotes = {}
+        for eod in js.get('data') or []:
+            symbol, close = eod.get('symbol'), _float(eod.get('close'))
+            if symbol in symbols and close:
+                quotes[symbol] = {'source': 'marketstack', 'price': close, 'open': _float(eod.get('open'), close),
+                                  'high': _float(eod.get('high'), close), 'low': _float(eod.get('low'), close),
+                                  'change': None, 'change_pct': None, 'volume': int(eod.get('volume') or 0)}
+        return quotes
+
+
+class TwelveDataQuotes(QuoteProvider):
+    name = 'twelvedata'
+    max_batch = 8
+    chunk_pause = 8.0  # 8 Credits/Minute im Free-Tier
+
+    def _fetch_chunk(self, symbols):
+        js = _check(self._get(f'https://api.twelvedata.com/time_series?symbol={",".join(symbols)}&interval=1min&outputsize=1&apikey={self.api_key}'))
+        if not isinstance(js, dict):
+            return {}
+        # Rate Limit kommt bei TwelveData als HTTP 200 mit code 429
+        if js.get('code') == 429:
+            self.health.trip(self.name, reason=str(js.get('message', 'rate_limited'))[:120])
+            raise ProviderUnavailable(f'{self.name}: rate limited')
+        # Einzelsymbol: direktes Format, mehrere Symbole: Ticker als Keys
+        payloads = {symbols[0]: js} if len(symbols) == 1 else {s: js.get(s) for s in symbols}
+        quotes = {}
+        for symbol, payload in payloads.items():
+            if not isinstance(payload, dict) or payload.get('status') == 'error' or not payload.get('values'):
+                continue
+            latest = payload['values'][0]
+            price = _float(latest.get('close'))
+            if price:
+                quotes[symbol] = {'source': 'twelvedata', 'price': price, 'open': _float(latest.get('open'), price),
+                                  'high': _float(latest.get('high'), price), 'low': _float(latest.get('low'), price),
+                                  'change': None, 'change_pct': None, 'volume': int(_float(latest.get('volume'), 0))}
+        return quotes
+
+
+class AlphaVantageQuotes(QuoteProvider):
+    name = 'alphavantage'
+    max_batch = 1
+    fallback_only = True  # 25 Calls/Tag
+
+    def _fetch_chunk(self, symbols):
+        symbol = symbols[0]
+        js = _check(self._get(f'https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={symbol}&interval=15min&apikey={self.api_key}', timeout=10))
+        # Rate Limit kommt als HTTP 200 mit Note/Information -> Breaker öffnen
+        if 'Note' in js or 'Information' in js:
+            self.health.trip(self.name, reason=str(js.get('Note', js.get('Information', '')))[:120])
+            raise ProviderUnavailable(f'{self.name}: rate limited')
+        series = js.get('Time Series (15min)') or {}
+        if not series:
+            return {}
+        bar = series[max(series)]
+        close = _float(bar.get('4. close'))
+        if not close:
+            return {}
+        return {symbol: {'source': 'alphavantage', 'price': close, 'open': _float(bar.get('1. open'), close),
+                         'high': _float(bar.get('2. high'), close), 'low': _float(bar.get('3. low'), close),
+                         'change': None, 'change_pct': None, 'volume': int(_float(bar.get('5. volume'), 0))}}
+
+
+PROVIDER_CLASSES = {cls.name: cls for cls in (TwelveDataQuotes, FinnhubQuotes, FMPQuotes, MarketstackQuotes, AlphaVantageQuotes)}
+
+
+def build_quote_providers(health, api_keys: Dict[str, str]) -> Dict[str, QuoteProvider]:
+    """Adapter für alle Provider mit API Key (Reihenfolge = Default-Priorität)."""
+    providers = {}
+    for name, cls in PROVIDER_CLASSES.items():
+        provider = cls(api_keys.get(name), health)
+        if provider.configured():
+            providers[name] = provider
+    return providers
@@ -0,0 +1,152 @@
+"""
+Redis Value Codec (worker, yfinance_enhanced_service, multi_api_enhanced_service)
+
+Backend-interne Keys (BINARY_KEYS) werden kompakt codiert:
+
+    MAGIC b'\\x00qb' + Format (m=MessagePack, o=orjson, j=json) + Kompression (z=zstd, -=keine) + Payload
+
+Alle übrigen Keys – insbesondere die, die das QML Frontend direkt liest (trading_settings,
+trades_log, market_data, predictions_current, ...) – bleiben reines JSON, nur kompakt über
+orjson falls installiert. loads() erkennt das Format am Marker; Werte ohne Marker werden als
+JSON gelesen, bestehende Redis-Inhalte bleiben also lesbar.
+
+Binär codierte Keys nur mit Clients ohne decode_responses lesen (bytes).
+
+Konfiguration (ENV):
+    REDIS_CODEC          msgpack | orjson | json (Default: msgpack falls installiert, sonst orjson)
+    REDIS_BINARY_KEYS    zusätzliche Keys, Komma-getrennt ('*' am Ende = Prefix)
+    REDIS_COMPRESS_MIN   zstd ab dieser Payload-Größe in Bytes (Default 8192, 0 = aus)
+"""
+
+import json
+import os
+from typing import Any, Optional, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MAGIC = b'\x00qb'
+FORMAT_MSGPACK = b'm'
+FORMAT_ORJSON = b'o'
+FORMAT_JSON = b'j'
+COMPRESSION_NONE = b'-'
+COMPRESSION_ZSTD = b'z'
+
+CODECS = {'msgpack': FORMAT_MSGPACK, 'orjson': FORMAT_ORJSON, 'json': FORMAT_JSON}
+
+DEFAULT_BINARY_KEYS = (
+    'yfinance_enhanced:*',
+    'yfinance_indicator_state:*',
+    'yfinance_fundamentals:*',
+    'market_quotes',
+)
+
+
+def _parse_keys(spec: str) -> Tuple[str, ...]:
+    return tuple(k.strip() for k in spec.split(',') if k.strip())
+
+
+def _default_codec() -> str:
+    name = os.getenv('REDIS_CODEC', '').strip().lower()
+    if name in CODECS:
+        return name
+    return 'msgpack' if MSGPACK_AVAILABLE else 'orjson'
+
+
+BINARY_KEYS = DEFAULT_BINARY_KEYS + _parse_keys(os.getenv('REDIS_BINARY_KEYS', ''))
+COMPRESS_MIN = int(os.getenv('REDIS_COMPRESS_MIN', '8192'))
+CODEC = _default_codec()
+
+
+def is_binary_key(key) -> bool:
+    if isinstance(key, bytes):
+        key = key.decode()
+    for pattern in BINARY_KEYS:
+        if pattern.endswith('*'):
+            if key.startswith(pattern[:-1]):
+                return True
+        elif key == pattern:
+            return True
+    return False
+
+
+def _json_bytes(value: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass  # z.B. int > 64 bit -> stdlib
+    return json.dumps(value).encode()
+
+
+def _json_loads(raw: bytes) -> Any:
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass  # alte Werte mit NaN/Infinity (json.dumps) versteht nur die stdlib
+    return json.loads(raw)
+
+
+def _msgpack_default(obj):
+    # NumPy Skalare/Arrays wie orjson OPT_SERIALIZE_NUMPY
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f'Object of type {type(obj).__name__} is not MessagePack serializable')
+
+
+def encode(value: Any, codec: Optional[str] = None, compress_min: Optional[int] = None) -> bytes:
+    """Binärer Wert mit Marker (unabhängig vom Key)."""
+    codec = codec or CODEC
+    compress_min = COMPRESS_MIN if compress_min is None else compress_min
+    if codec == 'msgpack' and MSGPACK_AVAILABLE:
+        fmt, payload = FORMAT_MSGPACK, msgpack.packb(value, use_bin_type=True, default=_msgpack_default)
+    elif codec == 'json':
+        fmt, payload = FORMAT_JSON, json.dumps(value).encode()
+    else:
+        fmt, payload = FORMAT_ORJSON, _json_bytes(value)
+    compression = COMPRESSION_NONE
+    if ZSTD_AVAILABLE and compress_min and len(payload) >= compress_min:
+        # Compressor pro Aufruf: zstandard Objekte sind nicht thread-safe (Fundamentals-Pool)
+        payload = zstandard.ZstdCompressor(level=3).compress(payload)
+        compression = COMPRESSION_ZSTD
+    return MAGIC + fmt + compression + payload
+
+
+def dumps(key, value: Any) -> bytes:
+    """Wert für r.set(key, ...): binär für BINARY_KEYS, sonst JSON."""
+    if is_binary_key(key):
+        return encode(value)
+    return _json_bytes(value)
+
+
+def loads(raw, default: Any = None) -> Any:
+    """Liest JSON (ohne Marker) und alle binären Formate."""
+    if raw is None:
+        return default
+    if isinstance(raw, str):
+        raw = raw.encode()
+    if raw[:len(MAGIC)] != MAGIC:
+        return _json_loads(raw)
+    header = len(MAGIC)
+    fmt, compression, payload = raw[header:header + 1], raw[header + 1:header + 2], raw[header + 2:]
+    if compression == COMPRESSION_ZSTD:
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    if fmt == FORMAT_MSGPACK:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    return _json_loads(payload)
@@ -0,0 +1,192 @@
+"""
+Response Cache für leselastige Market/Portfolio-Endpoints
+
+- Prozesslokaler TTL/LRU Cache, Schlüssel = (endpoint, params, data-version)
+- Data-Versionen liegen in Redis (data_version:{scope}) und werden von den
+  Ingestion-Tasks im Worker hochgezählt (bump_data_version)
+- Serialisierter Body wird einmal pro Version erzeugt und mit ETag/Last-Modified
+  ausgeliefert; Clients bekommen bei If-None-Match / If-Modified-Since ein 304
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from response_formats import dumps_json
+
+DATA_VERSION_KEY = "data_version:{scope}"
+DATA_VERSION_UPDATED_KEY = "data_version:{scope}:updated"
+
+# Scopes die von den Ingestion-Tasks gebumpt werden
+SCOPE_MARKET = "market"
+SCOPE_PORTFOLIO = "portfolio"
+
+
+def bump_data_version(redis_client, scope: str) -> Optional[int]:
+    """Zählt die Data-Version eines Scopes hoch (aufgerufen nach erfolgreichem Insert)."""
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.incr(DATA_VERSION_KEY.format(scope=scope))
+        pipe.set(DATA_VERSION_UPDATED_KEY.format(scope=scope), f"{time.time():.3f}")
+        version, _ = pipe.execute()
+        return int(version)
+    except Exception:
+        return None
+
+
+def _decode(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value.decode()
+    return str(value)
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "last_modified", "media_type", "expires_at")
+
+    def __init__(self, body: bytes, etag: str, last_modified: str, media_type: str, expires_at: float):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.media_type = media_type
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Thread-sicherer TTL/LRU Cache für fertig serialisierte Responses."""
+
+    def __init__(self, redis_client=None, max_entries: int = 512, ttl_seconds: float = 900.0):
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "bypass": 0,
+            "evictions": 0,
+        }
+
+    # ----- Data-Versionen -----
+    def data_version(self, scope: str) -> Tuple[Optional[str], Optional[float]]:
+        """Liest (version, updated_epoch) eines Scopes; (None, None) wenn Redis fehlt."""
+        if self.redis is None:
+            return None, None
+        try:
+            version, updated = self.redis.mget(
+                DATA_VERSION_KEY.format(scope=scope),
+                DATA_VERSION_UPDATED_KEY.format(scope=scope),
+            )
+        except Exception:
+            return None, None
+        version = _decode(version) or "0"
+        updated = _decode(updated)
+        return version, float(updated) if updated else None
+
+    # ----- Cache Zugriff -----
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.expires_at < now:
+                del self._entries[key]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def record(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else None,
+            "pid": os.getpid(),
+        }
+
+    # ----- Hilfsfunktionen für Endpoints -----
+    def build_entry(self, body: bytes, media_type: str, updated: Optional[float]) -> CacheEntry:
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        modified = datetime.fromtimestamp(updated or time.time(), tz=timezone.utc).replace(microsecond=0)
+        return CacheEntry(
+            body=body,
+            etag=etag,
+            last_modified=format_datetime(modified, usegmt=True),
+            media_type=media_type,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+
+    def lookup_or_build(
+        self,
+        endpoint: str,
+        params: Dict[str, object],
+        scope: str,
+        builder: Callable[[], object],
+        serializer: Callable[[object], bytes] = None,
+        media_type: str = "application/json",
+    ) -> Optional[CacheEntry]:
+        """Liefert den Cache-Eintrag für (endpoint, params, data-version); baut ihn bei Miss.
+
+        Gibt None zurück wenn keine Data-Version verfügbar ist (Redis down) – der Aufrufer
+        liefert dann ungecacht aus.
+        """
+        version, updated = self.data_version(scope)
+        if version is None:
+            self.record("bypass")
+            return None
+
+        key = (endpoint, tuple(sorted(params.items())), media_type, version)
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        serializer = serializer or dumps_json
+        entry = self.build_entry(serializer(builder()), media_type, updated)
+        self.put(key, entry)
+        return entry
+
+
+def is_not_modified(entry: CacheEntry, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """Prüft Conditional-Request Header gegen einen Cache-Eintrag (RFC 7232 Reihenfolge)."""
+    if if_none_match:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or entry.etag in candidates or f"W/{entry.etag}" in candidates
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(entry.last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
@@ -0,0 +1,195 @@
+"""
+Response-Formate für OHLCV-Endpoints (Content Negotiation)
+
+- json:      Standard, Array von Candle-Objekten (orjson falls installiert, sonst stdlib)
+- columnar:  Parallele Arrays timestamp/open/high/low/close/volume als JSON
+- msgpack:   Columnar Payload als MessagePack
+- arrow:     Apache Arrow IPC Stream (eine Tabelle, Spalte timeframe bei Multi-Requests)
+
+Auswahl über Query-Parameter ?format=... oder Accept-Header.
+Zeilen kommen direkt aus dem Cursor: (time, timestamp, open, high, low, close, volume).
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+FORMAT_JSON = "json"
+FORMAT_COLUMNAR = "columnar"
+FORMAT_MSGPACK = "msgpack"
+FORMAT_ARROW = "arrow"
+
+MEDIA_TYPES = {
+    FORMAT_JSON: "application/json",
+    FORMAT_COLUMNAR: "application/vnd.qbot.columnar+json",
+    FORMAT_MSGPACK: "application/x-msgpack",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+}
+
+_ACCEPT_ALIASES = {
+    "application/vnd.qbot.columnar+json": FORMAT_COLUMNAR,
+    "application/x-msgpack": FORMAT_MSGPACK,
+    "application/msgpack": FORMAT_MSGPACK,
+    "application/vnd.msgpack": FORMAT_MSGPACK,
+    "application/vnd.apache.arrow.stream": FORMAT_ARROW,
+}
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+Row = Tuple[datetime, int, Optional[float], Optional[float], Optional[float], Optional[float], int]
+
+
+class UnsupportedFormat(Exception):
+    """Gewünschtes Format unbekannt oder optionale Library nicht installiert."""
+
+
+def available_formats() -> List[str]:
+    formats = [FORMAT_JSON, FORMAT_COLUMNAR]
+    if MSGPACK_AVAILABLE:
+        formats.append(FORMAT_MSGPACK)
+    if ARROW_AVAILABLE:
+        formats.append(FORMAT_ARROW)
+    return formats
+
+
+def negotiate_format(format_param: Optional[str], accept: Optional[str]) -> str:
+    """Bestimmt das Ausgabeformat; Query-Parameter hat Vorrang vor dem Accept-Header."""
+    if format_param:
+        fmt = format_param.strip().lower()
+        if fmt not in MEDIA_TYPES:
+            raise UnsupportedFormat(f"Unknown format '{format_param}'. Allowed: {available_formats()}")
+    else:
+        fmt = FORMAT_JSON
+        for part in (accept or "").split(","):
+            media = part.split(";")[0].strip().lower()
+            if media in _ACCEPT_ALIASES:
+                fmt = _ACCEPT_ALIASES[media]
+                break
+    if fmt not in available_formats():
+        raise UnsupportedFormat(f"Format '{fmt}' not available on this server. Allowed: {available_formats()}")
+    return fmt
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps_json(payload: object) -> bytes:
+    """Schneller JSON-Encoder (orjson) mit stdlib-Fallback; datetime -> ISO 8601."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+
+
+# ----- Payload Builder (direkt aus Cursor-Zeilen) -----
+
+def rows_to_records(rows: Sequence[Row]) -> List[Dict[str, object]]:
+    """Klassisches Candle-Array; time bleibt datetime und wird vom Encoder serialisiert."""
+    return [
+        {
+            "time": bucket_time,
+            "timestamp": ts,
+            "open": open_p,
+            "high": high_p,
+            "low": low_p,
+            "close": close_p,
+            "volume": vol,
+        }
+        for bucket_time, ts, open_p, high_p, low_p, close_p, vol in rows
+    ]
+
+
+def rows_to_columns(rows: Sequence[Row]) -> Dict[str, list]:
+    """Parallele Arrays ohne Zwischen-Dicts pro Candle."""
+    if not rows:
+        return {name: [] for name in COLUMNS}
+    _, timestamps, opens, highs, lows, closes, volumes = zip(*rows)
+    return {
+        "timestamp": list(timestamps),
+        "open": list(opens),
+        "high": list(highs),
+        "low": list(lows),
+        "close": list(closes),
+        "volume": list(volumes),
+    }
+
+
+def build_candle_payload(fmt: str, rows: Sequence[Row]):
+    """Formatabhängige Darstellung der Candles einer Zeitreihe."""
+    if fmt == FORMAT_JSON:
+        return rows_to_records(rows)
+    return rows_to_columns(rows)
+
+
+# ----- Serializer -----
+
+def _arrow_table(frames: Dict[str, Dict[str, list]], metadata: Dict[str, str]):
+    timeframe_col: List[str] = []
+    columns: Dict[str, list] = {name: [] for name in COLUMNS}
+    for timeframe, cols in frames.items():
+        timeframe_col.extend([timeframe] * len(cols["timestamp"]))
+        for name in COLUMNS:
+            columns[name].extend(cols[name])
+    schema = pa.schema(
+        [
+            ("timeframe", pa.dictionary(pa.int8(), pa.string())),
+            ("timestamp", pa.timestamp("s", tz="UTC")),
+            ("open", pa.float64()),
+            ("high", pa.float64()),
+            ("low", pa.float64()),
+            ("close", pa.float64()),
+            ("volume", pa.int64()),
+        ],
+        metadata={k: str(v) for k, v in metadata.items()},
+    )
+    arrays = [pa.array(timeframe_col, type=pa.string()).dictionary_encode()]
+    arrays.append(pa.array(columns["timestamp"], type=pa.int64()).cast(pa.timestamp("s", tz="UTC")))
+    arrays.extend(pa.array(columns[name], type=pa.float64()) for name in ("open", "high", "low", "close"))
+    arrays.append(pa.array(columns["volume"], type=pa.int64()))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def serializer_for(fmt: str, frames_key: str):
+    """Liefert eine Funktion payload -> bytes.
+
+    frames_key: Feld im Payload das die Candle-Daten enthält ("data" für eine Zeitreihe,
+    "timeframes" für Multi-Timeframe Responses) – relevant für Arrow.
+    """
+    if fmt in (FORMAT_JSON, FORMAT_COLUMNAR):
+        return dumps_json
+    if fmt == FORMAT_MSGPACK:
+        return lambda payload: msgpack.packb(payload, use_bin_type=True)
+    if fmt == FORMAT_ARROW:
+        def to_arrow(payload: Dict[str, object]) -> bytes:
+            if frames_key == "data":
+                frames = {payload.get("timeframe", ""): payload["data"]}
+            else:
+                frames = payload[frames_key]
+            metadata = {k: v for k, v in payload.items() if k != frames_key and not isinstance(v, (dict, list))}
+            table = _arrow_table(frames, metadata)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes()
+        return to_arrow
+    raise UnsupportedFormat(fmt)
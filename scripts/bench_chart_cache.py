@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+QBot Chart Cache Benchmark
+Misst wiederholte Chart-Loads gegen /market/data/{symbol}:
+- cold:        erster Request (Cache-Miss, DB + Serialisierung)
+- warm:        wiederholte Requests ohne Conditional Header (Cache-Hit, voller Body)
+- revalidate:  wiederholte Requests mit If-None-Match (304 Not Modified)
+
+Usage: python scripts/bench_chart_cache.py [--url http://localhost:8000] [--symbol AAPL] [--runs 50]
+"""
+
+import argparse
+import statistics
+import time
+from typing import Dict, List
+
+import requests
+
+
+def timed_get(session: requests.Session, url: str, params: Dict, headers: Dict = None):
+    start = time.perf_counter()
+    response = session.get(url, params=params, headers=headers or {}, timeout=30)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return response, elapsed_ms
+
+
+def summarize(label: str, samples: List[float], sizes: List[int], statuses: List[int]):
+    if not samples:
+        print(f"{label:<12} no samples")
+        return
+    samples_sorted = sorted(samples)
+    p95 = samples_sorted[max(0, int(len(samples_sorted) * 0.95) - 1)]
+    print(
+        f"{label:<12} n={len(samples):<4} "
+        f"median={statistics.median(samples):7.2f}ms  p95={p95:7.2f}ms  "
+        f"bytes={int(statistics.mean(sizes)):<8} status={sorted(set(statuses))}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für den Chart Response Cache")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--symbol", default="AAPL")
+    parser.add_argument("--timeframe", default="15min")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    session = requests.Session()
+    url = f"{args.url}/market/data/{args.symbol}"
+    params = {"timeframe": args.timeframe, "limit": args.limit}
+
+    before = session.get(f"{args.url}/system/cache-stats", timeout=10).json().get("cache", {})
+
+    # Cache-Buster: limit variieren erzeugt einen neuen Key -> Miss
+    cold_resp, cold_ms = timed_get(session, url, {**params, "limit": args.limit - 1})
+    etag_resp, _ = timed_get(session, url, params)
+    etag = etag_resp.headers.get("ETag")
+
+    warm, warm_sizes, warm_status = [], [], []
+    reval, reval_sizes, reval_status = [], [], []
+    for _ in range(args.runs):
+        resp, ms = timed_get(session, url, params)
+        warm.append(ms); warm_sizes.append(len(resp.content)); warm_status.append(resp.status_code)
+        resp, ms = timed_get(session, url, params, {"If-None-Match": etag} if etag else None)
+        reval.append(ms); reval_sizes.append(len(resp.content)); reval_status.append(resp.status_code)
+
+    after = session.get(f"{args.url}/system/cache-stats", timeout=10).json().get("cache", {})
+
+    print(f"📊 {url} params={params} runs={args.runs} etag={etag}")
+    summarize("cold", [cold_ms], [len(cold_resp.content)], [cold_resp.status_code])
+    summarize("warm", warm, warm_sizes, warm_status)
+    summarize("revalidate", reval, reval_sizes, reval_status)
+    print(
+        "cache delta: "
+        f"hits +{after.get('hits', 0) - before.get('hits', 0)}, "
+        f"misses +{after.get('misses', 0) - before.get('misses', 0)}, "
+        f"304 +{after.get('not_modified', 0) - before.get('not_modified', 0)} "
+        f"(hit_rate process {after.get('pid')}: {after.get('hit_rate')})"
+    )
+
+
+if __name__ == "__main__":
+    main()
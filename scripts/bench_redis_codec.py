@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+QBot Redis Codec Benchmark
+Liest große Keys aus Redis und misst pro Key Payload-Größe sowie Encode/Decode-Zeit für:
+- json:          stdlib json.dumps/json.loads (bisheriger Pfad)
+- orjson:        kompaktes JSON (Format der Frontend-Keys)
+- msgpack:       MessagePack mit Marker
+- msgpack+zstd:  MessagePack, zstd-komprimiert (REDIS_COMPRESS_MIN=0 erzwingt Kompression)
+
+Usage: python scripts/bench_redis_codec.py [--redis redis://:pass123@localhost:6379/0] [--runs 20]
+                                          [--keys market_data predictions_current ...] [--yf-samples 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import redis_codec  # noqa: E402
+
+DEFAULT_KEYS = ['market_data', 'predictions_current', 'trades_log', 'deviation_tracker', 'market_quotes']
+
+
+def variants():
+    out = [('json', lambda v: json.dumps(v).encode(), json.loads)]
+    if redis_codec.ORJSON_AVAILABLE:
+        out.append(('orjson', redis_codec._json_bytes, redis_codec.loads))
+    if redis_codec.MSGPACK_AVAILABLE:
+        out.append(('msgpack', lambda v: redis_codec.encode(v, 'msgpack', 0), redis_codec.loads))
+        if redis_codec.ZSTD_AVAILABLE:
+            out.append(('msgpack+zstd', lambda v: redis_codec.encode(v, 'msgpack', 1), redis_codec.loads))
+    return out
+
+
+def timed(fn, arg, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Redis Value Codecs pro Key")
+    parser.add_argument("--redis", default=os.getenv('REDIS_URL', 'redis://:pass123@localhost:6379/0'))
+    parser.add_argument("--keys", nargs='*', default=DEFAULT_KEYS)
+    parser.add_argument("--yf-samples", type=int, default=5, help="Anzahl yfinance_enhanced:* Keys")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    client = redis.from_url(args.redis)
+    keys = list(args.keys)
+    for idx, key in enumerate(client.scan_iter(match='yfinance_enhanced:*', count=100)):
+        if idx >= args.yf_samples:
+            break
+        keys.append(key.decode())
+
+    print(f"📊 codec default={redis_codec.CODEC} compress_min={redis_codec.COMPRESS_MIN} runs={args.runs}")
+    print(f"{'key':<28} {'variant':<14} {'bytes':>10} {'encode_ms':>10} {'decode_ms':>10}")
+    for key in keys:
+        raw = client.get(key)
+        if not raw:
+            print(f"{key:<28} (leer)")
+            continue
+        value = redis_codec.loads(raw)
+        stored = 'binary' if raw[:len(redis_codec.MAGIC)] == redis_codec.MAGIC else 'json'
+        for name, encode, decode in variants():
+            payload, enc_ms = timed(encode, value, args.runs)
+            _, dec_ms = timed(decode, payload, args.runs)
+            print(f"{key:<28} {name:<14} {len(payload):>10,} {enc_ms:>10.3f} {dec_ms:>10.3f}")
+        print(f"{'':<28} stored as {stored} ({len(raw):,} bytes), binary key: {redis_codec.is_binary_key(key)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+QBot SSE Fan-out Benchmark
+Misst die Verteilung von Events durch den EventBroadcaster (event_stream.py) an viele Clients.
+
+- inproc (Default): ruft dispatch() direkt auf, N Consumer-Tasks lesen ihre Queues
+  -> reine Fan-out Kosten ohne Netzwerk
+- live:   öffnet N echte SSE-Verbindungen gegen /stream und publiziert über Redis
+  -> End-to-End Latenz Publish -> Client (benötigt laufende API + Redis)
+
+Usage:
+  python scripts/bench_sse_fanout.py --clients 100 500 1000 --events 200
+  python scripts/bench_sse_fanout.py --mode live --url http://localhost:8000 --clients 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_stream import EventBroadcaster  # noqa: E402
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def report(label: str, clients: int, events: int, elapsed: float, latencies: List[float], dropped: int):
+    deliveries = len(latencies)
+    print(
+        f"{label:<8} clients={clients:<5} events={events:<5} deliveries={deliveries:<8} "
+        f"throughput={deliveries / elapsed:>10.0f}/s  "
+        f"p50={statistics.median(latencies) * 1000:7.3f}ms  p99={percentile(latencies, 0.99) * 1000:7.3f}ms  "
+        f"dropped={dropped}"
+    )
+
+
+async def bench_inproc(clients: int, events: int, queue_size: int, interval: float):
+    broadcaster = EventBroadcaster(queue_size=queue_size)
+    subscribers = [broadcaster.subscribe(["market"]) for _ in range(clients)]
+    latencies: List[float] = []
+
+    async def consume(subscriber):
+        received = 0
+        while received < events:
+            frame = await subscriber.queue.get()
+            data = frame.split("data: ", 1)[1]
+            sent = json.loads(data)["data"]["sent"]
+            latencies.append(time.perf_counter() - sent)
+            received += 1
+            if subscriber.queue.empty() and received + subscriber.dropped >= events:
+                break
+
+    consumers = [asyncio.create_task(consume(s)) for s in subscribers]
+    start = time.perf_counter()
+    for i in range(events):
+        payload = json.dumps({"type": "quotes", "data": {"seq": i, "sent": time.perf_counter()}})
+        broadcaster.dispatch("market", payload)
+        await asyncio.sleep(interval)
+    await asyncio.wait_for(asyncio.gather(*consumers), timeout=60)
+    elapsed = time.perf_counter() - start
+    report("inproc", clients, events, elapsed, latencies, broadcaster.stats()["dropped"])
+
+
+async def bench_live(url: str, clients: int, events: int, interval: float):
+    import httpx
+    import redis
+
+    publisher = redis.Redis(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
+        password=os.getenv("REDIS_PASSWORD", "pass123"),
+    )
+    latencies: List[float] = []
+    ready = asyncio.Event()
+    connected = 0
+
+    async def client(http: "httpx.AsyncClient"):
+        nonlocal connected
+        received = 0
+        async with http.stream("GET", f"{url}/stream", params={"topics": "market"}) as response:
+            connected += 1
+            if connected == clients:
+                ready.set()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                sent = json.loads(line[6:])["data"].get("sent")
+                if sent is None:
+                    continue
+                latencies.append(time.time() - sent)
+                received += 1
+                if received >= events:
+                    return
+
+    limits = httpx.Limits(max_connections=clients + 10)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as http:
+        tasks = [asyncio.create_task(client(http)) for _ in range(clients)]
+        await asyncio.wait_for(ready.wait(), timeout=60)
+        await asyncio.sleep(0.5)
+        start = time.perf_counter()
+        for i in range(events):
+            publisher.publish("events:market", json.dumps({"type": "bench", "data": {"seq": i, "sent": time.time()}}))
+            await asyncio.sleep(interval)
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=120)
+        elapsed = time.perf_counter() - start
+    report("live", clients, events, elapsed, latencies, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fan-out Benchmark für den SSE Event Stream")
+    parser.add_argument("--mode", choices=["inproc", "live"], default="inproc")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--interval", type=float, default=0.001, help="Pause zwischen Events (s)")
+    args = parser.parse_args()
+
+    print(f"📡 SSE fan-out benchmark mode={args.mode} events={args.events}")
+    for clients in args.clients:
+        if args.mode == "inproc":
+            asyncio.run(bench_inproc(clients, args.events, args.queue_size, args.interval))
+        else:
+            asyncio.run(bench_live(args.url, clients, args.events, args.interval))
+
+
+if __name__ == "__main__":
+    main()
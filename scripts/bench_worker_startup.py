@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+QBot Worker Cold-Start Benchmark
+
+- importtime: startet `python -X importtime -c "import worker"` mehrfach in frischen Prozessen
+  und listet die teuersten Module (kumulativ) -> zeigt ob autogluon/pandas noch beim Import landen
+- ready:      startet einen Celery Worker (solo pool) und misst die Zeit bis "ready" im Log
+
+Usage:
+  python scripts/bench_worker_startup.py --mode importtime --runs 5 --top 15
+  python scripts/bench_worker_startup.py --mode ready --queues realtime
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\s*)(\S+)")
+
+
+def run_importtime(module: str):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            modules[name] = (int(cumulative), len(indent) // 2)
+    total = modules.get(module, (0, 0))[0]
+    return total, modules
+
+
+def bench_importtime(module: str, runs: int, top: int):
+    totals = []
+    modules = {}
+    for _ in range(runs):
+        total, modules = run_importtime(module)
+        totals.append(total / 1000)
+    print(f"import {module}: median={statistics.median(totals):.1f}ms  min={min(totals):.1f}ms  max={max(totals):.1f}ms  runs={runs}")
+    # Top-Level Imports (Tiefe 1 unter dem Modul) nach kumulativer Zeit
+    direct = [(name, us) for name, (us, depth) in modules.items() if depth <= 1 and name != module]
+    print("\nTeuerste Imports (kumulativ, letzter Lauf):")
+    for name, us in sorted(direct, key=lambda x: -x[1])[:top]:
+        print(f"  {us / 1000:>9.1f}ms  {name}")
+    heavy = [m for m in ("autogluon.tabular", "pandas", "numpy", "torch", "sklearn") if m in modules]
+    print(f"\nSchwere ML-Module beim Import geladen: {', '.join(heavy) if heavy else 'keine'}")
+
+
+def bench_ready(queues: str, timeout: float):
+    cmd = ["celery", "-A", "worker", "worker", "--pool", "solo", "-Q", queues, "--loglevel=info",
+           "-n", f"startup-bench-{os.getpid()}@%h"]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    ready_at = None
+    try:
+        for line in proc.stdout:
+            if " ready." in line:
+                ready_at = time.perf_counter() - start
+                break
+            if time.perf_counter() - start > timeout:
+                break
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    if ready_at is None:
+        print(f"❌ Worker nicht innerhalb von {timeout:.0f}s ready")
+    else:
+        print(f"worker ready (-Q {queues}): {ready_at:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-Start Messung für worker.py")
+    parser.add_argument("--mode", choices=["importtime", "ready"], default="importtime")
+    parser.add_argument("--module", default="worker")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--queues", default="realtime")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    if args.mode == "importtime":
+        bench_importtime(args.module, args.runs, args.top)
+    else:
+        bench_ready(args.queues, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+QBot YFinance Serialization Benchmark
+Vergleicht die Serialisierung der yfinance_enhanced Feature-Daten (synthetische OHLCV + Indikatoren):
+- rows:     alter Pfad, hist.iterrows() + pd.isna/float pro Feld -> Liste von Dicts -> json.dumps
+- columns:  build_feature_columns (NumPy where, NaN -> None) -> spaltenweises Dict -> json.dumps
+
+Usage: python scripts/bench_yf_serialization.py [--tickers 500] [--days 252] [--runs 3]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('REDIS_URL', 'redis://localhost:6379/0')  # redis.from_url verbindet erst beim ersten Befehl
+
+from yfinance_enhanced_service import add_technical_indicators, build_feature_columns  # noqa: E402
+
+
+def synthetic_history(days: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    index = pd.bdate_range(end='2025-10-01', periods=days)
+    hist = pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.005, days)),
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 50_000_000, days).astype(float),
+    }, index=index)
+    return add_technical_indicators(hist)
+
+
+def legacy_rows(ticker, hist):
+    """Alter Pfad (bis user-043): iterrows + Feldweise Konvertierung"""
+    ml_features = []
+    for idx, row in hist.iterrows():
+        if pd.isna(row['Close']):
+            continue
+        ml_features.append({
+            'date': idx.strftime('%Y-%m-%d'),
+            'ticker': ticker,
+            'open': float(row['Open']) if not pd.isna(row['Open']) else None,
+            'high': float(row['High']) if not pd.isna(row['High']) else None,
+            'low': float(row['Low']) if not pd.isna(row['Low']) else None,
+            'close': float(row['Close']),
+            'volume': int(row['Volume']) if not pd.isna(row['Volume']) else 0,
+            'sma_20': float(row['SMA_20']) if not pd.isna(row['SMA_20']) else None,
+            'sma_50': float(row['SMA_50']) if not pd.isna(row['SMA_50']) else None,
+            'sma_200': float(row['SMA_200']) if not pd.isna(row['SMA_200']) else None,
+            'rsi': float(row['RSI']) if not pd.isna(row['RSI']) else None,
+            'macd': float(row['MACD']) if not pd.isna(row['MACD']) else None,
+            'macd_signal': float(row['MACD_Signal']) if not pd.isna(row['MACD_Signal']) else None,
+            'bb_upper': float(row['BB_Upper']) if not pd.isna(row['BB_Upper']) else None,
+            'bb_lower': float(row['BB_Lower']) if not pd.isna(row['BB_Lower']) else None,
+            'volume_ratio': float(row['Volume_Ratio']) if not pd.isna(row['Volume_Ratio']) else None
+        })
+    return json.dumps({'historical_data': ml_features})
+
+
+def columnar(ticker, hist):
+    return json.dumps({'historical_columns': build_feature_columns(hist)})
+
+
+def measure(label, fn, frames, runs):
+    samples, size = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        size = sum(len(fn(ticker, hist)) for ticker, hist in frames.items())
+        samples.append(time.perf_counter() - start)
+    per_ticker_ms = statistics.median(samples) / len(frames) * 1000
+    print(f"{label:<8} total={statistics.median(samples):7.3f}s  per_ticker={per_ticker_ms:6.3f}ms  bytes={size:,}")
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark iterrows vs. spaltenweise Feature-Serialisierung")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=252)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = {f"T{i:04d}": synthetic_history(args.days, i) for i in range(args.tickers)}
+    print(f"📊 {args.tickers} tickers x {args.days} bars, runs={args.runs}")
+    rows_s = measure("rows", legacy_rows, frames, args.runs)
+    cols_s = measure("columns", columnar, frames, args.runs)
+    print(f"speedup: {rows_s / cols_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Celery Queues, Routing und Worker-Pools
+
+Vier Queues statt einer gemeinsamen Default-Queue, damit lange ML-Jobs
+keine latenzkritischen Tasks blockieren:
+
+- realtime  Emergency, Orders, trade_bot, Heartbeat       (prefork, kurze Limits, höchste Priorität)
+- ingest    fetch_*, Backfill, Grok, Performance          (prefork, mittlere Limits)
+- ml-train  train_model, daily_train, train_sequential    (prefork concurrency 1, acks_late, lange Limits)
+- ml-infer  generate_predictions, Diagnose, Enhanced      (prefork, prefetch 1)
+
+Metriken (Redis):
+- celery_task_metrics:{queue}  Hash mit count/failed/wait_ms/run_ms (Summen + letzter Wert)
+- celery_queue_metrics         JSON mit Queue-Tiefe pro Queue und Priorität (Task collect_queue_metrics)
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun
+from kombu import Queue
+
+QUEUE_REALTIME = 'realtime'
+QUEUE_INGEST = 'ingest'
+QUEUE_ML_TRAIN = 'ml-train'
+QUEUE_ML_INFER = 'ml-infer'
+TASK_QUEUES = (QUEUE_REALTIME, QUEUE_INGEST, QUEUE_ML_TRAIN, QUEUE_ML_INFER)
+
+# Redis-Broker Prioritäten: 0 = höchste, 9 = niedrigste
+PRIORITY_STEPS = list(range(10))
+
+# Pro Queue: Priorität, Soft/Hard Time Limit (Sekunden), acks_late
+# Time Limits setzt Celery nur in prefork Pools durch -> alle Worker-Services laufen mit --pool prefork
+QUEUE_POLICIES = {
+    QUEUE_REALTIME: {'priority': 0, 'soft_time_limit': 60, 'time_limit': 90, 'acks_late': False},
+    QUEUE_INGEST: {'priority': 4, 'soft_time_limit': 900, 'time_limit': 1200, 'acks_late': False},
+    QUEUE_ML_TRAIN: {'priority': 8, 'soft_time_limit': 4 * 3600, 'time_limit': 4 * 3600 + 600, 'acks_late': True},
+    QUEUE_ML_INFER: {'priority': 5, 'soft_time_limit': 600, 'time_limit': 900, 'acks_late': True},
+}
+
+TASK_QUEUE_MAP = {
+    QUEUE_REALTIME: [
+        'emergency_handler', 'process_manual_orders', 'trade_bot', 'manage_open_positions',
+        'system_heartbeat', 'get_market_status_task', 'sync_frontend_settings',
+        'update_backend_responses', 'monitor_autotrading_frontend', 'check_training_commands',
+        'collect_queue_metrics', 'run_market_pipeline', 'pipeline_completed', 'pipeline_failed',
+    ],
+    QUEUE_INGEST: [
+        'fetch_data', 'fetch_portfolio', 'sync_alpaca_orders', 'fetch_historical_data', 'backfill_ticker',
+        'scan_and_backfill_low_history', 'fetch_grok_recommendations', 'fetch_grok_deepersearch',
+        'fetch_grok_deepersearch_xai', 'fetch_grok_topstocks', 'grok_health',
+        'calculate_trading_performance', 'compute_prediction_quality_metrics',
+    ],
+    QUEUE_ML_TRAIN: [
+        'train_model', 'daily_train', 'train_sequential', 'retrain_check', 'training_diagnostics',
+    ],
+    QUEUE_ML_INFER: [
+        'generate_predictions', 'diagnose_predictions', 'update_ml_predictions_enhanced',
+    ],
+}
+
+TASK_METRICS_KEY = 'celery_task_metrics:{queue}'
+QUEUE_METRICS_KEY = 'celery_queue_metrics'
+
+# Visibility Timeout muss länger sein als der längste acks_late Task (sonst Redelivery)
+VISIBILITY_TIMEOUT = QUEUE_POLICIES[QUEUE_ML_TRAIN]['time_limit'] + 1800
+
+
+def build_task_routes(module='worker'):
+    routes = {}
+    for queue, tasks in TASK_QUEUE_MAP.items():
+        for task in tasks:
+            routes[f'{module}.{task}'] = {'queue': queue, 'routing_key': queue}
+    return routes
+
+
+def build_task_annotations(module='worker'):
+    annotations = {}
+    for queue, tasks in TASK_QUEUE_MAP.items():
+        policy = QUEUE_POLICIES[queue]
+        for task in tasks:
+            annotations[f'{module}.{task}'] = dict(policy)
+    return annotations
+
+
+def configure_queues(app, redis_client, module='worker'):
+    """Wendet Queues, Routing, Prioritäten, Limits und Metrik-Signale auf die Celery-App an."""
+    app.conf.task_queues = [Queue(name, routing_key=name) for name in TASK_QUEUES]
+    app.conf.task_default_queue = QUEUE_INGEST
+    app.conf.task_routes = build_task_routes(module)
+    app.conf.task_annotations = build_task_annotations(module)
+    app.conf.task_default_priority = 5
+    app.conf.task_queue_max_priority = PRIORITY_STEPS[-1]
+    app.conf.broker_transport_options = {
+        'priority_steps': PRIORITY_STEPS,
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+        'visibility_timeout': VISIBILITY_TIMEOUT,
+    }
+    app.conf.result_backend_transport_options = {'visibility_timeout': VISIBILITY_TIMEOUT}
+    # Lange Tasks: nur eine Nachricht pro Prozess vorholen (Pools überschreiben per CLI)
+    app.conf.worker_prefetch_multiplier = 1
+    app.conf.task_reject_on_worker_lost = True
+    _connect_metric_signals(redis_client)
+
+
+def _task_queue(task):
+    delivery_info = getattr(task.request, 'delivery_info', None) or {}
+    return delivery_info.get('routing_key') or delivery_info.get('exchange') or 'unknown'
+
+
+def _connect_metric_signals(redis_client):
+    started = {}
+
+    @before_task_publish.connect(weak=False)
+    def _stamp_sent_at(headers=None, **kwargs):
+        if headers is not None:
+            headers.setdefault('sent_at', time.time())
+
+    @task_prerun.connect(weak=False)
+    def _record_wait(task_id=None, task=None, **kwargs):
+        now = time.time()
+        started[task_id] = now
+        sent_at = getattr(task.request, 'sent_at', None) or (getattr(task.request, 'headers', None) or {}).get('sent_at')
+        if not sent_at or getattr(task.request, 'eta', None):
+            return
+        wait_ms = max(0.0, (now - float(sent_at)) * 1000)
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            key = TASK_METRICS_KEY.format(queue=_task_queue(task))
+            pipe.hincrbyfloat(key, 'wait_ms_total', wait_ms)
+            pipe.hincrby(key, 'wait_samples', 1)
+            pipe.hset(key, 'last_wait_ms', f'{wait_ms:.1f}')
+            pipe.hset(key, f'task:{task.name}:last_wait_ms', f'{wait_ms:.1f}')
+            pipe.execute()
+        except Exception as e:
+            logging.debug(f"Task wait metric failed: {e}")
+
+    @task_postrun.connect(weak=False)
+    def _record_runtime(task_id=None, task=None, state=None, **kwargs):
+        start = started.pop(task_id, None)
+        if start is None:
+            return
+        run_ms = (time.time() - start) * 1000
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            key = TASK_METRICS_KEY.format(queue=_task_queue(task))
+            pipe.hincrby(key, 'count', 1)
+            pipe.hincrbyfloat(key, 'run_ms_total', run_ms)
+            pipe.hset(key, 'last_run_ms', f'{run_ms:.1f}')
+            pipe.hset(key, f'task:{task.name}:last_run_ms', f'{run_ms:.1f}')
+            pipe.hset(key, 'last_task', task.name)
+            pipe.hset(key, 'last_state', state or '')
+            pipe.execute()
+        except Exception as e:
+            logging.debug(f"Task runtime metric failed: {e}")
+
+    @task_failure.connect(weak=False)
+    def _record_failure(sender=None, **kwargs):
+        try:
+            redis_client.hincrby(TASK_METRICS_KEY.format(queue=_task_queue(sender)), 'failed', 1)
+        except Exception as e:
+            logging.debug(f"Task failure metric failed: {e}")
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def collect_queue_depths(redis_client):
+    """Queue-Tiefe pro Queue (Summe über Prioritäts-Listen) plus Task-Metriken als Snapshot."""
+    pipe = redis_client.pipeline(transaction=False)
+    list_names = []
+    for queue in TASK_QUEUES:
+        for step in PRIORITY_STEPS:
+            name = queue if step == 0 else f'{queue}:{step}'
+            list_names.append((queue, step, name))
+            pipe.llen(name)
+    for queue in TASK_QUEUES:
+        pipe.hgetall(TASK_METRICS_KEY.format(queue=queue))
+    results = pipe.execute()
+    depths = results[:len(list_names)]
+    metrics_raw = results[len(list_names):]
+
+    snapshot = {'time': datetime.utcnow().isoformat(), 'queues': {}}
+    for queue in TASK_QUEUES:
+        snapshot['queues'][queue] = {'depth': 0, 'by_priority': {}}
+    for (queue, step, _), depth in zip(list_names, depths):
+        if depth:
+            snapshot['queues'][queue]['depth'] += depth
+            snapshot['queues'][queue]['by_priority'][str(step)] = depth
+    for queue, raw in zip(TASK_QUEUES, metrics_raw):
+        metrics = {_decode(k): _decode(v) for k, v in (raw or {}).items()}
+        count = int(metrics.get('count', 0) or 0)
+        wait_samples = int(metrics.get('wait_samples', 0) or 0)
+        snapshot['queues'][queue].update({
+            'tasks_completed': count,
+            'tasks_failed': int(metrics.get('failed', 0) or 0),
+            'avg_wait_ms': round(float(metrics.get('wait_ms_total', 0)) / wait_samples, 1) if wait_samples else None,
+            'avg_run_ms': round(float(metrics.get('run_ms_total', 0)) / count, 1) if count else None,
+            'last_wait_ms': metrics.get('last_wait_ms'),
+            'last_run_ms': metrics.get('last_run_ms'),
+        })
+    redis_client.set(QUEUE_METRICS_KEY, json.dumps(snapshot))
+    return snapshot
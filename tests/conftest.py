@@ -0,0 +1,124 @@
+"""Gemeinsame Fixtures: fakeredis statt Redis, Registry im tmp_path, Fake-Cursor statt Postgres,
+Fake-AutoGluon statt autogluon.tabular."""
+
+import os
+import sys
+import types
+from contextlib import contextmanager
+
+import fakeredis
+import numpy as np
+import pandas as pd
+import pytest
+
+# worker.py / app.py bauen beim Import Clients aus REDIS_URL (ohne Verbindungsaufbau)
+os.environ.setdefault('REDIS_URL', 'redis://localhost:6379/15')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def fake_redis():
+    """Bytes-Client wie worker.r (decode_responses=False)."""
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def registry_dir(tmp_path, monkeypatch):
+    import model_registry
+
+    path = tmp_path / 'registry'
+    path.mkdir()
+    monkeypatch.setattr(model_registry, 'REGISTRY_DIR', str(path))
+    return path
+
+
+class FakeCursor:
+    """Antwortet auf SQL anhand des ersten passenden Fragments in responses (fragment -> rows)."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        for fragment, rows in self.responses.items():
+            if fragment in sql:
+                self._rows = list(rows(params) if callable(rows) else rows)
+                return
+        self._rows = []
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+
+@pytest.fixture
+def fake_db():
+    """Liefert (cursor, contextmanager); der contextmanager ersetzt db_cursor/transaction."""
+    cursor = FakeCursor({})
+
+    @contextmanager
+    def cursor_context():
+        yield cursor
+
+    return cursor, cursor_context
+
+
+class FakePredictor:
+    """Minimaler TabularPredictor: sagt den Mittelwert des Labels vorher."""
+
+    def __init__(self, label='target', path=None, eval_metric=None):
+        self.label = label
+        self.path = path
+        if path:
+            os.makedirs(path, exist_ok=True)
+        self.features = []
+        self.mean = 0.0
+
+    def fit(self, data, time_limit=None, verbosity=0):
+        self.features = [c for c in data.columns if c != self.label]
+        self.mean = float(data[self.label].mean())
+        return self
+
+    def leaderboard(self, silent=True):
+        return pd.DataFrame({'model': ['WeightedEnsemble_L2'], 'score_val': [-1.5]})
+
+    @property
+    def feature_metadata(self):
+        return types.SimpleNamespace(get_features=lambda: list(self.features))
+
+    def predict(self, frame):
+        return np.full(len(frame), self.mean)
+
+
+@pytest.fixture
+def fake_autogluon(monkeypatch):
+    """Ersetzt autogluon.tabular; fits/loads zeichnen Aufrufe auf, Pfade in broken sind nicht ladbar."""
+    calls = types.SimpleNamespace(fits=[], loads=[], broken=set())
+
+    class RecordingPredictor(FakePredictor):
+        def fit(self, data, time_limit=None, verbosity=0):
+            calls.fits.append({'path': self.path, 'time_limit': time_limit})
+            return super().fit(data, time_limit, verbosity)
+
+        @classmethod
+        def load(cls, path):
+            calls.loads.append(path)
+            if path in calls.broken:
+                raise OSError(f'cannot load {path}')
+            predictor = cls(path=None)
+            predictor.path = path
+            predictor.features = ['close']
+            return predictor
+
+    tabular = types.ModuleType('autogluon.tabular')
+    tabular.TabularDataset = lambda df: df
+    tabular.TabularPredictor = RecordingPredictor
+    package = types.ModuleType('autogluon')
+    package.tabular = tabular
+    monkeypatch.setitem(sys.modules, 'autogluon', package)
+    monkeypatch.setitem(sys.modules, 'autogluon.tabular', tabular)
+    return calls
@@ -0,0 +1,74 @@
+"""Chart-Cache: Refresh eines Continuous Aggregates invalidiert den ETag auch ohne neue Data-Version."""
+
+from contextlib import contextmanager
+from datetime import datetime
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, 'response_cache', ResponseCache(fakeredis.FakeRedis()))
+    return TestClient(api.app)
+
+
+def _rows(close):
+    return [(datetime(2026, 1, 5, 15), 1767625200, 100.0, 101.0, 99.0, close, 1000)]
+
+
+def test_aggregate_refresh_invalidates_etag(client, monkeypatch):
+    rows = {'close': 100.5}
+    watermarks = {'market_data_15min': '2026-01-05T15:00:00+00:00'}
+    monkeypatch.setattr(api, 'fetch_timescale_rows', lambda *args, **kwargs: _rows(rows['close']))
+    monkeypatch.setattr(api, 'aggregate_watermarks', lambda: dict(watermarks))
+
+    first = client.get('/market/data/AAPL?timeframe=15min')
+    etag = first.headers['etag']
+    assert client.get('/market/data/AAPL?timeframe=15min', headers={'If-None-Match': etag}).status_code == 304
+
+    rows['close'] = 100.9  # Policy-Refresh ändert den Bucket, kein Ingest-Bump
+    watermarks['market_data_15min'] = '2026-01-05T15:15:00+00:00'
+    refreshed = client.get('/market/data/AAPL?timeframe=15min', headers={'If-None-Match': etag})
+
+    assert refreshed.status_code == 200
+    assert refreshed.headers['etag'] != etag
+
+
+def test_raw_timeframes_do_not_look_up_watermarks(monkeypatch):
+    monkeypatch.setattr(api, 'aggregate_watermarks', lambda: pytest.fail('no lookup expected'))
+    assert api.aggregate_watermark(['5min', '4hour']) is None
+
+
+def test_watermarks_are_cached_per_process(monkeypatch):
+    queries = []
+
+    class Cursor:
+        def execute(self, sql):
+            queries.append(sql)
+
+        def fetchall(self):
+            return [('market_data_1hour', datetime(2026, 1, 5, 15))]
+
+    class Connection:
+        @contextmanager
+        def cursor(self):
+            yield Cursor()
+
+    @contextmanager
+    def connection():
+        yield Connection()
+
+    monkeypatch.setattr(api, 'db_connection', connection)
+    monkeypatch.setattr(api, '_aggregate_watermarks', {'expires': 0.0, 'values': {}})
+
+    first = api.aggregate_watermark(['1hour', '15min'])
+    second = api.aggregate_watermark(['1HOUR'])
+
+    assert first == 'market_data_15min@None,market_data_1hour@2026-01-05T15:00:00'
+    assert second == 'market_data_1hour@2026-01-05T15:00:00'
+    assert len(queries) == 1
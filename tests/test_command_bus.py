@@ -0,0 +1,135 @@
+"""Command Bus: ACK nur nach Erfolg, Retry/Dead-Letter über den XAUTOCLAIM-Sweep, Legacy-Bridge."""
+
+import json
+import types
+
+import fakeredis
+import pytest
+
+import command_bus
+import redis_codec
+import worker
+
+
+@pytest.fixture
+def bus_redis(monkeypatch):
+    monkeypatch.setattr(command_bus, 'COMMAND_RETRY_IDLE_MS', 0)
+    monkeypatch.setattr(command_bus, 'COMMAND_SWEEP_SECONDS', 0)
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def _bus(client, handlers):
+    bus = command_bus.CommandBus(client, handlers, consumer='test')
+    bus.ensure_group()
+    return bus
+
+
+def _read(bus):
+    for _, messages in bus.redis.xreadgroup(command_bus.COMMAND_GROUP, bus.consumer,
+                                            {command_bus.COMMAND_STREAM: '>'}, count=10) or []:
+        for message_id, fields in messages:
+            bus._handle(message_id, fields)
+
+
+def _pending(client):
+    return client.xpending(command_bus.COMMAND_STREAM, command_bus.COMMAND_GROUP)['pending']
+
+
+def test_successful_command_is_acked(bus_redis):
+    calls = []
+    bus = _bus(bus_redis, {'settings': calls.append})
+    command_bus.enqueue_command(bus_redis, 'settings', {'x': 1})
+
+    _read(bus)
+
+    assert calls == [{'x': 1}]
+    assert _pending(bus_redis) == 0
+    assert bus_redis.hget(command_bus.COMMAND_STATS_KEY, 'settings:ok') == '1'
+
+
+def test_failing_command_is_retried_then_dead_lettered(bus_redis, monkeypatch):
+    monkeypatch.setattr(command_bus, 'COMMAND_MAX_RETRIES', 2)
+    attempts = []
+
+    def handler(payload):
+        attempts.append(payload)
+        raise RuntimeError('alpaca down')
+
+    bus = _bus(bus_redis, {'manual_orders': handler})
+    command_bus.enqueue_command(bus_redis, 'manual_orders')
+
+    _read(bus)
+    assert _pending(bus_redis) == 1
+    for _ in range(3):
+        bus._maybe_sweep()
+
+    assert len(attempts) == 2
+    assert _pending(bus_redis) == 0
+    dead = bus_redis.xrange(command_bus.COMMAND_DEAD_LETTER)
+    assert [fields['reason'] for _, fields in dead] == ['max_retries']
+
+
+def test_sweep_runs_no_handler_without_commands(bus_redis):
+    calls = []
+    bus = _bus(bus_redis, {name: calls.append for name in ('emergency', 'settings', 'autotrading')})
+
+    bus._maybe_sweep()
+    bus._maybe_sweep()
+
+    assert calls == []
+
+
+def test_bridge_catch_up_skips_unchanged_state_keys(bus_redis):
+    bridge = command_bus.LegacyKeyBridge(bus_redis)
+    bus_redis.set('frontend:trading_config', '{"aggressiveness": 3}')
+    bus_redis.set('training:command', 'start')
+
+    assert bridge.catch_up() == 2
+    assert bridge.catch_up() == 1  # training:command ist noch nicht abgearbeitet, trading_config unverändert
+    bus_redis.set('frontend:trading_config', '{"aggressiveness": 4}')
+    bus_redis.delete('training:command')
+    assert bridge.catch_up() == 1
+    types = [fields['type'] for _, fields in bus_redis.xrange(command_bus.COMMAND_STREAM)]
+    assert types == ['training_start', 'settings', 'training_start', 'settings']
+
+
+def test_emergency_handler_raises_and_keeps_legacy_action(fake_redis, monkeypatch):
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    fake_redis.set('frontend:emergency_actions',
+                   redis_codec.dumps('frontend:emergency_actions', {'action': 'STOP_ALL_TRADING', 'confirmed': True}))
+    real_set = worker._redis_json_set
+
+    def failing_set(key, value):
+        if key == 'trading_settings':
+            raise ConnectionError('redis write failed')
+        real_set(key, value)
+
+    monkeypatch.setattr(worker, '_redis_json_set', failing_set)
+
+    with pytest.raises(ConnectionError):
+        worker.COMMAND_HANDLERS['emergency']({'key': 'frontend:emergency_actions'})
+    assert redis_codec.loads(fake_redis.get('frontend:emergency_actions'))['action'] == 'STOP_ALL_TRADING'
+
+
+def test_trade_bot_refreshes_autotrading_feedback(fake_redis, monkeypatch):
+    """Ohne frontend-monitoring Beat: trade_bot schreibt autotrading:* selbst nach."""
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'is_market_open', lambda: True)
+    monkeypatch.setattr(worker, 'check_risk_limits', lambda: True)
+    monkeypatch.setattr(worker, 'update_system_heartbeat', lambda: None)
+    response = types.SimpleNamespace(status_code=200, content=b'{}', json=lambda: {'id': 'o1'})
+    monkeypatch.setattr(worker, '_http_post', lambda *args, **kwargs: response)
+    fake_redis.set('autotrading:session_active', 'session-1')
+    worker._redis_json_set('trading_settings', {'enabled': True, 'buy_threshold_pct': 0.01, 'sell_threshold_pct': 0.01})
+    worker._redis_json_set('portfolio_positions', [{'ticker': 'MSFT', 'qty': '3'}])
+    worker._redis_json_set('predictions_current', {
+        'AAPL': {'current_price': 100.0, 'horizons': {'60': {'predicted_price': 110.0}}},
+    })
+
+    worker.trade_bot()
+
+    stats = json.loads(fake_redis.get('autotrading:stats'))
+    assert stats['trades_today'] == 1 and stats['positions_count'] == 1
+    assert json.loads(fake_redis.get('autotrading:last_trade'))['ticker'] == 'AAPL'
+    assert json.loads(fake_redis.get('autotrading:active_positions')) == [{'ticker': 'MSFT', 'qty': '3'}]
+    assert fake_redis.get('autotrading:backend_status') == b'RUNNING'
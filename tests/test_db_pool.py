@@ -0,0 +1,75 @@
+"""db_pool: Semaphore-Slots werden bei jedem Fehler im Checkout freigegeben."""
+
+import os
+import threading
+
+import psycopg2
+import pytest
+
+import db_pool
+
+
+class FakeConnection:
+    def __init__(self, closed=0):
+        self.closed = closed
+        self.autocommit = False
+
+
+class FakePool:
+    maxconn = 2
+
+    def __init__(self, connections):
+        self.connections = list(connections)
+        self.returned = []
+
+    def getconn(self):
+        item = self.connections.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def putconn(self, connection, close=False):
+        self.returned.append((connection, close))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    def install(connections):
+        fake = FakePool(connections)
+        slots = threading.BoundedSemaphore(fake.maxconn)
+        monkeypatch.setattr(db_pool, '_pool', fake)
+        monkeypatch.setattr(db_pool, '_pool_pid', os.getpid())
+        monkeypatch.setattr(db_pool, '_slots', slots)
+        return fake, slots
+    return install
+
+
+def test_failed_reconnect_releases_slot(pool):
+    fake, slots = pool([FakeConnection(closed=1), psycopg2.OperationalError('db down')])
+
+    with pytest.raises(psycopg2.OperationalError):
+        db_pool._checkout(autocommit=True)
+
+    assert slots._value == fake.maxconn
+    assert fake.returned[0][1] is True
+
+
+def test_failed_getconn_releases_slot(pool):
+    fake, slots = pool([db_pool.pg_pool.PoolError('exhausted')])
+
+    with pytest.raises(db_pool.pg_pool.PoolError):
+        db_pool._checkout(autocommit=True)
+
+    assert slots._value == fake.maxconn
+
+
+def test_reconnect_replaces_closed_connection(pool):
+    fresh = FakeConnection()
+    fake, slots = pool([FakeConnection(closed=1), fresh])
+
+    with db_pool.db_connection() as connection:
+        assert connection is fresh and connection.autocommit is True
+        assert slots._value == fake.maxconn - 1
+
+    assert slots._value == fake.maxconn
+    assert fake.returned[-1] == (fresh, False)
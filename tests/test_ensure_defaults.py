@@ -0,0 +1,51 @@
+"""ensure_defaults_once: Marker pro Deployment erst nach Erfolg, Fehler blockieren keinen Rerun."""
+
+import worker
+
+
+def test_runs_once_per_deployment_version(fake_redis, monkeypatch):
+    runs = []
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'ensure_defaults', lambda: runs.append(1))
+    monkeypatch.setenv('DEPLOYMENT_VERSION', 'v1')
+
+    assert worker.ensure_defaults_once() is True
+    assert worker.ensure_defaults_once() is False
+    assert fake_redis.ttl(worker.DEFAULTS_INIT_MARKER.format(version='v1')) == -1
+    assert not fake_redis.exists(worker.DEFAULTS_INIT_LOCK)
+
+    monkeypatch.setenv('DEPLOYMENT_VERSION', 'v2')
+    assert worker.ensure_defaults_once() is True
+    assert len(runs) == 2
+
+
+def test_failure_sets_no_marker_and_releases_lock(fake_redis, monkeypatch):
+    def failing():
+        raise ConnectionError('redis write failed')
+
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'ensure_defaults', failing)
+    monkeypatch.setenv('DEPLOYMENT_VERSION', 'v1')
+
+    assert worker.ensure_defaults_once() is False
+    assert not fake_redis.exists(worker.DEFAULTS_INIT_MARKER.format(version='v1'))
+    assert not fake_redis.exists(worker.DEFAULTS_INIT_LOCK)
+
+    monkeypatch.setattr(worker, 'ensure_defaults', lambda: None)
+    assert worker.ensure_defaults_once() is True
+
+
+def test_concurrent_run_is_skipped_while_locked(fake_redis, monkeypatch):
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'ensure_defaults', lambda: None)
+    monkeypatch.setenv('DEPLOYMENT_VERSION', 'v1')
+    fake_redis.set(worker.DEFAULTS_INIT_LOCK, 'other-pool', ex=worker.DEFAULTS_INIT_LOCK_TTL)
+
+    assert worker.ensure_defaults_once() is False
+    assert fake_redis.get(worker.DEFAULTS_INIT_LOCK) == b'other-pool'
+
+
+def test_version_falls_back_to_code_hash(monkeypatch):
+    monkeypatch.delenv('DEPLOYMENT_VERSION', raising=False)
+    monkeypatch.delenv('GIT_SHA', raising=False)
+    assert len(worker._deployment_version()) == 12
@@ -0,0 +1,34 @@
+"""fetch_portfolio: ungültige Alpaca-Positionen werden vor dem Batch verworfen."""
+
+import types
+
+import worker
+
+
+def _response(payload):
+    return types.SimpleNamespace(status_code=200, json=lambda: payload)
+
+
+def test_invalid_positions_are_skipped_before_batch(fake_redis, fake_db, monkeypatch):
+    cursor, cursor_context = fake_db
+    batches = []
+    positions = [
+        {'symbol': 'AAPL', 'qty': '10', 'avg_entry_price': '150.5', 'market_value': '1600',
+         'unrealized_pl': '95', 'unrealized_plpc': '0.06', 'side': 'long'},
+        {'symbol': 'MSFT', 'qty': 'n/a', 'avg_entry_price': '300'},
+        {'symbol': None, 'qty': '1', 'avg_entry_price': '1'},
+    ]
+    account = {'equity': 'not-a-number', 'portfolio_value': '1000', 'buying_power': '500'}
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'transaction', cursor_context)
+    monkeypatch.setattr(worker, '_http_get', lambda url, **kw: _response(positions if 'positions' in url else account))
+    monkeypatch.setattr(worker, 'execute_values', lambda cur, sql, rows, **kw: batches.append((sql, rows)))
+
+    result = worker.fetch_portfolio()
+
+    assert len(result['positions']) == 3
+    summary = next(rows for sql, rows in batches if 'portfolio_positions' in sql)
+    history = next(rows for sql, rows in batches if 'alpaca_positions' in sql)
+    assert summary == [('AAPL', 10, 150.5, 'long')]
+    assert [row[0] for row in history] == ['AAPL']
+    assert not any('portfolio_equity' in sql for sql, _ in cursor.executed)
@@ -0,0 +1,73 @@
+"""InferenceRouter: Slot-Auswahl innerhalb der Cache-Kapazität und gemerkte Ladefehler."""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import inference_router
+import model_registry
+from conftest import FakePredictor
+
+HORIZONS = ('15', '30', '60')
+
+
+def _setup(client, tickers, now):
+    """Eine frische Ticker-Version pro Slot, unterschiedlich alt (Versions-ID = Zeitpunkt)."""
+    versions = {}
+    for i, ticker in enumerate(tickers):
+        for j, hz in enumerate(HORIZONS):
+            version = (now - timedelta(minutes=3 * i + j)).strftime(model_registry.VERSION_FORMAT)
+            client.hset(model_registry.CURRENT_KEY, model_registry.slot(ticker, hz), version)
+            versions[(ticker, hz)] = version
+    features = {t: pd.DataFrame([{'close': 100.0}]) for t in tickers}
+    global_predictor = FakePredictor()
+    global_predictor.features = ['close']
+    return versions, features, {hz: global_predictor for hz in HORIZONS}
+
+
+def test_ticker_routes_stay_resident_across_cycles(fake_redis, registry_dir, fake_autogluon):
+    tickers = [f'T{i:03d}' for i in range(100)]
+    versions, features, global_predictors = _setup(fake_redis, tickers, datetime.utcnow())
+    router = inference_router.InferenceRouter(capacity=48)
+
+    for _ in range(3):
+        result = router.predict(fake_redis, features, global_predictors, HORIZONS)
+
+    cache = router.cache.snapshot()
+    assert cache['loads'] == 48
+    assert cache['hits'] == 96
+    assert cache['evictions'] == 0
+    stats = result['stats']['routes']
+    assert stats['ticker']['rows'] == 48
+    assert stats['ticker']['capacity_limited'] == 300 - 48
+    assert stats['global']['rows'] == 300 - 48
+    newest = sorted(versions.items(), key=lambda kv: kv[1], reverse=True)[:48]
+    for (ticker, hz), version in newest:
+        assert result['predictions'][ticker][hz] == {'value': 0.0, 'route': 'ticker', 'version': version}
+
+
+def test_failed_load_is_not_retried_every_cycle(fake_redis, registry_dir, fake_autogluon):
+    versions, features, global_predictors = _setup(fake_redis, ['AAPL'], datetime.utcnow())
+    broken = model_registry.version_path('AAPL', '15', versions[('AAPL', '15')])
+    fake_autogluon.broken.add(broken)
+    router = inference_router.InferenceRouter(capacity=10)
+
+    first = router.predict(fake_redis, features, global_predictors, HORIZONS)
+    second = router.predict(fake_redis, features, global_predictors, HORIZONS)
+
+    assert fake_autogluon.loads.count(broken) == 1
+    assert first['stats']['routes']['ticker']['fallbacks'] == 1
+    assert second['stats']['routes']['ticker']['known_failures'] == 1
+    assert second['predictions']['AAPL']['15']['route'] == 'global'
+    assert second['predictions']['AAPL']['30']['route'] == 'ticker'
+
+
+def test_failed_load_is_retried_after_retry_window(registry_dir, fake_autogluon):
+    cache = model_registry.PredictorCache(retry_seconds=0)
+    fake_autogluon.broken.add(model_registry.version_path('AAPL', '15', 'v1'))
+
+    assert cache.get('AAPL', '15', 'v1') is None
+    fake_autogluon.broken.clear()
+    assert cache.get('AAPL', '15', 'v1')['version'] == 'v1'
+    assert cache.stats['load_errors'] == 1
+    assert cache.stats['loads'] == 1
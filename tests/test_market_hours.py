@@ -0,0 +1,63 @@
+"""market_hours: Phasen über den Handelstag, Feiertage und verkürzte Sitzungen."""
+
+from datetime import date, datetime
+
+import pytest
+
+import market_hours
+from market_hours import EASTERN, PHASE_CLOSED, PHASE_POST, PHASE_PRE, PHASE_REGULAR
+
+
+def _et(*args):
+    return EASTERN.localize(datetime(*args))
+
+
+@pytest.mark.parametrize('moment, phase', [
+    ((2026, 1, 6, 3, 59), PHASE_CLOSED),
+    ((2026, 1, 6, 4, 0), PHASE_PRE),
+    ((2026, 1, 6, 9, 29), PHASE_PRE),
+    ((2026, 1, 6, 9, 30), PHASE_REGULAR),
+    ((2026, 1, 6, 15, 59), PHASE_REGULAR),
+    ((2026, 1, 6, 16, 0), PHASE_POST),
+    ((2026, 1, 6, 19, 59), PHASE_POST),
+    ((2026, 1, 6, 20, 0), PHASE_CLOSED),
+    ((2026, 1, 10, 12, 0), PHASE_CLOSED),   # Samstag
+    ((2026, 12, 25, 12, 0), PHASE_CLOSED),  # Weihnachten
+])
+def test_market_phase_across_trading_day(moment, phase):
+    assert market_hours.market_phase(_et(*moment)) == phase
+
+
+def test_naive_datetimes_are_utc():
+    # 14:30 UTC = 09:30 ET (Winterzeit)
+    assert market_hours.market_phase(datetime(2026, 1, 6, 14, 30)) == PHASE_REGULAR
+    assert market_hours.is_market_open(datetime(2026, 1, 6, 14, 29)) is False
+
+
+def test_early_close_after_thanksgiving():
+    day = date(2026, 11, 27)
+    assert market_hours.is_early_close(day)
+    assert not market_hours.is_early_close(date(2026, 11, 25))
+    assert market_hours.market_phase(_et(2026, 11, 27, 12, 59)) == PHASE_REGULAR
+    assert market_hours.market_phase(_et(2026, 11, 27, 13, 0)) == PHASE_POST
+    assert market_hours.market_phase(_et(2026, 11, 27, 17, 0)) == PHASE_CLOSED
+    _, open_, close, post = market_hours.session_bounds(day)
+    assert (open_.hour, open_.minute, close.hour, post.hour) == (9, 30, 13, 17)
+
+
+def test_christmas_eve_is_early_close():
+    assert market_hours.is_early_close(date(2026, 12, 24))
+    assert market_hours.market_phase(_et(2026, 12, 24, 14, 0)) == PHASE_POST
+
+
+def test_next_regular_open_skips_weekend_and_holiday():
+    # Freitag nach Börsenschluss -> Montag; Karfreitag 2026 (3. April) ist geschlossen
+    assert market_hours.next_regular_open(_et(2026, 1, 9, 16, 30)) == _et(2026, 1, 12, 9, 30)
+    assert market_hours.next_regular_open(_et(2026, 4, 2, 17, 0)) == _et(2026, 4, 6, 9, 30)
+    assert market_hours.next_regular_open(_et(2026, 1, 6, 10, 0)) == _et(2026, 1, 6, 9, 30)
+
+
+def test_next_session_start():
+    now = _et(2026, 1, 6, 21, 0)
+    assert market_hours.next_session_start((PHASE_PRE, PHASE_REGULAR), now) == _et(2026, 1, 7, 4, 0)
+    assert market_hours.next_session_start((PHASE_REGULAR,), _et(2026, 1, 6, 10, 0)) is None
@@ -0,0 +1,88 @@
+"""model_registry: publish -> promote -> rollback -> gc auf tmp-Registry und fakeredis."""
+
+import os
+
+import pytest
+
+import model_registry
+
+
+def _publish(scope, hz, version, **manifest):
+    os.makedirs(model_registry.staging_path(scope, hz, version))
+    return model_registry.publish(scope, hz, version, {'metrics': manifest})
+
+
+def test_publish_renames_staging_atomically(registry_dir):
+    path = _publish('global', '15', 'v1', mae=1.0)
+
+    assert path == model_registry.version_path('global', '15', 'v1')
+    assert not os.path.exists(model_registry.staging_path('global', '15', 'v1'))
+    manifest = model_registry.read_manifest('global', '15', 'v1')
+    assert manifest['version'] == 'v1' and manifest['horizon'] == '15' and manifest['metrics'] == {'mae': 1.0}
+    assert model_registry.list_versions('global', '15') == ['v1']
+
+
+def test_unpublished_staging_is_not_listed_or_promotable(registry_dir, fake_redis):
+    os.makedirs(model_registry.staging_path('global', '15', 'v1'))
+
+    assert model_registry.list_versions('global', '15') == []
+    with pytest.raises(ValueError):
+        model_registry.promote(fake_redis, 'global', {'15': 'v1'})
+    assert model_registry.current(fake_redis, 'global', '15') is None
+
+
+def test_promote_moves_all_horizons_and_records_history(registry_dir, fake_redis):
+    for version in ('v1', 'v2'):
+        for hz in ('15', '30'):
+            _publish('global', hz, version)
+        model_registry.promote(fake_redis, 'global', {'15': version, '30': version})
+
+    assert model_registry.current_versions(fake_redis, 'global', ['15', '30']) == {'15': 'v2', '30': 'v2'}
+    assert model_registry.history(fake_redis, 'global', '15') == ['v2', 'v1']
+
+
+def test_rollback_to_previous_and_explicit_version(registry_dir, fake_redis):
+    for version in ('v1', 'v2', 'v3'):
+        _publish('AAPL', '60', version)
+        model_registry.promote(fake_redis, 'AAPL', {'60': version})
+
+    assert model_registry.rollback(fake_redis, 'AAPL', '60') == 'v2'
+    assert model_registry.current(fake_redis, 'AAPL', '60') == 'v2'
+    assert model_registry.history(fake_redis, 'AAPL', '60') == ['v2', 'v1']
+    assert model_registry.rollback(fake_redis, 'AAPL', '60', version='v3') == 'v3'
+    with pytest.raises(ValueError):
+        model_registry.rollback(fake_redis, 'AAPL', '60', version='missing')
+
+
+def test_rollback_without_target_returns_none(registry_dir, fake_redis):
+    _publish('AAPL', '60', 'v1')
+    model_registry.promote(fake_redis, 'AAPL', {'60': 'v1'})
+
+    assert model_registry.rollback(fake_redis, 'AAPL', '60') is None
+    assert model_registry.current(fake_redis, 'AAPL', '60') == 'v1'
+
+
+def test_gc_keeps_current_and_rollback_targets(registry_dir, fake_redis):
+    for version in ('v1', 'v2', 'v3', 'v4', 'v5'):
+        _publish('global', '15', version)
+    model_registry.promote(fake_redis, 'global', {'15': 'v1'})
+    stale = model_registry.staging_path('global', '15', 'v6')
+    os.makedirs(stale)
+    os.utime(stale, (0, 0))
+
+    result = model_registry.gc(fake_redis, keep=2)
+
+    assert result == {'removed': 2, 'staging_removed': 1}
+    assert model_registry.list_versions('global', '15') == ['v1', 'v4', 'v5']
+    assert not os.path.exists(stale)
+
+
+def test_gc_can_be_limited_to_scopes(registry_dir, fake_redis):
+    for scope in ('global', 'AAPL'):
+        for version in ('v1', 'v2', 'v3'):
+            _publish(scope, '15', version)
+
+    model_registry.gc(fake_redis, keep=1, scopes=['AAPL'])
+
+    assert model_registry.list_versions('AAPL', '15') == ['v3']
+    assert model_registry.list_versions('global', '15') == ['v1', 'v2', 'v3']
@@ -0,0 +1,118 @@
+"""Pipeline: StageError bricht ab, Lock-TTL deckt die ganze Chain ab."""
+
+import json
+import time
+
+import pytest
+
+import inference_router
+import pipeline
+import worker
+from task_queues import QUEUE_POLICIES
+
+
+def test_lock_ttl_is_short_and_stages_cover_their_time_limit():
+    chain_limit = sum(QUEUE_POLICIES[queue]['time_limit'] for queue in pipeline.STAGE_QUEUES.values())
+    assert pipeline.PIPELINE_LOCK_TTL < chain_limit
+    for stage, queue in pipeline.STAGE_QUEUES.items():
+        assert pipeline.stage_lock_ttl(stage) > QUEUE_POLICIES[queue]['time_limit']
+
+
+def test_lock_is_exclusive_until_released(fake_redis):
+    run_id = pipeline.acquire_pipeline_lock(fake_redis)
+
+    assert run_id
+    assert pipeline.acquire_pipeline_lock(fake_redis) is None
+    assert fake_redis.ttl(pipeline.PIPELINE_LOCK_KEY) == pipeline.PIPELINE_LOCK_TTL
+    pipeline.release_pipeline_lock(fake_redis, run_id)
+    assert pipeline.acquire_pipeline_lock(fake_redis)
+
+
+def test_lock_expires_when_no_stage_refreshes_it(fake_redis, monkeypatch):
+    monkeypatch.setattr(pipeline, 'PIPELINE_LOCK_TTL', 1)
+    assert pipeline.acquire_pipeline_lock(fake_redis)
+
+    time.sleep(1.1)
+
+    assert pipeline.acquire_pipeline_lock(fake_redis)
+
+
+def test_stage_extends_lock_of_its_run(fake_redis):
+    calls = []
+
+    @pipeline.pipeline_stage(fake_redis, pipeline.STAGE_INGEST)
+    def stage():
+        calls.append(fake_redis.ttl(pipeline.PIPELINE_LOCK_KEY))
+
+    run_id = pipeline.acquire_pipeline_lock(fake_redis)
+    stage(pipeline_run=run_id)
+
+    assert calls == [pipeline.stage_lock_ttl(pipeline.STAGE_INGEST)]
+    assert fake_redis.get(pipeline.PIPELINE_LOCK_KEY).decode() == run_id
+
+
+def test_stage_of_superseded_run_stops_the_chain(fake_redis):
+    calls = []
+
+    @pipeline.pipeline_stage(fake_redis, pipeline.STAGE_PREDICT)
+    def stage():
+        calls.append(1)
+
+    fake_redis.set(pipeline.PIPELINE_LOCK_KEY, 'newer-run')
+    with pytest.raises(pipeline.StageError):
+        stage(pipeline_run='old-run')
+
+    assert calls == []
+    assert fake_redis.get(pipeline.PIPELINE_LOCK_KEY) == b'newer-run'
+    stage()  # manueller Aufruf ohne Lauf-ID ignoriert den Lock
+    assert calls == [1]
+
+
+def test_stage_error_keeps_previous_output_fresh_marker(fake_redis):
+    @pipeline.pipeline_stage(fake_redis, pipeline.STAGE_PREDICT)
+    def ok():
+        return 'done'
+
+    @pipeline.pipeline_stage(fake_redis, pipeline.STAGE_PREDICT)
+    def failing():
+        raise pipeline.StageError('no models')
+
+    ok()
+    produced = json.loads(fake_redis.hget(pipeline.PIPELINE_STATUS_KEY, pipeline.STAGE_PREDICT))['finished_epoch']
+    with pytest.raises(pipeline.StageError):
+        failing()
+
+    state = json.loads(fake_redis.hget(pipeline.PIPELINE_STATUS_KEY, pipeline.STAGE_PREDICT))
+    assert state['status'] == 'error'
+    assert state['finished_epoch'] == produced
+    assert state['runs'] == 2
+
+
+def test_generate_predictions_without_models_fails_stage(fake_redis, monkeypatch):
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'get_dynamic_tickers', lambda: ['AAPL'])
+    monkeypatch.setattr(worker, 'load_horizon_predictors', lambda: {})
+    monkeypatch.setattr(inference_router, 'TICKER_MODELS_ENABLED', False)
+
+    with pytest.raises(pipeline.StageError):
+        worker.generate_predictions()
+
+
+def test_trade_bot_fails_stage_when_every_order_fails(fake_redis, monkeypatch):
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'is_market_open', lambda: True)
+    monkeypatch.setattr(worker, 'check_risk_limits', lambda: True)
+    monkeypatch.setattr(worker, 'update_system_heartbeat', lambda: None)
+
+    def broken_post(*args, **kwargs):
+        raise ConnectionError('alpaca unreachable')
+
+    monkeypatch.setattr(worker, '_http_post', broken_post)
+    worker._redis_json_set('trading_settings', {'enabled': True, 'buy_threshold_pct': 0.01, 'sell_threshold_pct': 0.01})
+    worker._redis_json_set('predictions_current', {
+        'AAPL': {'current_price': 100.0, 'horizons': {'60': {'predicted_price': 110.0}}},
+    })
+
+    with pytest.raises(pipeline.StageError):
+        worker.trade_bot()
+    assert worker._redis_json_get('trading_status')['last_error'].startswith('All 1 orders failed')
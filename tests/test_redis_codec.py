@@ -0,0 +1,47 @@
+"""redis_codec: Round-Trip aller Formate, Kompression, JSON-Fallback für Altwerte."""
+
+import json
+
+import numpy as np
+import pytest
+
+import redis_codec
+
+VALUE = {'AAPL': {'price': 187.25, 'volume': 1200, 'tags': ['tech', None], 'ok': True}}
+
+
+@pytest.mark.parametrize('codec', ['msgpack', 'orjson', 'json'])
+def test_round_trip(codec):
+    raw = redis_codec.encode(VALUE, codec=codec, compress_min=0)
+    assert raw.startswith(redis_codec.MAGIC)
+    assert raw[len(redis_codec.MAGIC):len(redis_codec.MAGIC) + 1] == redis_codec.CODECS[codec]
+    assert redis_codec.loads(raw) == VALUE
+
+
+def test_large_values_are_compressed():
+    value = {'rows': [{'t': i, 'close': 100.0 + i} for i in range(2000)]}
+    raw = redis_codec.encode(value, codec='msgpack', compress_min=1024)
+    assert raw[len(redis_codec.MAGIC) + 1:len(redis_codec.MAGIC) + 2] == redis_codec.COMPRESSION_ZSTD
+    assert redis_codec.loads(raw) == value
+
+
+def test_numpy_values_serialize():
+    raw = redis_codec.encode({'x': np.float64(1.5), 'arr': np.arange(3)}, codec='msgpack', compress_min=0)
+    assert redis_codec.loads(raw) == {'x': 1.5, 'arr': [0, 1, 2]}
+
+
+def test_legacy_json_is_read_without_marker():
+    assert redis_codec.loads(json.dumps(VALUE).encode()) == VALUE
+    assert redis_codec.loads(json.dumps(VALUE)) == VALUE
+    # json.dumps schreibt NaN, das orjson nicht parst -> stdlib Fallback
+    assert np.isnan(redis_codec.loads(b'{"x": NaN}')['x'])
+    assert redis_codec.loads(None, default=[]) == []
+
+
+def test_dumps_is_binary_only_for_binary_keys():
+    assert redis_codec.dumps('market_quotes', VALUE).startswith(redis_codec.MAGIC)
+    assert redis_codec.dumps('yfinance_enhanced:AAPL', VALUE).startswith(redis_codec.MAGIC)
+    plain = redis_codec.dumps('trading_settings', VALUE)
+    assert json.loads(plain) == VALUE
+    assert redis_codec.is_binary_key(b'yfinance_fundamentals:MSFT')
+    assert not redis_codec.is_binary_key('yfinance_enhanced')
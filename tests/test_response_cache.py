@@ -0,0 +1,81 @@
+"""response_cache: TTL/LRU, Data-Version als Cache-Key, ETag und Conditional Requests."""
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import fakeredis
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, bump_data_version, is_not_modified
+
+SCOPE = response_cache.SCOPE_MARKET
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(fakeredis.FakeRedis(), max_entries=2, ttl_seconds=60)
+
+
+def _build(calls, payload):
+    def builder():
+        calls.append(1)
+        return payload
+    return builder
+
+
+def test_body_is_built_once_per_data_version(cache):
+    calls = []
+    first = cache.lookup_or_build('/quotes', {'t': 'AAPL'}, SCOPE, _build(calls, {'p': 1}))
+    again = cache.lookup_or_build('/quotes', {'t': 'AAPL'}, SCOPE, _build(calls, {'p': 1}))
+    assert again is first and len(calls) == 1
+
+    assert bump_data_version(cache.redis, SCOPE) == 1
+    fresh = cache.lookup_or_build('/quotes', {'t': 'AAPL'}, SCOPE, _build(calls, {'p': 2}))
+    assert len(calls) == 2
+    assert fresh.etag != first.etag
+    assert cache.stats()['hits'] == 1
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    calls = []
+    cache.lookup_or_build('/quotes', {}, SCOPE, _build(calls, [1]))
+    now = response_cache.time.monotonic()
+    monkeypatch.setattr(response_cache.time, 'monotonic', lambda: now + 61)
+
+    cache.lookup_or_build('/quotes', {}, SCOPE, _build(calls, [1]))
+
+    assert len(calls) == 2
+
+
+def test_lru_evicts_oldest_entry(cache):
+    calls = []
+    for endpoint in ('/a', '/b', '/a', '/c'):
+        cache.lookup_or_build(endpoint, {}, SCOPE, _build(calls, endpoint))
+    assert cache.stats()['evictions'] == 1
+    cache.lookup_or_build('/a', {}, SCOPE, _build(calls, '/a'))
+    assert len(calls) == 3
+
+
+def test_without_redis_requests_bypass_the_cache():
+    cache = ResponseCache(None)
+    assert cache.lookup_or_build('/quotes', {}, SCOPE, lambda: {}) is None
+    assert cache.stats()['bypass'] == 1
+
+
+def test_etag_and_last_modified_conditions(cache):
+    bump_data_version(cache.redis, SCOPE)
+    entry = cache.lookup_or_build('/quotes', {}, SCOPE, lambda: {'p': 1})
+    modified = datetime.now(timezone.utc)
+
+    assert entry.etag.startswith('"') and entry.etag.endswith('"')
+    assert is_not_modified(entry, entry.etag, None)
+    assert is_not_modified(entry, f'"other", W/{entry.etag}', None)
+    assert is_not_modified(entry, '*', None)
+    assert not is_not_modified(entry, '"other"', None)
+    # If-None-Match hat Vorrang vor If-Modified-Since
+    assert not is_not_modified(entry, '"other"', format_datetime(modified + timedelta(days=1), usegmt=True))
+    assert is_not_modified(entry, None, format_datetime(modified + timedelta(days=1), usegmt=True))
+    assert not is_not_modified(entry, None, format_datetime(modified - timedelta(days=1), usegmt=True))
+    assert not is_not_modified(entry, None, 'not a date')
+    assert not is_not_modified(entry, None, None)
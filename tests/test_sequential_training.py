@@ -0,0 +1,35 @@
+"""SequentialTrainer: Datenzugriff über db_cursor."""
+
+from datetime import datetime, timedelta
+
+import worker_sequential_training
+
+COLUMNS = ['ticker', 'time', 'open', 'high', 'low', 'close', 'volume', 'prev_close', 'prev_close_5',
+           'prev_close_15', 'grok_sentiment', 'grok_expected_gain']
+
+
+def test_load_ticker_data_builds_frame_from_cursor(fake_db, monkeypatch):
+    cursor, cursor_context = fake_db
+    start = datetime(2025, 10, 1, 14, 0)
+    rows = [('AAPL', start + timedelta(minutes=15 * i), 1.0, 2.0, 0.5, 1.5, 100, None, None, None, 0.0, 0.0)
+            for i in range(3)]
+    cursor.responses.update({'to_regclass': [(True, False)], 'FROM market_data md': rows})
+    cursor.description = [(name,) for name in COLUMNS]
+    monkeypatch.setattr(worker_sequential_training, 'db_cursor', cursor_context)
+
+    df = worker_sequential_training.SequentialTrainer().load_ticker_data('AAPL')
+
+    assert list(df.columns) == COLUMNS
+    assert len(df) == 3
+    sql, params = cursor.executed[-1]
+    assert 'grok_deepersearch' not in sql  # Tabelle fehlt -> Query ohne Grok Features
+    assert params == ('AAPL', worker_sequential_training.SequentialTrainer().lookback_days)
+
+
+def test_check_ticker_data_availability(fake_db, monkeypatch):
+    cursor, cursor_context = fake_db
+    cursor.responses['COUNT(*)'] = [(42,)]
+    monkeypatch.setattr(worker_sequential_training, 'db_cursor', cursor_context)
+    trainer = worker_sequential_training.SequentialTrainer()
+
+    assert trainer.check_ticker_data_availability('AAPL') == (42 >= trainer.min_rows, 42)
@@ -0,0 +1,96 @@
+"""sync_alpaca_orders: überlappende Seitengrenzen, Dedupe per Order-ID, tz-aware UTC."""
+
+import types
+
+import pytz
+
+import worker
+
+
+def _order(order_id, submitted_at):
+    return {'id': order_id, 'symbol': 'AAPL', 'side': 'buy', 'qty': '1', 'filled_qty': '1',
+            'filled_avg_price': '100', 'status': 'filled', 'type': 'market',
+            'created_at': submitted_at, 'submitted_at': submitted_at,
+            'filled_at': submitted_at, 'updated_at': submitted_at}
+
+
+def _alpaca(orders, calls):
+    """Simuliert Alpaca: aufsteigend, 'after' exklusiv, 'until' inklusiv, limit pro Seite."""
+    def get(url, params=None, **kwargs):
+        calls.append(dict(params))
+        after = worker._parse_alpaca_ts(params['after'])
+        until = worker._parse_alpaca_ts(params['until'])
+        page = [o for o in orders if after < worker._parse_alpaca_ts(o['submitted_at']) <= until]
+        return types.SimpleNamespace(status_code=200, text='', json=lambda: page[:params['limit']])
+    return get
+
+
+def test_orders_sharing_boundary_timestamp_are_not_skipped(fake_redis, fake_db, monkeypatch):
+    cursor, cursor_context = fake_db
+    cursor.responses['MIN(submitted_at)'] = [(None,)]
+    upserted = []
+    calls = []
+    orders = [
+        _order('a', '2026-01-05T14:00:00.100000Z'),
+        _order('b', '2026-01-05T14:00:01.500000Z'),
+        _order('c', '2026-01-05T14:00:01.500000Z'),  # gleicher Zeitstempel wie b, liegt hinter der Seitengrenze
+        _order('d', '2026-01-05T14:00:02.250000Z'),
+        _order('e', '2026-01-05T14:00:03.000000Z'),
+    ]
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'db_cursor', cursor_context)
+    monkeypatch.setattr(worker, 'transaction', cursor_context)
+    monkeypatch.setattr(worker, 'ALPACA_ORDERS_PAGE_SIZE', 2)
+    monkeypatch.setattr(worker, '_http_get', _alpaca(orders, calls))
+    monkeypatch.setattr(worker, 'execute_values', lambda cur, sql, rows, **kw: upserted.extend(rows))
+    worker._redis_json_set(worker.ALPACA_ORDERS_SYNC_KEY, {'cursor': '2026-01-05T13:59:59'})
+
+    result = worker.sync_alpaca_orders()
+
+    assert sorted(row[0] for row in upserted) == ['a', 'b', 'c', 'd', 'e']
+    assert len(upserted) == 5
+    assert result['fetched'] == 5
+    for row in upserted:
+        assert all(ts.tzinfo is not None and ts.utcoffset().total_seconds() == 0 for ts in row[8:12])
+    assert all(call['after'].endswith('Z') and call['until'].endswith('Z') for call in calls)
+    state = worker._redis_json_get(worker.ALPACA_ORDERS_SYNC_KEY)
+    assert worker._parse_alpaca_ts(state['cursor']) == worker._parse_alpaca_ts(orders[-1]['submitted_at'])
+
+
+def test_full_page_inside_overlap_window_terminates(fake_redis, fake_db, monkeypatch):
+    cursor, cursor_context = fake_db
+    calls = []
+    orders = [_order(f'o{i}', '2026-01-05T14:00:00.500000Z') for i in range(3)]
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'db_cursor', cursor_context)
+    monkeypatch.setattr(worker, 'transaction', cursor_context)
+    monkeypatch.setattr(worker, 'ALPACA_ORDERS_PAGE_SIZE', 2)
+    monkeypatch.setattr(worker, '_http_get', _alpaca(orders, calls))
+    monkeypatch.setattr(worker, 'execute_values', lambda cur, sql, rows, **kw: None)
+
+    result = worker.sync_alpaca_orders()
+
+    assert result['status'] == 'ok'
+    assert len(calls) <= 3
+
+
+def test_naive_legacy_cursor_is_read_as_utc():
+    assert worker._parse_alpaca_ts('2026-01-05T14:00:00') == worker._parse_alpaca_ts('2026-01-05T16:00:00+02:00')
+    assert worker._parse_alpaca_ts('2026-01-05T14:00:00').tzinfo is not None
+    assert worker._to_utc(worker._parse_alpaca_ts('2026-01-05T14:00:00Z')).tzinfo == pytz.utc
+
+
+def test_fractional_quantities_are_kept(fake_redis, fake_db, monkeypatch):
+    cursor, cursor_context = fake_db
+    upserted = []
+    order = {**_order('f1', '2026-01-05T14:00:00Z'), 'qty': '0.25', 'filled_qty': '0.25'}
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'db_cursor', cursor_context)
+    monkeypatch.setattr(worker, 'transaction', cursor_context)
+    monkeypatch.setattr(worker, '_http_get', _alpaca([order], []))
+    monkeypatch.setattr(worker, 'execute_values', lambda cur, sql, rows, **kw: upserted.extend(rows))
+    worker._redis_json_set(worker.ALPACA_ORDERS_SYNC_KEY, {'cursor': '2026-01-05T13:00:00Z'})
+
+    worker.sync_alpaca_orders()
+
+    assert upserted[0][3:5] == (0.25, 0.25)
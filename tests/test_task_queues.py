@@ -0,0 +1,30 @@
+"""task_queues: Time Limits der Queue-Policies werden von den Worker-Pools auch durchgesetzt."""
+
+import os
+
+import yaml
+
+from task_queues import QUEUE_POLICIES
+
+COMPOSE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docker-compose.yml')
+
+
+def _worker_commands():
+    with open(COMPOSE_FILE) as fh:
+        services = yaml.safe_load(fh)['services']
+    for name, service in services.items():
+        command = service.get('command') or []
+        if 'worker' in command[:4] and '-Q' in command:
+            yield name, command
+
+
+def test_every_queue_with_time_limits_runs_on_prefork():
+    served = set()
+    for name, command in _worker_commands():
+        queues = command[command.index('-Q') + 1].split(',')
+        pool = command[command.index('--pool') + 1]
+        for queue in queues:
+            if QUEUE_POLICIES.get(queue, {}).get('time_limit'):
+                assert pool == 'prefork', f"{name}: {queue} hat time_limit, Pool {pool} setzt es nicht durch"
+        served.update(queues)
+    assert set(QUEUE_POLICIES) <= served
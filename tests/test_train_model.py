@@ -0,0 +1,151 @@
+"""Smoke Test für worker.train_model mit Fake-DB, fakeredis und einem Fake-AutoGluon."""
+
+import types
+from datetime import datetime, timedelta
+
+import pytest
+
+import model_registry
+import redis_codec
+import walk_forward
+import worker
+
+TICKERS = ('AAPL', 'MSFT')
+ROWS_PER_TICKER = 160
+
+
+def _market_rows(end):
+    rows = []
+    for ticker in TICKERS:
+        for i in range(ROWS_PER_TICKER):
+            t = end - timedelta(minutes=15 * (ROWS_PER_TICKER - 1 - i))
+            close = 100.0 + i * 0.1
+            rows.append((ticker, t, close, close + 0.5, close - 0.5, close, 1000 + i,
+                         close - 0.1, close - 0.5, close - 1.5, 0.2, 0.01))
+    return rows
+
+
+@pytest.fixture
+def training_env(monkeypatch, fake_redis, registry_dir, fake_db, fake_autogluon):
+    cursor, cursor_context = fake_db
+    state = {'rows': _market_rows(datetime(2025, 10, 3, 20, 0))}
+
+    def fingerprint_rows(params):
+        by_ticker = {}
+        for row in state['rows']:
+            by_ticker.setdefault(row[0], []).append(row[1])
+        return [(t, max(times), len(times)) for t, times in by_ticker.items()]
+
+    cursor.responses.update({
+        'GROUP BY ticker': fingerprint_rows,
+        'to_regclass': [(False,)],
+        'unnest': [(0,)],
+        'LAG(md.close, 1)': lambda params: state['rows'],
+    })
+    monkeypatch.setattr(worker, 'r', fake_redis)
+    monkeypatch.setattr(worker, 'db_cursor', cursor_context)
+    monkeypatch.setattr(worker, 'transaction', cursor_context)
+    monkeypatch.setattr(walk_forward, 'WF_ENABLED', False)
+    return types.SimpleNamespace(redis=fake_redis, cursor=cursor, state=state, fits=fake_autogluon.fits)
+
+
+def _json(client, key):
+    raw = client.get(key)
+    return redis_codec.loads(raw) if raw else None
+
+
+def test_train_model_publishes_and_promotes_all_horizons(training_env):
+    result = worker.train_model(trigger='test')
+
+    assert result.startswith('Trained multi-horizon models'), result
+    stats = _json(training_env.redis, 'last_training_stats')
+    assert stats['status'] == 'success'
+    assert stats['training_mode'] == 'full'
+    version = stats['model_version']
+    current = model_registry.current_versions(training_env.redis, model_registry.GLOBAL_SCOPE, worker.MODEL_HORIZONS)
+    assert current == {hz: version for hz in worker.MODEL_HORIZONS}
+    for hz in worker.MODEL_HORIZONS:
+        manifest = model_registry.read_manifest(model_registry.GLOBAL_SCOPE, hz, version)
+        assert manifest['fingerprint']['hash']
+        assert model_registry.history(training_env.redis, model_registry.GLOBAL_SCOPE, hz) == [version]
+    assert _json(training_env.redis, 'ml_training_status')['active'] is False
+
+
+def _append_rows(state, count):
+    """count neue 15min Candles pro Ticker nach dem bisherigen Ende."""
+    for ticker in TICKERS:
+        last = max(row for row in state['rows'] if row[0] == ticker)
+        for i in range(1, count + 1):
+            t = last[1] + timedelta(minutes=15 * i)
+            close = last[5] + i * 0.1
+            state['rows'].append((ticker, t, close, close + 0.5, close - 0.5, close, 1000,
+                                  close - 0.1, close - 0.5, close - 1.5, 0.2, 0.01))
+
+
+def _count_new_rows(state):
+    def count(params):
+        tickers, since = params
+        watermarks = dict(zip(tickers, (datetime.fromisoformat(s) for s in since)))
+        return [(sum(1 for row in state['rows'] if row[0] in watermarks and row[1] > watermarks[row[0]]),)]
+    return count
+
+
+def test_train_model_skips_unchanged_data(training_env):
+    worker.train_model(trigger='test')
+    version = _json(training_env.redis, 'last_training_stats')['model_version']
+    fits = len(training_env.fits)
+
+    result = worker.train_model(trigger='test')
+
+    assert result.startswith('Training skipped'), result
+    assert len(training_env.fits) == fits
+    stats = _json(training_env.redis, 'last_training_stats')
+    assert stats['status'] == 'skipped_unchanged'
+    assert stats['model_version'] == version
+    assert model_registry.current(training_env.redis, model_registry.GLOBAL_SCOPE, '60') == version
+    assert _json(training_env.redis, 'ml_training_status')['active'] is False
+    assert _json(training_env.redis, 'retrain_status')['pending'] is False
+
+
+def test_train_model_force_retrains_unchanged_data(training_env):
+    worker.train_model(trigger='test')
+    first = _json(training_env.redis, 'last_training_stats')['model_version']
+
+    worker.train_model(trigger='test', force=True)
+
+    stats = _json(training_env.redis, 'last_training_stats')
+    assert stats['status'] == 'success'
+    assert stats['training_mode'] == 'full'
+    assert stats['model_version'] != first
+    assert model_registry.history(training_env.redis, model_registry.GLOBAL_SCOPE, '15') == [stats['model_version'], first]
+
+
+def test_train_model_small_delta_trains_incremental(training_env, monkeypatch):
+    monkeypatch.setenv('TRAIN_MODEL_TIME_BUDGET', '480')
+    worker.train_model(trigger='test')
+    training_env.cursor.responses['unnest'] = _count_new_rows(training_env.state)
+    _append_rows(training_env.state, 8)  # 16 / 320 Zeilen = 5%
+    fits = len(training_env.fits)
+
+    worker.train_model(trigger='test')
+
+    stats = _json(training_env.redis, 'last_training_stats')
+    assert stats['status'] == 'success'
+    assert stats['training_mode'] == 'incremental'
+    assert stats['fingerprint_delta']['new_rows'] == 16
+    budget = sum(fit['time_limit'] for fit in training_env.fits[fits:])
+    assert budget <= int(480 * worker.training_fingerprint.INCREMENTAL_TIME_FRACTION)
+
+
+def test_train_model_trains_when_fingerprint_fails(training_env):
+    def broken(params):
+        raise RuntimeError('db down')
+
+    training_env.cursor.responses['GROUP BY ticker'] = broken
+
+    worker.train_model(trigger='test')
+
+    stats = _json(training_env.redis, 'last_training_stats')
+    assert stats['status'] == 'success'
+    assert stats['fingerprint_delta'] == {}
+    assert _json(training_env.redis, 'ml_training_status')['active'] is False
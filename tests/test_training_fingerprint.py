@@ -0,0 +1,95 @@
+"""training_fingerprint: Fingerprint, Delta gegen den Vorgänger und Trainingsmodus."""
+
+import os
+from datetime import datetime
+
+import pytest
+
+import model_registry
+import training_fingerprint as tf
+from conftest import FakeCursor
+
+
+def _cursor(market_rows, new_rows=0, grok=False):
+    return FakeCursor({
+        'GROUP BY ticker': market_rows,
+        'to_regclass': [(grok,)],
+        'unnest': [(new_rows,)],
+        'FROM grok_': [(datetime(2026, 1, 5, 12), 4)],
+    })
+
+
+MARKET = [('AAPL', datetime(2026, 1, 5, 21), 1000), ('MSFT', datetime(2026, 1, 5, 21), 1000)]
+
+
+def test_compute_is_deterministic_and_tracks_watermarks():
+    first = tf.compute(_cursor(MARKET), 30)
+    again = tf.compute(_cursor(list(reversed(MARKET))), 30)
+    moved = tf.compute(_cursor([MARKET[0], ('MSFT', datetime(2026, 1, 6, 21), 1026)]), 30)
+
+    assert first['hash'] == again['hash']
+    assert first['hash'] != moved['hash']
+    assert first['tickers']['AAPL'] == {'max_time': '2026-01-05T21:00:00', 'rows': 1000}
+    assert first['grok'] == {}
+
+
+def test_delta_baselines():
+    current = tf.compute(_cursor(MARKET), 30)
+    assert tf.delta(None, None, current) == {'baseline': False}
+    assert tf.delta(None, {**current, 'lookback_days': 60}, current)['window_changed']
+    unchanged = tf.delta(None, current, current)
+    assert unchanged['unchanged'] and unchanged['new_rows'] == 0
+
+
+def test_delta_counts_new_rows_and_added_tickers():
+    previous = tf.compute(_cursor(MARKET[:1]), 30)
+    current = tf.compute(_cursor(MARKET), 30)
+
+    change = tf.delta(_cursor(MARKET, new_rows=50), previous, current)
+
+    assert change['tickers_added'] == ['MSFT']
+    assert change['new_rows'] == 50 + 1000
+    assert change['new_fraction'] == pytest.approx(1.05)
+
+
+@pytest.mark.parametrize('change, force, mode, reason', [
+    ({'baseline': False}, False, tf.MODE_FULL, 'no_baseline'),
+    ({'baseline': False, 'window_changed': True}, False, tf.MODE_FULL, 'window_changed'),
+    ({'baseline': True, 'unchanged': True, 'new_fraction': 0.0, 'tickers_added': [], 'tickers_removed': [],
+      'grok_new_rows': 0}, True, tf.MODE_FULL, 'forced'),
+    ({'baseline': True, 'unchanged': True, 'new_fraction': 0.0, 'tickers_added': [], 'tickers_removed': [],
+      'grok_new_rows': 0}, False, tf.MODE_SKIP, 'unchanged'),
+    ({'baseline': True, 'new_fraction': 0.01, 'tickers_added': [], 'tickers_removed': [], 'grok_new_rows': 0},
+     False, tf.MODE_SKIP, 'below_threshold'),
+    ({'baseline': True, 'new_fraction': 0.01, 'tickers_added': [], 'tickers_removed': [], 'grok_new_rows': 3},
+     False, tf.MODE_INCREMENTAL, 'small_delta'),
+    ({'baseline': True, 'new_fraction': 0.10, 'tickers_added': [], 'tickers_removed': [], 'grok_new_rows': 0},
+     False, tf.MODE_INCREMENTAL, 'small_delta'),
+    ({'baseline': True, 'new_fraction': 0.50, 'tickers_added': [], 'tickers_removed': [], 'grok_new_rows': 0},
+     False, tf.MODE_FULL, 'new_data'),
+    ({'baseline': True, 'new_fraction': 0.0, 'tickers_added': [], 'tickers_removed': ['TSLA'], 'grok_new_rows': 0},
+     False, tf.MODE_FULL, 'ticker_set_changed'),
+])
+def test_decide(change, force, mode, reason):
+    decision = tf.decide(change, force=force)
+    assert (decision['mode'], decision['reason']) == (mode, reason)
+
+
+def test_decide_slots_compares_each_horizon_with_its_current_manifest(registry_dir, fake_redis):
+    previous = tf.compute(_cursor(MARKET), 30)
+    os.makedirs(model_registry.staging_path('global', '15', 'v1'))
+    model_registry.publish('global', '15', 'v1', {'fingerprint': previous, 'metrics': {'mae': 1.2}})
+    model_registry.promote(fake_redis, 'global', {'15': 'v1'})
+
+    decisions = tf.decide_slots(_cursor(MARKET), fake_redis, 'global', ['15', '60'], previous)
+
+    assert decisions['15']['mode'] == tf.MODE_SKIP
+    assert decisions['15']['previous_version'] == 'v1'
+    assert decisions['15']['previous_metrics'] == {'mae': 1.2}
+    assert decisions['60']['mode'] == tf.MODE_FULL and decisions['60']['reason'] == 'no_baseline'
+    assert tf.strictest(decisions)['mode'] == tf.MODE_FULL
+
+
+def test_strictest_defaults_to_full():
+    assert tf.strictest({})['mode'] == tf.MODE_FULL
+    assert tf.strictest({'15': {'mode': tf.MODE_SKIP}, '30': {'mode': tf.MODE_INCREMENTAL}})['mode'] == tf.MODE_INCREMENTAL
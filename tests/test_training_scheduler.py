@@ -0,0 +1,76 @@
+"""training_scheduler: Budget-Aufteilung, Restbudget pro Ticker, Allokation."""
+
+import pytest
+
+import training_scheduler as ts
+
+NO_WF = {'enabled': False}
+
+
+def _job(ticker, hz, score, time_limit=ts.MIN_JOB_SECONDS):
+    return {'ticker': ticker, 'horizon': hz, 'score': score, 'time_limit': time_limit}
+
+
+def test_split_budget_respects_minimum_and_weights():
+    shares = ts.split_budget(900, {'15': 1.0, '30': 1.0, '60': 2.0}, minimum=60)
+
+    assert shares == {'15': 240, '30': 240, '60': 420}
+    assert sum(shares.values()) <= 900
+
+
+def test_split_budget_below_minimum_gives_minimum_each():
+    assert ts.split_budget(100, {'15': 1.0, '60': 3.0}, minimum=60) == {'15': 60, '60': 60}
+    assert ts.split_budget(300, {'15': 0.0, '60': 0.0}, minimum=60) == {'15': 60, '60': 60}
+
+
+def test_fit_remaining_keeps_jobs_that_fit():
+    jobs = [_job('AAPL', '15', 0.9, 120), _job('AAPL', '60', 0.5, 120)]
+    needed = ts.estimate_seconds([120, 120], NO_WF)
+
+    result = ts.fit_remaining(jobs, needed, NO_WF)
+
+    assert [j['time_limit'] for j in result['run']] == [120, 120]
+    assert result['preempted'] == []
+
+
+def test_fit_remaining_shrinks_time_limits_before_preempting():
+    jobs = [_job('AAPL', '15', 0.9, 300), _job('AAPL', '60', 0.5, 300)]
+    remaining = ts.estimate_seconds([200, 200], NO_WF)
+
+    result = ts.fit_remaining(jobs, remaining, NO_WF)
+
+    assert len(result['run']) == 2 and result['preempted'] == []
+    assert all(ts.MIN_JOB_SECONDS <= j['time_limit'] < 300 for j in result['run'])
+    assert ts.estimate_seconds([j['time_limit'] for j in result['run']], NO_WF) <= remaining
+
+
+def test_fit_remaining_preempts_lowest_score_first():
+    jobs = [_job('AAPL', '60', 0.2), _job('AAPL', '15', 0.9), _job('AAPL', '30', 0.5)]
+    remaining = ts.estimate_seconds([ts.MIN_JOB_SECONDS], NO_WF)
+
+    result = ts.fit_remaining(jobs, remaining, NO_WF)
+
+    assert [j['horizon'] for j in result['run']] == ['15']
+    assert [j['horizon'] for j in result['preempted']] == ['60', '30']
+
+
+def test_fit_remaining_without_budget_preempts_everything():
+    result = ts.fit_remaining([_job('AAPL', '15', 0.9)], 0, NO_WF)
+    assert result == {'run': [], 'preempted': [_job('AAPL', '15', 0.9)]}
+
+
+def test_allocate_defers_jobs_beyond_budget():
+    jobs = [_job(t, '15', score) for t, score in (('AAPL', 0.9), ('MSFT', 0.6), ('TSLA', 0.3))]
+    budget = 2 * ts.estimate_seconds([ts.MIN_JOB_SECONDS], NO_WF)
+
+    plan = ts.allocate(jobs, budget, NO_WF)
+
+    assert [j['ticker'] for j in plan['scheduled']] == ['AAPL', 'MSFT']
+    assert [j['ticker'] for j in plan['deferred']] == ['TSLA']
+
+
+def test_estimate_includes_walk_forward_folds():
+    wf = {'enabled': True, 'folds': 4, 'time_limit': 60}
+    assert ts.estimate_seconds([], wf) == 0.0
+    assert ts.estimate_seconds([120], wf) > ts.estimate_seconds([120], NO_WF)
+    assert ts.estimate_seconds([120], NO_WF) == pytest.approx(ts.TICKER_OVERHEAD_SECONDS + ts.OVERHEAD_FACTOR * 120)
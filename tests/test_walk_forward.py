@@ -0,0 +1,57 @@
+"""walk_forward.make_folds: Rolling-Origin Folds mit Purging und Embargo."""
+
+import pandas as pd
+
+import walk_forward
+
+
+def _frame(rows=40, freq='15min', tickers=('AAPL', 'MSFT')):
+    times = pd.date_range('2026-01-05 14:30', periods=rows, freq=freq, tz='UTC')
+    df = pd.DataFrame([{'ticker': t, 'time': ts} for ts in times for t in tickers])
+    return walk_forward.add_target_times(df)
+
+
+def test_target_times_shift_per_ticker():
+    df = _frame(rows=5)
+    aapl = df[df['ticker'] == 'AAPL'].reset_index(drop=True)
+    assert aapl.loc[0, 'target_time_15'] == aapl.loc[1, 'time']
+    assert aapl.loc[0, 'target_time_60'] == aapl.loc[4, 'time']
+    assert aapl['target_time_30'].isna().sum() == 2
+
+
+def test_folds_roll_forward_and_purge_overlapping_targets():
+    df = _frame()
+    folds = walk_forward.make_folds(df['time'], df['target_time_60'], n_folds=4, min_train_fraction=0.5,
+                                    embargo_minutes=15)
+
+    assert [f['fold'] for f in folds] == [0, 1, 2, 3]
+    times = df['time'].to_numpy()
+    targets = df['target_time_60'].to_numpy()
+    previous_end = None
+    for fold in folds:
+        test_start = times[fold['test']].min()
+        assert times[fold['train']].max() < test_start
+        # Target jeder Trainingszeile ist vor Testbeginn - Embargo bekannt
+        assert (targets[fold['train']] < test_start - pd.Timedelta(minutes=15).to_timedelta64()).all()
+        if previous_end is not None:
+            assert test_start > previous_end
+        previous_end = times[fold['test']].max()
+    # erster Testblock beginnt nach der Hälfte der Zeitstempel
+    assert times[folds[0]['test']].min() == df['time'].drop_duplicates().iloc[20]
+
+
+def test_embargo_removes_more_training_rows():
+    df = _frame()
+    plain = walk_forward.make_folds(df['time'], df['target_time_15'], n_folds=2, embargo_minutes=0)
+    embargoed = walk_forward.make_folds(df['time'], df['target_time_15'], n_folds=2, embargo_minutes=60)
+    for a, b in zip(plain, embargoed):
+        assert len(b['train']) < len(a['train'])
+        assert list(a['test']) == list(b['test'])
+    # ohne Embargo: nur Zeilen, deren 15-min Target den Testbeginn erreicht, fallen weg (1 Zeitstempel x 2 Ticker)
+    first = plain[0]
+    assert len(first['train']) == int(len(df['time'].unique()) * 0.5) * 2 - 2
+
+
+def test_no_folds_without_enough_history():
+    df = _frame(rows=3)
+    assert walk_forward.make_folds(df['time'], df['target_time_60'], n_folds=2) == []
@@ -0,0 +1,157 @@
+"""
+Trainingsdaten-Fingerprint: überspringt Retrains ohne relevante neue Daten
+
+train_model und train_sequential werden von daily_train, retrain_check, den Grok-Hooks und
+check_training_commands ausgelöst, auch wenn sich market_data und die Grok-Tabellen seit dem
+letzten Training kaum geändert haben. Der Fingerprint des Trainingsfensters
+
+    pro Ticker max(time) + Zeilen im Fenster, Grok High-Water Marks (max(time), Zeilen)
+
+wird im manifest.json jeder Registry-Version gespeichert. Vor dem nächsten Training zählt
+delta() die seit den Watermarks neuen Zeilen (eine Abfrage pro Tabelle) und decide() wählt:
+
+- skip:        neue Zeilen < TRAIN_SKIP_MAX_NEW_FRACTION, gleiche Ticker, keine neuen Grok-Zeilen
+- incremental: neue Zeilen < TRAIN_INCREMENTAL_MAX_NEW_FRACTION, gleiche Ticker -> Refit mit
+               TRAIN_INCREMENTAL_TIME_FRACTION des Zeitbudgets, ohne Walk-Forward (Metriken der
+               Vorgängerversion werden übernommen); AutoGluon Tabular kennt kein Warm-Start
+- full:        sonst, ohne Vorgänger-Fingerprint oder mit force
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional
+
+import model_registry
+
+SKIP_MAX_NEW_FRACTION = float(os.getenv('TRAIN_SKIP_MAX_NEW_FRACTION', '0.02'))
+INCREMENTAL_MAX_NEW_FRACTION = float(os.getenv('TRAIN_INCREMENTAL_MAX_NEW_FRACTION', '0.15'))
+INCREMENTAL_TIME_FRACTION = float(os.getenv('TRAIN_INCREMENTAL_TIME_FRACTION', '0.35'))
+
+GROK_TABLES = ('grok_deepersearch', 'grok_topstocks')
+
+MODE_SKIP = 'skip'
+MODE_INCREMENTAL = 'incremental'
+MODE_FULL = 'full'
+MODE_ORDER = {MODE_SKIP: 0, MODE_INCREMENTAL: 1, MODE_FULL: 2}
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def compute(cur, lookback_days: int, tickers: Optional[Iterable[str]] = None) -> Dict[str, object]:
+    """Fingerprint des Trainingsfensters (alle Ticker bzw. nur tickers)."""
+    tickers = list(tickers) if tickers is not None else None
+    ticker_filter = "AND ticker = ANY(%s)" if tickers is not None else ""
+    params = [lookback_days] + ([tickers] if tickers is not None else [])
+    cur.execute(f"""
+        SELECT ticker, MAX(time), COUNT(*)
+        FROM market_data
+        WHERE time >= NOW() - make_interval(days => %s) {ticker_filter}
+        GROUP BY ticker
+    """, params)
+    per_ticker = {t: {'max_time': _iso(max_time), 'rows': rows} for t, max_time, rows in sorted(cur.fetchall())}
+    grok = {}
+    for table in GROK_TABLES:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+        if not cur.fetchone()[0]:
+            continue
+        cur.execute(f"SELECT MAX(time), COUNT(*) FROM {table} WHERE TRUE {ticker_filter}",
+                    [tickers] if tickers is not None else [])
+        max_time, rows = cur.fetchone()
+        grok[table] = {'max_time': _iso(max_time), 'rows': rows}
+    body = {'lookback_days': lookback_days, 'filter': tickers, 'tickers': per_ticker, 'grok': grok}
+    digest = hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+    return {**body, 'hash': digest}
+
+
+def delta(cur, previous: Optional[Dict[str, object]], current: Dict[str, object]) -> Dict[str, object]:
+    """Neue Zeilen seit den Watermarks von previous (market_data pro Ticker, Grok pro Tabelle)."""
+    if not previous:
+        return {'baseline': False}
+    if previous.get('lookback_days') != current.get('lookback_days'):
+        return {'baseline': False, 'window_changed': True}
+    if previous.get('hash') == current.get('hash'):
+        return {'baseline': True, 'unchanged': True, 'new_rows': 0, 'new_fraction': 0.0, 'tickers_added': [],
+                'tickers_removed': [], 'grok_new_rows': 0}
+    prev_tickers = previous.get('tickers', {})
+    cur_tickers = current.get('tickers', {})
+    common = [t for t in cur_tickers if t in prev_tickers and prev_tickers[t].get('max_time')]
+    new_rows = 0
+    if common:
+        cur.execute("""
+            SELECT COUNT(m.time)
+            FROM unnest(%s::text[], %s::timestamptz[]) AS w(ticker, since)
+            JOIN market_data m ON m.ticker = w.ticker AND m.time > w.since
+        """, (common, [prev_tickers[t]['max_time'] for t in common]))
+        new_rows = cur.fetchone()[0] or 0
+    added = sorted(set(cur_tickers) - set(prev_tickers))
+    new_rows += sum(cur_tickers[t]['rows'] for t in added)
+    scope = current.get('filter')
+    ticker_filter = "AND ticker = ANY(%s)" if scope is not None else ""
+    grok_new = 0
+    for table, marks in current.get('grok', {}).items():
+        since = previous.get('grok', {}).get(table, {}).get('max_time')
+        if since is None:
+            grok_new += marks.get('rows', 0)
+            continue
+        cur.execute(f"SELECT COUNT(*) FROM {table} WHERE time > %s {ticker_filter}",
+                    [since] + ([scope] if scope is not None else []))
+        grok_new += cur.fetchone()[0] or 0
+    baseline_rows = sum(v.get('rows', 0) for v in prev_tickers.values()) or 1
+    return {
+        'baseline': True,
+        'unchanged': False,
+        'new_rows': int(new_rows),
+        'new_fraction': round(new_rows / baseline_rows, 4),
+        'tickers_added': added,
+        'tickers_removed': sorted(set(prev_tickers) - set(cur_tickers)),
+        'grok_new_rows': int(grok_new),
+    }
+
+
+def decide(change: Dict[str, object], force: bool = False) -> Dict[str, object]:
+    """Trainingsmodus (skip | incremental | full) mit Begründung."""
+    if force:
+        return {'mode': MODE_FULL, 'reason': 'forced', 'delta': change}
+    if not change.get('baseline'):
+        reason = 'window_changed' if change.get('window_changed') else 'no_baseline'
+        return {'mode': MODE_FULL, 'reason': reason, 'delta': change}
+    if change['tickers_added'] or change['tickers_removed']:
+        return {'mode': MODE_FULL, 'reason': 'ticker_set_changed', 'delta': change}
+    fraction = change['new_fraction']
+    if fraction < SKIP_MAX_NEW_FRACTION and not change['grok_new_rows']:
+        return {'mode': MODE_SKIP, 'reason': 'unchanged' if change.get('unchanged') else 'below_threshold', 'delta': change}
+    if fraction < INCREMENTAL_MAX_NEW_FRACTION:
+        return {'mode': MODE_INCREMENTAL, 'reason': 'small_delta', 'delta': change}
+    return {'mode': MODE_FULL, 'reason': 'new_data', 'delta': change}
+
+
+def previous_manifest(client, scope: str, horizon) -> Optional[Dict[str, object]]:
+    """Manifest der aktuellen Registry-Version eines Slots, sofern es einen Fingerprint enthält."""
+    version = model_registry.current(client, scope, horizon)
+    manifest = model_registry.read_manifest(scope, horizon, version) if version else None
+    return manifest if manifest and manifest.get('fingerprint') else None
+
+
+def decide_slots(cur, client, scope: str, horizons: Iterable, current: Dict[str, object],
+                 force: bool = False) -> Dict[str, Dict[str, object]]:
+    """Entscheidung pro Horizon gegen den Fingerprint der jeweils aktuellen Version
+    (gleiche Vorgänger-Fingerprints werden nur einmal abgefragt)."""
+    decisions, by_hash = {}, {}
+    for hz in horizons:
+        manifest = previous_manifest(client, scope, hz) or {}
+        previous = manifest.get('fingerprint')
+        key = (previous or {}).get('hash')
+        if key not in by_hash:
+            by_hash[key] = decide(delta(cur, previous, current), force=force)
+        decisions[str(hz)] = {**by_hash[key], 'previous_version': manifest.get('version'),
+                              'previous_metrics': manifest.get('metrics')}
+    return decisions
+
+
+def strictest(decisions: Dict[str, Dict[str, object]]) -> Dict[str, object]:
+    """Aufwändigster Modus über alle Horizonte (train_model trainiert sie gemeinsam)."""
+    return max(decisions.values(), key=lambda d: MODE_ORDER[d['mode']],
+               default={'mode': MODE_FULL, 'reason': 'no_baseline', 'delta': {}})
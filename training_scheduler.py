@@ -0,0 +1,329 @@
+"""
+Training Scheduler: verteilt ein Wall-Clock Budget auf (Ticker, Horizon) Trainingsjobs
+
+Bisher bekam im SequentialTrainer jeder Ticker fix 160s pro Modell in Listen-Reihenfolge und
+train_model teilte 480s gleichmäßig auf die Horizonte. Der Scheduler priorisiert nach Wert:
+
+- Positionsgröße (|market_value| aus portfolio_positions, relativ zur größten Position)
+- jüngster Vorhersagefehler aus deviation_tracker (mittlere Abweichung pro Ticker/Horizon)
+- Staleness: Zeit seit dem letzten Training (Registry-Version, model_registry.version_time)
+- Datenfrische: neue Bars seit dem letzten Training, letzte Bar nicht zu alt
+- Aging: im letzten Fenster zurückgestellte Jobs bekommen einen Bonus pro Zurückstellung
+
+Budget: Sekunden bis zum nächsten Pre-Market (Off-Hours Fenster) bzw. TRAIN_WINDOW_SECONDS,
+gekappt auf das Soft Time Limit der ml-train Queue. Jobs werden in Wert-Reihenfolge mit
+TRAIN_MIN_JOB_SECONDS aufgenommen, das Restbudget wird nach Score bis TRAIN_MAX_JOB_SECONDS
+verteilt. Was nicht passt oder zur Laufzeit nicht mehr ins Restbudget passt (preempted),
+landet im Backlog (Redis Hash) und wird im nächsten Fenster fortgesetzt.
+"""
+
+import json
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+import market_hours
+import model_registry
+import redis_codec
+from task_queues import QUEUE_ML_TRAIN, QUEUE_POLICIES
+
+SCHEDULER_ENABLED = os.getenv('TRAIN_SCHEDULER_ENABLED', '1') == '1'
+WINDOW_SECONDS = int(os.getenv('TRAIN_WINDOW_SECONDS', '0'))              # 0 = bis Pre-Market
+WINDOW_MARGIN_SECONDS = int(os.getenv('TRAIN_WINDOW_MARGIN_SECONDS', '600'))
+MIN_JOB_SECONDS = int(os.getenv('TRAIN_MIN_JOB_SECONDS', '60'))
+MAX_JOB_SECONDS = int(os.getenv('TRAIN_MAX_JOB_SECONDS', '600'))
+OVERHEAD_FACTOR = float(os.getenv('TRAIN_OVERHEAD_FACTOR', '1.25'))        # fit time_limit -> Wall-Clock
+TICKER_OVERHEAD_SECONDS = int(os.getenv('TRAIN_TICKER_OVERHEAD_SECONDS', '30'))  # Laden, Features, Walk-Forward Setup
+ERROR_CAP = float(os.getenv('TRAIN_ERROR_CAP', '0.02'))                   # Abweichung, ab der error = 1
+STALE_HOURS = float(os.getenv('TRAIN_STALE_HOURS', '72'))
+DATA_MAX_AGE_HOURS = float(os.getenv('TRAIN_DATA_MAX_AGE_HOURS', '96'))
+ERROR_WINDOW_HOURS = 48
+AGING_BONUS = 0.15
+AGING_MAX_BONUS = 0.6
+
+DEFAULT_WEIGHTS = {'position': 0.35, 'error': 0.30, 'staleness': 0.20, 'freshness': 0.15}
+
+BACKLOG_KEY = 'training_scheduler:backlog'   # Hash "{ticker}:{horizon}" -> {deferrals, first_deferred, score}
+PLAN_KEY = 'training_scheduler:last_plan'
+
+
+def _weights() -> Dict[str, float]:
+    """DEFAULT_WEIGHTS, überschreibbar per TRAIN_PRIORITY_WEIGHTS='position=0.5,error=0.3'."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in os.getenv('TRAIN_PRIORITY_WEIGHTS', '').split(','):
+        name, _, value = part.partition('=')
+        if name.strip() in weights and value.strip():
+            weights[name.strip()] = float(value)
+    return weights
+
+
+WEIGHTS = _weights()
+
+
+def window_budget() -> int:
+    """Sekunden Trainingsbudget im aktuellen Fenster."""
+    soft_limit = QUEUE_POLICIES[QUEUE_ML_TRAIN]['soft_time_limit']
+    if WINDOW_SECONDS:
+        seconds = WINDOW_SECONDS
+    else:
+        start = market_hours.next_session_start(market_hours.EXTENDED_SESSIONS)
+        if start is None:
+            # Markt offen (manueller Start): ein Durchlauf mit dem Soft Limit als Obergrenze
+            seconds = soft_limit
+        else:
+            seconds = int((start - datetime.now(timezone.utc)).total_seconds())
+    return max(0, min(seconds, soft_limit) - WINDOW_MARGIN_SECONDS)
+
+
+def _load_json(client, key, default):
+    try:
+        return redis_codec.loads(client.get(key), default)
+    except Exception:
+        return default
+
+
+def position_values(client) -> Dict[str, float]:
+    values = {}
+    for position in _load_json(client, 'portfolio_positions', []) or []:
+        try:
+            values[position['ticker']] = values.get(position['ticker'], 0.0) + abs(float(position.get('market_value') or 0))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return values
+
+
+def recent_errors(entries: Iterable[dict], window_hours: int = ERROR_WINDOW_HOURS,
+                  now: Optional[datetime] = None) -> Dict[tuple, float]:
+    """Mittlere Abweichung pro (ticker, horizon) und (ticker, None) aus deviation_tracker."""
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=window_hours)
+    sums = {}
+    for entry in entries or []:
+        deviation = entry.get('deviation')
+        if deviation is None or not entry.get('ticker'):
+            continue
+        try:
+            if datetime.fromisoformat(entry.get('actual_time')) < cutoff:
+                continue
+        except (TypeError, ValueError):
+            continue
+        for key in ((entry['ticker'], str(entry.get('horizon_minutes'))), (entry['ticker'], None)):
+            total, count = sums.get(key, (0.0, 0))
+            sums[key] = (total + deviation, count + 1)
+    return {key: total / count for key, (total, count) in sums.items()}
+
+
+def data_stats(cur, tickers: List[str], lookback_days: int = 14) -> Dict[str, dict]:
+    """Letzte Bar und Anzahl Bars im Trainingsfenster pro Ticker (eine Abfrage)."""
+    cur.execute("""
+        SELECT ticker, MAX(time), COUNT(*)
+        FROM market_data
+        WHERE ticker = ANY(%s) AND time >= NOW() - make_interval(days => %s)
+        GROUP BY ticker
+    """, (list(tickers), lookback_days))
+    return {ticker: {'last_bar': last_bar, 'rows': rows} for ticker, last_bar, rows in cur.fetchall()}
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def score_jobs(tickers: List[str], horizons: List[str], positions: Dict[str, float], errors: Dict[tuple, float],
+               data: Dict[str, dict], last_trained: Dict[tuple, Optional[datetime]], backlog: Dict[str, dict],
+               min_rows: int, now: Optional[datetime] = None, weights: Dict[str, float] = WEIGHTS) -> List[dict]:
+    """Jobs mit Score und Einzelsignalen, absteigend sortiert; Ticker ohne genug Daten fallen raus."""
+    now = now or datetime.utcnow()
+    max_position = max(positions.values(), default=0.0)
+    jobs = []
+    for ticker in tickers:
+        stats = data.get(ticker) or {}
+        if stats.get('rows', 0) < min_rows:
+            continue
+        last_bar = _naive_utc(stats.get('last_bar'))
+        for hz in horizons:
+            trained = last_trained.get((ticker, hz))
+            error = errors.get((ticker, hz), errors.get((ticker, None)))
+            signals = {
+                'position': positions.get(ticker, 0.0) / max_position if max_position else 0.0,
+                # ohne Fehlerhistorie (neu/ungenutzt): mittlere Priorität
+                'error': min(error / ERROR_CAP, 1.0) if error is not None else 0.5,
+                'staleness': min((now - trained).total_seconds() / 3600 / STALE_HOURS, 1.0) if trained else 1.0,
+                'freshness': 0.0 if last_bar is None or (now - last_bar) > timedelta(hours=DATA_MAX_AGE_HOURS)
+                             else 1.0 if trained is None or last_bar > trained else 0.0,
+            }
+            deferred = (backlog.get(model_registry.slot(ticker, hz)) or {}).get('deferrals', 0)
+            score = sum(weights.get(name, 0.0) * value for name, value in signals.items())
+            score += min(AGING_BONUS * deferred, AGING_MAX_BONUS)
+            jobs.append({'ticker': ticker, 'horizon': hz, 'score': round(score, 4), 'deferrals': deferred,
+                         'signals': {k: round(v, 3) for k, v in signals.items()},
+                         'last_trained': trained.isoformat() if trained else None})
+    jobs.sort(key=lambda job: job['score'], reverse=True)
+    return jobs
+
+
+def estimate_seconds(time_limits: Iterable[int], walk_forward: Optional[dict] = None) -> float:
+    """Wall-Clock Schätzung für die Jobs eines Tickers (ein Daten-Load, eine Walk-Forward Evaluation)."""
+    time_limits = list(time_limits)
+    if not time_limits:
+        return 0.0
+    seconds = TICKER_OVERHEAD_SECONDS + OVERHEAD_FACTOR * sum(time_limits)
+    if walk_forward and walk_forward.get('enabled'):
+        fits = walk_forward['folds'] * len(time_limits)
+        workers = max(1, min(fits, os.cpu_count() or 1))
+        seconds += math.ceil(fits / workers) * walk_forward['time_limit'] * OVERHEAD_FACTOR
+    return seconds
+
+
+def _walk_forward_config() -> dict:
+    from walk_forward import WF_ENABLED, WF_FOLDS, WF_TIME_LIMIT
+    return {'enabled': WF_ENABLED, 'folds': WF_FOLDS, 'time_limit': WF_TIME_LIMIT}
+
+
+def allocate(jobs: List[dict], budget_seconds: float, walk_forward: Optional[dict] = None) -> Dict[str, List[dict]]:
+    """Aufnahme in Score-Reihenfolge mit MIN_JOB_SECONDS, dann Restbudget nach Score bis MAX_JOB_SECONDS.
+
+    Rückgabe {'scheduled': [...job + time_limit], 'deferred': [...]}
+    """
+    scheduled, deferred, per_ticker = [], [], {}
+
+    def total(groups):
+        return sum(estimate_seconds([j['time_limit'] for j in group], walk_forward) for group in groups.values())
+
+    for job in jobs:
+        trial = {t: list(g) for t, g in per_ticker.items()}
+        trial.setdefault(job['ticker'], []).append({**job, 'time_limit': MIN_JOB_SECONDS})
+        if total(trial) <= budget_seconds:
+            per_ticker = trial
+            scheduled.append(per_ticker[job['ticker']][-1])
+        else:
+            deferred.append(job)
+
+    # Restbudget (Water-Filling): Fit-Zeit proportional zum Score, gedeckelt auf MAX_JOB_SECONDS
+    for _ in range(8):
+        spare = (budget_seconds - total(per_ticker)) / OVERHEAD_FACTOR
+        growable = [j for j in scheduled if j['time_limit'] < MAX_JOB_SECONDS]
+        score_sum = sum(max(j['score'], 1e-6) for j in growable)
+        if spare < 1 or not growable:
+            break
+        for job in growable:
+            extra = int(spare * max(job['score'], 1e-6) / score_sum)
+            job['time_limit'] = min(MAX_JOB_SECONDS, job['time_limit'] + extra)
+    return {'scheduled': scheduled, 'deferred': deferred}
+
+
+def fit_remaining(jobs: List[dict], remaining_seconds: float, walk_forward: Optional[dict] = None) -> Dict[str, List[dict]]:
+    """Jobs eines Tickers auf das Restbudget kürzen: erst Zeitlimits bis MIN_JOB_SECONDS, dann die
+    Jobs mit dem niedrigsten Score verwerfen (preempted)."""
+    kept = sorted(jobs, key=lambda job: job['score'], reverse=True)
+    preempted = []
+    while kept:
+        needed = estimate_seconds([j['time_limit'] for j in kept], walk_forward)
+        if needed <= remaining_seconds:
+            break
+        overshoot = (needed - remaining_seconds) / OVERHEAD_FACTOR
+        shrinkable = sum(j['time_limit'] - MIN_JOB_SECONDS for j in kept)
+        if shrinkable >= overshoot:
+            ratio = 1 - overshoot / shrinkable
+            kept = [{**j, 'time_limit': int(MIN_JOB_SECONDS + (j['time_limit'] - MIN_JOB_SECONDS) * ratio)} for j in kept]
+            continue
+        preempted.append(kept.pop())
+    return {'run': kept, 'preempted': preempted}
+
+
+def horizon_weights(entries: Iterable[dict], horizons: Iterable[str], now: Optional[datetime] = None) -> Dict[str, float]:
+    """Gewichte pro Horizon für train_model: 1 + relative mittlere Abweichung der globalen Route."""
+    horizons = [str(hz) for hz in horizons]
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=ERROR_WINDOW_HOURS)
+    sums = {hz: [0.0, 0] for hz in horizons}
+    for entry in entries or []:
+        hz = str(entry.get('horizon_minutes'))
+        if hz not in sums or entry.get('deviation') is None or (entry.get('route') or 'global') != 'global':
+            continue
+        try:
+            if datetime.fromisoformat(entry.get('actual_time')) < cutoff:
+                continue
+        except (TypeError, ValueError):
+            continue
+        sums[hz][0] += entry['deviation']
+        sums[hz][1] += 1
+    means = {hz: total / count for hz, (total, count) in sums.items() if count}
+    if not means:
+        return {hz: 1.0 for hz in horizons}
+    scale = max(means.values()) or 1.0
+    return {hz: 1.0 + means.get(hz, 0.0) / scale for hz in horizons}
+
+
+def split_budget(total_seconds: int, weights: Dict[str, float], minimum: int = MIN_JOB_SECONDS) -> Dict[str, int]:
+    """Teilt ein Budget nach Gewicht auf, jeder Anteil mindestens minimum Sekunden."""
+    weight_sum = sum(weights.values()) or 1.0
+    spare = max(0, total_seconds - minimum * len(weights))
+    return {key: int(minimum + spare * weight / weight_sum) for key, weight in weights.items()}
+
+
+def load_backlog(client) -> Dict[str, dict]:
+    return {model_registry._text(k): redis_codec.loads(v, {}) for k, v in (client.hgetall(BACKLOG_KEY) or {}).items()}
+
+
+def update_backlog(client, completed: Iterable[dict], deferred: Iterable[dict], remove: Iterable[str] = (),
+                   now: Optional[datetime] = None) -> int:
+    """Abgeschlossene Jobs (und remove: Slots ohne Kandidat mehr) aus dem Backlog entfernen,
+    zurückgestellte/preempted Jobs (wieder) eintragen."""
+    now = (now or datetime.utcnow()).isoformat()
+    backlog = load_backlog(client)
+    pipe = client.pipeline()
+    done = [model_registry.slot(j['ticker'], j['horizon']) for j in completed] + list(remove)
+    if done:
+        pipe.hdel(BACKLOG_KEY, *done)
+    entries = {}
+    for job in deferred:
+        key = model_registry.slot(job['ticker'], job['horizon'])
+        previous = backlog.get(key) or {}
+        entries[key] = json.dumps({'ticker': job['ticker'], 'horizon': job['horizon'],
+                                   'deferrals': previous.get('deferrals', 0) + 1,
+                                   'first_deferred': previous.get('first_deferred') or now,
+                                   'score': job['score']})
+    if entries:
+        pipe.hset(BACKLOG_KEY, mapping=entries)
+    pipe.execute()
+    return len(entries)
+
+
+def build_plan(client, cur, tickers: List[str], horizons: Iterable, min_rows: int, budget_seconds: Optional[int] = None,
+               now: Optional[datetime] = None) -> Dict[str, object]:
+    """Signale sammeln, Jobs bewerten und das Budget verteilen. Kandidaten = tickers + Backlog."""
+    now = now or datetime.utcnow()
+    horizons = [str(hz) for hz in horizons]
+    budget = window_budget() if budget_seconds is None else budget_seconds
+    backlog = load_backlog(client)
+    candidates = list(dict.fromkeys(list(tickers) + [entry.get('ticker') for entry in backlog.values() if entry.get('ticker')]))
+    versions = client.hmget(model_registry.CURRENT_KEY, [model_registry.slot(t, hz) for t in candidates for hz in horizons]) if candidates else []
+    slots = [(t, hz) for t in candidates for hz in horizons]
+    last_trained = {slot: model_registry.version_time(model_registry._text(v)) for slot, v in zip(slots, versions)}
+    jobs = score_jobs(candidates, horizons, position_values(client),
+                      recent_errors(_load_json(client, 'deviation_tracker', []), now=now),
+                      data_stats(cur, candidates) if candidates else {}, last_trained, backlog, min_rows, now=now)
+    walk_forward = _walk_forward_config()
+    allocation = allocate(jobs, budget, walk_forward)
+    return {
+        'time': now.isoformat(),
+        'budget_seconds': budget,
+        'candidates': len(candidates),
+        'scheduled': allocation['scheduled'],
+        'deferred': allocation['deferred'],
+        # Backlog-Einträge ohne Job (z.B. keine Daten mehr) werden beim Abschluss entfernt
+        'stale_backlog': sorted(set(backlog) - {model_registry.slot(j['ticker'], j['horizon']) for j in jobs}),
+        'estimated_seconds': round(sum(
+            estimate_seconds([j['time_limit'] for j in allocation['scheduled'] if j['ticker'] == t], walk_forward)
+            for t in {j['ticker'] for j in allocation['scheduled']}), 1),
+        'walk_forward': walk_forward,
+    }
+
+
+def group_by_ticker(jobs: List[dict]) -> List[tuple]:
+    """(ticker, jobs) in Reihenfolge des besten Job-Scores je Ticker (Daten werden pro Ticker einmal geladen)."""
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job['ticker'], []).append(job)
+    return sorted(groups.items(), key=lambda item: max(j['score'] for j in item[1]), reverse=True)
@@ -0,0 +1,214 @@
+"""
+Walk-Forward Evaluation (Rolling Origin) für die Multi-Horizon AutoGluon Modelle
+
+Ersetzt die In-Sample MAPE/R² aus train_model und SequentialTrainer (Predict auf dem
+Trainingsframe selbst) durch Out-of-Sample Metriken:
+
+- Zeitlich geordnete Folds: die ersten WALK_FORWARD_MIN_TRAIN_FRACTION der Zeitstempel sind
+  immer Training, der Rest wird in WALK_FORWARD_FOLDS aufeinanderfolgende Testblöcke geteilt
+  (expanding window, Training nur aus der Vergangenheit)
+- Purging: Trainingszeilen, deren Target-Zeitpunkt (time der Zeile shift -k pro Ticker) in
+  oder nach dem Testblock liegt, fallen raus; Embargo: zusätzlicher Abstand
+  WALK_FORWARD_EMBARGO_MINUTES vor Testbeginn
+- Folds × Horizonte laufen parallel (ProcessPoolExecutor; in Celery-Prefork-Kindern, die
+  keine Prozesse starten dürfen, als Threads), jeder Fit mit begrenzten CPUs und Zeitlimit
+- Metriken pro Horizon und Ticker (+ 'ALL') landen in der Tabelle model_evaluations
+  (model_version, source) und sind so über Modellversionen vergleichbar
+"""
+
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+WF_ENABLED = os.getenv('WALK_FORWARD_ENABLED', '1') == '1'
+WF_FOLDS = int(os.getenv('WALK_FORWARD_FOLDS', '4'))
+WF_MIN_TRAIN_FRACTION = float(os.getenv('WALK_FORWARD_MIN_TRAIN_FRACTION', '0.5'))
+WF_EMBARGO_MINUTES = int(os.getenv('WALK_FORWARD_EMBARGO_MINUTES', '15'))
+WF_TIME_LIMIT = int(os.getenv('WALK_FORWARD_TIME_LIMIT', '60'))  # Sekunden pro Fold-Fit
+WF_PROCESSES = int(os.getenv('WALK_FORWARD_PROCESSES', '0'))     # 0 = min(Jobs, CPUs)
+
+# Horizon (Minuten als String) -> Shift in Zeilen (15m Candles), wie die Targets in train_model
+HORIZON_STEPS = {'15': 1, '30': 2, '60': 4}
+ALL_TICKERS = 'ALL'
+EVALUATION_KEY = 'model_evaluation_last'
+
+logger = logging.getLogger(__name__)
+
+
+def add_target_times(df: pd.DataFrame, horizons: Dict[str, int] = HORIZON_STEPS,
+                     ticker_col: str = 'ticker', time_col: str = 'time') -> pd.DataFrame:
+    """Spalten target_time_{hz}: Zeitpunkt, zu dem das Target der Zeile bekannt ist (für Purging)."""
+    times = pd.to_datetime(df[time_col], utc=True)
+    grouped = times.groupby(df[ticker_col]) if ticker_col in df else None
+    for hz, steps in horizons.items():
+        df[f'target_time_{hz}'] = grouped.shift(-steps) if grouped is not None else times.shift(-steps)
+    return df
+
+
+def make_folds(times, target_times, n_folds: int = WF_FOLDS, min_train_fraction: float = WF_MIN_TRAIN_FRACTION,
+               embargo_minutes: int = WF_EMBARGO_MINUTES) -> List[Dict[str, object]]:
+    """Rolling-Origin Folds über die eindeutigen Zeitstempel; Rückgabe Positions-Indizes."""
+    times = pd.to_datetime(pd.Series(times), utc=True).to_numpy()
+    target_times = pd.to_datetime(pd.Series(target_times), utc=True).to_numpy()
+    unique = np.unique(times)
+    first_test = int(len(unique) * min_train_fraction)
+    blocks = np.array_split(unique[first_test:], n_folds)
+    embargo = np.timedelta64(embargo_minutes, 'm')
+    folds = []
+    for fold, block in enumerate(blocks):
+        if not len(block):
+            continue
+        test_start, test_end = block[0], block[-1]
+        test_idx = np.nonzero((times >= test_start) & (times <= test_end))[0]
+        # Purging + Embargo: Target muss vor (Testbeginn - Embargo) bekannt sein
+        train_idx = np.nonzero((times < test_start) & (target_times < test_start - embargo))[0]
+        if len(train_idx) and len(test_idx):
+            folds.append({'fold': fold, 'train': train_idx, 'test': test_idx,
+                          'test_start': str(pd.Timestamp(test_start)), 'test_end': str(pd.Timestamp(test_end))})
+    return folds
+
+
+def regression_metrics(y_true, y_pred, current=None) -> Dict[str, Optional[float]]:
+    """MAE, MAPE, RMSE, R² und (mit current) Richtungstrefferquote."""
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    if not len(y_true):
+        return {'rows': 0, 'mae': None, 'mape': None, 'rmse': None, 'r2': None, 'direction_accuracy': None}
+    err = y_true - y_pred
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mape = float(np.nanmean(np.abs(err / np.where(y_true == 0, np.nan, y_true))))
+    ss_tot = float(((y_true - y_true.mean()) ** 2).sum())
+    direction = None
+    if current is not None:
+        current = np.asarray(current, dtype=float)
+        moved = y_true != current
+        if moved.any():
+            direction = float(np.mean(np.sign(y_pred[moved] - current[moved]) == np.sign(y_true[moved] - current[moved])))
+    return {
+        'rows': int(len(y_true)),
+        'mae': float(np.abs(err).mean()),
+        'mape': mape if np.isfinite(mape) else None,
+        'rmse': float(np.sqrt((err ** 2).mean())),
+        'r2': 1 - float((err ** 2).sum()) / ss_tot if ss_tot else None,
+        'direction_accuracy': direction,
+    }
+
+
+def _fit_and_predict(job: Dict[str, object]) -> Dict[str, object]:
+    """Ein Fold eines Horizonts: Fit auf train, Predict auf test (temporäres Modellverzeichnis)."""
+    from autogluon.tabular import TabularDataset, TabularPredictor
+
+    path = tempfile.mkdtemp(prefix=f"wf_{job['horizon']}_{job['fold']}_")
+    try:
+        predictor = TabularPredictor(label='target', path=path, eval_metric='mean_absolute_error', verbosity=0)
+        predictor.fit(TabularDataset(job['train']), time_limit=job['time_limit'], num_cpus=job['num_cpus'], verbosity=0)
+        y_pred = predictor.predict(job['test'].drop(columns=['target']))
+        return {'horizon': job['horizon'], 'fold': job['fold'], 'y_pred': np.asarray(y_pred, dtype=float)}
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _executor(max_workers: int):
+    # Celery-Prefork-Kinder sind daemonic und dürfen keine Kindprozesse starten
+    if multiprocessing.current_process().daemon:
+        return ThreadPoolExecutor(max_workers=max_workers)
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+def evaluate(df: pd.DataFrame, features: List[str], labels: Dict[str, str], tickers, current_col: Optional[str] = 'close',
+             n_folds: int = WF_FOLDS, time_limit: int = WF_TIME_LIMIT, processes: int = WF_PROCESSES) -> Dict[str, object]:
+    """Walk-Forward über alle Horizonte.
+
+    df braucht: features, Label-Spalten (labels: hz -> Spalte), 'time' und target_time_{hz}
+    (add_target_times). tickers: Ticker pro Zeile (gleiche Länge wie df).
+    Rückgabe: {'horizons': {hz: {'overall': metrics, 'tickers': {t: metrics}, 'folds': [...]}}, 'config': {...}}
+    """
+    started = datetime.utcnow()
+    tickers = np.asarray(tickers)
+    jobs, fold_meta = [], {}
+    for hz, label in labels.items():
+        folds = make_folds(df['time'], df[f'target_time_{hz}'], n_folds=n_folds)
+        frame = df[features + [label]].rename(columns={label: 'target'})
+        for fold in folds:
+            fold_meta[(hz, fold['fold'])] = fold
+            jobs.append({'horizon': hz, 'fold': fold['fold'], 'time_limit': time_limit,
+                         'train': frame.iloc[fold['train']], 'test': frame.iloc[fold['test']]})
+    if not jobs:
+        return {'horizons': {}, 'config': {'folds': n_folds, 'jobs': 0}}
+
+    workers = processes or min(len(jobs), os.cpu_count() or 1)
+    for job in jobs:
+        job['num_cpus'] = max(1, (os.cpu_count() or 1) // workers)
+    with _executor(workers) as pool:
+        outputs = list(pool.map(_fit_and_predict, jobs))
+
+    horizons = {}
+    for hz, label in labels.items():
+        idx_parts, pred_parts, fold_metrics = [], [], []
+        for out in outputs:
+            if out['horizon'] != hz:
+                continue
+            fold = fold_meta[(hz, out['fold'])]
+            test_idx = fold['test']
+            current = df[current_col].to_numpy()[test_idx] if current_col else None
+            fold_metrics.append({'fold': out['fold'], 'train_rows': int(len(fold['train'])),
+                                 'test_start': fold['test_start'], 'test_end': fold['test_end'],
+                                 **regression_metrics(df[label].to_numpy()[test_idx], out['y_pred'], current)})
+            idx_parts.append(test_idx)
+            pred_parts.append(out['y_pred'])
+        if not idx_parts:
+            continue
+        idx = np.concatenate(idx_parts)
+        y_pred = np.concatenate(pred_parts)
+        y_true = df[label].to_numpy()[idx]
+        current = df[current_col].to_numpy()[idx] if current_col else None
+        per_ticker = {}
+        for ticker in np.unique(tickers[idx]):
+            mask = tickers[idx] == ticker
+            per_ticker[str(ticker)] = regression_metrics(y_true[mask], y_pred[mask],
+                                                         current[mask] if current is not None else None)
+        horizons[hz] = {'overall': regression_metrics(y_true, y_pred, current), 'tickers': per_ticker, 'folds': fold_metrics}
+
+    return {
+        'horizons': horizons,
+        'config': {'folds': n_folds, 'min_train_fraction': WF_MIN_TRAIN_FRACTION, 'embargo_minutes': WF_EMBARGO_MINUTES,
+                   'time_limit': time_limit, 'workers': workers, 'jobs': len(jobs),
+                   'duration_s': round((datetime.utcnow() - started).total_seconds(), 1)},
+    }
+
+
+def persist_evaluation(cur, evaluation: Dict[str, object], model_version: str, source: str) -> int:
+    """Schreibt Metriken pro Horizon × Ticker (+ ALL) nach model_evaluations; Rückgabe Zeilen."""
+    from psycopg2.extras import execute_values
+
+    rows = []
+    for hz, result in evaluation.get('horizons', {}).items():
+        folds = len(result['folds'])
+        for ticker, m in [(ALL_TICKERS, result['overall'])] + list(result['tickers'].items()):
+            rows.append((model_version, source, int(hz), ticker, folds, m['rows'], m['mae'], m['mape'],
+                         m['rmse'], m['r2'], m['direction_accuracy']))
+    if rows:
+        execute_values(cur, """
+            INSERT INTO model_evaluations (
+                time, model_version, source, horizon_minutes, ticker, folds, rows,
+                mae, mape, rmse, r2, direction_accuracy
+            )
+            VALUES %s
+        """, rows, template="(NOW(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)")
+    return len(rows)
+
+
+def summary(evaluation: Dict[str, object]) -> Dict[str, object]:
+    """Kompakte Form für Redis/Trainingsstatus: Gesamtmetriken pro Horizon + Konfiguration."""
+    return {
+        'horizons': {hz: res['overall'] for hz, res in evaluation.get('horizons', {}).items()},
+        'config': evaluation.get('config', {}),
+    }
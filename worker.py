@@ -1,18 +1,37 @@
 import os
 import json
 import time
-import requests
 import redis
-import psycopg2
-from autogluon.tabular import TabularPredictor
-from celery import Celery
+from psycopg2.extras import execute_values
+from celery import Celery, chain
+from celery.signals import beat_init, worker_ready, worker_process_init, worker_process_shutdown
 import logging
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from celery.schedules import crontab
 from grok_top_stocks import get_top_stocks_prediction
+from response_cache import bump_data_version, SCOPE_MARKET, SCOPE_PORTFOLIO
+from event_stream import publish_event
+from task_queues import configure_queues, collect_queue_depths
+from provider_health import ProviderHealth, ProviderUnavailable, SNAPSHOT_KEY as PROVIDER_HEALTH_KEY
+from quote_providers import build_quote_providers
+import redis_codec
+import model_registry
+import inference_router
+import training_scheduler
+import training_fingerprint
+from quote_ingest import (
+    CANONICAL_KEY as CANONICAL_QUOTES_KEY, ENHANCED_DATA_KEY, ENHANCED_STATS_KEY,
+    build_record, collect_readings, enhanced_stats, to_enhanced, to_market_data,
+)
+from db_pool import close_pool, db_cursor, init_pool, transaction
+from pipeline import (
+    PIPELINE_INTERVAL_SECONDS, STAGE_ENHANCE, STAGE_INGEST, STAGE_PREDICT, STAGE_TRADE, StageError,
+    acquire_pipeline_lock, pipeline_stage, record_run, release_pipeline_lock,
+)
 import pytz
-import holidays
+import market_hours
+from market_hours import EXTENDED_SESSIONS, OFF_HOURS, market_schedule
 try:
     from xai_sdk import Client as XAIClient
     from xai_sdk.chat import user as xai_user, system as xai_system
@@ -34,23 +53,36 @@ app = Celery('worker', broker=REDIS_URL, backend=REDIS_URL)
 # Redis
 r = redis.from_url(REDIS_URL)
 
-# Database (lazy fallback retry)
-def _connect_db():
-    for attempt in range(3):
-        try:
-            return psycopg2.connect(DATABASE_URL)
-        except Exception as e:
-            logging.error(f"DB connect attempt {attempt+1} failed: {e}")
-            time.sleep(2)
-    raise RuntimeError("Cannot connect to database after retries")
+# Queues: realtime / ingest / ml-train / ml-infer (Routing, Prioritäten, Time Limits, Metriken)
+configure_queues(app, r)
 
-conn = _connect_db()
-try:
-    # Verhindert, dass eine einzige Duplicate-Key Exception die gesamte Connection in aborted state versetzt
-    # und nachfolgende Queries (z.B. generate_predictions) scheitern.
-    conn.autocommit = True
-except Exception:
-    pass
+# Provider Health: jeder Provider-Call zeichnet Erfolg/Latenz auf (statt aktiver Heartbeat-Probes),
+# offene Circuit Breaker / erschöpfte Quotas blockieren den Call ohne HTTP-Request
+provider_health = ProviderHealth(
+    r,
+    idle_seconds=int(os.getenv('PROVIDER_IDLE_PROBE_SECONDS', 900)),
+    breaker_failures=int(os.getenv('PROVIDER_BREAKER_FAILURES', 5)),
+    breaker_cooldown=int(os.getenv('PROVIDER_BREAKER_COOLDOWN_SECONDS', 300)),
+)
+
+def _http_get(url, **kwargs):
+    return provider_health.request('GET', url, **kwargs)
+
+def _http_post(url, **kwargs):
+    return provider_health.request('POST', url, **kwargs)
+
+# Database: Connection Pool pro Prozess (db_pool.py), nach dem Prefork-Fork initialisiert
+@worker_process_init.connect
+def _init_db_pool(**kwargs):
+    try:
+        init_pool()
+    except Exception as e:
+        # Nicht fatal: db_cursor()/transaction() bauen den Pool beim ersten Zugriff erneut auf
+        logging.error(f"DB pool init failed: {e}")
+
+@worker_process_shutdown.connect
+def _close_db_pool(**kwargs):
+    close_pool()
 
 # API Keys (from env)
 FINNHUB_API_KEY = os.getenv('FINNHUB_API_KEY')
@@ -64,6 +96,17 @@ GROK_API_KEY = os.getenv('GROK_API_KEY')
 GROK_BASE_URL = os.getenv('GROK_BASE_URL', 'https://grok.xai-api.com')
 GROK_INSECURE = os.getenv('GROK_INSECURE', '0') == '1'
 
+# Quote-Kette in fetch_data (Reihenfolge: provider_health.rank, Batch-Adapter: quote_providers.py)
+QUOTE_CHAIN_PROVIDERS = ('twelvedata', 'finnhub', 'fmp', 'marketstack', 'alphavantage')
+QUOTE_TARGET_SOURCES = int(os.getenv('QUOTE_TARGET_SOURCES', 3))  # Quellen pro Ticker für den Median
+quote_providers = build_quote_providers(provider_health, {
+    'twelvedata': TWELVE_DATA_API_KEY,
+    'finnhub': FINNHUB_API_KEY,
+    'fmp': FMP_API_KEY,
+    'marketstack': MARKETSTACK_API_KEY,
+    'alphavantage': ALPHAVANTAGE_API_KEY,
+})
+
 BASE_TICKERS = ['AAPL', 'NVDA', 'MSFT', 'TSLA', 'AMZN', 'META', 'GOOGL', 'BRK.B', 'AVGO', 'JPM', 'LLY', 'V', 'XOM', 'PG', 'UNH', 'MA', 'JNJ', 'COST', 'HD', 'BAC']
 
 # ================= Helper / Utility =================
@@ -74,32 +117,14 @@ DEVIATION_THRESHOLD = 0.08  # 8% vom Nutzer gewünscht
 
 def is_market_open():
     """
-    Prüft ob US-Markt aktuell geöffnet ist (Eastern Time)
-    Berücksichtigt Wochenenden und US-Feiertage
+    Prüft ob US-Markt aktuell geöffnet ist (Eastern Time, reguläre Sitzung)
+    Berücksichtigt Wochenenden, US-Feiertage und Early-Close Tage (market_hours.py)
     
     Returns:
         bool: True wenn Markt offen, False wenn geschlossen
     """
     try:
-        # Aktuelle Zeit in US Eastern Time
-        eastern = pytz.timezone('US/Eastern')
-        now_et = datetime.now(eastern)
-        
-        # Wochenende Check (Samstag=5, Sonntag=6)
-        if now_et.weekday() >= 5:
-            return False
-            
-        # US-Feiertage Check
-        us_holidays = holidays.UnitedStates(years=now_et.year)
-        if now_et.date() in us_holidays:
-            return False
-            
-        # Handelszeiten: 9:30 - 16:00 Uhr ET
-        market_open = now_et.replace(hour=9, minute=30, second=0, microsecond=0)
-        market_close = now_et.replace(hour=16, minute=0, second=0, microsecond=0)
-        
-        return market_open <= now_et <= market_close
-        
+        return market_hours.is_market_open()
     except Exception as e:
         logging.error(f"Market hours check failed: {e}")
         # Im Fehlerfall: Sicherheit geht vor - Markt als geschlossen betrachten
@@ -113,45 +138,19 @@ def get_market_status():
         dict: Marktstatus mit Details
     """
     try:
-        eastern = pytz.timezone('US/Eastern')
-        now_et = datetime.now(eastern)
-        
-        market_open_bool = is_market_open()
-        
-        # Nächste Marktöffnung berechnen
-        next_market_open = None
-        if not market_open_bool:
-            # Wenn Markt geschlossen, berechne nächste Öffnung
-            next_day = now_et
-            while True:
-                # Nächster Werktag
-                if next_day.weekday() >= 5:  # Wochenende
-                    next_day += timedelta(days=1)
-                    continue
-                    
-                # Feiertag prüfen
-                us_holidays = holidays.UnitedStates(years=next_day.year)
-                if next_day.date() in us_holidays:
-                    next_day += timedelta(days=1)
-                    continue
-                    
-                # Wenn heute und noch vor 9:30
-                if next_day.date() == now_et.date() and now_et.time() < datetime.strptime('09:30', '%H:%M').time():
-                    next_market_open = next_day.replace(hour=9, minute=30, second=0, microsecond=0)
-                    break
-                # Nächster Tag 9:30
-                else:
-                    next_day += timedelta(days=1)
-                    if next_day.weekday() < 5:  # Werktag
-                        next_market_open = next_day.replace(hour=9, minute=30, second=0, microsecond=0)
-                        break
+        now_et = datetime.now(market_hours.EASTERN)
+        phase = market_hours.market_phase(now_et)
+        market_open_bool = phase == market_hours.PHASE_REGULAR
+        next_market_open = None if market_open_bool else market_hours.next_regular_open(now_et)
         
         return {
             'market_open': market_open_bool,
             'current_time_et': now_et.isoformat(),
             'next_open': next_market_open.isoformat() if next_market_open else None,
-            'trading_day': now_et.weekday() < 5 and now_et.date() not in holidays.UnitedStates(years=now_et.year),
-            'market_session': 'OPEN' if market_open_bool else 'CLOSED'
+            'trading_day': market_hours.is_trading_day(now_et.date()),
+            'market_session': 'OPEN' if market_open_bool else 'CLOSED',
+            'market_phase': phase,
+            'early_close': market_hours.is_trading_day(now_et.date()) and market_hours.is_early_close(now_et.date())
         }
         
     except Exception as e:
@@ -170,12 +169,12 @@ def _redis_json_get(key, default=None):
     if not val:
         return default
     try:
-        return json.loads(val)
+        return redis_codec.loads(val)
     except Exception:
         return default
 
 def _redis_json_set(key, value):
-    r.set(key, json.dumps(value))
+    r.set(key, redis_codec.dumps(key, value))
 
 def ensure_defaults():
     """Ensure all required Redis keys exist with proper default values according to backend.txt spec"""
@@ -215,7 +214,6 @@ def ensure_defaults():
             'market_open': False,              # Market Hours Status
             'last_market_check': None
         },
-        'market_status': get_market_status(),  # Separate detailed market status
         'risk_settings': {
             'daily_notional_cap': 50000,       # Max. Handelsvolumen pro Tag (USD)
             'max_position_per_ticker': 5,      # Max. Orders pro Ticker pro Tag
@@ -239,9 +237,16 @@ def ensure_defaults():
             'cooldowns': {}  # ticker -> iso timestamp wann wieder erlaubt
         }
     }
-    for k, v in defaults.items():
-        if r.get(k) is None:
-            _redis_json_set(k, v)
+    # Ein MGET statt GET pro Key; fehlende Keys per SET NX in einer Pipeline anlegen
+    keys = list(defaults) + ['market_status']
+    existing = r.mget(keys)
+    missing = [k for k, val in zip(keys, existing) if val is None]
+    if missing:
+        pipe = r.pipeline(transaction=False)
+        for k in missing:
+            value = get_market_status() if k == 'market_status' else defaults[k]
+            pipe.set(k, json.dumps(value), nx=True)
+        pipe.execute()
     # Migration alte predictions_pending Struktur -> neue
     pending = _redis_json_get('predictions_pending', []) or []
     migrated = False
@@ -254,7 +259,49 @@ def ensure_defaults():
     if migrated:
         _redis_json_set('predictions_pending', pending)
 
-ensure_defaults()
+DEFAULTS_INIT_LOCK = 'defaults_init_lock'
+DEFAULTS_INIT_LOCK_TTL = 300
+DEFAULTS_INIT_MARKER = 'defaults_initialized:{version}'
+
+def _deployment_version():
+    """DEPLOYMENT_VERSION / GIT_SHA aus dem Deployment, sonst Hash von worker.py (neuer Code = neue Version)."""
+    version = os.getenv('DEPLOYMENT_VERSION') or os.getenv('GIT_SHA')
+    if version:
+        return version
+    import hashlib
+    with open(os.path.abspath(__file__), 'rb') as fh:
+        return hashlib.sha1(fh.read()).hexdigest()[:12]
+
+def ensure_defaults_once():
+    """Führt ensure_defaults einmal pro Deployment aus (nicht bei jedem Import / Prefork-Child).
+    Der Marker defaults_initialized:<version> wird erst nach Erfolg gesetzt (ohne TTL); der kurze
+    SET-NX-Lock verhindert nur parallele Läufe mehrerer Pools + Beat und wird danach freigegeben."""
+    marker = DEFAULTS_INIT_MARKER.format(version=_deployment_version())
+    token = f"{os.getpid()}@{datetime.utcnow().isoformat()}"
+    try:
+        if r.exists(marker):
+            return False
+        if not r.set(DEFAULTS_INIT_LOCK, token, nx=True, ex=DEFAULTS_INIT_LOCK_TTL):
+            return False
+        try:
+            ensure_defaults()
+            r.set(marker, datetime.utcnow().isoformat())
+        finally:
+            owner = r.get(DEFAULTS_INIT_LOCK)
+            if (owner.decode() if isinstance(owner, bytes) else owner) == token:
+                r.delete(DEFAULTS_INIT_LOCK)
+        return True
+    except Exception as e:
+        logging.error(f"ensure_defaults failed: {e}")
+        return False
+
+@worker_ready.connect
+def _on_worker_ready(**kwargs):
+    ensure_defaults_once()
+
+@beat_init.connect
+def _on_beat_init(**kwargs):
+    ensure_defaults_once()
 
 # ===== Training Status Utilities =====
 def _training_status_update(**kwargs):
@@ -299,9 +346,11 @@ def append_trade_log(entry):
     if len(log) > 200:
         log = log[-200:]
     _redis_json_set('trades_log', log)
+    publish_event(r, 'trading', 'trade', entry)
     
     # Update today's trade statistics
     update_daily_trade_stats(entry)
+    update_frontend_feedback()
 
 def update_daily_trade_stats(trade_entry):
     """Update daily statistics for trades_today and total_volume"""
@@ -350,17 +399,22 @@ def update_system_heartbeat():
         market_open = is_market_open()
         market_status = get_market_status()
         
-        # API Health Checks - Multi-API Integration
+        # API Health - passiv aus den echten Provider-Calls (provider_health.py)
+        try:
+            providers = collect_provider_health()
+        except Exception as e:
+            logging.warning(f"Provider health snapshot failed: {e}")
+            providers = {}
         api_status = {
             'redis_connected': test_redis_connection(),
             'postgres_connected': test_postgres_connection(), 
-            'finnhub_api_active': test_api_health('finnhub'),
-            'fmp_api_active': test_api_health('fmp'),
-            'marketstack_api_active': test_api_health('marketstack'),
-            'alpaca_api_active': test_api_health('alpaca'),
-            'grok_api_active': test_api_health('grok'),
-            'yfinance_api_active': test_api_health('yfinance'),
-            'twelvedata_api_active': test_api_health('twelvedata'),
+            'finnhub_api_active': providers.get('finnhub', {}).get('active', False),
+            'fmp_api_active': providers.get('fmp', {}).get('active', False),
+            'marketstack_api_active': providers.get('marketstack', {}).get('active', False),
+            'alpaca_api_active': providers.get('alpaca', {}).get('active', False),
+            'grok_api_active': providers.get('grok', {}).get('active', False),
+            'yfinance_api_active': providers.get('yfinance', {}).get('active', False),
+            'twelvedata_api_active': providers.get('twelvedata', {}).get('active', False),
             'worker_running': True,
             'last_heartbeat': datetime.utcnow().isoformat(),
             'uptime_seconds': uptime_seconds,
@@ -390,56 +444,66 @@ def test_redis_connection():
 def test_postgres_connection():
     """Test PostgreSQL connectivity"""  
     try:
-        cur = conn.cursor()
-        cur.execute('SELECT 1')
+        with db_cursor() as cur:
+            cur.execute('SELECT 1')
         return True
     except Exception:
         return False
 
-def test_api_health(api_name):
-    """Test API endpoint health"""
+# Billige Probes nur für Provider ohne Traffic seit PROVIDER_IDLE_PROBE_SECONDS (quota-arme Endpoints).
+# Marketstack (Monatsquote), AlphaVantage (25/Tag) und Grok werden nie aktiv geprobt.
+def _probe_finnhub():
+    return _http_get(f'https://finnhub.io/api/v1/quote?symbol=AAPL&token={FINNHUB_API_KEY}', timeout=5)
+
+def _probe_alpaca():
+    headers = {'APCA-API-KEY-ID': ALPACA_API_KEY, 'APCA-API-SECRET-KEY': ALPACA_SECRET}
+    return _http_get('https://paper-api.alpaca.markets/v2/clock', headers=headers, timeout=5)
+
+def _probe_twelvedata():
+    # /api_usage verbraucht keine Credits
+    return _http_get(f'https://api.twelvedata.com/api_usage?apikey={TWELVE_DATA_API_KEY}', timeout=5)
+
+def _probe_fmp():
+    return _http_get(f'https://financialmodelingprep.com/api/v3/quote/AAPL?apikey={FMP_API_KEY}', timeout=5)
+
+def collect_provider_health():
+    """Passive Provider Health aus den echten Calls (+ Idle-Probes), gespeichert unter provider_health"""
+    configured = {
+        'finnhub': bool(FINNHUB_API_KEY),
+        'fmp': bool(FMP_API_KEY),
+        'marketstack': bool(MARKETSTACK_API_KEY),
+        'twelvedata': bool(TWELVE_DATA_API_KEY),
+        'alphavantage': bool(ALPHAVANTAGE_API_KEY),
+        'alpaca': bool(ALPACA_API_KEY),
+        'grok': bool(GROK_API_KEY),
+    }
+    probes = {
+        'finnhub': _probe_finnhub,
+        'alpaca': _probe_alpaca,
+        'twelvedata': _probe_twelvedata,
+        'fmp': _probe_fmp,
+    }
+    providers = [name for name, has_key in configured.items() if has_key]
+    health = provider_health.snapshot(providers, {name: probes[name] for name in providers if name in probes})
+    for name, has_key in configured.items():
+        if not has_key:
+            health[name] = {'active': False, 'source': 'not_configured'}
+
+    # yfinance läuft als separater Service: Health = Frische von yfinance_quotes
+    yf_payload = _redis_json_get('yfinance_quotes') or {}
+    yf_age = None
     try:
-        if api_name == 'finnhub' and FINNHUB_API_KEY:
-            response = requests.get(f'https://finnhub.io/api/v1/quote?symbol=AAPL&token={FINNHUB_API_KEY}', timeout=5)
-            return response.status_code == 200
-        
-        elif api_name == 'alpaca' and ALPACA_API_KEY:
-            headers = {'APCA-API-KEY-ID': ALPACA_API_KEY, 'APCA-API-SECRET-KEY': ALPACA_SECRET}
-            response = requests.get('https://paper-api.alpaca.markets/v2/account', headers=headers, timeout=5)
-            return response.status_code == 200
-            
-        elif api_name == 'grok' and GROK_API_KEY:
-            # Simple health check for Grok API
-            return bool(GROK_API_KEY)
-            
-        elif api_name == 'yfinance':
-            # Test yfinance with a simple quote
-            import yfinance as yf
-            ticker = yf.Ticker("AAPL")
-            info = ticker.info
-            return bool(info.get('regularMarketPrice'))
-            
-        elif api_name == 'twelvedata':
-            if not TWELVE_DATA_API_KEY:
-                return False
-            response = requests.get(f'https://api.twelvedata.com/time_series?symbol=AAPL&interval=1min&outputsize=1&apikey={TWELVE_DATA_API_KEY}', timeout=5)
-            return response.status_code == 200
-            
-        elif api_name == 'fmp' and FMP_API_KEY:
-            # Test Financial Modeling Prep API
-            response = requests.get(f'https://financialmodelingprep.com/api/v3/quote/AAPL?apikey={FMP_API_KEY}', timeout=5)
-            return response.status_code == 200
-            
-        elif api_name == 'marketstack' and MARKETSTACK_API_KEY:
-            # Test Marketstack API
-            response = requests.get(f'http://api.marketstack.com/v1/eod/latest?access_key={MARKETSTACK_API_KEY}&symbols=AAPL', timeout=5)
-            return response.status_code == 200
-            
-    except Exception as e:
-        logging.debug(f"API health check failed for {api_name}: {e}")
-        return False
-    
-    return False
+        yf_age = (datetime.utcnow() - datetime.fromisoformat(str(yf_payload.get('time', '')).replace('Z', ''))).total_seconds()
+    except Exception:
+        pass
+    health['yfinance'] = {
+        'active': yf_age is not None and yf_age <= provider_health.idle_seconds,
+        'idle_seconds': round(yf_age, 1) if yf_age is not None else None,
+        'source': 'yfinance_quotes',
+    }
+
+    _redis_json_set(PROVIDER_HEALTH_KEY, {'time': datetime.utcnow().isoformat(), 'providers': health})
+    return health
 
 def update_trading_status(active=None, error=None, next_run=None):
     """Update trading_status with proper backend.txt compliance"""
@@ -459,6 +523,7 @@ def update_trading_status(active=None, error=None, next_run=None):
         status['worker_pid'] = os.getpid()
         
         _redis_json_set('trading_status', status)
+        publish_event(r, 'trading', 'status', status)
         
     except Exception as e:
         logging.error(f"Trading status update failed: {e}")
@@ -488,7 +553,7 @@ def check_risk_limits():
         logging.error(f"Risk limit check failed: {e}")
         return False  # Fail safe
 
-def record_deviation(ticker, predicted, actual, horizon_minutes, ts_pred, ts_actual):
+def record_deviation(ticker, predicted, actual, horizon_minutes, ts_pred, ts_actual, route=None):
     deviation = None
     if actual and actual != 0:
         deviation = abs(predicted - actual) / actual
@@ -500,7 +565,8 @@ def record_deviation(ticker, predicted, actual, horizon_minutes, ts_pred, ts_act
         'deviation': deviation,
         'horizon_minutes': horizon_minutes,
         'prediction_time': ts_pred,
-        'actual_time': ts_actual
+        'actual_time': ts_actual,
+        'route': route
     })
     # Keep last 500 records
     if len(tracker) > 500:
@@ -508,8 +574,95 @@ def record_deviation(ticker, predicted, actual, horizon_minutes, ts_pred, ts_act
     _redis_json_set('deviation_tracker', tracker)
     return deviation
 
+def update_intraday_summary(quotes):
+    """Pflegt die Intraday-Zusammenfassung pro Ticker inkrementell (wird von fetch_data gespeist).
+
+    quotes: {ticker: {'price': float, 'high': float|None, 'low': float|None}}
+
+    Redis Keys (UTC-Tag, TTL 3 Tage):
+    - intraday:summary:{YYYY-MM-DD}  Hash ticker -> JSON {open, last, high, low, change_percent, time}
+    - intraday:movers:{YYYY-MM-DD}   Sorted Set ticker -> change_percent (Basis für /market/top-movers)
+    """
+    if not quotes:
+        return 0
+    day = datetime.utcnow().date().isoformat()
+    summary_key = f'intraday:summary:{day}'
+    movers_key = f'intraday:movers:{day}'
+    tickers = list(quotes.keys())
+    now_iso = datetime.utcnow().isoformat()
+    try:
+        existing = r.hmget(summary_key, tickers)
+    except Exception as e:
+        logging.warning(f"Intraday summary read failed: {e}")
+        return 0
+    pipe = r.pipeline(transaction=False)
+    for ticker, raw in zip(tickers, existing):
+        quote = quotes[ticker]
+        price = float(quote['price'])
+        high_p = quote.get('high') if isinstance(quote.get('high'), (int, float)) else price
+        low_p = quote.get('low') if isinstance(quote.get('low'), (int, float)) else price
+        prev = None
+        if raw:
+            try:
+                prev = json.loads(raw)
+            except Exception:
+                prev = None
+        if prev:
+            open_p = prev.get('open') or price
+            high_p = max(prev.get('high') or high_p, high_p, price)
+            low_p = min(prev.get('low') or low_p, low_p, price)
+        else:
+            open_p = price
+            high_p = max(high_p, price)
+            low_p = min(low_p, price)
+        change_pct = (price - open_p) / open_p * 100 if open_p else 0.0
+        pipe.hset(summary_key, ticker, json.dumps({
+            'open': open_p,
+            'last': price,
+            'high': high_p,
+            'low': low_p,
+            'change_percent': change_pct,
+            'time': now_iso
+        }))
+        pipe.zadd(movers_key, {ticker: change_pct})
+    pipe.expire(summary_key, 3 * 86400)
+    pipe.expire(movers_key, 3 * 86400)
+    try:
+        pipe.execute()
+    except Exception as e:
+        logging.warning(f"Intraday summary update failed: {e}")
+        return 0
+    return len(tickers)
+
+# Predictoren aus der Model Registry; bleiben im Worker-Prozess geladen, bis sich der current Pointer ändert
+_predictor_cache = model_registry.PredictorCache()
+# Ticker-Modelle des SequentialTrainer: begrenzter LRU (INFERENCE_MAX_LOADED_MODELS)
+_inference_router = inference_router.InferenceRouter()
+MODEL_HORIZONS = ('15', '30', '60')
+
+
+def load_horizon_predictors(scope: str = model_registry.GLOBAL_SCOPE, horizons=MODEL_HORIZONS):
+    """horizon -> Predictor der aktuellen Registry-Version; ohne Registry-Pointer (Altbestand)
+    Fallback auf die Pfade in model_paths_multi."""
+    predictors = {hz: entry['predictor'] for hz, entry in _predictor_cache.load(r, scope, horizons).items()}
+    if predictors or scope != model_registry.GLOBAL_SCOPE:
+        return predictors
+    from autogluon.tabular import TabularPredictor
+    for hz, path in (_redis_json_get('model_paths_multi', {}) or {}).items():
+        try:
+            if os.path.isdir(path):
+                predictors[hz] = TabularPredictor.load(path)
+        except Exception as e:
+            logging.error(f"Could not load predictor horizon {hz}: {e}")
+    return predictors
+
+
 def load_predictor():
     try:
+        predictor = load_horizon_predictors(horizons=('60',)).get('60')
+        if predictor is not None:
+            return predictor
+        from autogluon.tabular import TabularPredictor
         model_path = _redis_json_get('model_path') or './autogluon_model'
         if not os.path.isdir(model_path):
             return None
@@ -521,6 +674,7 @@ def load_predictor():
 ## Entfernt: Doppelter Alt-Block (Initialisierung) – vereinfacht auf oberen Abschnitt
 
 @app.task
+@pipeline_stage(r, STAGE_INGEST)
 def fetch_data():
     """Enhanced Multi-API Data Fetching: TwelveData -> Finnhub -> FMP -> Marketstack -> YFinance.
 
@@ -533,69 +687,24 @@ def fetch_data():
     
     Features:
     - Per-Ticker Logging (Redis Key: market_fetch_log, FIFO 400 Einträge)
-    - Multi-Source Statistics (Redis Key: market_source_stats)
-    - Intelligent Fallback Chain
+    - Multi-Source Statistics (Redis Key: market_source_stats, inkl. Circuit Breaker Zustand)
+    - Fallback Chain sortiert nach Erfolgsquote/Latenz/Quota, stoppt bei QUOTE_TARGET_SOURCES Quellen;
+      Provider mit offenem Circuit Breaker werden für den Rest des Zyklus übersprungen
+    - Multi-Symbol Batches pro Provider (quote_providers.py): FMP 50, Marketstack 100, TwelveData 8 Symbole/Call
+    - Kanonischer Record pro Ticker (quote_ingest.py, Redis Key market_quotes); market_data und
+      multi_api_enhanced_data/_stats werden daraus abgeleitet (ersetzt multi_api_enhanced_service)
     """
     data = _redis_json_get('market_data', {}) or {}
-    cur = conn.cursor()
+    previous_prices = {t: v.get('price') for t, v in data.items() if isinstance(v, dict)}
     tickers = get_dynamic_tickers()
+    intraday_quotes = {}
+    candle_rows = []
     fetch_log = _redis_json_get('market_fetch_log', []) or []
-    stats = {'finnhub': 0, 'twelvedata': 0, 'fmp': 0, 'marketstack': 0, 'alphavantage': 0, 'yfinance': 0, 'stub': 0, 'failed': 0}
+    stats = {'finnhub': 0, 'twelvedata': 0, 'fmp': 0, 'marketstack': 0, 'alphavantage': 0, 'yfinance': 0, 'stub': 0, 'failed': 0, 'circuit_skipped': 0}
     
-    # API Keys
-    td_key = TWELVE_DATA_API_KEY
-    fh_key = FINNHUB_API_KEY
-    fmp_key = FMP_API_KEY
-    ms_key = MARKETSTACK_API_KEY
-    av_key = ALPHAVANTAGE_API_KEY
     allow_stub = os.getenv('PRICE_STUB_ENABLED','0') == '1'
     import random
 
-    # TwelveData Batch-Abruf - Respektiere 8 calls/minute limit
-    fetch_data.twelvedata_batch_cache = {}
-    if td_key and tickers:
-        try:
-            # Split tickers into batches of 8 to respect 8 calls/minute limit
-            batch_size = 8
-            ticker_batches = [tickers[i:i+batch_size] for i in range(0, len(tickers), batch_size)]
-            
-            for batch_idx, ticker_batch in enumerate(ticker_batches):
-                # Use time_series endpoint with outputsize=1 for latest price
-                batch_symbols = ','.join(ticker_batch)
-                url = f'https://api.twelvedata.com/time_series?symbol={batch_symbols}&interval=1min&outputsize=1&apikey={td_key}'
-                
-                logging.info(f"TwelveData batch {batch_idx+1}/{len(ticker_batches)}: {len(ticker_batch)} symbols")
-                resp = requests.get(url, timeout=15)
-                
-                if resp.status_code == 200:
-                    batch_data = resp.json()
-                    
-                    if isinstance(batch_data, dict):
-                        # Handle both single and multiple ticker responses
-                        if len(ticker_batch) == 1 and 'values' in batch_data:
-                            # Single ticker response - direct format
-                            fetch_data.twelvedata_batch_cache[ticker_batch[0]] = batch_data
-                            stats['twelvedata'] += 1
-                        else:
-                            # Multiple ticker response - ticker as keys
-                            for ticker in ticker_batch:
-                                if ticker in batch_data and isinstance(batch_data[ticker], dict):
-                                    if batch_data[ticker].get('status') == 'ok':
-                                        fetch_data.twelvedata_batch_cache[ticker] = batch_data[ticker]
-                                        stats['twelvedata'] += 1
-                                
-                    logging.info(f"TwelveData batch {batch_idx+1} cached {len([t for t in ticker_batch if t in fetch_data.twelvedata_batch_cache])} tickers")
-                else:
-                    logging.warning(f"TwelveData batch {batch_idx+1} failed: HTTP {resp.status_code}")
-                    
-                # Add delay between batches to respect rate limits (only if more batches follow)
-                if batch_idx < len(ticker_batches) - 1:
-                    import time
-                    time.sleep(8)  # Wait 8 seconds between batches to stay under 8/minute limit
-                    
-        except Exception as e:
-            logging.warning(f"TwelveData batch failed: {e}")
-
     def append_log(ticker, source, status, note=None):
         fetch_log.append({
             'time': datetime.utcnow().isoformat(),
@@ -607,173 +716,36 @@ def fetch_data():
         if len(fetch_log) > 400:
             del fetch_log[:len(fetch_log)-400]
 
+    readings_by_ticker = {ticker: [] for ticker in tickers}  # list of dicts {source, price, open, high, low, change, change_pct, volume}
+
     # YFinance Preise aus separatem Service (optional)
     yfinance_payload = _redis_json_get('yfinance_quotes') or {}
     yf_prices = yfinance_payload.get('prices', {}) if isinstance(yfinance_payload, dict) else {}
-
     for ticker in tickers:
-        readings = []  # list of dicts {source, price, open, high, low, change, change_pct, volume}
         # Falls YFinance Preis vorhanden -> als zusätzliche Reading (niedrige Priorität für open/high/low, da nur Close vorhanden)
         if ticker in yf_prices:
             try:
                 prc = float(yf_prices[ticker])
-                readings.append({'source':'yfinance','price':prc,'open':prc,'high':prc,'low':prc,'change':None,'change_pct':None,'volume':0})
+                readings_by_ticker[ticker].append({'source':'yfinance','price':prc,'open':prc,'high':prc,'low':prc,'change':None,'change_pct':None,'volume':0})
                 stats['yfinance'] += 1; append_log(ticker,'yfinance','ok')
             except Exception:
                 append_log(ticker,'yfinance','parse_error')
-                
-        # Marketstack API - EOD Historical Data (als Fallback für bessere Abdeckung)
-        if MARKETSTACK_API_KEY and len(readings) == 0:  # Nur wenn noch keine anderen Quellen
-            try:
-                url = f'http://api.marketstack.com/v1/eod/latest?access_key={MARKETSTACK_API_KEY}&symbols={ticker}'
-                resp = requests.get(url, timeout=10)
-                
-                if resp.status_code == 200:
-                    ms_data = resp.json()
-                    if ms_data.get('data') and len(ms_data['data']) > 0:
-                        eod = ms_data['data'][0]
-                        close_price = eod.get('close')
-                        if close_price:
-                            readings.append({
-                                'source': 'marketstack',
-                                'price': float(close_price),
-                                'open': float(eod.get('open', close_price)),
-                                'high': float(eod.get('high', close_price)),
-                                'low': float(eod.get('low', close_price)),
-                                'change': None,
-                                'change_pct': None,
-                                'volume': int(eod.get('volume', 0))
-                            })
-                            stats['marketstack'] += 1
-                            append_log(ticker, 'marketstack', 'ok', 'EOD data')
-                else:
-                    append_log(ticker, 'marketstack', f'http_{resp.status_code}')
-            except Exception as e:
-                append_log(ticker, 'marketstack', 'exception', str(e)[:100])
-        
-        # AlphaVantage - TIME_SERIES_INTRADAY für 15min bars (wenn keine anderen Quellen erfolgreich)
-        if ALPHAVANTAGE_API_KEY and len(readings) == 0:
-            try:
-                # Free tier: 5 calls/minute, 25 calls/day
-                # TIME_SERIES_INTRADAY endpoint mit 15min interval
-                url = f'https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={ticker}&interval=15min&apikey={ALPHAVANTAGE_API_KEY}'
-                resp = requests.get(url, timeout=10)
-                
-                if resp.status_code == 200:
-                    av_data = resp.json()
-                    
-                    # Prüfen ob Rate Limit erreicht (message in response)
-                    if 'Note' in av_data or 'Information' in av_data:
-                        append_log(ticker, 'alphavantage', 'rate_limit', av_data.get('Note', av_data.get('Information', ''))[:100])
-                    elif 'Time Series (15min)' in av_data:
-                        time_series = av_data['Time Series (15min)']
-                        # Neueste Candle verwenden
-                        latest_time = sorted(time_series.keys(), reverse=True)[0]
-                        latest_bar = time_series[latest_time]
-                        
-                        close_price = float(latest_bar.get('4. close'))
-                        if close_price:
-                            readings.append({
-                                'source': 'alphavantage',
-                                'price': close_price,
-                                'open': float(latest_bar.get('1. open', close_price)),
-                                'high': float(latest_bar.get('2. high', close_price)),
-                                'low': float(latest_bar.get('3. low', close_price)),
-                                'change': None,
-                                'change_pct': None,
-                                'volume': int(latest_bar.get('5. volume', 0))
-                            })
-                            stats['alphavantage'] += 1
-                            append_log(ticker, 'alphavantage', 'ok', f'15min bar from {latest_time}')
-                    else:
-                        append_log(ticker, 'alphavantage', 'empty', 'no time series data')
-                else:
-                    append_log(ticker, 'alphavantage', f'http_{resp.status_code}')
-            except Exception as e:
-                append_log(ticker, 'alphavantage', 'exception', str(e)[:100])
-                
-        # Finnhub
-        try:
-            if FINNHUB_API_KEY:
-                url = f'https://finnhub.io/api/v1/quote?symbol={ticker}&token={FINNHUB_API_KEY}'
-                resp = requests.get(url, timeout=10)
-                if resp.status_code == 200:
-                    js = resp.json()
-                    c = js.get('c')
-                    if c not in (None, 0):
-                        readings.append({'source':'finnhub','price':c,'open':js.get('o'),'high':js.get('h'), 'low':js.get('l'), 'change':js.get('d'), 'change_pct':js.get('dp'), 'volume': js.get('v') or 0})
-                        stats['finnhub'] += 1; append_log(ticker,'finnhub','ok')
-                    else:
-                        append_log(ticker,'finnhub','empty','no current price')
-                else:
-                    append_log(ticker,'finnhub','http_error',f"{resp.status_code}")
-        except Exception as e:
-            append_log(ticker,'finnhub','exception',str(e))
-        # TwelveData - bereits in Batch-Modus integriert (siehe twelvedata_batch_cache)
-        if td_key and ticker in getattr(fetch_data, 'twelvedata_batch_cache', {}):
-            batch_data = fetch_data.twelvedata_batch_cache[ticker]
-            
-            # Handle time_series response format
-            price = None
-            if 'values' in batch_data and batch_data['values']:
-                latest = batch_data['values'][0]
-                price = float(latest.get('close', 0))
-                
-                # Extract additional data from time_series format
-                try:
-                    readings.append({
-                        'source': 'twelvedata',
-                        'price': price,
-                        'open': float(latest.get('open', 0)),
-                        'high': float(latest.get('high', 0)),
-                        'low': float(latest.get('low', 0)),
-                        'volume': int(latest.get('volume', 0))
-                    })
-                    stats['twelvedata'] += 1
-                    append_log(ticker, 'twelvedata', 'ok')
-                except Exception as e:
-                    append_log(ticker, 'twelvedata', 'parse_error', f'time_series parse fail: {e}')
-                    
-            elif batch_data.get('price'):
-                # Fallback for quote format
-                try:
-                    price = float(batch_data['price'])
-                    readings.append({
-                        'source': 'twelvedata',
-                        'price': price,
-                        'open': batch_data.get('open'),
-                        'high': batch_data.get('high'),
-                        'low': batch_data.get('low'),
-                        'change': batch_data.get('change'),
-                        'change_pct': batch_data.get('percent_change'),
-                        'volume': batch_data.get('volume') or 0
-                    })
-                    stats['twelvedata'] += 1
-                    append_log(ticker, 'twelvedata', 'ok')
-                except Exception as e:
-                    append_log(ticker, 'twelvedata', 'parse_error', f'price parse fail: {e}')
-            else:
-                append_log(ticker, 'twelvedata', 'empty')
-        # FMP
-        if fmp_key:
-            try:
-                url = f'https://financialmodelingprep.com/api/v3/quote-short/{ticker}?apikey={fmp_key}'
-                resp = requests.get(url, timeout=10)
-                if resp.status_code == 200:
-                    arr = resp.json() if resp.content else []
-                    if isinstance(arr, list) and arr:
-                        p = arr[0].get('price')
-                        if p not in (None,0):
-                            readings.append({'source':'fmp','price':p,'open':p,'high':p,'low':p,'change':None,'change_pct':None,'volume': arr[0].get('volume') or 0})
-                            stats['fmp'] += 1; append_log(ticker,'fmp','ok')
-                        else:
-                            append_log(ticker,'fmp','empty')
-                    else:
-                        append_log(ticker,'fmp','empty')
-                else:
-                    append_log(ticker,'fmp','http_error',f"{resp.status_code}")
-            except Exception as e:
-                append_log(ticker,'fmp','exception',str(e))
+
+    # Batch-Kette (quote_ingest.py): jedes (Provider, Symbol) höchstens einmal pro Zyklus, Provider sortiert nach
+    # Erfolgsquote/Latenz/Quota; offene Breaker fehlen in provider_order
+    ranked = provider_health.rank([name for name in QUOTE_CHAIN_PROVIDERS if name in quote_providers])
+    provider_order = sorted(ranked, key=lambda name: quote_providers[name].fallback_only)
+    provider_results = collect_readings(tickers, quote_providers, provider_order, readings_by_ticker,
+                                        QUOTE_TARGET_SOURCES, log=append_log)
+    for name, counts in provider_results.items():
+        stats[name] += counts['ok']
+        stats['circuit_skipped'] += counts['circuit_skipped']
+        logging.info(f"{name}: {counts['ok']} quotes in {counts['calls']} calls")
+
+    records = {}
+    now = datetime.utcnow()
+    for ticker in tickers:
+        readings = readings_by_ticker[ticker]
         # Stub zusätzlich (nur falls keine echte Quelle oder explizit zur Diversifizierung?)
         if allow_stub and not readings:
             prev = data.get(ticker, {}).get('price')
@@ -786,48 +758,52 @@ def fetch_data():
         if not readings:
             stats['failed'] += 1; append_log(ticker,'none','failed_all')
             continue
-        # Aggregation: Median Preis
-        import statistics
-        prices = [r['price'] for r in readings if r.get('price') is not None]
-        if not prices:
+        # Kanonischer Record: Median Preis, OHLC aus Primärquelle (Finnhub > TwelveData > FMP > ...), Detail pro Quelle
+        record = build_record(readings, now)
+        if record is None:
             stats['failed'] += 1; append_log(ticker,'aggregate','failed_all','no numeric prices')
             continue
-        agg_price = statistics.median(prices)
-        # Referenz für open/high/low: aus erster bevorzugten Quelle (Finnhub > TwelveData > FMP > Stub)
-        priority_order = ['finnhub','twelvedata','fmp','stub']
-        primary = None
-        for psrc in priority_order:
-            primary = next((r for r in readings if r['source']==psrc), None)
-            if primary: break
-        open_p = primary.get('open'); high_p = primary.get('high'); low_p = primary.get('low'); vol = primary.get('volume')
-        # Abweichungsmetrik
-        deviations = []
-        for r_ in readings:
-            try:
-                deviations.append({'source': r_['source'], 'delta_pct': (r_['price']-agg_price)/agg_price if agg_price else 0})
-            except Exception:
-                pass
-        data[ticker] = {
-            'price': agg_price,
-            'change': primary.get('change'),
-            'change_percent': primary.get('change_pct'),
-            'time': datetime.utcnow().isoformat(),
-            'sources_used': [r_['source'] for r_ in readings],
-            'source_deviation': deviations
-        }
+        records[ticker] = record
+        data[ticker] = to_market_data(record)
+        intraday_quotes[ticker] = {'price': record['price'], 'high': record['high'], 'low': record['low']}
+        candle_rows.append((ticker, record['open'], record['high'], record['low'], record['price'], record['volume'] or 0))
+    # Connection erst nach den API-Calls auschecken: ein Batch-Insert in einer Transaktion
+    insert_error = None
+    if candle_rows:
         try:
-            # ON CONFLICT schützt vor Duplicate-Key (time,ticker) wenn mehrere fetch_data Läufe denselben 15m Slot treffen
-            cur.execute("""
-                INSERT INTO market_data (time, ticker, open, high, low, close, volume)
-                VALUES (NOW(), %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (time, ticker) DO NOTHING
-            """, (ticker, open_p, high_p, low_p, agg_price, vol or 0))
+            with transaction() as cur:
+                # ON CONFLICT schützt vor Duplicate-Key (time,ticker) wenn mehrere fetch_data Läufe denselben 15m Slot treffen
+                execute_values(cur, """
+                    INSERT INTO market_data (time, ticker, open, high, low, close, volume)
+                    VALUES %s
+                    ON CONFLICT (time, ticker) DO NOTHING
+                """, candle_rows, template="(NOW(), %s, %s, %s, %s, %s, %s)")
         except Exception as e:
-            logging.warning(f"Insert realtime candle {ticker} failed: {e}")
-    conn.commit()
+            logging.warning(f"Insert realtime candles ({len(candle_rows)}) failed: {e}")
+            insert_error = e
+    bump_data_version(r, SCOPE_MARKET)
+    _redis_json_set(CANONICAL_QUOTES_KEY, records)
     _redis_json_set('market_data', data)
+    # Kompatibilität: früher eigener Poller (multi_api_enhanced_service), jetzt aus denselben Records abgeleitet
+    _redis_json_set(ENHANCED_DATA_KEY, {t: to_enhanced(rec) for t, rec in records.items()})
+    _redis_json_set(ENHANCED_STATS_KEY, enhanced_stats(records, tickers, provider_results))
+    update_intraday_summary(intraday_quotes)
+    changed_quotes = {t: data[t] for t in intraday_quotes if data[t]['price'] != previous_prices.get(t)}
+    if changed_quotes:
+        publish_event(r, 'market', 'quotes', changed_quotes)
     _redis_json_set('market_fetch_log', fetch_log)
-    _redis_json_set('market_source_stats', {'time': datetime.utcnow().isoformat(), **stats})
+    _redis_json_set('market_source_stats', {
+        'time': datetime.utcnow().isoformat(),
+        **stats,
+        'provider_order': provider_order,
+        'api_calls': {name: counts['calls'] for name, counts in provider_results.items()},
+        'breakers': provider_health.breaker_states(list(quote_providers)),
+    })
+    # Redis ist aktualisiert; ohne Quotes bzw. neue Candles würde predict auf veralteten Daten laufen
+    if tickers and not records:
+        raise StageError(f"fetch_data: keine Quotes für {len(tickers)} Ticker")
+    if insert_error is not None:
+        raise StageError(f"fetch_data: Candles nicht gespeichert: {insert_error}") from insert_error
     return {'tickers': len(tickers), 'stats': stats}
     
 @app.task
@@ -840,7 +816,7 @@ def fetch_portfolio():
     try:
         # Portfolio-Positionen
         pos_url = 'https://paper-api.alpaca.markets/v2/positions'
-        pos_resp = requests.get(pos_url, headers=headers, timeout=30)
+        pos_resp = _http_get(pos_url, headers=headers, timeout=30)
         positions = pos_resp.json() if pos_resp.status_code == 200 else []
         
         # Transform to backend.txt format
@@ -860,54 +836,42 @@ def fetch_portfolio():
         
         # Legacy storage for backward compatibility
         r.set('portfolio_positions_raw', json.dumps(positions))
+        update_frontend_feedback()
         
-        cur = conn.cursor()
-        
-        # Insert into portfolio_positions (summary table)
-        for pos in positions:
-            cur.execute("""
-                INSERT INTO portfolio_positions (ticker, qty, avg_price, side)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (ticker) DO UPDATE SET qty=EXCLUDED.qty, avg_price=EXCLUDED.avg_price, side=EXCLUDED.side
-            """, (pos.get('symbol'), pos.get('qty'), pos.get('avg_entry_price'), pos.get('side')))
-        
-        # Insert into alpaca_positions (hypertable for ML training data)
+        # Portfolio-Equity
+        acct_url = 'https://paper-api.alpaca.markets/v2/account'
+        acct_resp = _http_get(acct_url, headers=headers, timeout=30)
+        account_data = acct_resp.json() if acct_resp.status_code == 200 else {}
+        equity = account_data.get('equity')
+
+        # Zeilen vorab aufbereiten: ungültige Positionen überspringen, bevor sie die gemeinsame
+        # Transaktion abbrechen (ein fehlerhafter Batch-Wert würde alle Writes des Laufs verwerfen)
+        summary_rows = {}  # ticker -> Zeile; doppelte Symbole brechen ON CONFLICT DO UPDATE ab
+        position_rows = []
         for pos in positions:
             try:
-                cur.execute("""
-                    INSERT INTO alpaca_positions (
-                        time, symbol, qty, avg_entry_price, market_value, 
-                        unrealized_pl, unrealized_pl_pct
-                    )
-                    VALUES (NOW(), %s, %s, %s, %s, %s, %s)
-                """, (
-                    pos.get('symbol'),
-                    int(float(pos.get('qty', 0))),
-                    float(pos.get('avg_entry_price', 0)),
+                symbol = pos.get('symbol')
+                if not symbol:
+                    raise ValueError('missing symbol')
+                qty = float(pos.get('qty', 0))
+                avg_entry_price = float(pos.get('avg_entry_price', 0))
+                row = (
+                    symbol,
+                    int(qty),
+                    avg_entry_price,
                     float(pos.get('market_value', 0)),
                     float(pos.get('unrealized_pl', 0)),
                     float(pos.get('unrealized_plpc', 0))
-                ))
-            except Exception as e:
-                logging.warning(f"Insert alpaca_positions {pos.get('symbol')} failed: {e}")
-            
-        # Portfolio-Equity
-        acct_url = 'https://paper-api.alpaca.markets/v2/account'
-        acct_resp = requests.get(acct_url, headers=headers, timeout=30)
-        account_data = acct_resp.json() if acct_resp.status_code == 200 else {}
-        equity = account_data.get('equity')
-        
-        # Insert into alpaca_account (hypertable for account history)
+                )
+            except (TypeError, ValueError) as e:
+                logging.warning(f"Skipping invalid alpaca position {pos.get('symbol')}: {e}")
+                continue
+            summary_rows[symbol] = (symbol, int(qty), avg_entry_price, pos.get('side') or 'long')
+            position_rows.append(row)
+        account_row = None
         if account_data:
             try:
-                cur.execute("""
-                    INSERT INTO alpaca_account (
-                        time, portfolio_value, buying_power, equity, 
-                        day_trade_buying_power, daytrade_count, 
-                        trading_blocked, account_blocked, pattern_day_trader
-                    )
-                    VALUES (NOW(), %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
+                account_row = (
                     float(account_data.get('portfolio_value', 0)),
                     float(account_data.get('buying_power', 0)),
                     float(account_data.get('equity', 0)),
@@ -916,18 +880,53 @@ def fetch_portfolio():
                     account_data.get('trading_blocked', False),
                     account_data.get('account_blocked', False),
                     account_data.get('pattern_day_trader', False)
-                ))
-            except Exception as e:
-                logging.warning(f"Insert alpaca_account failed: {e}")
-        
+                )
+            except (TypeError, ValueError) as e:
+                logging.warning(f"Skipping invalid alpaca account data: {e}")
+        try:
+            equity_value = float(equity) if equity is not None else None
+        except (TypeError, ValueError):
+            logging.warning(f"Skipping invalid equity value: {equity!r}")
+            equity_value = None
+
+        # Alle Writes eines Laufs in einer Transaktion
+        with transaction() as cur:
+            if summary_rows:
+                # Insert into portfolio_positions (summary table)
+                execute_values(cur, """
+                    INSERT INTO portfolio_positions (ticker, qty, avg_price, side)
+                    VALUES %s
+                    ON CONFLICT (ticker) DO UPDATE SET qty=EXCLUDED.qty, avg_price=EXCLUDED.avg_price, side=EXCLUDED.side
+                """, list(summary_rows.values()))
+            if position_rows:
+                # Insert into alpaca_positions (hypertable for ML training data)
+                execute_values(cur, """
+                    INSERT INTO alpaca_positions (
+                        time, symbol, qty, avg_entry_price, market_value,
+                        unrealized_pl, unrealized_pl_pct
+                    )
+                    VALUES %s
+                """, position_rows, template="(NOW(), %s, %s, %s, %s, %s, %s)")
+            if account_row:
+                # Insert into alpaca_account (hypertable for account history)
+                cur.execute("""
+                    INSERT INTO alpaca_account (
+                        time, portfolio_value, buying_power, equity,
+                        day_trade_buying_power, daytrade_count,
+                        trading_blocked, account_blocked, pattern_day_trader
+                    )
+                    VALUES (NOW(), %s, %s, %s, %s, %s, %s, %s, %s)
+                """, account_row)
+            if equity_value is not None:
+                cur.execute("""
+                    INSERT INTO portfolio_equity (time, equity_value)
+                    VALUES (NOW(), %s)
+                """, (equity_value,))
+
         if equity:
             r.set('portfolio_equity', json.dumps([{'timestamp': datetime.now().isoformat(), 'equity_value': equity}]))
-            cur.execute("""
-                INSERT INTO portfolio_equity (time, equity_value)
-                VALUES (NOW(), %s)
-            """, (equity,))
-            
-        conn.commit()
+        if equity:
+            bump_data_version(r, SCOPE_PORTFOLIO)
         logging.info(f"Portfolio fetched: {len(portfolio_positions)} positions, equity: ${equity}")
         
         return {
@@ -943,14 +942,168 @@ def fetch_portfolio():
         system_status['alpaca_api_active'] = False
         _redis_json_set('system_status', system_status)
         return None
-    conn.commit()
-    
-    # Store in Redis als JSON
-    r.set('market_data', json.dumps(data))
-    return data
 
     
 
+ALPACA_ORDERS_SYNC_KEY = 'alpaca_orders_sync'
+ALPACA_ORDERS_PAGE_SIZE = 500
+ALPACA_OPEN_ORDER_STATUSES = ('new', 'accepted', 'pending_new', 'partially_filled', 'accepted_for_bidding',
+                              'pending_cancel', 'pending_replace', 'held', 'calculated')
+ALPACA_ORDERS_PAGE_OVERLAP = timedelta(seconds=1)  # 'after' ist exklusiv -> Seitengrenze überlappen
+
+def _parse_alpaca_ts(value):
+    """Alpaca/ISO Zeitstempel -> tz-aware UTC datetime (Alpaca liefert Nanosekunden)."""
+    if not value:
+        return None
+    value = value.replace('Z', '+00:00')
+    if '.' in value:
+        head, frac = value.split('.', 1)
+        digits = len(frac) - len(frac.lstrip('0123456789'))
+        value = f"{head}.{frac[:min(digits, 6)]}{frac[digits:]}"
+    return _to_utc(datetime.fromisoformat(value))
+
+def _to_utc(dt):
+    """tz-aware UTC; naive Werte (alte Redis-Cursor) gelten als UTC."""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=pytz.utc)
+    return dt.astimezone(pytz.utc)
+
+def _alpaca_ts(dt):
+    return dt.astimezone(pytz.utc).isoformat().replace('+00:00', 'Z')
+
+@app.task
+def sync_alpaca_orders(initial_days: int = 90):
+    """Inkrementeller Sync der Alpaca Order-Historie in die Tabelle alpaca_orders.
+
+    - Cursor (submitted_at der neuesten bekannten Order) liegt in Redis alpaca_orders_sync
+    - Fenster startet beim älteren von Cursor und ältester noch offener Order, damit
+      Statuswechsel (new -> filled) nachgezogen werden; Ende fix auf 'until' = Start des Laufs
+    - Seiten aufsteigend mit after/until, Upsert pro Seite -> API-Calls skalieren mit neuen Orders
+    - 'after' ist bei Alpaca exklusiv: Seitengrenzen überlappen um ALPACA_ORDERS_PAGE_OVERLAP,
+      damit Orders mit gleichem submitted_at nicht verloren gehen; Dedupe über die Order-ID
+    - Alle Zeitstempel tz-aware UTC (TIMESTAMPTZ unabhängig von der Session-Zeitzone)
+    """
+    headers = {
+        'APCA-API-KEY-ID': ALPACA_API_KEY,
+        'APCA-API-SECRET-KEY': ALPACA_SECRET
+    }
+    sync_state = _redis_json_get(ALPACA_ORDERS_SYNC_KEY, {}) or {}
+    until = datetime.now(pytz.utc).replace(microsecond=0)
+
+    cursor = _parse_alpaca_ts(sync_state.get('cursor'))
+    after = cursor - ALPACA_ORDERS_PAGE_OVERLAP if cursor else None
+    try:
+        with db_cursor() as cur:
+            cur.execute("SELECT MIN(submitted_at) FROM alpaca_orders WHERE status = ANY(%s)", (list(ALPACA_OPEN_ORDER_STATUSES),))
+            oldest_open = _to_utc(cur.fetchone()[0])
+    except Exception as e:
+        logging.warning(f"alpaca_orders open lookup failed: {e}")
+        oldest_open = None
+    if oldest_open and (after is None or oldest_open < after):
+        # exklusives 'after' -> knapp vor der offenen Order starten
+        after = oldest_open - timedelta(microseconds=1)
+    if after is None:
+        after = until - timedelta(days=initial_days)
+    after_str = _alpaca_ts(after)
+
+    api_calls = 0
+    fetched = 0
+    newest = cursor
+    page_after = after
+    seen_ids = set()
+    try:
+        while True:
+            resp = _http_get(
+                'https://paper-api.alpaca.markets/v2/orders',
+                headers=headers,
+                params={
+                    'status': 'all',
+                    'direction': 'asc',
+                    'limit': ALPACA_ORDERS_PAGE_SIZE,
+                    'after': _alpaca_ts(page_after),
+                    'until': _alpaca_ts(until),
+                    'nested': 'false'
+                },
+                timeout=30
+            )
+            api_calls += 1
+            if resp.status_code != 200:
+                logging.warning(f"Alpaca orders sync HTTP {resp.status_code}: {resp.text[:120]}")
+                break
+            orders = resp.json() or []
+            if not orders:
+                break
+
+            rows = []
+            for o in orders:
+                # Überlappung der Seitengrenze: bereits geschriebene Orders nicht erneut upserten
+                if not o.get('id') or o['id'] in seen_ids:
+                    continue
+                seen_ids.add(o['id'])
+                rows.append((
+                    o.get('id'),
+                    o.get('symbol'),
+                    o.get('side'),
+                    float(o.get('qty') or 0),  # fractional/notional Orders: Bruchteile behalten
+                    float(o.get('filled_qty') or 0),
+                    float(o['filled_avg_price']) if o.get('filled_avg_price') else None,
+                    o.get('status'),
+                    o.get('type') or o.get('order_type'),
+                    _parse_alpaca_ts(o.get('created_at')),
+                    _parse_alpaca_ts(o.get('submitted_at')),
+                    _parse_alpaca_ts(o.get('filled_at')),
+                    _parse_alpaca_ts(o.get('updated_at'))
+                ))
+            if rows:
+                # Eine Transaktion pro Seite; Connection nur für den Upsert auschecken (nicht während HTTP)
+                with transaction() as cur:
+                    execute_values(cur, """
+                        INSERT INTO alpaca_orders (id, symbol, side, qty, filled_qty, filled_avg_price, status,
+                                                   order_type, created_at, submitted_at, filled_at, updated_at)
+                        VALUES %s
+                        ON CONFLICT (id) DO UPDATE SET
+                            filled_qty = EXCLUDED.filled_qty,
+                            filled_avg_price = EXCLUDED.filled_avg_price,
+                            status = EXCLUDED.status,
+                            filled_at = EXCLUDED.filled_at,
+                            updated_at = EXCLUDED.updated_at
+                    """, rows)
+            fetched += len(rows)
+
+            last_dt = _parse_alpaca_ts(orders[-1].get('submitted_at'))
+            if last_dt and (newest is None or last_dt > newest):
+                newest = last_dt
+            if len(orders) < ALPACA_ORDERS_PAGE_SIZE or last_dt is None:
+                break
+            next_after = last_dt - ALPACA_ORDERS_PAGE_OVERLAP
+            if not rows or next_after <= page_after:
+                # volle Seite innerhalb des Überlappungsfensters -> ohne Überlappung weiter, sonst Endlosschleife
+                next_after = last_dt
+            if next_after <= page_after:
+                break
+            page_after = next_after
+    except Exception as e:
+        logging.error(f"Alpaca orders sync failed: {e}")
+        sync_state.update({'last_error': str(e)[:200], 'last_error_time': datetime.now(pytz.utc).isoformat()})
+        _redis_json_set(ALPACA_ORDERS_SYNC_KEY, sync_state)
+        return {'status': 'error', 'error': str(e), 'api_calls': api_calls}
+
+    sync_state.update({
+        'cursor': newest.isoformat() if newest else sync_state.get('cursor'),
+        'last_sync': datetime.now(pytz.utc).isoformat(),
+        'window_after': after_str,
+        'fetched': fetched,
+        'api_calls': api_calls,
+        'total_synced': sync_state.get('total_synced', 0) + fetched
+    })
+    _redis_json_set(ALPACA_ORDERS_SYNC_KEY, sync_state)
+    if fetched:
+        publish_event(r, 'trading', 'orders_synced', {'fetched': fetched})
+    logging.info(f"Alpaca orders synced: {fetched} orders in {api_calls} calls (after {after_str})")
+    return {'status': 'ok', 'fetched': fetched, 'api_calls': api_calls}
+
 @app.task
 def fetch_grok_recommendations():
     """Holt täglich Grok Top-10 (HTTP Variante)."""
@@ -960,18 +1113,17 @@ def fetch_grok_recommendations():
     url = f"{GROK_BASE_URL.rstrip('/')}/v1/recommendations/top10"
     headers = {"Authorization": f"Bearer {GROK_API_KEY}"}
     try:
-        response = requests.get(url, headers=headers, timeout=45, verify=not GROK_INSECURE)
+        response = _http_get(url, provider='grok', headers=headers, timeout=45, verify=not GROK_INSECURE)
         if response.status_code == 200:
             top10 = response.json()
             _redis_json_set('grok_top10', top10)
-            cur = conn.cursor()
-            if isinstance(top10, list):
-                for rec in top10:
-                    cur.execute("""
+            if isinstance(top10, list) and top10:
+                with transaction() as cur:
+                    execute_values(cur, """
                         INSERT INTO grok_recommendations (time, ticker, score, reason)
-                        VALUES (NOW(), %s, %s, %s)
-                    """, (rec.get('ticker'), rec.get('score'), rec.get('reason')))
-                conn.commit()
+                        VALUES %s
+                    """, [(rec.get('ticker'), rec.get('score'), rec.get('reason')) for rec in top10],
+                        template="(NOW(), %s, %s, %s)")
             logging.info("Grok Top-10 gespeichert")
             return top10
         logging.error(f"Grok API Fehler: {response.status_code} {response.text}")
@@ -1016,7 +1168,7 @@ def fetch_grok_deepersearch():
     url = f"{GROK_BASE_URL.rstrip('/')}/v1/chat/completions"
     items = []
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=120, verify=not GROK_INSECURE)
+        resp = _http_post(url, provider='grok', headers=headers, json=payload, timeout=120, verify=not GROK_INSECURE)
         if resp.status_code != 200:
             logging.error(f"Grok deepersearch API Fehler {resp.status_code}: {resp.text[:200]}")
         else:
@@ -1089,13 +1241,12 @@ def fetch_grok_deepersearch():
     if items:
         # In DB speichern
         try:
-            cur = conn.cursor()
-            for it in items:
-                cur.execute("""
+            with transaction() as cur:
+                execute_values(cur, """
                     INSERT INTO grok_deepersearch (time, ticker, sentiment, explanation_de)
-                    VALUES (NOW(), %s, %s, %s)
-                """, (it['ticker'], it.get('sentiment'), it.get('explanation_de')))
-            conn.commit()
+                    VALUES %s
+                """, [(it['ticker'], it.get('sentiment'), it.get('explanation_de')) for it in items],
+                    template="(NOW(), %s, %s, %s)")
         except Exception as e:
             logging.error(f"DB Insert grok_deepersearch failed: {e}")
         dyn = set(_redis_json_get('dynamic_tickers', []) or [])
@@ -1213,13 +1364,12 @@ def fetch_grok_deepersearch_xai():
     if items:
         # In DB speichern
         try:
-            cur = conn.cursor()
-            for it in items:
-                cur.execute("""
+            with transaction() as cur:
+                execute_values(cur, """
                     INSERT INTO grok_deepersearch (time, ticker, sentiment, explanation_de)
-                    VALUES (NOW(), %s, %s, %s)
-                """, (it['ticker'], it.get('sentiment'), it.get('explanation_de')))
-            conn.commit()
+                    VALUES %s
+                """, [(it['ticker'], it.get('sentiment'), it.get('explanation_de')) for it in items],
+                    template="(NOW(), %s, %s, %s)")
         except Exception as e:
             logging.error(f"DB Insert grok_deepersearch failed: {e}")
         dyn = set(_redis_json_get('dynamic_tickers', []) or [])
@@ -1294,7 +1444,7 @@ def grok_health():
     try:
         # Leichter GET (statt HEAD da manche Endpoints HEAD nicht unterstützen)
         url = f"{GROK_BASE_URL.rstrip('/')}/v1/recommendations/top10"
-        resp = requests.get(url, timeout=8, headers={'Authorization': f'Bearer {GROK_API_KEY}'}, verify=not GROK_INSECURE)
+        resp = _http_get(url, provider='grok', timeout=8, headers={'Authorization': f'Bearer {GROK_API_KEY}'}, verify=not GROK_INSECURE)
         if resp.status_code in (200,401,403):  # 401/403 zählt als reachable
             health['http_ok'] = True
     except Exception as e:
@@ -1306,12 +1456,11 @@ def grok_health():
     _redis_json_set('grok_status', status)
     # In DB loggen
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO grok_health_log (sdk_ok, http_ok, error)
-            VALUES (%s, %s, %s)
-        """, (health.get('sdk_ok'), health.get('http_ok'), health.get('error')))
-        conn.commit()
+        with db_cursor() as cur:
+            cur.execute("""
+                INSERT INTO grok_health_log (sdk_ok, http_ok, error)
+                VALUES (%s, %s, %s)
+            """, (health.get('sdk_ok'), health.get('http_ok'), health.get('error')))
     except Exception as e:
         logging.error(f"DB Insert grok_health_log failed: {e}")
     # Log
@@ -1325,21 +1474,168 @@ def grok_health():
         fetch_log = fetch_log[-200:]
     _redis_json_set('grok_fetch_log', fetch_log)
     return health
+# ================= Historische Candles pro Provider =================
+# Gemeinsam für fetch_historical_data und backfill_ticker. Rückgabe: (candles, status, http_status, note),
+# candles chronologisch; ProviderUnavailable (offener Circuit Breaker) wird an den Aufrufer durchgereicht.
+
+HISTORICAL_PROVIDERS = ('finnhub', 'twelvedata', 'fmp')
+
+def _candles_finnhub(ticker, start_dt, end_dt, timeout=30):
+    s_time = int(start_dt.timestamp()); e_time = int(end_dt.timestamp())
+    url = f'https://finnhub.io/api/v1/stock/candle?symbol={ticker}&resolution=15&from={s_time}&to={e_time}&token={FINNHUB_API_KEY}'
+    resp = _http_get(url, timeout=timeout)
+    if resp.status_code != 200:
+        return [], 'http_error', resp.status_code, resp.text[:120]
+    js = resp.json()
+    if js.get('s') == 'ok' and js.get('t'):
+        candles = [{
+            'time': datetime.fromtimestamp(js['t'][i]),
+            'open': js['o'][i],
+            'high': js['h'][i],
+            'low': js['l'][i],
+            'close': js['c'][i],
+            'volume': js['v'][i]
+        } for i in range(len(js['t']))]
+        return candles, 'ok', 200, None
+    return [], 'empty', 200, js.get('s')
+
+def _candles_twelvedata(ticker, start_dt, end_dt, timeout=30):
+    # Intraday 15min – Pagination über 5-Tage Fenster (heuristisch), TwelveData liefert meist weniger Tage je Call
+    parsed_total = []
+    window = 5
+    cur_start = start_dt
+    while cur_start < end_dt:
+        cur_end = min(cur_start + timedelta(days=window), end_dt)
+        url = (
+            f'https://api.twelvedata.com/time_series?symbol={ticker}'
+            f'&interval=15min&apikey={TWELVE_DATA_API_KEY}&start_date={cur_start.strftime("%Y-%m-%d %H:%M:%S")}'
+            f'&end_date={cur_end.strftime("%Y-%m-%d %H:%M:%S")}&format=JSON'
+        )
+        resp = _http_get(url, timeout=timeout)
+        if resp.status_code != 200:
+            if not parsed_total:
+                return [], 'http_error', resp.status_code, resp.text[:120]
+            break
+        js = resp.json()
+        # Falls Error-Struktur (Rate Limit kommt als HTTP 200 mit code 429)
+        if isinstance(js, dict) and js.get('status') == 'error':
+            if js.get('code') == 429:
+                provider_health.trip('twelvedata', reason=str(js.get('message', 'rate_limited'))[:120])
+            if not parsed_total:
+                return [], 'api_error', 200, js.get('message')
+            break
+        for row in reversed(js.get('values') or []):
+            try:
+                ts = datetime.fromisoformat(row['datetime'])
+                if ts < start_dt or ts > end_dt:
+                    continue
+                parsed_total.append({
+                    'time': ts,
+                    'open': float(row['open']),
+                    'high': float(row['high']),
+                    'low': float(row['low']),
+                    'close': float(row['close']),
+                    'volume': float(row.get('volume', 0) or 0)
+                })
+            except Exception:
+                continue
+        # leichte Pause zur Ratelimit Schonung
+        time.sleep(0.25)
+        cur_start = cur_end
+    if parsed_total:
+        return parsed_total, 'ok', 200, None
+    return [], 'empty', 200, None
+
+def _candles_fmp(ticker, start_dt, end_dt, timeout=30):
+    # Endpoint: https://financialmodelingprep.com/api/v3/historical-chart/15min/AAPL?apikey=...
+    url = f'https://financialmodelingprep.com/api/v3/historical-chart/15min/{ticker}?apikey={FMP_API_KEY}'
+    resp = _http_get(url, timeout=timeout)
+    if resp.status_code != 200:
+        return [], 'http_error', resp.status_code, resp.text[:120]
+    parsed = []
+    for row in resp.json():
+        try:
+            ts = datetime.fromisoformat(row['date'])
+            if ts < start_dt or ts > end_dt:
+                continue
+            parsed.append({
+                'time': ts,
+                'open': float(row['open']),
+                'high': float(row['high']),
+                'low': float(row['low']),
+                'close': float(row['close']),
+                'volume': float(row.get('volume', 0) or 0)
+            })
+        except Exception:
+            continue
+    if parsed:
+        return list(reversed(parsed)), 'ok', 200, None  # Älteste zuerst
+    return [], 'empty', 200, None
+
+def _candles_alphavantage_daily(ticker, start_dt, end_dt, timeout=40):
+    # TIME_SERIES_DAILY_ADJUSTED: volle Historie (outputsize=full), Free tier 5 calls/minute, 25 calls/day
+    url = f'https://www.alphavantage.co/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={ticker}&outputsize=full&apikey={ALPHAVANTAGE_API_KEY}'
+    resp = _http_get(url, timeout=timeout)
+    if resp.status_code != 200:
+        return [], 'http_error', resp.status_code, None
+    av_data = resp.json()
+    # Rate Limit kommt als HTTP 200 mit Note/Information -> Breaker öffnen
+    if 'Note' in av_data or 'Information' in av_data:
+        note = av_data.get('Note', av_data.get('Information', ''))
+        provider_health.trip('alphavantage', reason=note[:120])
+        return [], 'rate_limit', 200, note[:100]
+    if 'Time Series (Daily)' not in av_data:
+        return [], 'unexpected_format', 200, None
+    parsed = []
+    for date_str, daily_bar in av_data['Time Series (Daily)'].items():
+        try:
+            # Parse date (format: YYYY-MM-DD), nur im gewünschten Zeitraum
+            ts = datetime.strptime(date_str, '%Y-%m-%d')
+            if ts < start_dt or ts > end_dt:
+                continue
+            parsed.append({
+                'time': ts,
+                'open': float(daily_bar.get('1. open', 0)),
+                'high': float(daily_bar.get('2. high', 0)),
+                'low': float(daily_bar.get('3. low', 0)),
+                'close': float(daily_bar.get('4. close', 0)),
+                'volume': int(daily_bar.get('6. volume', 0))
+            })
+        except Exception as parse_err:
+            logging.warning(f"AlphaVantage backfill {ticker} parse error for {date_str}: {parse_err}")
+            continue
+    if parsed:
+        return sorted(parsed, key=lambda x: x['time']), 'ok', 200, None
+    return [], 'empty', 200, 'no data in time range'
+
+HISTORICAL_FETCHERS = {
+    'finnhub': _candles_finnhub,
+    'twelvedata': _candles_twelvedata,
+    'fmp': _candles_fmp,
+    'alphavantage': _candles_alphavantage_daily,
+}
+
+def _historical_providers():
+    keys = {'finnhub': FINNHUB_API_KEY, 'twelvedata': TWELVE_DATA_API_KEY, 'fmp': FMP_API_KEY}
+    return [p for p in HISTORICAL_PROVIDERS if keys.get(p)]
+
 @app.task
 def fetch_historical_data():
-    """Hole historische Daten (30 Tage, 15m) für dynamische Ticker mit Fallback Finnhub -> TwelveData -> FMP.
+    """Hole historische Daten (30 Tage, 15m) für dynamische Ticker mit Fallback Finnhub / TwelveData / FMP.
+
+    Reihenfolge pro Ticker nach provider_health.rank (Erfolgsquote, Latenz, Quota); Provider mit
+    offenem Circuit Breaker werden ohne HTTP-Call übersprungen.
 
     Erweiterungen:
     - Detailliertes per-Ticker Logging (Redis Key: historical_fetch_log, max 300 Einträge FIFO)
     - TwelveData pseudo-Pagination (mehrere 5-Tages-Segmente falls nötig)
     - Quelle & Candle-Zähler pro Ticker
     """
-    cur = conn.cursor()
     tickers = get_dynamic_tickers()
     end_dt = datetime.utcnow()
     start_dt = end_dt - timedelta(days=30)
     inserted = 0
-    source_stats = { 'finnhub': 0, 'twelvedata': 0, 'fmp': 0, 'failed': 0 }
+    source_stats = { 'finnhub': 0, 'twelvedata': 0, 'fmp': 0, 'failed': 0, 'circuit_skipped': 0 }
 
     fetch_log = _redis_json_get('historical_fetch_log', []) or []
 
@@ -1358,150 +1654,54 @@ def fetch_historical_data():
             # FIFO beschränken
             del fetch_log[:len(fetch_log)-300]
 
-    td_key = os.getenv('TWELVE_DATA_API_KEY')
-    fmp_key = os.getenv('FMP_API_KEY')
+    providers = _historical_providers()
 
     def fetch_candles_ticker(ticker: str):
-        # 1) Finnhub
-        try:
-            start_time = int(start_dt.timestamp())
-            end_time = int(end_dt.timestamp())
-            url = f'https://finnhub.io/api/v1/stock/candle?symbol={ticker}&resolution=15&from={start_time}&to={end_time}&token={FINNHUB_API_KEY}'
-            resp = requests.get(url, timeout=30)
-            if resp.status_code == 200:
-                js = resp.json()
-                if js.get('s') == 'ok' and js.get('t'):
-                    source_stats['finnhub'] += 1
-                    candles = [
-                        {
-                            'time': datetime.fromtimestamp(js['t'][i]),
-                            'open': js['o'][i],
-                            'high': js['h'][i],
-                            'low': js['l'][i],
-                            'close': js['c'][i],
-                            'volume': js['v'][i]
-                        } for i in range(len(js['t']))
-                    ]
-                    append_fetch_log(ticker, 'finnhub', 'ok', len(candles), 200)
-                    return candles
-                append_fetch_log(ticker, 'finnhub', 'empty', 0, 200, js.get('s'))
-            else:
-                append_fetch_log(ticker, 'finnhub', 'http_error', 0, resp.status_code, resp.text[:120])
-        except Exception as e:
-            logging.warning(f"Finnhub fail {ticker}: {e}")
-            append_fetch_log(ticker, 'finnhub', 'exception', 0, None, str(e)[:120])
-        # 2) Twelve Data (Intraday 15min) – begrenzt: liefert meist weniger Tage je Call
-        if td_key:
+        # Fallback-Kette, pro Ticker nach Erfolgsquote/Latenz/Quota sortiert; offene Breaker fehlen
+        for provider in provider_health.rank(providers):
             try:
-                # Pagination über 5-Tage Fenster (heuristisch) – TwelveData Limit umgehen
-                parsed_total = []
-                window = 5
-                current_start = start_dt
-                while current_start < end_dt:
-                    current_end = min(current_start + timedelta(days=window), end_dt)
-                    url = (
-                        f'https://api.twelvedata.com/time_series?symbol={ticker}'
-                        f'&interval=15min&apikey={td_key}&start_date={current_start.strftime("%Y-%m-%d %H:%M:%S")}'
-                        f'&end_date={current_end.strftime("%Y-%m-%d %H:%M:%S")}&format=JSON'
-                    )
-                    resp = requests.get(url, timeout=30)
-                    if resp.status_code == 200:
-                        js = resp.json()
-                        values = js.get('values') or []
-                        # Falls Error-Struktur
-                        if isinstance(js, dict) and js.get('status') == 'error':
-                            append_fetch_log(ticker, 'twelvedata', 'api_error', 0, 200, js.get('message'))
-                            break
-                        for row in reversed(values):
-                            try:
-                                ts = datetime.fromisoformat(row['datetime'])
-                                if ts < start_dt or ts > end_dt:
-                                    continue
-                                parsed_total.append({
-                                    'time': ts,
-                                    'open': float(row['open']),
-                                    'high': float(row['high']),
-                                    'low': float(row['low']),
-                                    'close': float(row['close']),
-                                    'volume': float(row.get('volume', 0) or 0)
-                                })
-                            except Exception:
-                                continue
-                    else:
-                        append_fetch_log(ticker, 'twelvedata', 'http_error', 0, resp.status_code, resp.text[:120])
-                        break
-                    # leichte Pause zur Ratelimit Schonung
-                    time.sleep(0.25)
-                    current_start = current_end
-                if parsed_total:
-                    source_stats['twelvedata'] += 1
-                    append_fetch_log(ticker, 'twelvedata', 'ok', len(parsed_total), 200)
-                    return parsed_total
-                append_fetch_log(ticker, 'twelvedata', 'empty', 0, 200)
-            except Exception as e:
-                logging.warning(f"TwelveData fail {ticker}: {e}")
-                append_fetch_log(ticker, 'twelvedata', 'exception', 0, None, str(e)[:120])
-        # 3) FMP (Financial Modeling Prep) – 15min historisch
-        if fmp_key:
-            try:
-                # Endpoint: https://financialmodelingprep.com/api/v3/historical-chart/15min/AAPL?apikey=...
-                url = f'https://financialmodelingprep.com/api/v3/historical-chart/15min/{ticker}?apikey={fmp_key}'
-                resp = requests.get(url, timeout=30)
-                if resp.status_code == 200:
-                    arr = resp.json()
-                    parsed = []
-                    for row in arr:
-                        try:
-                            ts = datetime.fromisoformat(row['date'])
-                            if ts < start_dt or ts > end_dt:
-                                continue
-                            parsed.append({
-                                'time': ts,
-                                'open': float(row['open']),
-                                'high': float(row['high']),
-                                'low': float(row['low']),
-                                'close': float(row['close']),
-                                'volume': float(row.get('volume', 0) or 0)
-                            })
-                        except Exception:
-                            continue
-                    if parsed:
-                        source_stats['fmp'] += 1
-                        candles = list(reversed(parsed))  # Älteste zuerst
-                        append_fetch_log(ticker, 'fmp', 'ok', len(candles), 200)
-                        return candles
-                    append_fetch_log(ticker, 'fmp', 'empty', 0, 200)
-                else:
-                    append_fetch_log(ticker, 'fmp', 'http_error', 0, resp.status_code, resp.text[:120])
+                candles, status, http_status, note = HISTORICAL_FETCHERS[provider](ticker, start_dt, end_dt)
+            except ProviderUnavailable:
+                source_stats['circuit_skipped'] += 1
+                append_fetch_log(ticker, provider, 'circuit_open', 0, None)
+                continue
             except Exception as e:
-                logging.warning(f"FMP fail {ticker}: {e}")
-                append_fetch_log(ticker, 'fmp', 'exception', 0, None, str(e)[:120])
+                logging.warning(f"{provider} fail {ticker}: {e}")
+                append_fetch_log(ticker, provider, 'exception', 0, None, str(e)[:120])
+                continue
+            if candles:
+                source_stats[provider] += 1
+                append_fetch_log(ticker, provider, 'ok', len(candles), http_status)
+                return candles
+            append_fetch_log(ticker, provider, status, 0, http_status, note)
         source_stats['failed'] += 1
         append_fetch_log(ticker, 'none', 'failed_all', 0, None)
         return []
 
     for ticker in tickers:
         candles = fetch_candles_ticker(ticker)
-        for c in candles:
+        if candles:
+            # Batch-Insert pro Ticker in einer Transaktion
             try:
-                cur.execute("""
-                    INSERT INTO market_data (time, ticker, open, high, low, close, volume)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (time, ticker) DO NOTHING
-                """, (
-                    c['time'], ticker, c['open'], c['high'], c['low'], c['close'], c['volume']
-                ))
-                inserted += 1
+                with transaction() as cur:
+                    execute_values(cur, """
+                        INSERT INTO market_data (time, ticker, open, high, low, close, volume)
+                        VALUES %s
+                        ON CONFLICT (time, ticker) DO NOTHING
+                    """, [(c['time'], ticker, c['open'], c['high'], c['low'], c['close'], c['volume']) for c in candles])
+                inserted += len(candles)
             except Exception as e:
-                logging.error(f"Insert fail {ticker} {c.get('time')}: {e}")
+                logging.error(f"Insert fail {ticker} ({len(candles)} candles): {e}")
         # leichte Pause um Rate Limits zu schonen
         time.sleep(0.4)
 
-    conn.commit()
+    if inserted:
+        bump_data_version(r, SCOPE_MARKET)
     result = {"inserted": inserted, "tickers": len(tickers), "sources": source_stats}
     _redis_json_set('historical_source_stats', {
         'time': datetime.utcnow().isoformat(),
-        **result
+        **result,
+        'breakers': provider_health.breaker_states(providers),
     })
     # Schreibe detailliertes Log
     _redis_json_set('historical_fetch_log', fetch_log)
@@ -1512,10 +1712,9 @@ def fetch_historical_data():
 def backfill_ticker(ticker: str, days: int = 60):
     """Gezielter Backfill für einzelnen Ticker über längeren Zeitraum (Default 60 Tage) mit Fallback-Quellen.
 
-    Nutzt gleiche Logik wie fetch_historical_data (Pagination TwelveData, Finnhub, FMP).
+    Nutzt dieselben Provider-Fetcher wie fetch_historical_data (HISTORICAL_FETCHERS) inkl. Circuit Breaker.
     Ergebnis-Statistik in Redis Key historical_backfill_status (letzte 50 Einträge FIFO).
     """
-    cur = conn.cursor()
     end_dt = datetime.utcnow()
     start_dt = end_dt - timedelta(days=days)
     inserted = 0
@@ -1523,170 +1722,55 @@ def backfill_ticker(ticker: str, days: int = 60):
 
     def insert_batch(candles):
         nonlocal inserted
-        for c in candles:
-            try:
-                cur.execute("""
+        if not candles:
+            return
+        try:
+            with transaction() as cur:
+                execute_values(cur, """
                     INSERT INTO market_data (time, ticker, open, high, low, close, volume)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    VALUES %s
                     ON CONFLICT (time, ticker) DO NOTHING
-                """, (c['time'], ticker, c['open'], c['high'], c['low'], c['close'], c['volume']))
-                inserted += 1
-            except Exception as e:
-                logging.error(f"Backfill insert fail {ticker} {c.get('time')}: {e}")
-
-    # Re-Use interne Funktion aus fetch_historical_data indem Zeitraum temporär angepasst werden könnte.
-    # Zur Vereinfachung duplizieren wir Minimal-Logik (könnte refaktorisiert werden).
-    # 1 Finnhub
-    try:
-        s_time = int(start_dt.timestamp()); e_time = int(end_dt.timestamp())
-        url = f'https://finnhub.io/api/v1/stock/candle?symbol={ticker}&resolution=15&from={s_time}&to={e_time}&token={FINNHUB_API_KEY}'
-        resp = requests.get(url, timeout=40)
-        if resp.status_code == 200:
-            js = resp.json()
-            if js.get('s') == 'ok' and js.get('t'):
-                candles = [{
-                    'time': datetime.fromtimestamp(js['t'][i]),
-                    'open': js['o'][i],
-                    'high': js['h'][i],
-                    'low': js['l'][i],
-                    'close': js['c'][i],
-                    'volume': js['v'][i]
-                } for i in range(len(js['t']))]
-                insert_batch(candles)
-                sources_used.append({'source': 'finnhub', 'candles': len(candles)})
-    except Exception as e:
-        logging.warning(f"Backfill Finnhub fail {ticker}: {e}")
-    # 2 TwelveData Pagination
-    td_key = os.getenv('TWELVE_DATA_API_KEY')
-    if td_key:
-        try:
-            window = 5
-            parsed_total = []
-            cur_start = start_dt
-            while cur_start < end_dt:
-                cur_end = min(cur_start + timedelta(days=window), end_dt)
-                url = (
-                    f'https://api.twelvedata.com/time_series?symbol={ticker}'
-                    f'&interval=15min&apikey={td_key}&start_date={cur_start.strftime("%Y-%m-%d %H:%M:%S")}'
-                    f'&end_date={cur_end.strftime("%Y-%m-%d %H:%M:%S")}&format=JSON'
-                )
-                resp = requests.get(url, timeout=40)
-                if resp.status_code == 200:
-                    js = resp.json()
-                    if isinstance(js, dict) and js.get('status') == 'error':
-                        break
-                    values = js.get('values') or []
-                    for row in reversed(values):
-                        try:
-                            ts = datetime.fromisoformat(row['datetime'])
-                            if ts < start_dt or ts > end_dt: continue
-                            parsed_total.append({
-                                'time': ts,
-                                'open': float(row['open']),
-                                'high': float(row['high']),
-                                'low': float(row['low']),
-                                'close': float(row['close']),
-                                'volume': float(row.get('volume', 0) or 0)
-                            })
-                        except Exception:
-                            continue
-                else:
-                    break
-                time.sleep(0.25)
-                cur_start = cur_end
-            if parsed_total:
-                insert_batch(parsed_total)
-                sources_used.append({'source': 'twelvedata', 'candles': len(parsed_total)})
+                """, [(c['time'], ticker, c['open'], c['high'], c['low'], c['close'], c['volume']) for c in candles])
+            inserted += len(candles)
         except Exception as e:
-            logging.warning(f"Backfill TwelveData fail {ticker}: {e}")
-    # 3 FMP
-    fmp_key = os.getenv('FMP_API_KEY')
-    if fmp_key:
+            logging.error(f"Backfill insert fail {ticker} ({len(candles)} candles): {e}")
+
+    # Alle verfügbaren Quellen (ON CONFLICT dedupliziert), sortiert nach provider_health.rank;
+    # offene Circuit Breaker / erschöpfte Quotas kosten keinen HTTP-Call
+    for provider in provider_health.rank(_historical_providers()):
         try:
-            url = f'https://financialmodelingprep.com/api/v3/historical-chart/15min/{ticker}?apikey={fmp_key}'
-            resp = requests.get(url, timeout=40)
-            if resp.status_code == 200:
-                arr = resp.json(); parsed = []
-                for row in arr:
-                    try:
-                        ts = datetime.fromisoformat(row['date'])
-                        if ts < start_dt or ts > end_dt: continue
-                        parsed.append({
-                            'time': ts,
-                            'open': float(row['open']),
-                            'high': float(row['high']),
-                            'low': float(row['low']),
-                            'close': float(row['close']),
-                            'volume': float(row.get('volume', 0) or 0)
-                        })
-                    except Exception:
-                        continue
-                if parsed:
-                    parsed = list(reversed(parsed))
-                    insert_batch(parsed)
-                    sources_used.append({'source': 'fmp', 'candles': len(parsed)})
+            candles, status, http_status, note = HISTORICAL_FETCHERS[provider](ticker, start_dt, end_dt, timeout=40)
+        except ProviderUnavailable:
+            logging.info(f"Backfill {ticker}: {provider} circuit open - skipped")
+            continue
         except Exception as e:
-            logging.warning(f"Backfill FMP fail {ticker}: {e}")
-    
-    # 4 AlphaVantage - TIME_SERIES_DAILY_ADJUSTED für historische Daten (längere Zeiträume)
-    if ALPHAVANTAGE_API_KEY and inserted < 100:  # Nur wenn wenig Daten bisher
+            logging.warning(f"Backfill {provider} fail {ticker}: {e}")
+            continue
+        if candles:
+            insert_batch(candles)
+            sources_used.append({'source': provider, 'candles': len(candles)})
+        elif status != 'empty':
+            logging.warning(f"Backfill {provider} {ticker}: {status} {http_status or ''} {note or ''}")
+
+    # AlphaVantage - Tageskerzen als letzte Quelle, nur wenn wenig Daten bisher (25 Calls/Tag)
+    if ALPHAVANTAGE_API_KEY and inserted < 100 and provider_health.available('alphavantage'):
         try:
-            # Free tier: 5 calls/minute, 25 calls/day
-            # DAILY gibt volle Historie, outputsize=full für alle verfügbaren Daten
-            url = f'https://www.alphavantage.co/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={ticker}&outputsize=full&apikey={ALPHAVANTAGE_API_KEY}'
-            resp = requests.get(url, timeout=40)
-            
-            if resp.status_code == 200:
-                av_data = resp.json()
-                
-                # Prüfen ob Rate Limit erreicht
-                if 'Note' in av_data or 'Information' in av_data:
-                    logging.warning(f"AlphaVantage backfill {ticker} rate limit: {av_data.get('Note', av_data.get('Information', ''))[:100]}")
-                elif 'Time Series (Daily)' in av_data:
-                    time_series = av_data['Time Series (Daily)']
-                    parsed = []
-                    
-                    for date_str, daily_bar in time_series.items():
-                        try:
-                            # Parse date (format: YYYY-MM-DD)
-                            ts = datetime.strptime(date_str, '%Y-%m-%d')
-                            
-                            # Nur im gewünschten Zeitraum
-                            if ts < start_dt or ts > end_dt:
-                                continue
-                            
-                            parsed.append({
-                                'time': ts,
-                                'open': float(daily_bar.get('1. open', 0)),
-                                'high': float(daily_bar.get('2. high', 0)),
-                                'low': float(daily_bar.get('3. low', 0)),
-                                'close': float(daily_bar.get('4. close', 0)),
-                                'volume': int(daily_bar.get('6. volume', 0))
-                            })
-                        except Exception as parse_err:
-                            logging.warning(f"AlphaVantage backfill {ticker} parse error for {date_str}: {parse_err}")
-                            continue
-                    
-                    if parsed:
-                        # Chronologisch sortieren
-                        parsed = sorted(parsed, key=lambda x: x['time'])
-                        insert_batch(parsed)
-                        sources_used.append({'source': 'alphavantage', 'candles': len(parsed)})
-                        logging.info(f"AlphaVantage backfill {ticker}: {len(parsed)} daily candles")
-                    else:
-                        logging.warning(f"AlphaVantage backfill {ticker}: no data in time range")
-                else:
-                    logging.warning(f"AlphaVantage backfill {ticker}: unexpected response format")
+            candles, status, http_status, note = _candles_alphavantage_daily(ticker, start_dt, end_dt)
+            if candles:
+                insert_batch(candles)
+                sources_used.append({'source': 'alphavantage', 'candles': len(candles)})
+                logging.info(f"AlphaVantage backfill {ticker}: {len(candles)} daily candles")
             else:
-                logging.warning(f"AlphaVantage backfill {ticker}: HTTP {resp.status_code}")
-                
+                logging.warning(f"AlphaVantage backfill {ticker}: {status} {http_status or ''} {note or ''}")
             # Rate limiting: 5 calls/minute = 12 second delay
             time.sleep(12)
-            
+        except ProviderUnavailable:
+            logging.info(f"Backfill {ticker}: alphavantage circuit open - skipped")
         except Exception as e:
             logging.warning(f"Backfill AlphaVantage fail {ticker}: {e}")
 
-    conn.commit()
+    if inserted:
+        bump_data_version(r, SCOPE_MARKET)
     status_list = _redis_json_get('historical_backfill_status', []) or []
     status_list.append({
         'time': datetime.utcnow().isoformat(),
@@ -1704,17 +1788,17 @@ def backfill_ticker(ticker: str, days: int = 60):
 @app.task
 def training_diagnostics():
     """Erstellt Diagnose: Zeilen und Zeitabdeckung pro Ticker für letztes 14d Fenster."""
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT ticker, COUNT(*) AS rows,
-               MIN(time) AS first_time,
-               MAX(time) AS last_time
-        FROM market_data
-        WHERE time >= NOW() - INTERVAL '14 days'
-        GROUP BY ticker
-        ORDER BY ticker
-    """)
-    rows = cur.fetchall()
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT ticker, COUNT(*) AS rows,
+                   MIN(time) AS first_time,
+                   MAX(time) AS last_time
+            FROM market_data
+            WHERE time >= NOW() - INTERVAL '14 days'
+            GROUP BY ticker
+            ORDER BY ticker
+        """)
+        rows = cur.fetchall()
     diag = []
     for t, count, first_t, last_t in rows:
         diag.append({
@@ -1748,14 +1832,14 @@ def scan_and_backfill_low_history(min_rows: int = 150, days: int = 60, max_backf
       "remaining_budget": 4
     }
     """
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT ticker, COUNT(*) AS rows
-        FROM market_data
-        WHERE time >= NOW() - INTERVAL '14 days'
-        GROUP BY ticker
-    """)
-    rows = cur.fetchall()
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT ticker, COUNT(*) AS rows
+            FROM market_data
+            WHERE time >= NOW() - INTERVAL '14 days'
+            GROUP BY ticker
+        """)
+        rows = cur.fetchall()
     candidates = []
     for t, cnt in rows:
         if cnt < min_rows:
@@ -1810,6 +1894,9 @@ def compute_prediction_quality_metrics(window_hours: int = 24):
       - rmse
       - avg_deviation (falls bereits deviation Feld berechnet)
 
+    Dieselben Metriken zusätzlich pro Inferenz-Route ('ticker' | 'global', inference_router)
+    und Horizon unter per_route.
+
     Speichert Ergebnis unter Redis Key prediction_quality_metrics:
     {
       "time": "ISO",
@@ -1817,6 +1904,10 @@ def compute_prediction_quality_metrics(window_hours: int = 24):
       "per_horizon": {
          "15": {"count": 120, "mae": 0.42, "mape": 0.018, "rmse": 0.55, "avg_deviation":0.02},
          ...
+      },
+      "per_route": {
+         "ticker": {"15": {...}, ...},
+         "global": {"15": {...}, ...}
       }
     }
     Historie (Rolling 100) unter prediction_quality_metrics_history.
@@ -1825,6 +1916,7 @@ def compute_prediction_quality_metrics(window_hours: int = 24):
     entries = _redis_json_get('deviation_tracker', []) or []
     cutoff = datetime.utcnow() - timedelta(hours=window_hours)
     per_hz = {}
+    per_route = {}
     for e in entries:
         try:
             atime = datetime.fromisoformat(e.get('actual_time'))
@@ -1845,37 +1937,42 @@ def compute_prediction_quality_metrics(window_hours: int = 24):
             sq = (predicted - actual) ** 2
         except Exception:
             continue
-        bucket = per_hz.setdefault(hz, {'count':0,'mae_sum':0.0,'mape_sum':0.0,'mape_count':0,'sq_sum':0.0,'dev_sum':0.0,'dev_count':0})
-        bucket['count'] += 1
-        bucket['mae_sum'] += err
-        bucket['sq_sum'] += sq
-        if mape is not None and not math.isinf(mape):
-            bucket['mape_sum'] += mape
-            bucket['mape_count'] += 1
         deviation = e.get('deviation')
-        if deviation is not None:
-            bucket['dev_sum'] += deviation
-            bucket['dev_count'] += 1
-    result_hz = {}
-    for hz, b in per_hz.items():
-        count = b['count']
-        if count == 0:
-            continue
-        mae = b['mae_sum']/count
-        rmse = (b['sq_sum']/count)**0.5
-        mape = b['mape_sum']/b['mape_count'] if b['mape_count'] else None
-        avg_dev = b['dev_sum']/b['dev_count'] if b['dev_count'] else None
-        result_hz[hz] = {
-            'count': count,
-            'mae': mae,
-            'mape': mape,
-            'rmse': rmse,
-            'avg_deviation': avg_dev
-        }
+        # Einträge vor dem Inference Router haben keine Route -> 'global'
+        route_buckets = per_route.setdefault(e.get('route') or 'global', {})
+        for buckets in (per_hz, route_buckets):
+            bucket = buckets.setdefault(hz, {'count':0,'mae_sum':0.0,'mape_sum':0.0,'mape_count':0,'sq_sum':0.0,'dev_sum':0.0,'dev_count':0})
+            bucket['count'] += 1
+            bucket['mae_sum'] += err
+            bucket['sq_sum'] += sq
+            if mape is not None and not math.isinf(mape):
+                bucket['mape_sum'] += mape
+                bucket['mape_count'] += 1
+            if deviation is not None:
+                bucket['dev_sum'] += deviation
+                bucket['dev_count'] += 1
+
+    def summarize(buckets):
+        result = {}
+        for hz, b in buckets.items():
+            count = b['count']
+            if count == 0:
+                continue
+            result[hz] = {
+                'count': count,
+                'mae': b['mae_sum']/count,
+                'mape': b['mape_sum']/b['mape_count'] if b['mape_count'] else None,
+                'rmse': (b['sq_sum']/count)**0.5,
+                'avg_deviation': b['dev_sum']/b['dev_count'] if b['dev_count'] else None
+            }
+        return result
+
+    result_hz = summarize(per_hz)
     payload = {
         'time': datetime.utcnow().isoformat(),
         'window_hours': window_hours,
-        'per_horizon': result_hz
+        'per_horizon': result_hz,
+        'per_route': {route: summarize(buckets) for route, buckets in per_route.items()}
     }
     _redis_json_set('prediction_quality_metrics', payload)
     hist = _redis_json_get('prediction_quality_metrics_history', []) or []
@@ -1888,8 +1985,7 @@ def compute_prediction_quality_metrics(window_hours: int = 24):
 
 def _add_yfinance_enhanced_features(df, tickers):
     """Add YFinance Enhanced Features to training data"""
-    import json
-    from datetime import datetime, timedelta
+    import pandas as pd
     
     # Initialize new columns
     yf_features = ['sma_20', 'sma_50', 'sma_200', 'rsi', 'macd', 'macd_signal', 
@@ -1908,8 +2004,7 @@ def _add_yfinance_enhanced_features(df, tickers):
             if not yf_data_raw:
                 continue
                 
-            yf_data = json.loads(yf_data_raw)
-            historical_data = yf_data.get('historical_data', [])
+            yf_data = redis_codec.loads(yf_data_raw)
             fundamentals = yf_data.get('fundamentals', {})
             news = yf_data.get('news', [])
             
@@ -1923,34 +2018,33 @@ def _add_yfinance_enhanced_features(df, tickers):
             # TODO: Implement proper sentiment analysis
             news_sentiment_avg = 0.5  # Neutral baseline
             
-            # Historical/Technical Data matchen
-            for hist_row in historical_data:
-                hist_date = hist_row['date']
-                
-                # Finde matching rows in df
-                ticker_mask = df['ticker'] == ticker
-                date_mask = pd.to_datetime(df['time']).dt.strftime('%Y-%m-%d') == hist_date
-                matching_mask = ticker_mask & date_mask
-                
-                if matching_mask.any():
-                    # Technical Indicators
-                    df.loc[matching_mask, 'sma_20'] = hist_row.get('sma_20')
-                    df.loc[matching_mask, 'sma_50'] = hist_row.get('sma_50')
-                    df.loc[matching_mask, 'sma_200'] = hist_row.get('sma_200')
-                    df.loc[matching_mask, 'rsi'] = hist_row.get('rsi')
-                    df.loc[matching_mask, 'macd'] = hist_row.get('macd')
-                    df.loc[matching_mask, 'macd_signal'] = hist_row.get('macd_signal')
-                    df.loc[matching_mask, 'bb_upper'] = hist_row.get('bb_upper')
-                    df.loc[matching_mask, 'bb_lower'] = hist_row.get('bb_lower')
-                    df.loc[matching_mask, 'volume_ratio'] = hist_row.get('volume_ratio')
-                    
-                    # Fundamentals (same for all dates of this ticker)
-                    df.loc[matching_mask, 'pe_ratio'] = pe_ratio
-                    df.loc[matching_mask, 'market_cap'] = market_cap
-                    df.loc[matching_mask, 'beta'] = beta
-                    df.loc[matching_mask, 'news_sentiment_avg'] = news_sentiment_avg
-                    df.loc[matching_mask, 'news_count'] = news_count
-        
+            # Historical/Technical Data matchen (spaltenweise; altes Format historical_data als Fallback)
+            hist_cols = yf_data.get('historical_columns')
+            if not hist_cols:
+                rows = yf_data.get('historical_data', [])
+                hist_cols = {key: [row.get(key) for row in rows] for key in ['date'] + yf_features[:9]}
+            if not hist_cols.get('date'):
+                continue
+            by_date = pd.DataFrame(hist_cols).drop_duplicates('date').set_index('date')
+
+            ticker_idx = df.index[df['ticker'] == ticker]
+            dates = pd.to_datetime(df.loc[ticker_idx, 'time']).dt.strftime('%Y-%m-%d')
+            matched = dates[dates.isin(by_date.index)]
+            if matched.empty:
+                continue
+
+            # Technical Indicators
+            for feature in yf_features[:9]:
+                if feature in by_date:
+                    df.loc[matched.index, feature] = by_date.loc[matched.values, feature].values
+
+            # Fundamentals (same for all dates of this ticker)
+            df.loc[matched.index, 'pe_ratio'] = pe_ratio
+            df.loc[matched.index, 'market_cap'] = market_cap
+            df.loc[matched.index, 'beta'] = beta
+            df.loc[matched.index, 'news_sentiment_avg'] = news_sentiment_avg
+            df.loc[matched.index, 'news_count'] = news_count
+
         # Count how many YF features were added
         yf_count = sum(df[col].notna().sum() for col in yf_features)
         logging.info(f"Added {yf_count} YFinance enhanced features across {len(yf_features)} columns")
@@ -1961,42 +2055,78 @@ def _add_yfinance_enhanced_features(df, tickers):
     return df
 
 @app.task
-def train_model(trigger: str = 'manual'):
+def train_model(trigger: str = 'manual', force: bool = False):
     """Trainiert drei separate AutoGluon Modelle für 15/30/60 Minuten Horizonte.
 
     - 15m: shift -1 (bei 15m Candle-Auflösung)
     - 30m: shift -2
     - 60m: shift -4 (bestehende Logik)
-    Speichert Modelle unter ./autogluon_model_{15|30|60}
+    Speichert Modelle als neue Version in der Model Registry (scope 'global', Horizon 15|30|60)
+    und promotet alle Horizonte gemeinsam; Inferenz lädt die neue Version beim nächsten Lauf.
     Metriken (MAE, MAPE approximiert, ggf. R^2) werden gesammelt und in last_training_stats.metrics abgelegt.
     Historie der Metriken in model_metrics_history (Rolling 30).
+    Ohne force entscheidet der Fingerprint des Trainingsfensters (training_fingerprint) gegen den
+    der aktuellen Version: skip (kein Training), incremental (kleines Budget, ohne Walk-Forward) oder full.
     """
     import pandas as pd
-    _training_status_update(active=True, stage='query_data', progress=0.02, trigger=trigger, event='start', detail='Beginne SQL Fetch')
-    cur = conn.cursor()
-    # Leakage-freie Abfrage: Grok Features + YFinance Enhanced Data
-    cur.execute("""
-        SELECT md.ticker, md.time, md.open, md.high, md.low, md.close, md.volume,
-               LAG(md.close, 1) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close,
-               LAG(md.close, 5) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_5,
-               LAG(md.close, 15) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_15,
-               ds.sentiment AS grok_sentiment,
-               ts.expected_gain AS grok_expected_gain
-        FROM market_data md
-        LEFT JOIN LATERAL (
-            SELECT sentiment FROM grok_deepersearch d
-            WHERE d.ticker = md.ticker AND d.time <= md.time
-            ORDER BY d.time DESC LIMIT 1
-        ) ds ON TRUE
-        LEFT JOIN LATERAL (
-            SELECT expected_gain FROM grok_topstocks t
-            WHERE t.ticker = md.ticker AND t.time <= md.time
-            ORDER BY t.time DESC LIMIT 1
-        ) ts ON TRUE
-        WHERE md.time >= NOW() - INTERVAL '14 days'
-        ORDER BY md.ticker, md.time
-    """)
-    rows = cur.fetchall()
+    from walk_forward import (
+        EVALUATION_KEY, WF_ENABLED, WF_FOLDS, add_target_times, evaluate as walk_forward_evaluate,
+        persist_evaluation, summary as evaluation_summary,
+    )
+    _training_status_update(active=True, stage='fingerprint', progress=0.01, trigger=trigger, event='start', detail='Prüfe Trainingsdaten-Fingerprint')
+    # Fingerprint des Fensters vor der teuren Feature-Abfrage: ohne relevante neue Daten kein AutoGluon-Lauf
+    # Fehler bei der Prüfung dürfen das Training nicht blockieren (und ml_training_status nicht aktiv lassen)
+    try:
+        with db_cursor() as cur:
+            fingerprint = training_fingerprint.compute(cur, lookback_days=14)
+            decisions = training_fingerprint.decide_slots(cur, r, model_registry.GLOBAL_SCOPE, MODEL_HORIZONS, fingerprint, force=force)
+        decision = training_fingerprint.strictest(decisions)
+    except Exception as e:
+        logging.warning(f"Fingerprint-Prüfung fehlgeschlagen, trainiere voll: {e}")
+        fingerprint, decisions = None, {}
+        decision = {'mode': training_fingerprint.MODE_FULL, 'reason': 'fingerprint_failed', 'delta': {}}
+    training_mode = decision['mode']
+    logging.info(f"train_model trigger={trigger} mode={training_mode} reason={decision['reason']} delta={decision['delta']}")
+    if training_mode == training_fingerprint.MODE_SKIP:
+        _redis_json_set('last_training_stats', {
+            'time': datetime.utcnow().isoformat(),
+            'trigger': trigger,
+            'status': 'skipped_unchanged',
+            'training_mode': training_mode,
+            'reason': decision['reason'],
+            'fingerprint_delta': decision['delta'],
+            'model_version': decision.get('previous_version')
+        })
+        status = _redis_json_get('retrain_status', {}) or {}
+        status.update({'pending': False, 'last_skip': datetime.utcnow().isoformat(), 'trigger': trigger})
+        _redis_json_set('retrain_status', status)
+        _training_status_update(active=False, stage='skipped_unchanged', progress=1.0, event='skip', detail=f"Keine relevanten neuen Daten ({decision['reason']})")
+        return f"Training skipped: {decision['reason']}"
+    _training_status_update(stage='query_data', progress=0.02, event='query', detail=f'Beginne SQL Fetch (mode={training_mode})')
+    with db_cursor() as cur:
+        # Leakage-freie Abfrage: Grok Features + YFinance Enhanced Data
+        cur.execute("""
+            SELECT md.ticker, md.time, md.open, md.high, md.low, md.close, md.volume,
+                   LAG(md.close, 1) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close,
+                   LAG(md.close, 5) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_5,
+                   LAG(md.close, 15) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_15,
+                   ds.sentiment AS grok_sentiment,
+                   ts.expected_gain AS grok_expected_gain
+            FROM market_data md
+            LEFT JOIN LATERAL (
+                SELECT sentiment FROM grok_deepersearch d
+                WHERE d.ticker = md.ticker AND d.time <= md.time
+                ORDER BY d.time DESC LIMIT 1
+            ) ds ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT expected_gain FROM grok_topstocks t
+                WHERE t.ticker = md.ticker AND t.time <= md.time
+                ORDER BY t.time DESC LIMIT 1
+            ) ts ON TRUE
+            WHERE md.time >= NOW() - INTERVAL '14 days'
+            ORDER BY md.ticker, md.time
+        """)
+        rows = cur.fetchall()
     raw_count = len(rows)
 
     # Mindestzeilen pro Ticker (konfigurierbar via ENV)
@@ -2004,8 +2134,8 @@ def train_model(trigger: str = 'manual'):
     # Zerlege in per-Ticker Listen
     from collections import defaultdict
     bucket = defaultdict(list)
-    for r in rows:
-        bucket[r[0]].append(r)
+    for row in rows:
+        bucket[row[0]].append(row)
     included = []
     excluded = []
     filtered_rows = []
@@ -2061,6 +2191,7 @@ def train_model(trigger: str = 'manual'):
     df['target_15'] = df.groupby('ticker')['close'].shift(-1)
     df['target_30'] = df.groupby('ticker')['close'].shift(-2)
     df['target_60'] = df.groupby('ticker')['close'].shift(-4)
+    df = add_target_times(df)  # Zeitpunkt des Targets pro Horizon (Purging in der Walk-Forward Evaluation)
     df_clean = df.dropna(subset=['target_15','target_30','target_60']).copy()
     clean_count = len(df_clean)
     if clean_count < 100:
@@ -2095,22 +2226,40 @@ def train_model(trigger: str = 'manual'):
     _redis_json_set('feature_imputation', imputation_stats)
     df_enc = pd.get_dummies(df_clean, columns=['ticker'], prefix='ticker')
     _training_status_update(stage='encoding', progress=0.45, event='encode', detail=f'encoded_cols={len(df_enc.columns)}')
-    base_features = [c for c in df_enc.columns if c not in ['time','target_15','target_30','target_60']]
+    base_features = [c for c in df_enc.columns if c not in ['time','target_15','target_30','target_60'] and not c.startswith('target_time_')]
     started = datetime.utcnow().isoformat()
+    model_version = model_registry.new_version()
     metrics = {}
     model_paths = {}
+    trained = {}
     horizons = {'15':'target_15','30':'target_30','60':'target_60'}
-    from autogluon.tabular import TabularDataset
+    from autogluon.tabular import TabularDataset, TabularPredictor
+    # Out-of-Sample Metriken (Rolling Origin, Purging/Embargo) statt Predict auf dem Trainingsframe
+    evaluation = None
+    if WF_ENABLED and training_mode == training_fingerprint.MODE_FULL:
+        _training_status_update(stage='walk_forward', progress=0.47, event='walk_forward', detail=f'folds={WF_FOLDS} horizons={len(horizons)}')
+        try:
+            evaluation = walk_forward_evaluate(df_enc, base_features, horizons, df_clean['ticker'].to_numpy())
+            logging.info(f"Walk-forward evaluation: {evaluation_summary(evaluation)}")
+        except Exception as e:
+            logging.warning(f"Walk-forward evaluation failed: {e}")
     try:
-        total_time_budget = 480  # Sekunden gesamt Budget heuristisch
-        per_model_time = int(total_time_budget / len(horizons))
+        # Gesamtbudget nach jüngstem Fehler der globalen Route auf die Horizonte verteilen (statt gleichmäßig)
+        total_time_budget = int(os.getenv('TRAIN_MODEL_TIME_BUDGET', '480'))
+        if training_mode == training_fingerprint.MODE_INCREMENTAL:
+            total_time_budget = int(total_time_budget * training_fingerprint.INCREMENTAL_TIME_FRACTION)
+        horizon_budgets = training_scheduler.split_budget(
+            total_time_budget,
+            training_scheduler.horizon_weights(_redis_json_get('deviation_tracker', []) or [], horizons),
+            minimum=min(training_scheduler.MIN_JOB_SECONDS, total_time_budget // len(horizons)))
         horizon_count = len(horizons)
         for idx,(hz,label_col) in enumerate(horizons.items(), start=1):
             train_df = df_enc[base_features + [label_col]].rename(columns={label_col:'target'})
             td = TabularDataset(train_df)
-            path = f'./autogluon_model_{hz}'
+            # Training ins Staging-Verzeichnis; das laufende generate_predictions sieht es nie
+            path = model_registry.staging_path(model_registry.GLOBAL_SCOPE, hz, model_version)
             predictor = TabularPredictor(label='target', path=path, eval_metric='mean_absolute_error')\
-                .fit(td, time_limit=per_model_time, verbosity=0)
+                .fit(td, time_limit=horizon_budgets[hz], verbosity=0)
             lb = predictor.leaderboard(silent=True)
             # MAE aus Leaderboard (Bestes Modell = erste Zeile)
             mae = None
@@ -2120,24 +2269,44 @@ def train_model(trigger: str = 'manual'):
                 score_val = best.get('score_val')
                 if score_val is not None:
                     mae = abs(float(score_val))
-            # Approx MAPE
-            y_true = train_df['target']
-            y_pred = predictor.predict(train_df[base_features])
-            import numpy as np
-            with np.errstate(divide='ignore', invalid='ignore'):
-                mape = float(np.mean(np.abs((y_true - y_pred) / np.where(y_true==0, np.nan, y_true))))
-            # R^2 (einfach)
-            ss_res = float(((y_true - y_pred)**2).sum())
-            ss_tot = float(((y_true - y_true.mean())**2).sum())
-            r2 = 1 - ss_res/ss_tot if ss_tot else None
+            # MAPE/R^2 out-of-sample aus der Walk-Forward Evaluation (None wenn deaktiviert/fehlgeschlagen);
+            # incremental: OOS-Metriken der Vorgängerversion übernehmen
+            oos = (evaluation or {}).get('horizons', {}).get(hz, {}).get('overall', {})
+            if not oos and training_mode == training_fingerprint.MODE_INCREMENTAL:
+                previous_metrics = decisions.get(hz, {}).get('previous_metrics') or {}
+                oos = {'mape': previous_metrics.get('mape'), 'r2': previous_metrics.get('r2'),
+                       'mae': previous_metrics.get('oos_mae'), 'direction_accuracy': previous_metrics.get('direction_accuracy')}
             metrics[hz] = {
                 'mae': mae,
-                'mape': mape,
-                'r2': r2,
+                'mape': oos.get('mape'),
+                'r2': oos.get('r2'),
+                'oos_mae': oos.get('mae'),
+                'direction_accuracy': oos.get('direction_accuracy'),
                 'rows': int(len(train_df))
             }
-            model_paths[hz] = path
+            features = list(predictor.feature_metadata.get_features())
+            model_paths[hz] = model_registry.publish(model_registry.GLOBAL_SCOPE, hz, model_version, {
+                'source': 'train_model',
+                'trigger': trigger,
+                'training_mode': training_mode,
+                'fingerprint': fingerprint,
+                'label': label_col,
+                'features': features,
+                'metrics': metrics[hz],
+                'training_window': {'start': str(df_clean['time'].min()), 'end': str(df_clean['time'].max())},
+                'rows': int(len(train_df)),
+                'time_limit': horizon_budgets[hz],
+                'tickers': included,
+                'latency': model_registry.measure_latency(predictor, train_df.drop(columns=['target'])),
+            })
+            trained[hz] = features
             _training_status_update(stage=f'training_horizon_{hz}', progress=0.45 + 0.45 * (idx / horizon_count), event='horizon_trained', detail=f'hz={hz} mae={mae}')
+        # Alle Horizonte gemeinsam auf die neue Version umstellen (ein MULTI), danach alte Versionen aufräumen
+        model_registry.promote(r, model_registry.GLOBAL_SCOPE, {hz: model_version for hz in model_paths})
+        try:
+            model_registry.gc(r, scopes=[model_registry.GLOBAL_SCOPE])
+        except Exception as e:
+            logging.warning(f"Model Registry GC fehlgeschlagen: {e}")
         # Set flags
         _redis_json_set('model_trained', True)
         _redis_json_set('model_path', model_paths.get('60'))
@@ -2151,6 +2320,14 @@ def train_model(trigger: str = 'manual'):
         if len(history) > 30:
             history = history[-30:]
         _redis_json_set('model_metrics_history', history)
+        if evaluation:
+            try:
+                with transaction() as cur:
+                    persist_evaluation(cur, evaluation, model_version=model_version, source='train_model')
+            except Exception as e:
+                logging.warning(f"Konnte model_evaluations nicht speichern: {e}")
+            _redis_json_set(EVALUATION_KEY, {'time': datetime.utcnow().isoformat(), 'model_version': model_version,
+                                             'source': 'train_model', **evaluation_summary(evaluation)})
         _redis_json_set('last_training_stats', {
             'time': datetime.utcnow().isoformat(),
             'trigger': trigger,
@@ -2163,18 +2340,16 @@ def train_model(trigger: str = 'manual'):
             'degraded_mode': degraded_mode,
             'status': 'success',
             'started': started,
-            'metrics': metrics
+            'model_version': model_version,
+            'training_mode': training_mode,
+            'fingerprint_delta': decision['delta'],
+            'metrics': metrics,
+            'evaluation': evaluation_summary(evaluation) if evaluation else None
         })
         logging.info(f"Multi-horizon models trained metrics={metrics}")
         # Persistiere Feature-Schema je Horizon für spätere Inferenz-Diagnose
         try:
-            feature_schemas = {}
-            for hz, predictor in predictors.items():
-                try:
-                    feature_schemas[hz] = list(predictor.feature_metadata.get_features())
-                except Exception:
-                    feature_schemas[hz] = []
-            _redis_json_set('model_features_multi', feature_schemas)
+            _redis_json_set('model_features_multi', trained)
         except Exception as e:
             logging.warning(f"Konnte model_features_multi nicht speichern: {e}")
         _training_status_update(active=False, stage='complete', progress=1.0, event='finished', detail='Training abgeschlossen')
@@ -2199,6 +2374,7 @@ def train_model(trigger: str = 'manual'):
         return f"Training failed: {e}"
 
 @app.task
+@pipeline_stage(r, STAGE_PREDICT)
 def generate_predictions():
     """Erstellt Multi-Horizon Vorhersagen (15/30/60) und speichert strukturierte Ergebnisse.
 
@@ -2208,7 +2384,7 @@ def generate_predictions():
         "current_price": 234.10,
         "timestamp": "...",
         "horizons": {
-          "15": {"predicted_price": 234.50, "change_pct": 0.0017, "eta": "..."},
+          "15": {"predicted_price": 234.50, "change_pct": 0.0017, "eta": "...", "route": "ticker"},
           "30": {...},
           "60": {...}
         }
@@ -2217,62 +2393,65 @@ def generate_predictions():
     }
 
     predictions_pending Liste Einträge:
-    {ticker, horizon, predicted, timestamp, eta}
-    (eta = Zielzeitpunkt wann Abgleich stattfinden soll)
+    {ticker, horizon, predicted, timestamp, eta, route, model_version}
+    (eta = Zielzeitpunkt wann Abgleich stattfinden soll; route = 'ticker' | 'global', siehe inference_router)
     """
     import pandas as pd
-    import numpy as np
-    cur = conn.cursor()
     tickers = get_dynamic_tickers()
-    model_paths = _redis_json_get('model_paths_multi', {}) or {}
-    predictors = {}
-    for hz, path in model_paths.items():
-        try:
-            if os.path.isdir(path):
-                predictors[hz] = TabularPredictor.load(path)
-        except Exception as e:
-            logging.error(f"Could not load predictor horizon {hz}: {e}")
-    if not predictors:
-        logging.warning("generate_predictions: keine Multi-Horizon Modelle geladen")
-        return None
+    predictors = load_horizon_predictors()
+    if not predictors and not inference_router.TICKER_MODELS_ENABLED:
+        raise StageError("generate_predictions: keine Multi-Horizon Modelle geladen")
     now = datetime.utcnow()
     # Grok Feature Maps (einmalig pro Run)
     grok_sent_map = {}
     grok_exp_gain_map = {}
-    try:
-        cur.execute("""
-            SELECT DISTINCT ON (ticker) ticker, sentiment
-            FROM grok_deepersearch
-            WHERE time >= NOW() - INTERVAL '7 days'
-            ORDER BY ticker, time DESC
-        """)
-        for t,sent in cur.fetchall():
-            grok_sent_map[t] = sent
+    candles_by_ticker = {}
+    with db_cursor() as cur:
+        try:
+            cur.execute("""
+                SELECT DISTINCT ON (ticker) ticker, sentiment
+                FROM grok_deepersearch
+                WHERE time >= NOW() - INTERVAL '7 days'
+                ORDER BY ticker, time DESC
+            """)
+            for t,sent in cur.fetchall():
+                grok_sent_map[t] = sent
+            cur.execute("""
+                SELECT DISTINCT ON (ticker) ticker, expected_gain, sentiment
+                FROM grok_topstocks
+                WHERE time >= NOW() - INTERVAL '7 days'
+                ORDER BY ticker, time DESC
+            """)
+            for t, eg, s in cur.fetchall():
+                if t not in grok_sent_map and s is not None:
+                    grok_sent_map[t] = s
+                if eg is not None:
+                    grok_exp_gain_map[t] = eg
+        except Exception as e:
+            logging.error(f"Grok feature maps build failed: {e}")
+        # Letzte 40 Candles aller Ticker in einer Abfrage (statt einer pro Ticker)
         cur.execute("""
-            SELECT DISTINCT ON (ticker) ticker, expected_gain, sentiment
-            FROM grok_topstocks
-            WHERE time >= NOW() - INTERVAL '7 days'
-            ORDER BY ticker, time DESC
-        """)
-        for t, eg, s in cur.fetchall():
-            if t not in grok_sent_map and s is not None:
-                grok_sent_map[t] = s
-            if eg is not None:
-                grok_exp_gain_map[t] = eg
-    except Exception as e:
-        logging.error(f"Grok feature maps build failed: {e}")
+            SELECT t.ticker, m.time, m.close, m.open, m.high, m.low, m.volume
+            FROM unnest(%s::text[]) AS t(ticker)
+            CROSS JOIN LATERAL (
+                SELECT time, close, open, high, low, volume FROM market_data
+                WHERE ticker = t.ticker ORDER BY time DESC LIMIT 40
+            ) m
+            ORDER BY t.ticker, m.time DESC
+        """, (list(tickers),))
+        for t, *candle in cur.fetchall():
+            candles_by_ticker.setdefault(t, []).append(tuple(candle))
+    prediction_rows = []
     preds_struct = {}
     pending = _redis_json_get('predictions_pending', []) or []
+    feature_rows = {}
+    current_prices = {}
     # Lade Imputations-Statistiken (Median Werte) aus Training
     imputation = _redis_json_get('feature_imputation', {}) or {}
     median_sent = imputation.get('grok_sentiment_median', 0.0)
     median_gain = imputation.get('grok_expected_gain_median', 0.0)
     for t in tickers:
-        cur.execute("""
-            SELECT time, close, open, high, low, volume FROM market_data
-            WHERE ticker=%s ORDER BY time DESC LIMIT 40
-        """, (t,))
-        rows = cur.fetchall()
+        rows = candles_by_ticker.get(t, [])
         if len(rows) < 20:
             continue
         rows = list(reversed(rows))
@@ -2299,84 +2478,66 @@ def generate_predictions():
         dynamic_all = set(BASE_TICKERS)
         for base in dynamic_all:
             df[f'ticker_{base}'] = 1 if t == base else 0
-        # Letzte Zeile für Features
-        last_row = df.iloc[-1:].drop(columns=['time'])
-        # Prune Columns nicht in Predictor erwartet (robust gegen evtl. zusätzliche Spalten)
-        # (AutoGluon kann meist ignorieren, aber wir reduzieren Risiko)
+        # Letzte Zeile für Features; Spalten richtet der Router pro Modell am Feature-Schema aus
+        feature_rows[t] = df.iloc[-1:].drop(columns=['time'])
+        current_prices[t] = float(df['close'].iloc[-1])
+    # Gruppierte Vorhersage: frische Ticker-Modelle (SequentialTrainer) zuerst, sonst globales Modell im Batch
+    loaded_versions = _predictor_cache.versions()
+    global_versions = {hz: loaded_versions.get(model_registry.slot(model_registry.GLOBAL_SCOPE, hz)) for hz in predictors}
+    routed = _inference_router.predict(r, feature_rows, predictors, MODEL_HORIZONS, global_versions=global_versions)
+    if not routed['predictions'] and not predictors:
+        raise StageError("generate_predictions: keine Multi-Horizon oder Ticker-Modelle geladen")
+    for t, per_hz in routed['predictions'].items():
+        current_price = current_prices[t]
         horizons_out = {}
-        current_price = float(df['close'].iloc[-1])
-        for hz, predictor in predictors.items():
-            try:
-                expected_cols = list(predictor.feature_metadata.get_features())
-                use_row = last_row.copy()
-                drop_cols = [c for c in use_row.columns if c not in expected_cols]
-                if drop_cols:
-                    logging.debug(f"Prediction {t} hz={hz}: dropping cols {drop_cols}")
-                    use_row = use_row.drop(columns=drop_cols)
-                missing_cols = []
-                for c in expected_cols:
-                    if c not in use_row.columns:
-                        use_row[c] = 0
-                        missing_cols.append(c)
-                if missing_cols:
-                    logging.debug(f"Prediction {t} hz={hz}: added missing cols {missing_cols}")
-                # Reorder strictly
-                use_row = use_row[expected_cols]
-                pred_series = predictor.predict(use_row)
-                pred_val = float(getattr(pred_series, 'iloc', pred_series)[0])
-                horizon_minutes = int(hz)
-                eta = (now + timedelta(minutes=horizon_minutes)).isoformat()
-                change_pct = (pred_val - current_price) / current_price if current_price else None
-                horizons_out[hz] = {
-                    'predicted_price': pred_val,
-                    'change_pct': change_pct,
-                    'eta': eta
-                }
-                pending.append({
-                    'ticker': t,
-                    'horizon': hz,
-                    'predicted': pred_val,
-                    'timestamp': now.isoformat(),
-                    'eta': eta
-                })
-                
-                # Insert prediction into database for ML training history
-                try:
-                    cur.execute("""
-                        INSERT INTO predictions (
-                            time, ticker, horizon_minutes, predicted_price, 
-                            current_price, predicted_change_pct, eta_timestamp
-                        )
-                        VALUES (NOW(), %s, %s, %s, %s, %s, %s)
-                    """, (
-                        t,
-                        int(hz),
-                        pred_val,
-                        current_price,
-                        change_pct,
-                        eta
-                    ))
-                except Exception as db_err:
-                    logging.warning(f"Insert prediction {t} hz={hz} to DB failed: {db_err}")
-                    
-            except Exception as e:
-                logging.exception(f"Prediction failed {t} horizon {hz} features={list(last_row.columns)} expected={expected_cols if 'expected_cols' in locals() else 'n/a'} error")
+        for hz, pred in sorted(per_hz.items(), key=lambda item: int(item[0])):
+            pred_val = pred['value']
+            horizon_minutes = int(hz)
+            eta = (now + timedelta(minutes=horizon_minutes)).isoformat()
+            change_pct = (pred_val - current_price) / current_price if current_price else None
+            horizons_out[hz] = {
+                'predicted_price': pred_val,
+                'change_pct': change_pct,
+                'eta': eta,
+                'route': pred['route']
+            }
+            pending.append({
+                'ticker': t,
+                'horizon': hz,
+                'predicted': pred_val,
+                'timestamp': now.isoformat(),
+                'eta': eta,
+                'route': pred['route'],
+                'model_version': pred['version']
+            })
+            # Prediction für die ML Training History (Batch-Insert am Ende)
+            prediction_rows.append((t, horizon_minutes, pred_val, current_price, change_pct, eta))
         if horizons_out:
             preds_struct[t] = {
                 'current_price': current_price,
                 'timestamp': now.isoformat(),
                 'horizons': horizons_out
             }
+    _redis_json_set(inference_router.ROUTE_STATS_KEY, {'time': now.isoformat(), **routed['stats']})
     _redis_json_set('predictions_current', preds_struct)
     _redis_json_set('predictions_pending', pending)
+    if preds_struct:
+        publish_event(r, 'predictions', 'predictions', preds_struct)
     
-    # Commit all prediction inserts to database
+    # Alle Predictions eines Laufs in einer Transaktion speichern
     try:
-        conn.commit()
+        if prediction_rows:
+            with transaction() as cur:
+                execute_values(cur, """
+                    INSERT INTO predictions (
+                        time, ticker, horizon_minutes, predicted_price,
+                        current_price, predicted_change_pct, eta_timestamp
+                    )
+                    VALUES %s
+                """, prediction_rows, template="(NOW(), %s, %s, %s, %s, %s, %s)")
         logging.info(f"Predictions generated for {len(preds_struct)} tickers, {len(pending)} total predictions stored")
     except Exception as commit_err:
         logging.error(f"Failed to commit predictions to DB: {commit_err}")
-        conn.rollback()
     
     return preds_struct
 
@@ -2410,27 +2571,28 @@ def diagnose_predictions(limit_tickers: int = 10):
     }
     """
     import pandas as pd
-    cur = conn.cursor()
     tickers = get_dynamic_tickers()
-    model_paths = _redis_json_get('model_paths_multi', {}) or {}
-    predictors = {}
-    for hz, path in model_paths.items():
-        try:
-            if os.path.isdir(path):
-                predictors[hz] = TabularPredictor.load(path)
-        except Exception as e:
-            logging.error(f"Diagnose: load predictor {hz} failed: {e}")
+    predictors = load_horizon_predictors()
+    candles_by_ticker = {}
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT t.ticker, m.time, m.close, m.open, m.high, m.low, m.volume
+            FROM unnest(%s::text[]) AS t(ticker)
+            CROSS JOIN LATERAL (
+                SELECT time, close, open, high, low, volume FROM market_data
+                WHERE ticker = t.ticker ORDER BY time DESC LIMIT 60
+            ) m
+            ORDER BY t.ticker, m.time DESC
+        """, (list(tickers[:limit_tickers]),))
+        for t, *candle in cur.fetchall():
+            candles_by_ticker.setdefault(t, []).append(tuple(candle))
     feature_schemas = _redis_json_get('model_features_multi', {}) or {}
     imputation = _redis_json_get('feature_imputation', {}) or {}
     median_sent = imputation.get('grok_sentiment_median', 0.0)
     median_gain = imputation.get('grok_expected_gain_median', 0.0)
     results = []
     for t in tickers[:limit_tickers]:
-        cur.execute("""
-            SELECT time, close, open, high, low, volume FROM market_data
-            WHERE ticker=%s ORDER BY time DESC LIMIT 60
-        """, (t,))
-        rows = cur.fetchall()
+        rows = candles_by_ticker.get(t, [])
         entry = { 'ticker': t, 'rows': len(rows), 'skipped_reason': None }
         if len(rows) < 20:
             entry['skipped_reason'] = 'insufficient_rows'
@@ -2515,7 +2677,8 @@ def retrain_check():
             ticker = item['ticker']
             cur_price = market.get(ticker, {}).get('price')
             horizon_minutes = int(horizon) if horizon else item.get('horizon_minutes', 60)
-            deviation = record_deviation(ticker, item['predicted'], cur_price, horizon_minutes, item['timestamp'], now.isoformat())
+            deviation = record_deviation(ticker, item['predicted'], cur_price, horizon_minutes, item['timestamp'], now.isoformat(),
+                                         route=item.get('route'))
             if deviation is not None and deviation > DEVIATION_THRESHOLD:
                 triggered = True
         else:
@@ -2529,13 +2692,11 @@ def retrain_check():
     return {'remaining': len(still_pending), 'retrain_triggered': triggered}
 
 @app.task
+@pipeline_stage(r, STAGE_TRADE)
 def trade_bot():
     """Enhanced trading bot with full backend.txt compliance + Market Hours Safety"""
     
-    # 1. UPDATE SYSTEM HEARTBEAT
-    update_system_heartbeat()
-    
-    # 2. CHECK MARKET HOURS FIRST (CRITICAL SAFETY CHECK)
+    # 1. CHECK MARKET HOURS FIRST (CRITICAL SAFETY CHECK) – ohne externe Calls
     if not is_market_open():
         market_status = get_market_status()
         update_trading_status(active=False, error=f"Market closed - {market_status['market_session']}")
@@ -2545,6 +2706,9 @@ def trade_bot():
             'market_status': market_status
         }
     
+    # 2. UPDATE SYSTEM HEARTBEAT (nur während der Sitzung)
+    update_system_heartbeat()
+    
     # 3. READ TRADING SETTINGS  
     settings = _redis_json_get('trading_settings', {}) or {}
     
@@ -2577,6 +2741,7 @@ def trade_bot():
     sell_thr = settings.get('sell_threshold_pct', 0.05)
     qty = int(settings.get('max_position_per_trade', 1))
     results = []
+    failed_orders = []
     trades_this_run = 0
     max_trades_run = int(risk_settings.get('max_trades_per_run', 0) or 0)
     for ticker, p in preds.items():
@@ -2636,7 +2801,7 @@ def trade_bot():
             'time_in_force': 'gtc'
         }
         try:
-            response = requests.post('https://paper-api.alpaca.markets/v2/orders', json=order, headers=headers, timeout=30)
+            response = _http_post('https://paper-api.alpaca.markets/v2/orders', json=order, headers=headers, timeout=30)
             resp_json = response.json() if response.content else {}
             entry = {
                 'time': datetime.utcnow().isoformat(),
@@ -2660,8 +2825,13 @@ def trade_bot():
                 risk_status['cooldowns'] = cooldowns
         except Exception as e:
             logging.error(f"Trade error {ticker}: {e}")
+            failed_orders.append({'ticker': ticker, 'error': str(e)})
             continue
     _redis_json_set('risk_status', risk_status)
+    if failed_orders and not results:
+        update_trading_status(active=False, error=f"All {len(failed_orders)} orders failed")
+        update_frontend_feedback()
+        raise StageError(f"trade_bot: alle {len(failed_orders)} Orders fehlgeschlagen: {failed_orders[0]['error']}")
     
     # 6. UPDATE TRADING STATUS WITH FULL BACKEND.TXT COMPLIANCE
     next_run = (datetime.utcnow() + timedelta(minutes=10)).isoformat()  # Next scheduled run
@@ -2674,6 +2844,7 @@ def trade_bot():
         # No trades but system active
         update_trading_status(active=True, error=None, next_run=next_run)
         logging.info("Trading cycle completed: No trades executed")
+    update_frontend_feedback()
     
     return {
         'status': 'completed',
@@ -2705,7 +2876,7 @@ def manage_open_positions():
         }
         
         # Hole offene Positionen von Alpaca
-        response = requests.get(
+        response = _http_get(
             'https://paper-api.alpaca.markets/v2/positions',
             headers=headers,
             timeout=30
@@ -2752,7 +2923,7 @@ def manage_open_positions():
                         'time_in_force': 'gtc'
                     }
                     
-                    close_response = requests.post(
+                    close_response = _http_post(
                         'https://paper-api.alpaca.markets/v2/orders',
                         json=close_order,
                         headers=headers,
@@ -2805,7 +2976,10 @@ def daily_train():
     fetch_data.delay()
     train_model.delay('daily')
 
-# Schedule daily at 09:00 UTC
+# Intraday-Tasks nur in der regulären Sitzung, optional inkl. Pre-/After-Market
+INTRADAY_SESSIONS = EXTENDED_SESSIONS if os.getenv('MARKET_EXTENDED_HOURS', '0') == '1' else (market_hours.PHASE_REGULAR,)
+
+# Schedule daily at 09:00 UTC (vor Pre-Market, Off-Hours)
 app.conf.beat_schedule = {
     'train-daily': {
         'task': 'worker.daily_train',
@@ -2815,33 +2989,30 @@ app.conf.beat_schedule = {
         'task': 'worker.fetch_grok_recommendations',
         'schedule': crontab(hour=9, minute=5),
     },
+    # Intraday-Tasks laufen nur in Marktphasen (market_schedule, market_hours.py);
+    # Pre-/After-Market per ENV MARKET_EXTENDED_HOURS=1
     'portfolio-sync': {
         'task': 'worker.fetch_portfolio',
-        'schedule': crontab(minute='*/5'),
+        'schedule': market_schedule(300, sessions=INTRADAY_SESSIONS),
     },
-    'market-sync': {
-        'task': 'worker.fetch_data',
-        'schedule': crontab(minute='*/5'),
+    # Alpaca Order-Historie inkrementell nach alpaca_orders (Basis für /trades); Orders auch in Extended Hours
+    'alpaca-orders-sync': {
+        'task': 'worker.sync_alpaca_orders',
+        'schedule': market_schedule(120, sessions=EXTENDED_SESSIONS),
     },
-    'prediction-cycle': {
-        'task': 'worker.generate_predictions',
-        'schedule': crontab(minute='*/15'),
+    # Markt-Pipeline: fetch_data -> generate_predictions -> update_ml_predictions_enhanced -> trade_bot
+    # (ersetzt market-sync, prediction-cycle, update-ml-predictions-enhanced und tradebot-auto)
+    'market-pipeline': {
+        'task': 'worker.run_market_pipeline',
+        'schedule': market_schedule(PIPELINE_INTERVAL_SECONDS, sessions=INTRADAY_SESSIONS),
     },
     'retrain-check': {
         'task': 'worker.retrain_check',
-        'schedule': crontab(minute='*/30'),
-    },
-    'tradebot-auto': {
-        'task': 'worker.trade_bot',
-        'schedule': crontab(minute='*/10'),
+        'schedule': market_schedule(1800, sessions=INTRADAY_SESSIONS),
     },
     'position-management': {
         'task': 'worker.manage_open_positions',
-        'schedule': crontab(minute='*/15'),  # Alle 15 Minuten Positionen prüfen
-    },
-    'frontend-monitoring': {
-        'task': 'worker.monitor_autotrading_frontend',
-        'schedule': crontab(minute='*'),  # Every minute for responsive frontend communication
+        'schedule': market_schedule(900),  # Alle 15 Minuten Positionen prüfen (reguläre Sitzung)
     },
     'grok-deepersearch-daily': {
         'task': 'worker.fetch_grok_deepersearch',
@@ -2851,11 +3022,15 @@ app.conf.beat_schedule = {
         'task': 'worker.fetch_grok_topstocks',
         'schedule': crontab(hour=8, minute=20),  # täglich 08:20 UTC
     },
-    # Neuer automatischer Backfill Scanner alle 30 Minuten mit Offset (Minuten 7 und 37)
+    # Backfill Scanner außerhalb der Handelszeiten (Provider-Quota gehört tagsüber den Live-Quotes)
     'auto-backfill-scan': {
         'task': 'worker.scan_and_backfill_low_history',
-        # Erhöhte Frequenz: alle 15 Minuten statt 30 für schnellere Daten-Abdeckung
-        'schedule': crontab(minute='7,22,37,52'),
+        'schedule': market_schedule(1800, sessions=OFF_HOURS),
+    },
+    # Off-Hours Slots für Training: sequenzielles Ticker-Training nachts und am Wochenende
+    'offhours-sequential-training': {
+        'task': 'worker.train_sequential',
+        'schedule': market_schedule(6 * 3600, sessions=OFF_HOURS),
     },
     # Prediction Quality Aggregation alle 30 Minuten (gleichmäßiger Rhythmus)
     'prediction-quality-metrics': {
@@ -2867,43 +3042,75 @@ app.conf.beat_schedule = {
         'task': 'worker.system_heartbeat',
         'schedule': 30.0,  # Every 30 seconds
     },
-    # Frontend Settings Synchronization - alle 2 Minuten
-    'sync-frontend-settings': {
-        'task': 'worker.sync_frontend_settings',
-        'schedule': crontab(minute='*/2'),  # Every 2 minutes
-    },
-    # Manual Order Processing - alle 30 Sekunden
-    'process-manual-orders': {
-        'task': 'worker.process_manual_orders',
-        'schedule': 30.0,  # Every 30 seconds
-    },
-    # Emergency Handler - alle 10 Sekunden (höchste Priorität)
-    'emergency-handler': {
-        'task': 'worker.emergency_handler',
-        'schedule': 10.0,  # Every 10 seconds
-    },
-    # Backend Response Updates - alle 30 Sekunden
+    # Frontend-Commands (Emergency, Manual Orders, Training, Settings, AutoTrading) laufen über
+    # den Command Bus (command_bus.py, Service command-listener) statt über Polling-Beats.
+    # Backend Response Updates - nach jedem Command, hier nur noch als Fallback alle 5 Minuten
     'update-backend-responses': {
         'task': 'worker.update_backend_responses',
-        'schedule': 30.0,  # Every 30 seconds
+        'schedule': crontab(minute='*/5'),
     },
     # Performance Calculator - alle 5 Minuten
     'performance-calculator': {
         'task': 'worker.calculate_trading_performance',
         'schedule': crontab(minute='*/5'),  # Every 5 minutes
     },
-    # Enhanced ML Predictions - alle 15 Minuten (nach generate_predictions)
-    'update-ml-predictions-enhanced': {
-        'task': 'worker.update_ml_predictions_enhanced',
-        'schedule': crontab(minute='*/15'),  # Every 15 minutes
-    },
-    # Training Command Watcher - alle 30 Sekunden für manuelle Triggers
-    'check-training-commands': {
-        'task': 'worker.check_training_commands',
-        'schedule': 30.0,  # Every 30 seconds
+    # Queue-Tiefe + Task-Latenzen pro Queue (celery_queue_metrics)
+    'collect-queue-metrics': {
+        'task': 'worker.collect_queue_metrics',
+        'schedule': 60.0,
     },
 }
 
+@app.task
+def run_market_pipeline():
+    """Startet einen Pipeline-Lauf als Chain; jede Stufe triggert die nächste nach Abschluss.
+
+    Schlägt eine Stufe fehl, bricht die Chain ab (kein Trading auf veralteten Predictions).
+    Überlappende Läufe werden per Lock verhindert; jede Stufe verlängert ihn beim Start.
+    """
+    run_id = acquire_pipeline_lock(r)
+    if not run_id:
+        logging.info("Market pipeline: previous run still active – skipping")
+        return {'status': 'skipped', 'reason': 'previous_run_active'}
+    started = time.time()
+    workflow = chain(
+        fetch_data.si(pipeline_run=run_id),
+        generate_predictions.si(pipeline_run=run_id),
+        update_ml_predictions_enhanced.si(pipeline_run=run_id),
+        trade_bot.si(pipeline_run=run_id),
+        pipeline_completed.si(run_id, started),
+    )
+    workflow.on_error(pipeline_failed.si(run_id, started))
+    workflow.apply_async()
+    return {'status': 'started', 'run_id': run_id}
+
+@app.task
+def pipeline_completed(run_id, started):
+    release_pipeline_lock(r, run_id)
+    entry = record_run(r, run_id, started, 'ok')
+    logging.info(f"✅ Market pipeline {run_id} finished in {entry['duration_s']}s")
+    return entry
+
+@app.task
+def pipeline_failed(run_id, started):
+    release_pipeline_lock(r, run_id)
+    entry = record_run(r, run_id, started, 'error')
+    logging.error(f"❌ Market pipeline {run_id} failed after {entry['duration_s']}s")
+    return entry
+
+@app.task
+def collect_queue_metrics():
+    """Schreibt Queue-Tiefen und Wait/Run-Zeiten pro Queue nach celery_queue_metrics."""
+    try:
+        snapshot = collect_queue_depths(r)
+        backlog = {q: v['depth'] for q, v in snapshot['queues'].items() if v['depth']}
+        if backlog:
+            logging.info(f"📊 Queue backlog: {backlog}")
+        return snapshot
+    except Exception as e:
+        logging.error(f"Queue metrics failed: {e}")
+        return {'error': str(e)}
+
 @app.task 
 def system_heartbeat():
     """System heartbeat task for frontend dashboard - runs every 30 seconds"""
@@ -3011,7 +3218,7 @@ def sync_frontend_settings():
         
     except Exception as e:
         logging.error(f"Frontend settings sync failed: {e}")
-        return {'status': 'error', 'error': str(e)}
+        raise  # Command bleibt pending -> Retry über den Command Bus
 
 def _map_aggressiveness_to_strategy(aggressiveness):
     """Maps aggressiveness level (1-5) to strategy name"""
@@ -3028,11 +3235,12 @@ def _map_aggressiveness_to_strategy(aggressiveness):
 def process_manual_orders():
     """Processes manual orders from frontend through Alpaca API.
     
-    Monitors frontend:manual_orders and executes PENDING orders every 30 seconds.
+    Executes PENDING orders in frontend:manual_orders; triggered by the command bus
+    (manual_orders command) instead of a 30s beat.
     """
     try:
         manual_orders = _redis_json_get('frontend:manual_orders', []) or []
-        if not manual_orders:
+        if not any(order.get('status') == 'PENDING' for order in manual_orders):
             return {'status': 'no_orders', 'timestamp': datetime.utcnow().isoformat()}
         
         processed_orders = []
@@ -3054,7 +3262,7 @@ def process_manual_orders():
                     continue
                 
                 # Execute order through Alpaca (if available)
-                if ALPACA_API_KEY and ALPACA_SECRET_KEY:
+                if ALPACA_API_KEY and ALPACA_SECRET:
                     alpaca_order = _execute_alpaca_order(order)
                     if alpaca_order:
                         order['status'] = 'SUBMITTED'
@@ -3103,7 +3311,7 @@ def process_manual_orders():
         
     except Exception as e:
         logging.error(f"Manual order processing failed: {e}")
-        return {'status': 'error', 'error': str(e)}
+        raise  # Command bleibt pending -> Retry über den Command Bus
 
 def _execute_alpaca_order(order):
     """Execute order through Alpaca API"""
@@ -3133,13 +3341,15 @@ def _add_trade_to_log(trade_entry):
     _redis_json_set('trades_log', trades_log)
 
 @app.task
-def emergency_handler():
+def emergency_handler(emergency_action=None):
     """Handles emergency actions from frontend with immediate response.
     
-    Monitors frontend:emergency_actions every 10 seconds for critical commands.
+    Triggered by the command bus (emergency command). The action comes either as
+    command payload or from the legacy key frontend:emergency_actions.
     """
     try:
-        emergency_action = _redis_json_get('frontend:emergency_actions')
+        if emergency_action is None:
+            emergency_action = _redis_json_get('frontend:emergency_actions')
         if not emergency_action:
             return {'status': 'no_action', 'timestamp': datetime.utcnow().isoformat()}
         
@@ -3149,9 +3359,6 @@ def emergency_handler():
         if not confirmed:
             return {'status': 'not_confirmed', 'action': action}
         
-        # Clear the emergency action first to prevent re-processing
-        _redis_json_set('frontend:emergency_actions', None)
-        
         result = {'action': action, 'timestamp': datetime.utcnow().isoformat()}
         
         if action == 'STOP_ALL_TRADING':
@@ -3260,17 +3467,21 @@ def emergency_handler():
             emergency_log = emergency_log[:50]
         _redis_json_set('emergency_log', emergency_log)
         
+        # Legacy-Key erst nach erfolgreicher Ausführung leeren (bei Fehler holt der Retry die Aktion erneut)
+        _redis_json_set('frontend:emergency_actions', None)
+        
         return result
         
     except Exception as e:
         logging.error(f"Emergency handler failed: {e}")
-        return {'status': 'error', 'error': str(e)}
+        raise  # Command bleibt pending -> Retry über den Command Bus
 
 @app.task
 def update_backend_responses():
     """Updates backend response keys for frontend consumption.
     
-    Updates backend:active_orders, backend:recent_trades, backend:system_health every 30 seconds.
+    Updates backend:active_orders, backend:recent_trades, backend:system_health after every
+    handled bus command and on a slow beat as fallback.
     """
     try:
         timestamp = datetime.utcnow().isoformat()
@@ -3473,6 +3684,7 @@ def calculate_trading_performance():
         return {'status': 'error', 'error': str(e)}
 
 @app.task
+@pipeline_stage(r, STAGE_ENHANCE)
 def update_ml_predictions_enhanced():
     """Updates enhanced ML predictions for frontend charts and trading signals.
     
@@ -3581,7 +3793,7 @@ def update_ml_predictions_enhanced():
         
     except Exception as e:
         logging.error(f"Enhanced ML predictions update failed: {e}")
-        return {'status': 'error', 'error': str(e)}
+        raise  # Pipeline-Stufe: Chain bricht ab
 
 @app.task
 def fetch_grok_topstocks():
@@ -3618,13 +3830,12 @@ def fetch_grok_topstocks():
     if items:
         # In DB speichern
         try:
-            cur = conn.cursor()
-            for it in items:
-                cur.execute("""
+            with transaction() as cur:
+                execute_values(cur, """
                     INSERT INTO grok_topstocks (time, ticker, expected_gain, sentiment, reason)
-                    VALUES (NOW(), %s, %s, %s, %s)
-                """, (it.get('ticker'), it.get('expected_gain'), it.get('sentiment'), it.get('reason')))
-            conn.commit()
+                    VALUES %s
+                """, [(it.get('ticker'), it.get('expected_gain'), it.get('sentiment'), it.get('reason')) for it in items],
+                    template="(NOW(), %s, %s, %s, %s)")
         except Exception as e:
             logging.error(f"DB Insert grok_topstocks failed: {e}")
         dyn = set(_redis_json_get('dynamic_tickers', []) or [])
@@ -3775,11 +3986,13 @@ def monitor_frontend_redis_commands():
         logging.error(f"Frontend Redis monitoring error: {e}")
         r.set('autotrading:backend_status', 'ERROR')
         r.set('autotrading:error', str(e))
-        return {'status': 'error', 'error': str(e)}
+        raise
 
 def update_frontend_feedback():
     """
-    Schreibt aktuellen Trading-Status zurück an Frontend über Redis
+    Schreibt aktuellen Trading-Status zurück an Frontend über Redis.
+    Aufgerufen von den Stellen, die den Zustand ändern (trade_bot, append_trade_log, fetch_portfolio);
+    aktiv ist die Session prozessübergreifend über autotrading:session_active.
     """
     try:
         # Trading Status
@@ -3787,28 +4000,40 @@ def update_frontend_feedback():
         portfolio_positions = _redis_json_get('portfolio_positions', []) or []
         trades_log = _redis_json_get('trades_log', []) or []
         
-        # Backend Status Update
-        if current_autotrading_session['active']:
-            r.set('autotrading:backend_status', 'RUNNING')
+        # Backend Status Update – nur geänderte Keys schreiben und als Delta publizieren
+        if current_autotrading_session['active'] or r.exists('autotrading:session_active'):
             r.set('autotrading:last_update', datetime.utcnow().isoformat())
             
+            desired = {
+                'autotrading:backend_status': 'RUNNING',
+                # Aktive Positionen
+                'autotrading:active_positions': json.dumps(portfolio_positions),
+                # Trading Stats
+                'autotrading:stats': json.dumps({
+                    'trades_today': trading_status.get('trades_today', 0),
+                    'total_volume': trading_status.get('total_volume', 0.0),
+                    'last_run': trading_status.get('last_run'),
+                    'next_run': trading_status.get('next_run'),
+                    'positions_count': len(portfolio_positions)
+                })
+            }
             # Letzter Trade
             if trades_log:
-                latest_trade = trades_log[-1]  # Neuester Trade
-                r.set('autotrading:last_trade', json.dumps(latest_trade))
+                desired['autotrading:last_trade'] = json.dumps(trades_log[-1])  # Neuester Trade
             
-            # Aktive Positionen
-            r.set('autotrading:active_positions', json.dumps(portfolio_positions))
-            
-            # Trading Stats
-            trading_stats = {
-                'trades_today': trading_status.get('trades_today', 0),
-                'total_volume': trading_status.get('total_volume', 0.0),
-                'last_run': trading_status.get('last_run'),
-                'next_run': trading_status.get('next_run'),
-                'positions_count': len(portfolio_positions)
+            keys = list(desired.keys())
+            current = r.mget(keys)
+            changed = {
+                key: desired[key] for key, raw in zip(keys, current)
+                if (raw.decode() if isinstance(raw, bytes) else raw) != desired[key]
             }
-            r.set('autotrading:stats', json.dumps(trading_stats))
+            if changed:
+                r.mset(changed)
+                publish_event(r, 'trading', 'autotrading', {
+                    key.split(':', 1)[1]: (value if key == 'autotrading:backend_status' else json.loads(value))
+                    for key, value in changed.items()
+                })
+            return {'status': 'updated', 'changed': list(changed.keys())}
             
         return {'status': 'updated'}
             
@@ -3838,24 +4063,27 @@ def monitor_autotrading_frontend():
         
     except Exception as e:
         logging.error(f"AutoTrading frontend monitoring failed: {e}")
-        return {'status': 'error', 'error': str(e)}
+        raise  # Command bleibt pending -> Retry über den Command Bus
 
 
 
 # ===== Sequential Training System =====
 
 @app.task
-def train_sequential(tickers=None):
+def train_sequential(tickers=None, budget_seconds=None, force=False):
     """
     Sequenzielles Training: Ein Ticker nach dem anderen
     Speichert Fortschritt in Redis für Frontend-Monitoring
+    budget_seconds: Wall-Clock Budget für den training_scheduler (Default: bis Pre-Market)
+    force: Fingerprint-Prüfung übergehen, jeder Horizon wird voll trainiert
     """
     import sys
     sys.path.insert(0, '/app')
     
     try:
         import worker_sequential_training
-        return worker_sequential_training.train_sequential_task(tickers=tickers)
+        return worker_sequential_training.train_sequential_task(tickers=tickers, budget_seconds=budget_seconds,
+                                                               force=bool(force))
         
     except Exception as e:
         logging.error(f"❌ Sequential training failed: {e}")
@@ -3871,8 +4099,8 @@ def train_sequential(tickers=None):
 @app.task
 def check_training_commands():
     """
-    Überwacht Redis auf manuelle Training-Commands vom Frontend
-    Wird regelmäßig durch Celery Beat aufgerufen
+    Überwacht Redis auf manuelle Training-Commands vom Frontend (Legacy-Key training:command)
+    Wird vom Command-Listener (Legacy-Bridge) ausgelöst, nicht mehr per Beat
     """
     try:
         command = r.get("training:command")
@@ -3896,5 +4124,41 @@ def check_training_commands():
         
     except Exception as e:
         logging.error(f"❌ Error checking training commands: {e}")
-        return {"status": "error", "message": str(e)}
+        raise  # Command bleibt pending -> Retry über den Command Bus
+
+
+# ===== Command Bus Handler (command_bus.py Listener) =====
+
+def _handle_emergency_command(payload):
+    # API-Commands tragen die Aktion direkt, Legacy-Bridge nur den Key
+    return emergency_handler(payload if payload.get('action') else None)
+
+def _handle_manual_orders_command(payload):
+    order = payload.get('order')
+    if order:
+        manual_orders = _redis_json_get('frontend:manual_orders', []) or []
+        manual_orders.append({**order, 'status': 'PENDING', 'created_at': order.get('created_at') or datetime.utcnow().isoformat()})
+        _redis_json_set('frontend:manual_orders', manual_orders)
+    return process_manual_orders()
+
+def _handle_training_command(payload):
+    if payload.get('key'):
+        return check_training_commands()
+    train_sequential.delay(tickers=payload.get('tickers'), budget_seconds=payload.get('budget_seconds'),
+                           force=bool(payload.get('force')))
+    return {"status": "training_started", "timestamp": datetime.now().isoformat()}
+
+def _handle_settings_command(payload):
+    return sync_frontend_settings()
+
+def _handle_autotrading_command(payload):
+    return monitor_autotrading_frontend()
+
+COMMAND_HANDLERS = {
+    'emergency': _handle_emergency_command,
+    'manual_orders': _handle_manual_orders_command,
+    'training_start': _handle_training_command,
+    'settings': _handle_settings_command,
+    'autotrading': _handle_autotrading_command,
+}
 
@@ -6,13 +6,16 @@ Trainiert ML-Modelle Ticker für Ticker mit Frontend-Monitoring
 import os
 import json
 import logging
+import time
 import redis
-import psycopg2
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-from autogluon.tabular import TabularPredictor, TabularDataset
-from celery import Celery
+from datetime import datetime
+from event_stream import publish_event
+from db_pool import db_cursor, transaction
+import model_registry
+import training_scheduler
+import training_fingerprint
+from walk_forward import WF_ENABLED, add_target_times, evaluate as walk_forward_evaluate, persist_evaluation
 
 # Setup
 logging.basicConfig(level=logging.INFO)
@@ -28,7 +31,8 @@ r = redis.from_url(REDIS_URL, decode_responses=True)
 class SequentialTrainer:
     """Sequenzieller Ticker-für-Ticker ML-Trainer"""
     
-    def __init__(self):
+    def __init__(self, force=False):
+        self.force = force  # Fingerprint-Prüfung übergehen (immer volles Training)
         self.horizons = [15, 30, 60]
         self.min_rows = int(os.getenv('TRAIN_MIN_ROWS', '150'))
         self.time_budget_per_model = 160  # Sekunden pro Modell
@@ -88,18 +92,14 @@ class SequentialTrainer:
         Returns: (has_enough_data, row_count)
         """
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cur = conn.cursor()
-            
-            cur.execute("""
-                SELECT COUNT(*) 
-                FROM market_data 
-                WHERE ticker = %s 
-                AND time >= NOW() - INTERVAL '14 days'
-            """, (ticker,))
-            
-            row_count = cur.fetchone()[0]
-            conn.close()
+            with db_cursor() as cur:
+                cur.execute("""
+                    SELECT COUNT(*) 
+                    FROM market_data 
+                    WHERE ticker = %s 
+                    AND time >= NOW() - INTERVAL '14 days'
+                """, (ticker,))
+                row_count = cur.fetchone()[0]
             
             has_enough = row_count >= self.min_rows
             return has_enough, row_count
@@ -113,68 +113,55 @@ class SequentialTrainer:
         Lädt Trainingsdaten für einen Ticker inkl. Grok Features (optional)
         """
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cur = conn.cursor()
-            
-            # Prüfe ob Grok-Tabellen existieren
-            cur.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'grok_deepersearch'
-                )
-            """)
-            has_deepersearch = cur.fetchone()[0]
-            
-            cur.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'grok_topstocks'
-                )
-            """)
-            has_topstocks = cur.fetchone()[0]
-            
-            # Base Query ohne Grok Features
-            if not has_deepersearch or not has_topstocks:
-                logger.info(f"Training {ticker} ohne Grok Features (Tabellen fehlen)")
-                query = """
-                    SELECT md.ticker, md.time, md.open, md.high, md.low, md.close, md.volume,
-                           LAG(md.close, 1) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close,
-                           LAG(md.close, 5) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_5,
-                           LAG(md.close, 15) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_15,
-                           0.0 AS grok_sentiment,
-                           0.0 AS grok_expected_gain
-                    FROM market_data md
-                    WHERE md.ticker = %s 
-                    AND md.time >= NOW() - INTERVAL '%s days'
-                    ORDER BY md.time
-                """
-            else:
-                # Query MIT Grok Features
-                query = """
-                    SELECT md.ticker, md.time, md.open, md.high, md.low, md.close, md.volume,
-                           LAG(md.close, 1) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close,
-                           LAG(md.close, 5) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_5,
-                           LAG(md.close, 15) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_15,
-                           COALESCE(ds.sentiment, 0.0) AS grok_sentiment,
-                           COALESCE(ts.expected_gain, 0.0) AS grok_expected_gain
-                    FROM market_data md
-                    LEFT JOIN LATERAL (
-                        SELECT sentiment FROM grok_deepersearch d
-                        WHERE d.ticker = md.ticker AND d.time <= md.time
-                        ORDER BY d.time DESC LIMIT 1
-                    ) ds ON TRUE
-                    LEFT JOIN LATERAL (
-                        SELECT expected_gain FROM grok_topstocks t
-                        WHERE t.ticker = md.ticker AND t.time <= md.time
-                        ORDER BY t.time DESC LIMIT 1
-                    ) ts ON TRUE
-                    WHERE md.ticker = %s 
-                    AND md.time >= NOW() - INTERVAL '%s days'
-                    ORDER BY md.time
-                """
-            
-            df = pd.read_sql(query, conn, params=(ticker, self.lookback_days))
-            conn.close()
+            with db_cursor() as cur:
+                # Prüfe ob Grok-Tabellen existieren
+                cur.execute("""
+                    SELECT to_regclass('grok_deepersearch') IS NOT NULL,
+                           to_regclass('grok_topstocks') IS NOT NULL
+                """)
+                has_deepersearch, has_topstocks = cur.fetchone()
+                
+                # Base Query ohne Grok Features
+                if not has_deepersearch or not has_topstocks:
+                    logger.info(f"Training {ticker} ohne Grok Features (Tabellen fehlen)")
+                    query = """
+                        SELECT md.ticker, md.time, md.open, md.high, md.low, md.close, md.volume,
+                               LAG(md.close, 1) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close,
+                               LAG(md.close, 5) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_5,
+                               LAG(md.close, 15) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_15,
+                               0.0 AS grok_sentiment,
+                               0.0 AS grok_expected_gain
+                        FROM market_data md
+                        WHERE md.ticker = %s 
+                        AND md.time >= NOW() - make_interval(days => %s)
+                        ORDER BY md.time
+                    """
+                else:
+                    # Query MIT Grok Features
+                    query = """
+                        SELECT md.ticker, md.time, md.open, md.high, md.low, md.close, md.volume,
+                               LAG(md.close, 1) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close,
+                               LAG(md.close, 5) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_5,
+                               LAG(md.close, 15) OVER (PARTITION BY md.ticker ORDER BY md.time) as prev_close_15,
+                               COALESCE(ds.sentiment, 0.0) AS grok_sentiment,
+                               COALESCE(ts.expected_gain, 0.0) AS grok_expected_gain
+                        FROM market_data md
+                        LEFT JOIN LATERAL (
+                            SELECT sentiment FROM grok_deepersearch d
+                            WHERE d.ticker = md.ticker AND d.time <= md.time
+                            ORDER BY d.time DESC LIMIT 1
+                        ) ds ON TRUE
+                        LEFT JOIN LATERAL (
+                            SELECT expected_gain FROM grok_topstocks t
+                            WHERE t.ticker = md.ticker AND t.time <= md.time
+                            ORDER BY t.time DESC LIMIT 1
+                        ) ts ON TRUE
+                        WHERE md.ticker = %s 
+                        AND md.time >= NOW() - make_interval(days => %s)
+                        ORDER BY md.time
+                    """
+                cur.execute(query, (ticker, self.lookback_days))
+                df = pd.DataFrame(cur.fetchall(), columns=[col[0] for col in cur.description])
             
             if len(df) == 0:
                 logger.warning(f"Keine Daten für {ticker}")
@@ -207,6 +194,7 @@ class SequentialTrainer:
         df['target_15'] = df['close'].shift(-1)   # 15min ahead
         df['target_30'] = df['close'].shift(-2)   # 30min ahead
         df['target_60'] = df['close'].shift(-4)   # 60min ahead
+        df = add_target_times(df)                 # für Purging in der Walk-Forward Evaluation
         
         # Grok Features Imputation
         for col in ['grok_sentiment', 'grok_expected_gain']:
@@ -220,11 +208,13 @@ class SequentialTrainer:
         
         return df_clean
     
-    def train_single_ticker(self, ticker):
+    def train_single_ticker(self, ticker, horizons=None, time_budgets=None):
         """
-        Trainiert alle 3 Horizonte für einen Ticker
+        Trainiert alle 3 Horizonte (bzw. horizons) für einen Ticker
+        time_budgets: Horizon -> Sekunden (training_scheduler), sonst time_budget_per_model
         Returns: dict mit Ergebnissen
         """
+        from autogluon.tabular import TabularPredictor, TabularDataset
         result = {
             'ticker': ticker,
             'status': 'unknown',
@@ -241,6 +231,21 @@ class SequentialTrainer:
                 logger.warning(f"⚠️  {ticker}: Zu wenig Daten ({row_count}/{self.min_rows})")
                 return result
             
+            # Fingerprint: Horizonte ohne relevante neue Daten überspringen, kleine Deltas incremental
+            selected = [str(hz) for hz in horizons] if horizons else ['15', '30', '60']
+            with db_cursor() as cur:
+                fingerprint = training_fingerprint.compute(cur, self.lookback_days, tickers=[ticker])
+                decisions = training_fingerprint.decide_slots(cur, r, ticker, selected, fingerprint, force=self.force)
+            for hz, decision in decisions.items():
+                if decision['mode'] == training_fingerprint.MODE_SKIP:
+                    result['models'][hz] = {'status': 'skipped', 'reason': decision['reason'],
+                                            'model_version': decision.get('previous_version')}
+            selected = [hz for hz in selected if decisions[hz]['mode'] != training_fingerprint.MODE_SKIP]
+            if not selected:
+                result['status'] = 'skipped'
+                logger.info(f"⏭️  {ticker}: keine relevanten neuen Daten, Training übersprungen")
+                return result
+            
             # 2. Daten laden
             df = self.load_ticker_data(ticker)
             if df is None or len(df) < self.min_rows:
@@ -258,18 +263,33 @@ class SequentialTrainer:
             
             # 4. Features extrahieren
             feature_cols = [c for c in df_clean.columns 
-                           if c not in ['time', 'ticker', 'target_15', 'target_30', 'target_60']]
+                           if c not in ['time', 'ticker', 'target_15', 'target_30', 'target_60']
+                           and not c.startswith('target_time_')]
             
-            # 5. Alle 3 Horizonte trainieren
+            # 5. Horizonte trainieren (alle 3 oder die vom Scheduler eingeplanten, ohne übersprungene)
             horizons = {
-                '15': 'target_15',
-                '30': 'target_30',
-                '60': 'target_60'
+                hz: label for hz, label in {
+                    '15': 'target_15',
+                    '30': 'target_30',
+                    '60': 'target_60'
+                }.items() if hz in selected
             }
+            time_budgets = time_budgets or {}
+            
+            # Out-of-Sample Metriken (Walk-Forward, Folds parallel) statt Predict auf den Trainingsdaten
+            evaluation = None
+            model_version = model_registry.new_version()
+            full_horizons = {hz: label for hz, label in horizons.items()
+                             if decisions[hz]['mode'] == training_fingerprint.MODE_FULL}
+            if WF_ENABLED and full_horizons:
+                try:
+                    evaluation = walk_forward_evaluate(df_clean, feature_cols, full_horizons, [ticker] * len(df_clean))
+                except Exception as e:
+                    logger.warning(f"  ⚠️  {ticker}: Walk-Forward Evaluation fehlgeschlagen: {e}")
             
             for horizon_idx, (horizon_name, target_col) in enumerate(horizons.items(), 1):
                 try:
-                    logger.info(f"  ⏳ Training {ticker} - {horizon_name}min Horizon ({horizon_idx}/3)...")
+                    logger.info(f"  ⏳ Training {ticker} - {horizon_name}min Horizon ({horizon_idx}/{len(horizons)})...")
                     
                     # Status Update: Welcher Horizon läuft gerade
                     current_status = r.get("training:status")
@@ -283,8 +303,13 @@ class SequentialTrainer:
                         columns={target_col: 'target'}
                     )
                     
-                    # AutoGluon Training
-                    model_path = f'/app/models/autogluon_model_{ticker}_{horizon_name}'
+                    training_mode = decisions[horizon_name]['mode']
+                    time_limit = int(time_budgets.get(horizon_name, self.time_budget_per_model))
+                    if training_mode == training_fingerprint.MODE_INCREMENTAL:
+                        time_limit = max(1, int(time_limit * training_fingerprint.INCREMENTAL_TIME_FRACTION))
+                    
+                    # AutoGluon Training ins Staging-Verzeichnis der Registry (scope = Ticker)
+                    model_path = model_registry.staging_path(ticker, horizon_name, model_version)
                     
                     predictor = TabularPredictor(
                         label='target',
@@ -294,33 +319,56 @@ class SequentialTrainer:
                     
                     predictor.fit(
                         TabularDataset(train_df),
-                        time_limit=self.time_budget_per_model,
+                        time_limit=time_limit,
                         verbosity=2  # 0=silent, 2=normal, 3=detailed, 4=debug
                     )
                     
-                    # Metriken berechnen
-                    y_true = train_df['target']
-                    y_pred = predictor.predict(train_df.drop('target', axis=1))
+                    # Metriken: Out-of-Sample aus der Walk-Forward Evaluation, Fallback MAE der AutoGluon Validierung
+                    oos = (evaluation or {}).get('horizons', {}).get(horizon_name, {}).get('overall', {})
+                    evaluation_source = 'walk_forward' if oos else 'validation'
+                    if not oos and training_mode == training_fingerprint.MODE_INCREMENTAL:
+                        # incremental: OOS-Metriken der Vorgängerversion übernehmen
+                        previous_metrics = decisions[horizon_name].get('previous_metrics') or {}
+                        oos = {k: previous_metrics.get(k) for k in ('mae', 'mape', 'r2', 'direction_accuracy')}
+                        evaluation_source = 'carried'
+                    mae = oos.get('mae')
+                    if mae is None:
+                        lb = predictor.leaderboard(silent=True)
+                        if not lb.empty and 'score_val' in lb.columns:
+                            mae = abs(float(lb.iloc[0]['score_val']))
+                    mape = oos.get('mape')
+                    r2 = oos.get('r2')
                     
-                    mae = float(np.mean(np.abs(y_true - y_pred)))
-                    
-                    with np.errstate(divide='ignore', invalid='ignore'):
-                        mape = float(np.mean(np.abs((y_true - y_pred) / np.where(y_true==0, np.nan, y_true))))
-                    
-                    ss_res = float(((y_true - y_pred)**2).sum())
-                    ss_tot = float(((y_true - y_true.mean())**2).sum())
-                    r2 = 1 - ss_res/ss_tot if ss_tot else None
+                    # Version veröffentlichen und sofort promoten (Horizonte sind unabhängig)
+                    model_path = model_registry.publish(ticker, horizon_name, model_version, {
+                        'source': 'sequential',
+                        'training_mode': training_mode,
+                        'fingerprint': fingerprint,
+                        'label': target_col,
+                        'features': list(predictor.feature_metadata.get_features()),
+                        'metrics': {'mae': mae, 'mape': mape, 'r2': r2,
+                                    'direction_accuracy': oos.get('direction_accuracy')},
+                        'training_window': {'start': str(df_clean['time'].min()), 'end': str(df_clean['time'].max())},
+                        'rows': len(train_df),
+                        'time_limit': time_limit,
+                        'latency': model_registry.measure_latency(predictor, train_df.drop(columns=['target'])),
+                    })
+                    model_registry.promote(r, ticker, {horizon_name: model_version})
                     
                     result['models'][horizon_name] = {
                         'status': 'success',
                         'mae': mae,
                         'mape': mape,
                         'r2': r2,
+                        'direction_accuracy': oos.get('direction_accuracy'),
+                        'evaluation': evaluation_source,
+                        'training_mode': training_mode,
                         'rows': len(train_df),
-                        'model_path': model_path
+                        'model_path': model_path,
+                        'model_version': model_version
                     }
                     
-                    logger.info(f"  ✅ {ticker} - {horizon_name}min: MAE={mae:.4f}, R²={r2:.4f}")
+                    logger.info(f"  ✅ {ticker} - {horizon_name}min: MAE={mae}, R²={r2} ({result['models'][horizon_name]['evaluation']})")
                     
                     # Status Update: Model Counter erhöhen nach jedem erfolgreichen Horizon
                     current_status = r.get("training:status")
@@ -342,9 +390,21 @@ class SequentialTrainer:
                     }
                     logger.error(f"  ❌ {ticker} - {horizon_name}min: {e}")
             
+            if evaluation:
+                try:
+                    with transaction() as cur:
+                        persist_evaluation(cur, evaluation, model_version=model_version, source='sequential')
+                except Exception as e:
+                    logger.warning(f"  ⚠️  {ticker}: model_evaluations nicht gespeichert: {e}")
+            
+            try:
+                model_registry.gc(r, scopes=[ticker])
+            except Exception as e:
+                logger.warning(f"  ⚠️  {ticker}: Model Registry GC fehlgeschlagen: {e}")
+            
             # Status setzen
             successful_models = sum(1 for m in result['models'].values() if m.get('status') == 'success')
-            if successful_models == 3:
+            if successful_models == len(horizons):
                 result['status'] = 'success'
             elif successful_models > 0:
                 result['status'] = 'partial_success'
@@ -367,14 +427,124 @@ class SequentialTrainer:
                 3600,  # 1 Stunde TTL
                 json.dumps(status_data, default=str)
             )
+            publish_event(r, "training", "status", status_data)
         except Exception as e:
             logger.error(f"Fehler beim Speichern von Training-Status: {e}")
     
-    def run_sequential_training(self, tickers=None):
+    def run_scheduled_training(self, tickers=None, budget_seconds=None):
+        """
+        Budget-gesteuertes Training (training_scheduler): (Ticker, Horizon) Jobs nach Wert,
+        Zeitlimits aus dem Fensterbudget, Preemption bei erschöpftem Budget, Rest -> Backlog
+        """
+        if tickers is None:
+            tickers = self.get_training_tickers()
+        with db_cursor() as cur:
+            plan = training_scheduler.build_plan(r, cur, tickers, self.horizons, self.min_rows,
+                                                 budget_seconds=budget_seconds)
+        deadline = time.monotonic() + plan['budget_seconds']
+        groups = training_scheduler.group_by_ticker(plan['scheduled'])
+        logger.info(f"🗓️  Scheduler: Budget {plan['budget_seconds']}s, {len(plan['scheduled'])} Jobs geplant "
+                    f"(~{plan['estimated_seconds']}s), {len(plan['deferred'])} zurückgestellt")
+        
+        if not groups:
+            training_scheduler.update_backlog(r, [], plan['deferred'], remove=plan['stale_backlog'])
+            r.set(training_scheduler.PLAN_KEY, json.dumps({**plan, 'status': 'nothing_scheduled'}, default=str))
+            return {'status': 'nothing_scheduled', 'budget_seconds': plan['budget_seconds'],
+                    'deferred': len(plan['deferred'])}
+        
+        total_models = len(plan['scheduled'])
+        status = {
+            'status': 'running',
+            'started_at': datetime.now().isoformat(),
+            'total_tickers': len(groups),
+            'total_models': total_models,
+            'current_ticker': None,
+            'current_horizon': None,
+            'completed_tickers': [],
+            'completed_models': 0,
+            'progress_percent': 0,
+            'errors': [],
+            'ticker_results': {},
+            'schedule': {
+                'budget_seconds': plan['budget_seconds'],
+                'estimated_seconds': plan['estimated_seconds'],
+                'deferred': len(plan['deferred']),
+                'preempted': 0
+            }
+        }
+        self.update_training_status(status)
+        
+        completed, preempted, failed = [], [], []
+        for idx, (ticker, jobs) in enumerate(groups, 1):
+            remaining = deadline - time.monotonic()
+            fitted = training_scheduler.fit_remaining(jobs, remaining, plan['walk_forward'])
+            if fitted['preempted']:
+                preempted.extend(fitted['preempted'])
+                status['schedule']['preempted'] = len(preempted)
+                logger.info(f"⏸️  {ticker}: {len(fitted['preempted'])} Jobs preempted (Rest {int(remaining)}s)")
+            if not fitted['run']:
+                continue
+            
+            status['current_ticker'] = ticker
+            status['current_horizon'] = int(fitted['run'][0]['horizon'])
+            self.update_training_status(status)
+            
+            started = time.monotonic()
+            ticker_result = self.train_single_ticker(
+                ticker,
+                horizons=[job['horizon'] for job in fitted['run']],
+                time_budgets={job['horizon']: job['time_limit'] for job in fitted['run']}
+            )
+            ticker_result['schedule'] = {
+                'jobs': {job['horizon']: {'score': job['score'], 'time_limit': job['time_limit']} for job in fitted['run']},
+                'estimated_seconds': round(training_scheduler.estimate_seconds(
+                    [job['time_limit'] for job in fitted['run']], plan['walk_forward']), 1),
+                'actual_seconds': round(time.monotonic() - started, 1)
+            }
+            status['ticker_results'][ticker] = ticker_result
+            
+            for job in fitted['run']:
+                model = ticker_result.get('models', {}).get(job['horizon'], {})
+                (completed if model.get('status') in ('success', 'skipped') else failed).append(job)
+            successful = sum(1 for m in ticker_result.get('models', {}).values() if m.get('status') == 'success')
+            if successful:
+                status['completed_tickers'].append(ticker)
+                status['completed_models'] += successful
+            for error in ticker_result.get('errors', []):
+                status['errors'].append(f"{ticker}: {error}")
+            status['progress_percent'] = int((idx / len(groups)) * 100)
+            self.update_training_status(status)
+        
+        # Zurückgestellte + preempted Jobs laufen im nächsten Fenster (Aging-Bonus); fehlgeschlagene
+        # Jobs bleiben wie bisher bis zum nächsten regulären Plan draußen
+        training_scheduler.update_backlog(r, completed + failed, plan['deferred'] + preempted,
+                                          remove=plan['stale_backlog'])
+        r.set(training_scheduler.PLAN_KEY, json.dumps({
+            **plan,
+            'completed': [(j['ticker'], j['horizon']) for j in completed],
+            'failed': [(j['ticker'], j['horizon']) for j in failed],
+            'preempted': [(j['ticker'], j['horizon']) for j in preempted],
+            'finished_at': datetime.utcnow().isoformat()
+        }, default=str))
+        
+        status['status'] = 'completed'
+        status['completed_at'] = datetime.now().isoformat()
+        status['current_ticker'] = None
+        status['current_horizon'] = None
+        status['progress_percent'] = 100
+        self.update_training_status(status)
+        logger.info(f"🎉 Scheduled Training abgeschlossen: {len(completed)}/{total_models} Modelle, "
+                    f"{len(preempted)} preempted, {len(plan['deferred'])} zurückgestellt")
+        return status
+    
+    def run_sequential_training(self, tickers=None, budget_seconds=None):
         """
         Hauptfunktion: Trainiert alle Ticker sequenziell
+        (mit TRAIN_SCHEDULER_ENABLED budget-gesteuert über run_scheduled_training)
         """
         logger.info("🚀 Starte Sequential Training")
+        if training_scheduler.SCHEDULER_ENABLED:
+            return self.run_scheduled_training(tickers=tickers, budget_seconds=budget_seconds)
         
         # Ticker bestimmen
         if tickers is None:
@@ -425,7 +595,7 @@ class SequentialTrainer:
             # Ergebnisse speichern
             status['ticker_results'][ticker] = ticker_result
             
-            if ticker_result['status'] in ['success', 'partial_success']:
+            if ticker_result['status'] in ['success', 'partial_success', 'skipped']:
                 status['completed_tickers'].append(ticker)
                 successful_models = sum(
                     1 for m in ticker_result['models'].values() 
@@ -464,10 +634,10 @@ class SequentialTrainer:
 
 
 # Celery Task Wrapper
-def train_sequential_task(tickers=None):
+def train_sequential_task(tickers=None, budget_seconds=None, force=False):
     """Celery Task für sequenzielles Training"""
-    trainer = SequentialTrainer()
-    return trainer.run_sequential_training(tickers=tickers)
+    trainer = SequentialTrainer(force=force)
+    return trainer.run_sequential_training(tickers=tickers, budget_seconds=budget_seconds)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,12 @@
-import os, time, json, logging, redis, yfinance as yf
+import os, time, json, logging, redis, threading, yfinance as yf
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import numpy as np
 
+import redis_codec
+
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='[yfinance-enhanced] %(asctime)s %(levelname)s %(message)s')
 
@@ -11,8 +14,55 @@ REDIS_URL = os.getenv('REDIS_URL', 'redis://:pass123@redis:6379/0')
 INTERVAL = int(os.getenv('YF_ENHANCED_INTERVAL','300'))  # 5 Minuten zwischen Läufen
 HISTORY_DAYS = int(os.getenv('YF_HISTORY_DAYS','365'))  # 1 Jahr historische Daten
 
+# Fundamentals/News: eigener, deutlich langsamerer Zyklus (Yahoo quoteSummary ist stark rate-limitiert)
+FUNDAMENTALS_INTERVAL = int(os.getenv('YF_FUNDAMENTALS_INTERVAL','21600'))  # 6 Stunden
+FUNDAMENTALS_WORKERS = int(os.getenv('YF_FUNDAMENTALS_WORKERS','3'))
+FUNDAMENTALS_RATE = float(os.getenv('YF_FUNDAMENTALS_RATE','0.5'))  # Requests/Sekunde über alle Threads
+
+# Inkrementelle Indikatoren: volle 1y-Historie nur bei neuem Handelstag/Corporate Action, sonst nur letzter Bar
+INCREMENTAL_PERIOD = os.getenv('YF_INCREMENTAL_PERIOD','5d')
+CORPORATE_ACTION_TOLERANCE = float(os.getenv('YF_CORPORATE_ACTION_TOLERANCE','0.002'))  # rel. Abweichung Vortags-Close
+STATE_TTL = 7 * 86400
+CLOSE_WINDOW = 199   # SMA_200 braucht 199 Vorgänger-Closes
+VOLUME_WINDOW = 19   # Volume_SMA (20) braucht 19 Vorgänger
+EMA_SPANS = {'ema12': 12, 'ema26': 26, 'signal': 9}
+
+# Spalten von historical_columns (Feature-Name -> DataFrame-Spalte); 'date' und 'volume' kommen separat
+FEATURE_COLUMNS = {
+    'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close',
+    'sma_20': 'SMA_20', 'sma_50': 'SMA_50', 'sma_200': 'SMA_200', 'rsi': 'RSI',
+    'macd': 'MACD', 'macd_signal': 'MACD_Signal', 'bb_upper': 'BB_Upper', 'bb_lower': 'BB_Lower',
+    'volume_ratio': 'Volume_Ratio'
+}
+
 r = redis.from_url(REDIS_URL)
 
+class RateLimiter:
+    """Token Bucket, von allen Threads des Fundamentals-Pools geteilt"""
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+rate_limiter = RateLimiter(FUNDAMENTALS_RATE)
+
+# Pro Ticker: Spalten der abgeschlossenen Bars + letzter (offener) Bar
+_history_cache = {}
+
 def get_tickers():
     """Hole aktuelle Ticker Liste aus Redis dynamic_tickers"""
     try:
@@ -23,217 +73,423 @@ def get_tickers():
         logging.error(f"Error getting tickers: {e}")
     return ['AAPL','MSFT','NVDA','TSLA','AMZN','GOOGL','META','NFLX','CRM','ORCL']
 
-def fetch_historical_data(ticker, period='1y'):
-    """Fetch comprehensive historical data for ML training with robust error handling"""
-    try:
-        stock = yf.Ticker(ticker)
-        
-        # 1. Historische OHLCV Daten mit Retry Logic
-        hist = None
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                hist = stock.history(period=period, interval='1d')
-                if not hist.empty:
-                    break
-                time.sleep(2 ** attempt)  # Exponential backoff
-            except Exception as e:
-                logging.warning(f"Attempt {attempt + 1} failed for {ticker}: {e}")
-                if attempt == max_retries - 1:
-                    return None
-                time.sleep(5 * (attempt + 1))  # Progressive delay
-        
-        if hist is None or hist.empty:
-            logging.warning(f"No historical data for {ticker}")
-            return None
-            
-        # 2. Fundamentals (mit Rate Limiting und Fallback)
-        info = {'fundamentals': {}}
-        try:
-            # Rate limiting für info API
-            time.sleep(2)  # 2 seconds between info calls
-            
-            stock_info = stock.info
-            if stock_info and isinstance(stock_info, dict):
-                # Wichtige Fundamentals für ML
-                fundamentals = {
-                    'market_cap': stock_info.get('marketCap'),
-                    'pe_ratio': stock_info.get('trailingPE'),
-                    'peg_ratio': stock_info.get('pegRatio'),
-                    'price_to_book': stock_info.get('priceToBook'),
-                    'revenue_growth': stock_info.get('revenueGrowth'),
-                    'profit_margin': stock_info.get('profitMargins'),
-                    'operating_margin': stock_info.get('operatingMargins'),
-                    'return_on_equity': stock_info.get('returnOnEquity'),
-                    'debt_to_equity': stock_info.get('debtToEquity'),
-                    'current_ratio': stock_info.get('currentRatio'),
-                    'beta': stock_info.get('beta'),
-                    'fifty_two_week_high': stock_info.get('fiftyTwoWeekHigh'),
-                    'fifty_two_week_low': stock_info.get('fiftyTwoWeekLow'),
-                    'dividend_yield': stock_info.get('dividendYield'),
-                    'sector': stock_info.get('sector'),
-                    'industry': stock_info.get('industry')
-                }
-                info['fundamentals'] = fundamentals
-                logging.info(f"✅ {ticker}: Fundamentals fetched")
-            else:
-                logging.warning(f"⚠️ {ticker}: Empty stock info")
-        except Exception as e:
-            logging.warning(f"❌ {ticker}: Fundamentals failed: {e}")
-            # Skip fundamentals but continue with historical data
-        
-        # 3. News (mit Fallback und Rate Limiting)
-        info['news'] = []
-        try:
-            # Rate limiting für news API
-            time.sleep(1)
-            
-            news = stock.news[:5] if hasattr(stock, 'news') and stock.news else []  # Reduziert auf 5
-            news_data = []
-            for article in news:
-                if isinstance(article, dict):
-                    news_data.append({
-                        'title': article.get('title', '')[:200],  # Titel begrenzen
-                        'publisher': article.get('publisher', ''),
-                        'published': datetime.fromtimestamp(article.get('providerPublishTime', 0)).isoformat() if article.get('providerPublishTime') else None,
-                        'sentiment': 0.5  # Neutral default
-                    })
-            info['news'] = news_data
-            logging.info(f"📰 {ticker}: {len(news_data)} news articles")
-        except Exception as e:
-            logging.warning(f"❌ {ticker}: News failed: {e}")
-            # Continue without news
-        
-        # 4. Technical Indicators berechnen
+def download_history(tickers, period='1y'):
+    """OHLCV für alle Ticker mit einem Multi-Ticker yf.download (threads=True) -> {ticker: DataFrame}"""
+    frames = {}
+    pending = list(tickers)
+    max_retries = 3
+    for attempt in range(max_retries):
+        if not pending:
+            break
         try:
-            # Simple Moving Averages
-            hist['SMA_20'] = hist['Close'].rolling(window=20).mean()
-            hist['SMA_50'] = hist['Close'].rolling(window=50).mean()
-            hist['SMA_200'] = hist['Close'].rolling(window=200).mean()
-            
-            # RSI (Relative Strength Index)
-            delta = hist['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            hist['RSI'] = 100 - (100 / (1 + rs))
-            
-            # MACD
-            exp1 = hist['Close'].ewm(span=12).mean()
-            exp2 = hist['Close'].ewm(span=26).mean()
-            hist['MACD'] = exp1 - exp2
-            hist['MACD_Signal'] = hist['MACD'].ewm(span=9).mean()
-            hist['MACD_Histogram'] = hist['MACD'] - hist['MACD_Signal']
-            
-            # Bollinger Bands
-            hist['BB_Middle'] = hist['Close'].rolling(window=20).mean()
-            bb_std = hist['Close'].rolling(window=20).std()
-            hist['BB_Upper'] = hist['BB_Middle'] + (bb_std * 2)
-            hist['BB_Lower'] = hist['BB_Middle'] - (bb_std * 2)
-            
-            # Volume indicators
-            hist['Volume_SMA'] = hist['Volume'].rolling(window=20).mean()
-            hist['Volume_Ratio'] = hist['Volume'] / hist['Volume_SMA']
-            
+            raw = yf.download(pending, period=period, interval='1d', group_by='ticker',
+                              threads=True, auto_adjust=False, progress=False)
         except Exception as e:
-            logging.warning(f"Could not calculate technical indicators for {ticker}: {e}")
-        
-        # 5. Prepare ML features
-        ml_features = []
-        for idx, row in hist.iterrows():
-            if pd.isna(row['Close']):
+            logging.warning(f"Bulk download attempt {attempt + 1} failed ({len(pending)} tickers): {e}")
+            time.sleep(5 * (attempt + 1))  # Progressive delay
+            continue
+        for ticker in pending:
+            try:
+                hist = raw[ticker] if isinstance(raw.columns, pd.MultiIndex) else raw
+            except KeyError:
                 continue
-                
-            feature_row = {
-                'date': idx.strftime('%Y-%m-%d'),
-                'ticker': ticker,
-                'open': float(row['Open']) if not pd.isna(row['Open']) else None,
-                'high': float(row['High']) if not pd.isna(row['High']) else None,
-                'low': float(row['Low']) if not pd.isna(row['Low']) else None,
-                'close': float(row['Close']),
-                'volume': int(row['Volume']) if not pd.isna(row['Volume']) else 0,
-                'sma_20': float(row['SMA_20']) if not pd.isna(row['SMA_20']) else None,
-                'sma_50': float(row['SMA_50']) if not pd.isna(row['SMA_50']) else None,
-                'sma_200': float(row['SMA_200']) if not pd.isna(row['SMA_200']) else None,
-                'rsi': float(row['RSI']) if not pd.isna(row['RSI']) else None,
-                'macd': float(row['MACD']) if not pd.isna(row['MACD']) else None,
-                'macd_signal': float(row['MACD_Signal']) if not pd.isna(row['MACD_Signal']) else None,
-                'bb_upper': float(row['BB_Upper']) if not pd.isna(row['BB_Upper']) else None,
-                'bb_lower': float(row['BB_Lower']) if not pd.isna(row['BB_Lower']) else None,
-                'volume_ratio': float(row['Volume_Ratio']) if not pd.isna(row['Volume_Ratio']) else None
+            hist = hist.dropna(how='all')
+            if not hist.empty:
+                frames[ticker] = hist.copy()
+        # Fehlende Ticker (Timeout/429 einzelner Threads) im nächsten Versuch erneut
+        pending = [t for t in pending if t not in frames]
+        if pending and attempt < max_retries - 1:
+            time.sleep(2 ** attempt)  # Exponential backoff
+    for ticker in pending:
+        logging.warning(f"No historical data for {ticker}")
+    return frames
+
+def add_technical_indicators(hist):
+    """Technical Indicators für ML Features (in-place)"""
+    # Simple Moving Averages
+    hist['SMA_20'] = hist['Close'].rolling(window=20).mean()
+    hist['SMA_50'] = hist['Close'].rolling(window=50).mean()
+    hist['SMA_200'] = hist['Close'].rolling(window=200).mean()
+
+    # RSI (Relative Strength Index)
+    delta = hist['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / loss
+    hist['RSI'] = 100 - (100 / (1 + rs))
+
+    # MACD
+    exp1 = hist['Close'].ewm(span=12).mean()
+    exp2 = hist['Close'].ewm(span=26).mean()
+    hist['MACD'] = exp1 - exp2
+    hist['MACD_Signal'] = hist['MACD'].ewm(span=9).mean()
+    hist['MACD_Histogram'] = hist['MACD'] - hist['MACD_Signal']
+
+    # Bollinger Bands
+    hist['BB_Middle'] = hist['Close'].rolling(window=20).mean()
+    bb_std = hist['Close'].rolling(window=20).std()
+    hist['BB_Upper'] = hist['BB_Middle'] + (bb_std * 2)
+    hist['BB_Lower'] = hist['BB_Middle'] - (bb_std * 2)
+
+    # Volume indicators
+    hist['Volume_SMA'] = hist['Volume'].rolling(window=20).mean()
+    hist['Volume_Ratio'] = hist['Volume'] / hist['Volume_SMA']
+    return hist
+
+def build_feature_columns(hist):
+    """ML Features spaltenweise (NumPy statt iterrows): {'date': [...], 'close': [...], ...}, NaN/inf -> None"""
+    bars = hist[hist['Close'].notna()]
+    columns = {'date': bars.index.strftime('%Y-%m-%d').tolist()}
+    for name, source in FEATURE_COLUMNS.items():
+        if source not in bars:
+            columns[name] = [None] * len(bars)
+            continue
+        values = bars[source].to_numpy(dtype=float)
+        columns[name] = np.where(np.isfinite(values), values, None).tolist()
+    columns['volume'] = bars['Volume'].fillna(0).astype('int64').tolist()
+    return columns
+
+def _ewm_step(state, value, span):
+    """Ein Schritt von pandas ewm(span, adjust=True): [Zähler, Nenner] der gewichteten Summe"""
+    decay = 1 - 2 / (span + 1)
+    num, den = state
+    return [value + decay * num, 1 + decay * den]
+
+def _ewm_value(state):
+    return state[0] / state[1] if state[1] else None
+
+def build_indicator_state(hist):
+    """Indikator-State bis einschließlich vorletztem Bar (Fenster + EMA-Summen); der letzte Bar bleibt offen"""
+    bars = hist[hist['Close'].notna()]
+    prior = bars.iloc[:-1]
+    closes = [float(c) for c in prior['Close']]
+    volumes = [0.0 if pd.isna(v) else float(v) for v in prior['Volume']]
+    emas = {name: [0.0, 0.0] for name in EMA_SPANS}
+    for close in closes:
+        emas['ema12'] = _ewm_step(emas['ema12'], close, EMA_SPANS['ema12'])
+        emas['ema26'] = _ewm_step(emas['ema26'], close, EMA_SPANS['ema26'])
+        macd = _ewm_value(emas['ema12']) - _ewm_value(emas['ema26'])
+        emas['signal'] = _ewm_step(emas['signal'], macd, EMA_SPANS['signal'])
+    return {
+        'bar_date': bars.index[-1].strftime('%Y-%m-%d'),
+        'prev_date': prior.index[-1].strftime('%Y-%m-%d') if len(prior) else None,
+        'closes': closes[-CLOSE_WINDOW:],
+        'volumes': volumes[-VOLUME_WINDOW:],
+        **emas,
+        'built_at': datetime.utcnow().isoformat()
+    }
+
+def incremental_row(state, date, bar):
+    """Feature-Row des neuesten Bars aus State + OHLCV (gleiche Formeln wie add_technical_indicators)"""
+    close = float(bar['Close'])
+    volume = 0.0 if pd.isna(bar['Volume']) else float(bar['Volume'])
+    closes = state['closes'] + [close]
+    volumes = state['volumes'] + [volume]
+
+    def sma(n):
+        return sum(closes[-n:]) / n if len(closes) >= n else None
+
+    def num(value):
+        return None if pd.isna(value) else float(value)
+
+    # RSI: einfache 14er Mittel der Gewinne/Verluste
+    rsi = None
+    if len(closes) >= 15:
+        deltas = [b - a for a, b in zip(closes[-15:-1], closes[-14:])]
+        gain = sum(d for d in deltas if d > 0) / 14
+        loss = sum(-d for d in deltas if d < 0) / 14
+        if loss:
+            rsi = 100 - (100 / (1 + gain / loss))
+        elif gain:
+            rsi = 100.0
+
+    sma_20 = sma(20)
+    bb_upper = bb_lower = None
+    if sma_20 is not None:
+        bb_std = (sum((c - sma_20) ** 2 for c in closes[-20:]) / 19) ** 0.5
+        bb_upper, bb_lower = sma_20 + bb_std * 2, sma_20 - bb_std * 2
+
+    volume_ratio = None
+    if len(volumes) >= 20:
+        volume_sma = sum(volumes[-20:]) / 20
+        volume_ratio = volume / volume_sma if volume_sma else None
+
+    macd = _ewm_value(_ewm_step(state['ema12'], close, EMA_SPANS['ema12'])) - \
+        _ewm_value(_ewm_step(state['ema26'], close, EMA_SPANS['ema26']))
+    macd_signal = _ewm_value(_ewm_step(state['signal'], macd, EMA_SPANS['signal']))
+
+    return {
+        'date': date,
+        'open': num(bar['Open']),
+        'high': num(bar['High']),
+        'low': num(bar['Low']),
+        'close': close,
+        'volume': int(volume),
+        'sma_20': sma_20,
+        'sma_50': sma(50),
+        'sma_200': sma(200),
+        'rsi': rsi,
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'bb_upper': bb_upper,
+        'bb_lower': bb_lower,
+        'volume_ratio': volume_ratio
+    }
+
+def rebuild_reason(state, hist):
+    """None wenn der letzte Bar inkrementell aktualisiert werden kann, sonst Grund für den Full Rebuild"""
+    bars = hist[hist['Close'].notna()]
+    if bars.empty:
+        return 'no_bars'
+    if bars.index[-1].strftime('%Y-%m-%d') != state['bar_date']:
+        return 'new_trading_day'
+    if state.get('prev_date'):
+        prev = bars[bars.index.strftime('%Y-%m-%d') == state['prev_date']]
+        if prev.empty:
+            return 'prev_bar_missing'
+        # Split/Dividende: Yahoo passt die Vergangenheit rückwirkend an -> Vortags-Close weicht ab
+        ref = state['closes'][-1]
+        if abs(float(prev['Close'].iloc[-1]) - ref) > CORPORATE_ACTION_TOLERANCE * abs(ref):
+            return 'corporate_action'
+    return None
+
+def _payload(ticker, entry, last_row, cached):
+    """yfinance_enhanced Payload; historical_columns = abgeschlossene Bars + letzter Bar (spaltenweise)"""
+    data = {
+        'ticker': ticker,
+        'timestamp': datetime.utcnow().isoformat(),
+        'historical_columns': {name: values + [last_row.get(name)] for name, values in entry['columns'].items()},
+        'fundamentals': cached.get('fundamentals', {}),
+        'news': cached.get('news', []),
+        'fundamentals_updated': cached.get('fetched_at'),
+        'data_points': entry['data_points']
+    }
+    return redis_codec.dumps(f'yfinance_enhanced:{ticker}', data)
+
+def _history_entry(columns, cached):
+    return {
+        'columns': {name: values[:-1] for name, values in columns.items()},
+        'last_row': {name: values[-1] for name, values in columns.items()},
+        'data_points': len(columns['date']),
+        'fundamentals_updated': cached.get('fetched_at')
+    }
+
+def _load_history_entry(ticker):
+    """Spalten-Cache nach Service-Neustart einmalig aus dem gespeicherten Payload rekonstruieren"""
+    if ticker not in _history_cache:
+        try:
+            raw = r.get(f'yfinance_enhanced:{ticker}')
+            data = redis_codec.loads(raw, {})
+        except Exception:
+            data = {}
+        columns = data.get('historical_columns')
+        # Altes zeilenweises Format (historical_data) -> Full Rebuild
+        if not columns or not columns.get('date'):
+            return None
+        _history_cache[ticker] = _history_entry(columns, {'fetched_at': data.get('fundamentals_updated')})
+    return _history_cache[ticker]
+
+def fetch_fundamentals(ticker):
+    """Fundamentals + News für einen Ticker (läuft im Fundamentals-Pool, Rate Limit geteilt)"""
+    stock = yf.Ticker(ticker)
+    info = {'ticker': ticker, 'fundamentals': {}, 'news': [], 'fetched_at': datetime.utcnow().isoformat()}
+    try:
+        rate_limiter.acquire()
+        stock_info = stock.info
+        if stock_info and isinstance(stock_info, dict):
+            # Wichtige Fundamentals für ML
+            info['fundamentals'] = {
+                'market_cap': stock_info.get('marketCap'),
+                'pe_ratio': stock_info.get('trailingPE'),
+                'peg_ratio': stock_info.get('pegRatio'),
+                'price_to_book': stock_info.get('priceToBook'),
+                'revenue_growth': stock_info.get('revenueGrowth'),
+                'profit_margin': stock_info.get('profitMargins'),
+                'operating_margin': stock_info.get('operatingMargins'),
+                'return_on_equity': stock_info.get('returnOnEquity'),
+                'debt_to_equity': stock_info.get('debtToEquity'),
+                'current_ratio': stock_info.get('currentRatio'),
+                'beta': stock_info.get('beta'),
+                'fifty_two_week_high': stock_info.get('fiftyTwoWeekHigh'),
+                'fifty_two_week_low': stock_info.get('fiftyTwoWeekLow'),
+                'dividend_yield': stock_info.get('dividendYield'),
+                'sector': stock_info.get('sector'),
+                'industry': stock_info.get('industry')
             }
-            ml_features.append(feature_row)
-        
-        return {
-            'ticker': ticker,
-            'timestamp': datetime.utcnow().isoformat(),
-            'historical_data': ml_features,
-            'fundamentals': info['fundamentals'],
-            'news': info['news'],
-            'data_points': len(ml_features)
-        }
-        
+        else:
+            logging.warning(f"⚠️ {ticker}: Empty stock info")
+    except Exception as e:
+        logging.warning(f"❌ {ticker}: Fundamentals failed: {e}")
+
+    try:
+        rate_limiter.acquire()
+        news = stock.news[:5] if hasattr(stock, 'news') and stock.news else []  # Reduziert auf 5
+        for article in news:
+            if isinstance(article, dict):
+                info['news'].append({
+                    'title': article.get('title', '')[:200],  # Titel begrenzen
+                    'publisher': article.get('publisher', ''),
+                    'published': datetime.fromtimestamp(article.get('providerPublishTime', 0)).isoformat() if article.get('providerPublishTime') else None,
+                    'sentiment': 0.5  # Neutral default
+                })
     except Exception as e:
-        logging.error(f"Error fetching data for {ticker}: {e}")
+        logging.warning(f"❌ {ticker}: News failed: {e}")
+    return info
+
+def get_fundamentals(ticker):
+    try:
+        raw = r.get(f'yfinance_fundamentals:{ticker}')
+        return redis_codec.loads(raw)
+    except Exception:
         return None
 
+def refresh_fundamentals(tickers=None, max_age=FUNDAMENTALS_INTERVAL):
+    """Fundamentals/News für alle Ticker deren Cache älter als max_age ist (bounded Thread Pool)"""
+    tickers = tickers or get_tickers()
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    stale = []
+    for ticker in tickers:
+        cached = get_fundamentals(ticker)
+        if not cached or datetime.fromisoformat(cached.get('fetched_at', '1970-01-01')) < cutoff:
+            stale.append(ticker)
+    if not stale:
+        return 0
+    logging.info(f"Refreshing fundamentals/news for {len(stale)} tickers ({FUNDAMENTALS_WORKERS} workers, {FUNDAMENTALS_RATE}/s)")
+    refreshed = 0
+    with ThreadPoolExecutor(max_workers=FUNDAMENTALS_WORKERS) as pool:
+        for info in pool.map(fetch_fundamentals, stale):
+            # Nur überschreiben wenn etwas kam, sonst bleibt der alte Stand bis zum nächsten Versuch
+            if info['fundamentals'] or info['news']:
+                key = f'yfinance_fundamentals:{info["ticker"]}'
+                r.set(key, redis_codec.dumps(key, info), ex=max_age * 4)
+                refreshed += 1
+    logging.info(f"📰 Fundamentals refreshed: {refreshed}/{len(stale)}")
+    return refreshed
+
+def fundamentals_loop():
+    """Eigener Zyklus im Hintergrund-Thread; prüft alle INTERVAL Sekunden auf neue/veraltete Ticker"""
+    while True:
+        try:
+            refresh_fundamentals()
+        except Exception as e:
+            logging.error(f"Error in fundamentals loop: {e}")
+        time.sleep(INTERVAL)
+
 def update_redis_data():
-    """Update Redis with enhanced YFinance data"""
+    """Update Redis with enhanced YFinance data (Preise + Indikatoren, Fundamentals aus Cache)
+
+    Pro Lauf nur ein kurzer Bulk-Download (INCREMENTAL_PERIOD); der neueste Bar wird aus dem
+    gespeicherten Indikator-State berechnet. Volle 1y-Historie + Neuberechnung nur ohne State,
+    bei neuem Handelstag oder erkannter Corporate Action.
+    """
+    started = time.time()
     tickers = get_tickers()
     logging.info(f"Starting enhanced YFinance data collection for {len(tickers)} tickers")
-    
-    success_count = 0
+
+    counts = {'rebuilt': 0, 'incremental': 0, 'unchanged': 0}
     error_count = 0
-    
-    for ticker in tickers:
+    pending = {}
+
+    states = {}
+    for ticker, raw in zip(tickers, r.mget([f'yfinance_indicator_state:{t}' for t in tickers])):
+        if raw:
+            states[ticker] = redis_codec.loads(raw)
+    rebuild = [t for t in tickers if t not in states or _load_history_entry(t) is None]
+    incremental = [t for t in tickers if t not in rebuild]
+
+    pipe = r.pipeline(transaction=False)
+    recent = download_history(incremental, period=INCREMENTAL_PERIOD) if incremental else {}
+    for ticker in incremental:
+        hist = recent.get(ticker)
+        if hist is None:
+            error_count += 1
+            continue
+        state = states[ticker]
+        reason = rebuild_reason(state, hist)
+        if reason:
+            logging.info(f"🔄 {ticker}: full rebuild ({reason})")
+            rebuild.append(ticker)
+            continue
+        try:
+            bars = hist[hist['Close'].notna()]
+            row = incremental_row(state, state['bar_date'], bars.iloc[-1])
+            entry = _history_cache[ticker]
+            cached = get_fundamentals(ticker) or {}
+            # Außerhalb der Handelszeit ändert sich nichts -> kein Redis Write
+            if row == entry['last_row'] and cached.get('fetched_at') == entry['fundamentals_updated']:
+                counts['unchanged'] += 1
+                continue
+            pipe.set(f'yfinance_enhanced:{ticker}', _payload(ticker, entry, row, cached))
+            pending[ticker] = dict(entry, last_row=row, fundamentals_updated=cached.get('fetched_at'))
+            counts['incremental'] += 1
+        except Exception as e:
+            error_count += 1
+            logging.error(f"❌ {ticker}: Incremental update failed {e}")
+
+    frames = download_history(rebuild, period='1y') if rebuild else {}
+    for ticker in rebuild:
+        hist = frames.get(ticker)
+        if hist is None:
+            error_count += 1
+            continue
         try:
-            data = fetch_historical_data(ticker)
-            if data:
-                # Store individual ticker data
-                r.set(f'yfinance_enhanced:{ticker}', json.dumps(data))
-                success_count += 1
-                logging.info(f"✅ {ticker}: {data['data_points']} data points, {len(data['news'])} news articles")
-            else:
+            try:
+                add_technical_indicators(hist)
+            except Exception as e:
+                logging.warning(f"Could not calculate technical indicators for {ticker}: {e}")
+            columns = build_feature_columns(hist)
+            if not columns['date']:
                 error_count += 1
-                logging.warning(f"❌ {ticker}: No data fetched")
-                
+                continue
+            cached = get_fundamentals(ticker) or {}
+            entry = _history_entry(columns, cached)
+            # Store individual ticker data + State für die inkrementellen Läufe des Tages
+            pipe.set(f'yfinance_enhanced:{ticker}', _payload(ticker, entry, entry['last_row'], cached))
+            state_key = f'yfinance_indicator_state:{ticker}'
+            pipe.set(state_key, redis_codec.dumps(state_key, build_indicator_state(hist)), ex=STATE_TTL)
+            pending[ticker] = entry
+            counts['rebuilt'] += 1
         except Exception as e:
             error_count += 1
             logging.error(f"❌ {ticker}: Error {e}")
-        
-        # Aggressive rate limiting to avoid 429 errors
-        time.sleep(5)  # 5 seconds between tickers
-    
+    pipe.execute()
+    _history_cache.update(pending)
+
     # Update status
+    success_count = sum(counts.values())
     status = {
         'timestamp': datetime.utcnow().isoformat(),
         'tickers_processed': len(tickers),
         'success_count': success_count,
         'error_count': error_count,
+        **counts,
+        'duration_s': round(time.time() - started, 1),
         'next_update': (datetime.utcnow() + timedelta(seconds=INTERVAL)).isoformat()
     }
     r.set('yfinance_enhanced_status', json.dumps(status))
-    
-    logging.info(f"Enhanced YFinance update complete: {success_count} success, {error_count} errors")
+
+    logging.info(f"Enhanced YFinance update complete: {success_count} success ({counts['rebuilt']} rebuilt, "
+                 f"{counts['incremental']} incremental, {counts['unchanged']} unchanged), {error_count} errors in {status['duration_s']}s")
 
 def main():
     """Main service loop"""
     logging.info("YFinance Enhanced Data Service starting...")
-    
+    threading.Thread(target=fundamentals_loop, name='yf-fundamentals', daemon=True).start()
+
     while True:
         start_time = time.time()
-        
+
         try:
             update_redis_data()
         except Exception as e:
             logging.error(f"Error in main loop: {e}")
-        
+
         # Calculate sleep time
         elapsed = time.time() - start_time
         sleep_time = max(60, INTERVAL - elapsed)
-        
+
         logging.info(f"Sleeping for {sleep_time:.0f} seconds until next update...")
         time.sleep(sleep_time)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()